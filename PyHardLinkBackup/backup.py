@@ -1,33 +1,44 @@
 import dataclasses
 import datetime
+import hashlib
 import logging
 import os
 import shutil
 import sys
 import time
+from concurrent.futures import ThreadPoolExecutor, wait
 from pathlib import Path
 
 from rich import print
 
-from PyHardLinkBackup.constants import CHUNK_SIZE
+from PyHardLinkBackup.constants import CHUNK_SIZE, HASH_ALGO
 from PyHardLinkBackup.logging_setup import LoggingManager
 from PyHardLinkBackup.utilities.file_hash_database import FileHashDatabase
+from PyHardLinkBackup.utilities.file_hash_pool import get_hash_db
 from PyHardLinkBackup.utilities.file_size_database import FileSizeDatabase
 from PyHardLinkBackup.utilities.filesystem import (
     RemoveFileOnError,
     copy_and_hash,
+    copy_small_file,
     copy_with_progress,
+    hardlink_or_copy,
     hash_file,
     humanized_fs_scan,
     iter_scandir_files,
     read_and_hash_file,
+    read_small_file,
     supports_hardlinks,
     verbose_path_stat,
+    write_small_file,
 )
 from PyHardLinkBackup.utilities.humanize import PrintTimingContextManager, human_filesize
-from PyHardLinkBackup.utilities.rich_utils import DisplayFileTreeProgress
+from PyHardLinkBackup.utilities.manifest import ManifestWriter
+from PyHardLinkBackup.utilities.rich_utils import DisplayFileTreeProgress, NoopProgress
 from PyHardLinkBackup.utilities.sha256sums import store_hash
+from PyHardLinkBackup.utilities.small_file_index import SmallFileIndex
+from PyHardLinkBackup.utilities.source_hash_cache import SourceHashCache
 from PyHardLinkBackup.utilities.tee import TeeStdoutContext
+from PyHardLinkBackup.utilities.tyro_cli_shared_args import DEFAULT_WORKERS
 
 
 logger = logging.getLogger(__name__)
@@ -46,9 +57,36 @@ class BackupResult:
     copied_size: int = 0
     copied_small_files: int = 0
     copied_small_size: int = 0
+    hardlinked_small_files: int = 0
+    hardlink_rotations: int = 0
+    hash_cache_hits: int = 0
+    hash_cache_misses: int = 0
     error_count: int = 0
 
 
+@dataclasses.dataclass
+class BackupSource:
+    src_root: Path
+    backup_name: str | None = None
+
+    @classmethod
+    def from_arg(cls, value: str) -> 'BackupSource':
+        """
+        Parse a CLI source argument: `path` or `name=path`
+
+        >>> BackupSource.from_arg('/home/foo')
+        BackupSource(src_root=PosixPath('/home/foo'), backup_name=None)
+        >>> BackupSource.from_arg('foo-home=/home/foo')
+        BackupSource(src_root=PosixPath('/home/foo'), backup_name='foo-home')
+        >>> BackupSource.from_arg('/data/a=b')
+        BackupSource(src_root=PosixPath('/data/a=b'), backup_name=None)
+        """
+        name, sep, path = value.partition('=')
+        if sep and name and os.sep not in name:
+            return cls(src_root=Path(path), backup_name=name)
+        return cls(src_root=Path(value))
+
+
 def copy_symlink(src_path: Path, dst_path: Path) -> None:
     """
     Copy file and directory symlinks.
@@ -59,6 +97,35 @@ def copy_symlink(src_path: Path, dst_path: Path) -> None:
     dst_path.symlink_to(target, target_is_directory=target_is_directory)
 
 
+def hardlink_duplicate(
+    *,
+    src_path: Path,
+    existing_path: Path,
+    dst_path: Path,
+    file_hash: str,
+    size: int,
+    hash_db: FileHashDatabase | SmallFileIndex,
+    backup_result: BackupResult,
+) -> bool:
+    """
+    Returns False if the hardlink limit was reached and the file was copied instead.
+    The copy gets the metadata of the source file, like every other copied file.
+    """
+    logger.info('Hardlink duplicate file: %s to %s', dst_path, existing_path)
+    if hardlink_or_copy(existing_path, dst_path):
+        backup_result.hardlinked_files += 1
+        backup_result.hardlinked_size += size
+        return True
+    else:
+        # Hardlink limit reached -> Use the fresh copy as new "master" for all following hardlinks:
+        shutil.copystat(src_path, dst_path)
+        hash_db[file_hash] = dst_path
+        backup_result.hardlink_rotations += 1
+        backup_result.copied_files += 1
+        backup_result.copied_size += size
+        return False
+
+
 def backup_one_file(
     *,
     src_root: Path,
@@ -68,6 +135,10 @@ def backup_one_file(
     backup_dir: Path,
     backup_result: BackupResult,
     progress: DisplayFileTreeProgress,
+    src_inode_cache: dict[str, tuple[str, Path]],
+    source_hash_cache: SourceHashCache | None = None,
+    small_file_index: SmallFileIndex | None = None,
+    manifest: ManifestWriter | None = None,
 ) -> None:
     backup_result.backup_count += 1
     src_path = Path(entry.path)
@@ -83,6 +154,8 @@ def backup_one_file(
         logger.warning(f'Broken symlink {src_path}: {err.__class__.__name__}: {err}')
         copy_symlink(src_path, dst_path)
         backup_result.symlink_files += 1
+        if manifest is not None:
+            manifest.add(dst_path, None)
         return
 
     backup_result.backup_size += size
@@ -96,57 +169,114 @@ def backup_one_file(
     if entry.is_symlink():
         copy_symlink(src_path, dst_path)
         backup_result.symlink_files += 1
+        if manifest is not None:
+            manifest.add(dst_path, None)
         return
 
     # Process regular files
     assert entry.is_file(follow_symlinks=False), f'Unexpected non-file: {src_path}'
 
+    src_stat = entry.stat()
+    src_inode = None
+    if src_stat.st_nlink > 1:
+        # The source file has hardlinks: Process every source inode only once
+        # and keep the hardlink structure in the backup, too.
+        src_inode = f'{src_stat.st_dev}:{src_stat.st_ino}'
+        if cached := src_inode_cache.get(src_inode):
+            file_hash, first_dst_path = cached
+            with RemoveFileOnError(dst_path):
+                logger.info('Hardlink %s to %s (same source inode)', dst_path, first_dst_path)
+                if hardlink_or_copy(first_dst_path, dst_path):
+                    backup_result.hardlinked_files += 1
+                    backup_result.hardlinked_size += size
+                else:
+                    shutil.copystat(src_path, dst_path)
+                    src_inode_cache[src_inode] = (file_hash, dst_path)
+                    backup_result.hardlink_rotations += 1
+                    backup_result.copied_files += 1
+                    backup_result.copied_size += size
+                store_hash(dst_path, file_hash)
+            if manifest is not None:
+                manifest.add(dst_path, file_hash, src_inode=src_inode)
+            return
+
     with RemoveFileOnError(dst_path):
         # Deduplication logic
 
-        if size < size_db.MIN_SIZE:
+        if size < size_db.MIN_SIZE and small_file_index is not None:
+            # Small file -> deduplicate via the small file index
+            file_hash = source_hash_cache.get(src_stat) if source_hash_cache is not None else None
+            file_content = None
+            if not file_hash:
+                file_content = read_small_file(src_path, src_stat)
+                file_hash = hashlib.new(HASH_ALGO, file_content).hexdigest()
+                logger.info('%s %s hash: %s', src_path, HASH_ALGO, file_hash)
+
+            if existing_path := small_file_index.get(file_hash):
+                if hardlink_duplicate(
+                    src_path=src_path,
+                    existing_path=existing_path,
+                    dst_path=dst_path,
+                    file_hash=file_hash,
+                    size=size,
+                    hash_db=small_file_index,
+                    backup_result=backup_result,
+                ):
+                    backup_result.hardlinked_small_files += 1
+            else:
+                logger.info('Store small file: %s to %s', src_path, dst_path)
+                if file_content is None:
+                    file_content = read_small_file(src_path, src_stat)
+                write_small_file(dst_path, file_content, src_stat)
+                small_file_index[file_hash] = dst_path
+                backup_result.copied_files += 1
+                backup_result.copied_size += size
+                backup_result.copied_small_files += 1
+                backup_result.copied_small_size += size
+
+        elif size < size_db.MIN_SIZE:
             # Small file -> always copy without deduplication
             logger.info('Copy small file: %s to %s', src_path, dst_path)
-            file_hash = copy_and_hash(src_path, dst_path, progress=progress, total_size=size)
+            file_hash = copy_small_file(src_path, dst_path, src_stat)
             backup_result.copied_files += 1
             backup_result.copied_size += size
             backup_result.copied_small_files += 1
             backup_result.copied_small_size += size
-            store_hash(dst_path, file_hash)
-            return
 
-        if size in size_db:
-            logger.debug('File with size %iBytes found before -> hash: %s', size, src_path)
-
-            if size <= CHUNK_SIZE:
+        elif size in size_db:
+            file_content = None
+            file_hash = source_hash_cache.get(src_stat) if source_hash_cache is not None else None
+            if file_hash:
+                logger.debug('File with size %iBytes found before -> use cached hash: %s', size, src_path)
+            elif size <= CHUNK_SIZE:
                 # File can be read complete into memory
+                logger.debug('File with size %iBytes found before -> hash: %s', size, src_path)
                 logger.debug('File size %iBytes <= CHUNK_SIZE (%iBytes) -> read complete into memory', size, CHUNK_SIZE)
                 file_content, file_hash = read_and_hash_file(src_path)
-                if existing_path := hash_db.get(file_hash):
-                    logger.info('Hardlink duplicate file: %s to %s', dst_path, existing_path)
-                    os.link(existing_path, dst_path)
-                    backup_result.hardlinked_files += 1
-                    backup_result.hardlinked_size += size
-                else:
+            else:
+                # Large file -> Calculate hash without copying
+                logger.debug('File with size %iBytes found before -> hash: %s', size, src_path)
+                file_hash = hash_file(src_path, progress=progress, total_size=size)
+
+            if existing_path := hash_db.get(file_hash):
+                hardlink_duplicate(
+                    src_path=src_path,
+                    existing_path=existing_path,
+                    dst_path=dst_path,
+                    file_hash=file_hash,
+                    size=size,
+                    hash_db=hash_db,
+                    backup_result=backup_result,
+                )
+            else:
+                if file_content is not None:
                     logger.info('Store unique file: %s to %s', src_path, dst_path)
                     dst_path.write_bytes(file_content)
-                    backup_result.copied_files += 1
-                    backup_result.copied_size += size
-
-            else:
-                # Large file
-                file_hash = hash_file(src_path, progress=progress, total_size=size)  # Calculate hash without copying
-
-                if existing_path := hash_db.get(file_hash):
-                    logger.info('Hardlink duplicate file: %s to %s', dst_path, existing_path)
-                    os.link(existing_path, dst_path)
-                    backup_result.hardlinked_files += 1
-                    backup_result.hardlinked_size += size
                 else:
                     logger.info('Copy unique file: %s to %s', src_path, dst_path)
                     copy_with_progress(src_path, dst_path, progress=progress, total_size=size)
-                    backup_result.copied_files += 1
-                    backup_result.copied_size += size
+                backup_result.copied_files += 1
+                backup_result.copied_size += size
 
             # Store new file in hash database or update existing entry to latest backuped file:
             hash_db[file_hash] = dst_path
@@ -161,27 +291,19 @@ def backup_one_file(
             backup_result.copied_files += 1
             backup_result.copied_size += size
 
+        if source_hash_cache is not None and (size >= size_db.MIN_SIZE or small_file_index is not None):
+            source_hash_cache[src_stat] = file_hash
+
         store_hash(dst_path, file_hash)
 
+    if manifest is not None:
+        manifest.add(dst_path, file_hash, src_inode=src_inode)
 
-def backup_tree(
-    *,
-    src_root: Path,
-    backup_root: Path,
-    backup_name: str | None,
-    one_file_system: bool,
-    excludes: tuple[str, ...],
-    log_manager: LoggingManager,
-) -> BackupResult:
-    src_root = src_root.resolve()
-    if not src_root.is_dir():
-        print('Error: Source directory does not exist!')
-        print(f'Please check source directory: "{src_root}"\n')
-        sys.exit(1)
+    if src_inode:
+        src_inode_cache[src_inode] = (file_hash, dst_path)
 
-    src_stat = verbose_path_stat(src_root)
-    src_device_id = src_stat.st_dev
 
+def check_backup_root(backup_root: Path) -> Path:
     backup_root = backup_root.resolve()
     if not backup_root.is_dir():
         print('Error: Backup directory does not exist!')
@@ -200,6 +322,129 @@ def backup_tree(
         print(f'Please check backup directory: "{backup_root}"\n')
         sys.exit(1)
 
+    return backup_root
+
+
+def check_src_root(src_root: Path) -> tuple[Path, int]:
+    """
+    Returns the resolved source directory and its device id.
+    """
+    src_root = src_root.resolve()
+    if not src_root.is_dir():
+        print('Error: Source directory does not exist!')
+        print(f'Please check source directory: "{src_root}"\n')
+        sys.exit(1)
+
+    src_stat = verbose_path_stat(src_root)
+    return src_root, src_stat.st_dev
+
+
+def backup_files(
+    *,
+    src_root: Path,
+    src_device_id: int,
+    one_file_system: bool,
+    excludes: set,
+    size_db: FileSizeDatabase,
+    hash_db: FileHashDatabase,
+    backup_result: BackupResult,
+    progress: DisplayFileTreeProgress,
+    source_hash_cache: SourceHashCache | None,
+    small_file_index: SmallFileIndex | None,
+) -> None:
+    """
+    Backup all files of the source directory into `backup_result.backup_dir`
+    """
+    # Source inode -> (hash, backup path) of all already processed source files with hardlinks:
+    src_inode_cache = {}
+
+    # One sorted manifest file of all backup files:
+    manifest = ManifestWriter(backup_result.backup_dir)
+
+    try:
+        next_update = 0
+        for entry in iter_scandir_files(
+            path=src_root,
+            one_file_system=one_file_system,
+            src_device_id=src_device_id,
+            excludes=excludes,
+        ):
+            try:
+                backup_one_file(
+                    src_root=src_root,
+                    entry=entry,
+                    size_db=size_db,
+                    hash_db=hash_db,
+                    backup_dir=backup_result.backup_dir,
+                    backup_result=backup_result,
+                    progress=progress,
+                    src_inode_cache=src_inode_cache,
+                    source_hash_cache=source_hash_cache,
+                    small_file_index=small_file_index,
+                    manifest=manifest,
+                )
+            except Exception as err:
+                logger.exception(f'Backup {entry.path} {err.__class__.__name__}')
+                backup_result.error_count += 1
+            else:
+                now = time.monotonic()
+                if now >= next_update:
+                    progress.update(
+                        completed_file_count=backup_result.backup_count, completed_size=backup_result.backup_size
+                    )
+                    next_update = now + 0.5
+        # Only a completed backup gets a manifest: It marks the snapshot as complete, e.g.: for "phlb replicate"
+        manifest.close()
+    finally:
+        # Remove the temporary files, also if the backup is interrupted:
+        manifest.cleanup()
+
+
+def print_summary(backup_result: BackupResult, *, hash_cache: bool, dedupe_small_files: bool) -> None:
+    min_size = FileSizeDatabase.MIN_SIZE
+    print(f'\nBackup complete: {backup_result.backup_dir} (total size {human_filesize(backup_result.backup_size)})\n')
+    print(f'  Total files processed: {backup_result.backup_count}')
+    print(f'   * Symlinked files: {backup_result.symlink_files}')
+    print(
+        f'   * Hardlinked files: {backup_result.hardlinked_files}'
+        f' (saved {human_filesize(backup_result.hardlinked_size)})'
+    )
+    if dedupe_small_files:
+        print(f'     of which small (<{min_size} Bytes) files: {backup_result.hardlinked_small_files}')
+    print(f'   * Copied files: {backup_result.copied_files} (total {human_filesize(backup_result.copied_size)})')
+    print(
+        f'     of which small (<{min_size} Bytes)'
+        f' files: {backup_result.copied_small_files}'
+        f' (total {human_filesize(backup_result.copied_small_size)})'
+    )
+    if backup_result.hardlink_rotations > 0:
+        print(f'   * Hardlink limit reached, new copies used as hardlink source: {backup_result.hardlink_rotations}')
+    if hash_cache:
+        lookups = backup_result.hash_cache_hits + backup_result.hash_cache_misses
+        hit_rate = backup_result.hash_cache_hits / lookups * 100 if lookups else 0
+        print(
+            f'  Source hash cache hits: {backup_result.hash_cache_hits} of {lookups} lookups (hit rate {hit_rate:.1f}%)'
+        )
+    if backup_result.error_count > 0:
+        print(f'  Errors during backup: {backup_result.error_count} (see log for details)')
+    print()
+
+
+def backup_tree(
+    *,
+    src_root: Path,
+    backup_root: Path,
+    backup_name: str | None,
+    one_file_system: bool,
+    excludes: tuple[str, ...],
+    log_manager: LoggingManager,
+    pool: bool = False,
+    hash_cache: bool = False,
+    dedupe_small_files: bool = False,
+) -> BackupResult:
+    src_root, src_device_id = check_src_root(src_root)
+    backup_root = check_backup_root(backup_root)
+
     # Step 1: Scan source directory:
     excludes: set = set(excludes)
     with PrintTimingContextManager('Filesystem scan completed in'):
@@ -234,60 +479,240 @@ def backup_tree(
     ) as progress:
         # "Databases" for deduplication
         size_db = FileSizeDatabase(phlb_conf_dir)
-        hash_db = FileHashDatabase(backup_root, phlb_conf_dir)
+        hash_db = get_hash_db(backup_root, phlb_conf_dir, pool=pool)
 
         backup_result = BackupResult(backup_dir=backup_dir, log_file=log_file)
 
-        next_update = 0
-        for entry in iter_scandir_files(
-            path=src_root,
-            one_file_system=one_file_system,
-            src_device_id=src_device_id,
-            excludes=excludes,
-        ):
-            try:
-                backup_one_file(
-                    src_root=src_root,
-                    entry=entry,
-                    size_db=size_db,
-                    hash_db=hash_db,
-                    backup_dir=backup_dir,
-                    backup_result=backup_result,
-                    progress=progress,
-                )
-            except Exception as err:
-                logger.exception(f'Backup {entry.path} {err.__class__.__name__}')
-                backup_result.error_count += 1
-            else:
-                now = time.monotonic()
-                if now >= next_update:
-                    progress.update(
-                        completed_file_count=backup_result.backup_count, completed_size=backup_result.backup_size
-                    )
-                    next_update = now + 0.5
+        # Optional persistent cache of source file hashes:
+        source_hash_cache = SourceHashCache(phlb_conf_dir, backup_name) if hash_cache else None
+
+        # Optional deduplication of small files:
+        small_file_index = SmallFileIndex(backup_root, phlb_conf_dir) if dedupe_small_files else None
+
+        completed = False
+        try:
+            backup_files(
+                src_root=src_root,
+                src_device_id=src_device_id,
+                one_file_system=one_file_system,
+                excludes=excludes,
+                size_db=size_db,
+                hash_db=hash_db,
+                backup_result=backup_result,
+                progress=progress,
+                source_hash_cache=source_hash_cache,
+                small_file_index=small_file_index,
+            )
+            completed = True
+        finally:
+            # Always store the new entries, also if the backup is interrupted:
+            if small_file_index is not None:
+                small_file_index.close()
+            if source_hash_cache is not None:
+                source_hash_cache.close(compact=completed)
+
+        if source_hash_cache is not None:
+            backup_result.hash_cache_hits = source_hash_cache.hits
+            backup_result.hash_cache_misses = source_hash_cache.misses
 
         # Finalize progress indicator values:
         progress.update(completed_file_count=backup_result.backup_count, completed_size=backup_result.backup_size)
 
     summary_file = backup_main_dir / f'{timestamp}-summary.txt'
     with TeeStdoutContext(summary_file):
-        print(f'\nBackup complete: {backup_dir} (total size {human_filesize(backup_result.backup_size)})\n')
-        print(f'  Total files processed: {backup_result.backup_count}')
-        print(f'   * Symlinked files: {backup_result.symlink_files}')
-        print(
-            f'   * Hardlinked files: {backup_result.hardlinked_files}'
-            f' (saved {human_filesize(backup_result.hardlinked_size)})'
-        )
-        print(f'   * Copied files: {backup_result.copied_files} (total {human_filesize(backup_result.copied_size)})')
-        print(
-            f'     of which small (<{size_db.MIN_SIZE} Bytes)'
-            f' files: {backup_result.copied_small_files}'
-            f' (total {human_filesize(backup_result.copied_small_size)})'
-        )
-        if backup_result.error_count > 0:
-            print(f'  Errors during backup: {backup_result.error_count} (see log for details)')
-        print()
+        print_summary(backup_result, hash_cache=hash_cache, dedupe_small_files=dedupe_small_files)
 
     logger.info('Backup completed. Summary created: %s', summary_file)
 
     return backup_result
+
+
+@dataclasses.dataclass
+class SourceJob:
+    src_root: Path
+    src_device_id: int
+    backup_name: str
+    backup_result: BackupResult
+
+
+def backup_device_sources(
+    *,
+    jobs: list[SourceJob],
+    phlb_conf_dir: Path,
+    one_file_system: bool,
+    excludes: set,
+    log_manager: LoggingManager,
+    size_db: FileSizeDatabase,
+    hash_db: FileHashDatabase,
+    small_file_index: SmallFileIndex | None,
+    hash_cache: bool,
+) -> None:
+    """
+    Backup all sources of one device, one after the other (Called in a worker thread)
+    """
+    for job in jobs:
+        backup_result = job.backup_result
+        file_handler = log_manager.start_file_logging(backup_result.log_file, current_thread_only=True)
+        try:
+            logger.info('Backup %s to %s', job.src_root, backup_result.backup_dir)
+            source_hash_cache = SourceHashCache(phlb_conf_dir, job.backup_name) if hash_cache else None
+            completed = False
+            try:
+                backup_files(
+                    src_root=job.src_root,
+                    src_device_id=job.src_device_id,
+                    one_file_system=one_file_system,
+                    excludes=excludes,
+                    size_db=size_db,
+                    hash_db=hash_db,
+                    backup_result=backup_result,
+                    # The shared progress is updated by the main thread
+                    # and large file progress bars can't be displayed concurrently:
+                    progress=NoopProgress(),
+                    source_hash_cache=source_hash_cache,
+                    small_file_index=small_file_index,
+                )
+                completed = True
+            finally:
+                if source_hash_cache is not None:
+                    source_hash_cache.close(compact=completed)
+            if source_hash_cache is not None:
+                backup_result.hash_cache_hits = source_hash_cache.hits
+                backup_result.hash_cache_misses = source_hash_cache.misses
+            logger.info('Backup of %s completed', job.src_root)
+        finally:
+            log_manager.stop_file_logging(file_handler)
+
+
+def backup_sources(
+    *,
+    sources: list[BackupSource],
+    backup_root: Path,
+    one_file_system: bool,
+    excludes: tuple[str, ...],
+    log_manager: LoggingManager,
+    workers: int = DEFAULT_WORKERS,
+    pool: bool = False,
+    hash_cache: bool = False,
+    dedupe_small_files: bool = False,
+) -> list[BackupResult]:
+    """DocWrite: README.md ## backup implementation - Multiple sources
+    Several sources can be backed up to the same destination in one run, e.g.:
+    ```bash
+    phlb backup /home /backups --more-sources etc=/etc /mnt/data/photos
+    ```
+    Every source gets its own backup name (default: the source directory name, or use `name=path`)
+    and its own snapshot directory, log file and summary. All snapshots get the same timestamp.
+
+    In contrast to several `phlb backup` calls, the deduplication "databases" and the small file index
+    are loaded only once and are shared by all sources, under one progress display.
+    Sources on distinct devices are backed up concurrently via a worker pool (`--workers`),
+    sources on the same device one after the other, to avoid competing disk seeks.
+    The same new content in concurrently processed sources may be stored twice in rare cases,
+    `phlb dedupe` can merge these copies later.
+    """
+    backup_names = [source.backup_name or source.src_root.resolve().name for source in sources]
+    if duplicates := sorted({name for name in backup_names if backup_names.count(name) > 1}):
+        print(f'Error: Backup names must be unique, duplicates: {", ".join(duplicates)}')
+        print('Please use "name=path" to set a unique backup name for these sources.\n')
+        sys.exit(1)
+
+    src_roots = [check_src_root(source.src_root) for source in sources]
+    backup_root = check_backup_root(backup_root)
+
+    # Step 1: Scan all source directories:
+    excludes: set = set(excludes)
+    src_file_count = src_total_size = 0
+    for src_root, src_device_id in src_roots:
+        with PrintTimingContextManager(f'Filesystem scan of {src_root} completed in'):
+            file_count, total_size = humanized_fs_scan(
+                path=src_root,
+                one_file_system=one_file_system,
+                src_device_id=src_device_id,
+                excludes=excludes,
+            )
+        src_file_count += file_count
+        src_total_size += total_size
+
+    phlb_conf_dir = backup_root / '.phlb'
+    phlb_conf_dir.mkdir(parents=False, exist_ok=True)
+
+    timestamp = datetime.datetime.now().strftime('%Y-%m-%d-%H%M%S')
+
+    # Device id -> all sources on this device:
+    device_jobs: dict[int, list[SourceJob]] = {}
+    backup_results = []
+    for (src_root, src_device_id), backup_name in zip(src_roots, backup_names):
+        backup_dir = backup_root / backup_name / timestamp
+        backup_dir.mkdir(parents=True, exist_ok=False)
+        backup_result = BackupResult(backup_dir=backup_dir, log_file=backup_dir.parent / f'{timestamp}-backup.log')
+        backup_results.append(backup_result)
+        device_jobs.setdefault(src_device_id, []).append(
+            SourceJob(
+                src_root=src_root,
+                src_device_id=src_device_id,
+                backup_name=backup_name,
+                backup_result=backup_result,
+            )
+        )
+
+    print(f'\nBackup {len(sources)} sources ({len(device_jobs)} devices) to {backup_root}...\n')
+
+    with DisplayFileTreeProgress(
+        description=f'Backup {len(sources)} sources...',
+        total_file_count=src_file_count,
+        total_size=src_total_size,
+    ) as progress:
+        # "Databases" for deduplication, shared by all sources:
+        size_db = FileSizeDatabase(phlb_conf_dir)
+        hash_db = get_hash_db(backup_root, phlb_conf_dir, pool=pool)
+        small_file_index = SmallFileIndex(backup_root, phlb_conf_dir) if dedupe_small_files else None
+
+        def update_progress():
+            progress.update(
+                completed_file_count=sum(result.backup_count for result in backup_results),
+                completed_size=sum(result.backup_size for result in backup_results),
+            )
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='backup') as executor:
+            futures = [
+                executor.submit(
+                    backup_device_sources,
+                    jobs=jobs,
+                    phlb_conf_dir=phlb_conf_dir,
+                    one_file_system=one_file_system,
+                    excludes=excludes,
+                    log_manager=log_manager,
+                    size_db=size_db,
+                    hash_db=hash_db,
+                    small_file_index=small_file_index,
+                    hash_cache=hash_cache,
+                )
+                for jobs in device_jobs.values()
+            ]
+            while wait(futures, timeout=0.5).not_done:
+                update_progress()
+
+        if small_file_index is not None:
+            small_file_index.close()
+
+        # Finalize progress indicator values:
+        update_progress()
+
+    for backup_result in backup_results:
+        summary_file = backup_result.backup_dir.parent / f'{timestamp}-summary.txt'
+        with TeeStdoutContext(summary_file):
+            print_summary(backup_result, hash_cache=hash_cache, dedupe_small_files=dedupe_small_files)
+        logger.info('Backup completed. Summary created: %s', summary_file)
+
+    error_count = sum(result.error_count for result in backup_results)
+    print(
+        f'All {len(sources)} sources backed up'
+        f' (total size {human_filesize(sum(result.backup_size for result in backup_results))},'
+        f' errors: {error_count})\n'
+    )
+
+    for future in futures:
+        future.result()  # Raise unexpected errors of the worker threads
+
+    return backup_results
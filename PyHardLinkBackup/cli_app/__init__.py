@@ -1,7 +1,8 @@
 """
-    CLI for usage
+CLI for usage
 """
 
+import functools
 import logging
 import sys
 from collections.abc import Sequence
@@ -19,6 +20,16 @@ logger = logging.getLogger(__name__)
 
 app = SubcommandApp()
 
+
+@functools.cache
+def print_banner() -> None:
+    """
+    Print the version banner once. Every command calls this after it has chosen the console:
+    "phlb export" writes the tar archive to stdout, so all messages must go to stderr.
+    """
+    print_version(PyHardLinkBackup, project_name='phlb')
+
+
 # Register all CLI commands, just by import all files in this package:
 import_all_files(package=__package__, init_file=__file__)
 
@@ -26,13 +37,13 @@ import_all_files(package=__package__, init_file=__file__)
 @app.command
 def version():
     """Print version and exit"""
-    # Pseudo command, because the version always printed on every CLI call ;)
+    # Pseudo command, because every command prints the version banner ;)
+    print_banner()
     sys.exit(0)
 
 
 def main(args: Sequence[str] | None = None):
     project_name = 'phlb'  # Enforce program name if pipx used
-    print_version(PyHardLinkBackup, project_name=project_name)
     app.cli(
         prog=project_name,
         description=constants.CLI_EPILOG,
@@ -3,11 +3,23 @@ from pathlib import Path
 from typing import Annotated
 
 import tyro
-from rich import print  # noqa
+from rich import get_console, print  # noqa
 
-from PyHardLinkBackup import compare_backup, rebuild_databases
-from PyHardLinkBackup.backup import backup_tree
-from PyHardLinkBackup.cli_app import app
+from PyHardLinkBackup import (
+    compare_backup,
+    dedupe_tree,
+    diff_snapshots,
+    disk_usage,
+    export_snapshot,
+    prune_snapshots,
+    rebuild_databases,
+    replicate_backup,
+    restore_snapshot,
+)
+from PyHardLinkBackup.backup import BackupSource, backup_sources, backup_tree
+from PyHardLinkBackup.cli_app import app, print_banner
+from PyHardLinkBackup.history import file_history, find_files
+from PyHardLinkBackup.import_tar import import_tar as import_tar_archive
 from PyHardLinkBackup.logging_setup import (
     DEFAULT_CONSOLE_LOG_LEVEL,
     DEFAULT_LOG_FILE_LEVEL,
@@ -17,9 +29,11 @@ from PyHardLinkBackup.logging_setup import (
 )
 from PyHardLinkBackup.utilities.tyro_cli_shared_args import (
     DEFAULT_EXCLUDE_DIRECTORIES,
+    DEFAULT_WORKERS,
     TyroBackupNameArgType,
     TyroExcludeDirectoriesArgType,
     TyroOneFileSystemArgType,
+    TyroWorkersArgType,
 )
 
 
@@ -46,16 +60,76 @@ def backup(
     name: TyroBackupNameArgType = None,
     one_file_system: TyroOneFileSystemArgType = True,
     excludes: TyroExcludeDirectoriesArgType = DEFAULT_EXCLUDE_DIRECTORIES,
+    pool: Annotated[
+        bool,
+        tyro.conf.arg(
+            help=(
+                'Store the first copy of every content in the ".phlb/pool" directory and hardlink all backup files'
+                ' to it. Once activated, the pool is always used for this backup destination.'
+            ),
+        ),
+    ] = False,
+    hash_cache: Annotated[
+        bool,
+        tyro.conf.arg(
+            help=(
+                'Cache the hashes of source files in the ".phlb/source-hash-cache" directory,'
+                ' so that unmodified files are not read again in the next backup, even if they are moved.'
+            ),
+        ),
+    ] = False,
+    dedupe_small_files: Annotated[
+        bool,
+        tyro.conf.arg(
+            help=(
+                'Deduplicate small files, too: Hardlink them to existing backup files with the same content,'
+                ' using the ".phlb/small-file-index.bin" index.'
+            ),
+        ),
+    ] = False,
+    more_sources: Annotated[
+        tuple[str, ...],
+        tyro.conf.arg(
+            help=(
+                'Additional source directories to back up in the same run, as "path" or "name=path".'
+                ' All sources share the deduplication databases and sources on distinct devices'
+                ' are backed up concurrently.'
+            ),
+        ),
+    ] = (),
+    workers: Annotated[
+        int,
+        tyro.conf.arg(
+            help='Number of sources on distinct devices that are backed up concurrently (with --more-sources).',
+        ),
+    ] = DEFAULT_WORKERS,
     verbosity: TyroConsoleLogLevelArgType = DEFAULT_CONSOLE_LOG_LEVEL,
     log_file_level: TyroLogFileLevelArgType = DEFAULT_LOG_FILE_LEVEL,
 ) -> None:
     """
     Backup the source directory to the destination directory using hard links for deduplication.
     """
+    print_banner()
     log_manager = LoggingManager(
         console_level=verbosity,
         file_level=log_file_level,
     )
+    if more_sources:
+        backup_sources(
+            sources=[
+                BackupSource(src_root=src, backup_name=name),
+                *(BackupSource.from_arg(value) for value in more_sources),
+            ],
+            backup_root=dst,
+            one_file_system=one_file_system,
+            excludes=excludes,
+            log_manager=log_manager,
+            workers=workers,
+            pool=pool,
+            hash_cache=hash_cache,
+            dedupe_small_files=dedupe_small_files,
+        )
+        return
     backup_tree(
         src_root=src,
         backup_root=dst,
@@ -63,6 +137,9 @@ def backup(
         one_file_system=one_file_system,
         excludes=excludes,
         log_manager=log_manager,
+        pool=pool,
+        hash_cache=hash_cache,
+        dedupe_small_files=dedupe_small_files,
     )
 
 
@@ -85,22 +162,366 @@ def compare(
     /,
     one_file_system: TyroOneFileSystemArgType = True,
     excludes: TyroExcludeDirectoriesArgType = DEFAULT_EXCLUDE_DIRECTORIES,
+    workers: TyroWorkersArgType = DEFAULT_WORKERS,
+    rehash_backup: Annotated[
+        bool,
+        tyro.conf.arg(
+            help=(
+                'Read and hash all backup files, too, instead of using the hashes from the SHA256SUMS files.'
+                ' Use this to detect damaged backup files.'
+            ),
+        ),
+    ] = False,
+    quick: Annotated[
+        bool,
+        tyro.conf.arg(
+            help='Compare only the metadata (size, modification time and mode) without reading any file content.',
+        ),
+    ] = False,
+    changed_list: Annotated[
+        Path | None,
+        tyro.conf.arg(
+            help='Quick compare only: Write the relative paths of all new and changed files into this file.',
+        ),
+    ] = None,
+    only_paths: Annotated[
+        Path | None,
+        tyro.conf.arg(
+            help='Compare only the files listed in this file, e.g.: the "--changed-list" of a quick compare.',
+        ),
+    ] = None,
     verbosity: TyroConsoleLogLevelArgType = DEFAULT_CONSOLE_LOG_LEVEL,
     log_file_level: TyroLogFileLevelArgType = DEFAULT_LOG_FILE_LEVEL,
 ) -> None:
     """
     Compares a source tree with the last backup and validates all known file hashes.
     """
+    print_banner()
     log_manager = LoggingManager(
         console_level=verbosity,
         file_level=log_file_level,
     )
-    compare_backup.compare_tree(
-        src_root=src,
-        backup_root=dst,
-        one_file_system=one_file_system,
-        excludes=excludes,
+    if quick:
+        compare_backup.quick_compare_tree(
+            src_root=src,
+            backup_root=dst,
+            one_file_system=one_file_system,
+            excludes=excludes,
+            log_manager=log_manager,
+            changed_list=changed_list,
+        )
+    else:
+        compare_backup.compare_tree(
+            src_root=src,
+            backup_root=dst,
+            one_file_system=one_file_system,
+            excludes=excludes,
+            log_manager=log_manager,
+            workers=workers,
+            rehash_backup=rehash_backup,
+            only_paths=only_paths,
+        )
+
+
+@app.command
+def dedupe(
+    backup_root: Annotated[
+        Path,
+        tyro.conf.arg(
+            metavar='backup-directory',
+            help='Root directory of the the backups.',
+        ),
+    ],
+    path: Annotated[
+        Path,
+        tyro.conf.arg(
+            metavar='path',
+            help='Directory inside the backup directory to deduplicate, e.g.: old backups made with "rsync".',
+        ),
+    ],
+    /,
+    workers: TyroWorkersArgType = DEFAULT_WORKERS,
+    verbosity: TyroConsoleLogLevelArgType = DEFAULT_CONSOLE_LOG_LEVEL,
+    log_file_level: TyroLogFileLevelArgType = DEFAULT_LOG_FILE_LEVEL,
+) -> None:
+    """
+    Deduplicate an existing directory tree: Replace files with already known content by hardlinks
+    and register all new content in the databases.
+    """
+    print_banner()
+    log_manager = LoggingManager(
+        console_level=verbosity,
+        file_level=log_file_level,
+    )
+    dedupe_tree.dedupe(
+        backup_root=backup_root,
+        path=path,
         log_manager=log_manager,
+        workers=workers,
+    )
+
+
+@app.command
+def diff(
+    snapshot_a: Annotated[
+        Path,
+        tyro.conf.arg(
+            metavar='snapshot-a',
+            help='The older backup snapshot directory, e.g.: ".../backups/foobar/2026-01-01-120000"',
+        ),
+    ],
+    snapshot_b: Annotated[
+        Path,
+        tyro.conf.arg(
+            metavar='snapshot-b',
+            help='The newer backup snapshot directory, e.g.: ".../backups/foobar/2026-01-02-120000"',
+        ),
+    ],
+    /,
+    verbosity: TyroConsoleLogLevelArgType = DEFAULT_CONSOLE_LOG_LEVEL,
+) -> None:
+    """
+    List added, removed, modified and moved files between two backup snapshots.
+    """
+    print_banner()
+    LoggingManager(
+        console_level=verbosity,
+        file_level=DEFAULT_LOG_FILE_LEVEL,
+    )
+    diff_snapshots.diff_snapshots(
+        snapshot_a=snapshot_a,
+        snapshot_b=snapshot_b,
+    )
+
+
+@app.command
+def du(
+    backup_root: Annotated[
+        Path,
+        tyro.conf.arg(
+            metavar='backup-directory',
+            help='Root directory of the the backups.',
+        ),
+    ],
+    /,
+    refresh: Annotated[
+        bool,
+        tyro.conf.arg(help='Scan all snapshots again, instead of using the stored snapshot catalogs.'),
+    ] = False,
+    workers: TyroWorkersArgType = DEFAULT_WORKERS,
+    verbosity: TyroConsoleLogLevelArgType = DEFAULT_CONSOLE_LOG_LEVEL,
+) -> None:
+    """
+    Show the real disk usage of every backup snapshot: Exclusive and shared (hardlinked) files.
+    """
+    print_banner()
+    LoggingManager(
+        console_level=verbosity,
+        file_level=DEFAULT_LOG_FILE_LEVEL,
+    )
+    disk_usage.disk_usage(
+        backup_root=backup_root,
+        workers=workers,
+        refresh=refresh,
+    )
+
+
+@app.command
+def export(
+    snapshot_dir: Annotated[
+        Path,
+        tyro.conf.arg(
+            metavar='snapshot',
+            help='The backup snapshot directory, e.g.: ".../backups/foobar/2026-01-01-120000"',
+        ),
+    ],
+    output: Annotated[
+        str,
+        tyro.conf.arg(
+            metavar='output',
+            help='The tar archive file to create, or "-" to write the archive to stdout.',
+        ),
+    ],
+    /,
+    base: Annotated[
+        Path | None,
+        tyro.conf.arg(
+            help='Base snapshot of a incremental export: Only new and changed files are exported.',
+        ),
+    ] = None,
+    verbosity: TyroConsoleLogLevelArgType = DEFAULT_CONSOLE_LOG_LEVEL,
+) -> None:
+    """
+    Export a backup snapshot as a POSIX tar archive that keeps the hardlinks.
+    """
+    if output == '-':
+        # The tar archive is written to stdout -> all messages to stderr:
+        get_console().stderr = True
+    print_banner()
+    LoggingManager(
+        console_level=verbosity,
+        file_level=DEFAULT_LOG_FILE_LEVEL,
+    )
+    export_snapshot.export(
+        snapshot_dir=snapshot_dir,
+        output=output,
+        base_dir=base,
+    )
+
+
+@app.command
+def find(
+    backup_root: Annotated[
+        Path,
+        tyro.conf.arg(
+            metavar='backup-directory',
+            help='Root directory of the the backups.',
+        ),
+    ],
+    pattern: Annotated[
+        str,
+        tyro.conf.arg(
+            metavar='glob-or-hash',
+            help=(
+                'Glob pattern of the relative path, e.g.: "*.xlsx" or "home/*/report.xlsx"'
+                ' (without "/" the file name is matched). Or a SHA256 hash of the file content.'
+            ),
+        ),
+    ],
+    /,
+    verbosity: TyroConsoleLogLevelArgType = DEFAULT_CONSOLE_LOG_LEVEL,
+) -> None:
+    """
+    Find files in all backup snapshots by a glob pattern or by the SHA256 hash.
+    """
+    print_banner()
+    LoggingManager(
+        console_level=verbosity,
+        file_level=DEFAULT_LOG_FILE_LEVEL,
+    )
+    find_files(
+        backup_root=backup_root,
+        pattern=pattern,
+    )
+
+
+@app.command
+def history(
+    backup_root: Annotated[
+        Path,
+        tyro.conf.arg(
+            metavar='backup-directory',
+            help='Root directory of the the backups.',
+        ),
+    ],
+    rel_path: Annotated[
+        str,
+        tyro.conf.arg(
+            metavar='path',
+            help='Path of the file relative to the backup source directory, e.g.: "home/x/report.xlsx"',
+        ),
+    ],
+    /,
+    verbosity: TyroConsoleLogLevelArgType = DEFAULT_CONSOLE_LOG_LEVEL,
+) -> None:
+    """
+    List all different versions of one file in all backup snapshots.
+    """
+    print_banner()
+    LoggingManager(
+        console_level=verbosity,
+        file_level=DEFAULT_LOG_FILE_LEVEL,
+    )
+    file_history(
+        backup_root=backup_root,
+        rel_path=rel_path,
+    )
+
+
+@app.command
+def import_tar(
+    archive_path: Annotated[
+        Path,
+        tyro.conf.arg(
+            metavar='archive',
+            help='The tar archive to import, e.g.: ".../old-backups/home-2019-01-01.tar.gz"',
+        ),
+    ],
+    backup_root: Annotated[
+        Path,
+        tyro.conf.arg(
+            metavar='backup-directory',
+            help='Root directory of the the backups.',
+        ),
+    ],
+    /,
+    name: Annotated[
+        str | None,
+        tyro.conf.arg(
+            help=(
+                'Optional name for the backup (used to create a subdirectory in the backup destination).'
+                ' If not provided, the archive file name without extensions is used.'
+            ),
+        ),
+    ] = None,
+    verbosity: TyroConsoleLogLevelArgType = DEFAULT_CONSOLE_LOG_LEVEL,
+    log_file_level: TyroLogFileLevelArgType = DEFAULT_LOG_FILE_LEVEL,
+) -> None:
+    """
+    Import a tar archive as a new backup snapshot: Deduplicate every member without extracting the archive first.
+    """
+    print_banner()
+    log_manager = LoggingManager(
+        console_level=verbosity,
+        file_level=log_file_level,
+    )
+    import_tar_archive(
+        archive_path=archive_path,
+        backup_root=backup_root,
+        backup_name=name,
+        log_manager=log_manager,
+    )
+
+
+@app.command
+def prune(
+    backup_root: Annotated[
+        Path,
+        tyro.conf.arg(
+            metavar='backup-directory',
+            help='Root directory of the the backups.',
+        ),
+    ],
+    /,
+    keep_last: Annotated[int, tyro.conf.arg(help='Keep the N newest snapshots.')] = 0,
+    keep_daily: Annotated[int, tyro.conf.arg(help='Keep the newest snapshot of each of the last N days.')] = 0,
+    keep_weekly: Annotated[int, tyro.conf.arg(help='Keep the newest snapshot of each of the last N weeks.')] = 0,
+    keep_monthly: Annotated[int, tyro.conf.arg(help='Keep the newest snapshot of each of the last N months.')] = 0,
+    dry_run: Annotated[
+        bool,
+        tyro.conf.arg(help='Only list the snapshots that would be deleted.'),
+    ] = False,
+    workers: TyroWorkersArgType = DEFAULT_WORKERS,
+    verbosity: TyroConsoleLogLevelArgType = DEFAULT_CONSOLE_LOG_LEVEL,
+    log_file_level: TyroLogFileLevelArgType = DEFAULT_LOG_FILE_LEVEL,
+) -> None:
+    """
+    Delete old backup snapshots by a retention policy and remove their entries from the databases.
+    """
+    print_banner()
+    log_manager = LoggingManager(
+        console_level=verbosity,
+        file_level=log_file_level,
+    )
+    prune_snapshots.prune(
+        backup_root=backup_root,
+        keep_last=keep_last,
+        keep_daily=keep_daily,
+        keep_weekly=keep_weekly,
+        keep_monthly=keep_monthly,
+        log_manager=log_manager,
+        workers=workers,
+        dry_run=dry_run,
     )
 
 
@@ -118,6 +539,22 @@ def rebuild(
         bool,
         tyro.conf.arg(help='Skip files that have the same inode number as already processed files.'),
     ] = True,
+    workers: TyroWorkersArgType = DEFAULT_WORKERS,
+    trust_sha256sums: Annotated[
+        bool,
+        tyro.conf.arg(
+            help=(
+                'Take the file hashes from the existing SHA256SUMS files, instead of reading all backup files.'
+                ' Only files without a SHA256SUMS entry are hashed. The backup files are not verified!'
+            ),
+        ),
+    ] = False,
+    incremental: Annotated[
+        bool,
+        tyro.conf.arg(
+            help='Process only snapshots that are new or changed since the last rebuild.',
+        ),
+    ] = False,
     verbosity: TyroConsoleLogLevelArgType = DEFAULT_CONSOLE_LOG_LEVEL,
     log_file_level: TyroLogFileLevelArgType = DEFAULT_LOG_FILE_LEVEL,
 ) -> None:
@@ -125,6 +562,7 @@ def rebuild(
     Rebuild the file hash and size database by scanning all backup files. And also verify SHA256SUMS
     and/or store missing hashes in SHA256SUMS files.
     """
+    print_banner()
     log_manager = LoggingManager(
         console_level=verbosity,
         file_level=log_file_level,
@@ -133,4 +571,97 @@ def rebuild(
         backup_root=backup_root,
         skip_same_inode=skip_same_inode,
         log_manager=log_manager,
+        workers=workers,
+        trust_sha256sums=trust_sha256sums,
+        incremental=incremental,
+    )
+
+
+@app.command
+def replicate(
+    src_root: Annotated[
+        Path,
+        tyro.conf.arg(
+            metavar='src-root',
+            help='Root directory of the backups to replicate.',
+        ),
+    ],
+    dst_root: Annotated[
+        Path,
+        tyro.conf.arg(
+            metavar='dst-root',
+            help='Root directory of the replicated backups, e.g.: on a offsite backup disk.',
+        ),
+    ],
+    /,
+    workers: TyroWorkersArgType = DEFAULT_WORKERS,
+    verbosity: TyroConsoleLogLevelArgType = DEFAULT_CONSOLE_LOG_LEVEL,
+    log_file_level: TyroLogFileLevelArgType = DEFAULT_LOG_FILE_LEVEL,
+) -> None:
+    """
+    Replicate all backup snapshots to a second backup root: Copy only new content, hardlink the rest.
+    """
+    print_banner()
+    log_manager = LoggingManager(
+        console_level=verbosity,
+        file_level=log_file_level,
+    )
+    replicate_backup.replicate(
+        src_root=src_root,
+        dst_root=dst_root,
+        log_manager=log_manager,
+        workers=workers,
+    )
+
+
+@app.command
+def restore(
+    snapshot_dir: Annotated[
+        Path,
+        tyro.conf.arg(
+            metavar='snapshot',
+            help='The backup snapshot directory, e.g.: ".../backups/foobar/2026-01-01-120000"',
+        ),
+    ],
+    target_dir: Annotated[
+        Path,
+        tyro.conf.arg(
+            metavar='target',
+            help='The (empty or not existing) directory to restore the files into.',
+        ),
+    ],
+    paths: Annotated[
+        tuple[str, ...],
+        tyro.conf.arg(
+            metavar='paths',
+            help='Optional relative paths of files or directories to restore. Default: The complete snapshot.',
+        ),
+    ] = (),
+    /,
+    workers: TyroWorkersArgType = DEFAULT_WORKERS,
+    verify: Annotated[
+        bool,
+        tyro.conf.arg(help='Hash every file while it is copied and compare it with the SHA256SUMS entry.'),
+    ] = False,
+    hardlinks: Annotated[
+        bool,
+        tyro.conf.arg(help='Restore files that were hardlinked in the backup source as hardlinks.'),
+    ] = True,
+    verbosity: TyroConsoleLogLevelArgType = DEFAULT_CONSOLE_LOG_LEVEL,
+) -> None:
+    """
+    Restore a backup snapshot (or only some paths of it) into a target directory.
+    """
+    print_banner()
+    LoggingManager(
+        console_level=verbosity,
+        file_level=DEFAULT_LOG_FILE_LEVEL,
+    )
+    restore_snapshot.restore(
+        snapshot_dir=snapshot_dir,
+        target_dir=target_dir,
+        paths=paths,
+        workers=workers,
+        verify=verify,
+        hardlinks=hardlinks,
     )
@@ -1,29 +1,45 @@
+import collections
+import contextlib
 import dataclasses
 import datetime
+import itertools
 import logging
 import os
+import stat
 import sys
 import time
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
 
 from rich import print
+from rich.progress import Progress, SpinnerColumn, TextColumn, TimeElapsedColumn
 
 from PyHardLinkBackup.logging_setup import LoggingManager
+from PyHardLinkBackup.utilities.bounded_jobs import BoundedJobQueue
 from PyHardLinkBackup.utilities.file_hash_database import FileHashDatabase
+from PyHardLinkBackup.utilities.file_hash_pool import get_hash_db
 from PyHardLinkBackup.utilities.file_size_database import FileSizeDatabase
 from PyHardLinkBackup.utilities.filesystem import (
     hash_file,
     humanized_fs_scan,
+    iter_listed_files,
     iter_scandir_files,
+    iter_scandir_pairs,
     verbose_path_stat,
 )
 from PyHardLinkBackup.utilities.humanize import PrintTimingContextManager, human_filesize
-from PyHardLinkBackup.utilities.rich_utils import DisplayFileTreeProgress
+from PyHardLinkBackup.utilities.manifest import iter_manifest
+from PyHardLinkBackup.utilities.rich_utils import DisplayFileTreeProgress, NoopProgress
+from PyHardLinkBackup.utilities.sha256sums import get_cached_sha256sums_reader, get_sha256sums_path, read_sha256sums
 from PyHardLinkBackup.utilities.tee import TeeStdoutContext
+from PyHardLinkBackup.utilities.tyro_cli_shared_args import DEFAULT_WORKERS
 
 
 logger = logging.getLogger(__name__)
 
+MOVED_BATCH_SIZE = 1000  # Hash the source files, that may be moved, in batches of this size
+
 
 @dataclasses.dataclass
 class CompareResult:
@@ -33,6 +49,7 @@ class CompareResult:
     total_file_count: int = 0
     total_size: int = 0
     src_file_new_count: int = 0
+    src_file_moved_count: int = 0
     file_size_missmatch: int = 0
     file_hash_missmatch: int = 0
     small_file_count: int = 0
@@ -42,16 +59,50 @@ class CompareResult:
     error_count: int = 0
 
 
+@dataclasses.dataclass
+class QuickCompareResult:
+    last_timestamp: str
+    compare_dir: Path
+    log_file: Path
+    total_file_count: int = 0
+    unchanged_file_count: int = 0
+    new_file_count: int = 0
+    missing_file_count: int = 0
+    changed_file_count: int = 0
+    error_count: int = 0
+
+
+@dataclasses.dataclass
+class FileCompare:
+    """
+    A source/backup file pair, that must be compared by hash.
+    """
+
+    src_path: Path
+    dst_path: Path
+    size: int
+    dst_inode: tuple[int, int] | None = None  # Only set for backup files with hardlinks
+    dst_hash: str | None = None  # Taken from SHA256SUMS, if possible
+    src_hash_future: Future | None = None
+    dst_hash_future: Future | None = None
+
+
 def compare_one_file(
     *,
     src_root: Path,
     entry: os.DirEntry,
-    size_db: FileSizeDatabase,
-    hash_db: FileHashDatabase,
     compare_dir: Path,
     compare_result: CompareResult,
-    progress: DisplayFileTreeProgress,
-) -> None:
+    get_sha256sums: Callable[[Path], dict[str, str]],
+    rehash_backup: bool,
+    size_db: FileSizeDatabase,
+    moved_candidates: list[tuple[Path, int]],
+) -> FileCompare | None:
+    """
+    Make all cheap checks of one source file.
+    Returns a FileCompare, if the files must be compared by hash.
+    Source files that are missing in the compare, but may be moved, are added to "moved_candidates".
+    """
     if entry.is_file():
         # For the progress bars:
         compare_result.total_file_count += 1
@@ -60,7 +111,7 @@ def compare_one_file(
         src_size = entry.stat().st_size
     except FileNotFoundError as err:
         logger.warning(f'Broken symlink {entry.path}: {err.__class__.__name__}: {err}')
-        return
+        return None
 
     # For the progress bars:
     compare_result.total_size += src_size
@@ -70,9 +121,13 @@ def compare_one_file(
     dst_path = compare_dir / src_path.relative_to(src_root)
 
     if not dst_path.exists():
-        logger.warning('Source file %s not found in compare %s', src_path, dst_path)
-        compare_result.src_file_new_count += 1
-        return
+        if src_size >= size_db.MIN_SIZE and src_size in size_db and entry.is_file(follow_symlinks=False):
+            # Content with the same size exists in the backup -> Check later by hash, if the file was moved
+            moved_candidates.append((src_path, src_size))
+        else:
+            logger.warning('Source file %s not found in compare %s', src_path, dst_path)
+            compare_result.src_file_new_count += 1
+        return None
 
     if src_path.is_dir():
         if not src_path.is_symlink():
@@ -90,9 +145,10 @@ def compare_one_file(
                 dst_target,
             )
             compare_result.error_count += 1
-        return
+        return None
 
-    dst_size = dst_path.stat().st_size
+    dst_stat = dst_path.stat()
+    dst_size = dst_stat.st_size
     if src_size != dst_size:
         logger.warning(
             'Source file %s size (%i Bytes) differs from compare file %s size (%iBytes)',
@@ -102,17 +158,77 @@ def compare_one_file(
             dst_size,
         )
         compare_result.file_size_missmatch += 1
+        return None
+
+    file_compare = FileCompare(src_path=src_path, dst_path=dst_path, size=src_size)
+    if dst_stat.st_nlink > 1:
+        file_compare.dst_inode = (dst_stat.st_dev, dst_stat.st_ino)
+
+    if not rehash_backup and not dst_path.is_symlink():
+        # Use the hash from the backup, instead of reading the backup file:
+        file_compare.dst_hash = get_sha256sums(get_sha256sums_path(dst_path)).get(dst_path.name)
+
+    return file_compare
+
+
+def submit_hash_jobs(
+    *,
+    executor: ThreadPoolExecutor,
+    file_compare: FileCompare,
+    dst_inode_hashes: dict[tuple[int, int], str],
+    dst_inode_futures: dict[tuple[int, int], Future],
+) -> None:
+    """
+    Hash the source file and, if needed, the backup file in worker threads.
+    Every backup inode will be hashed only once.
+    Note: No progress bars are used in worker threads.
+    """
+    file_compare.src_hash_future = executor.submit(
+        hash_file, file_compare.src_path, progress=NoopProgress(), total_size=file_compare.size
+    )
+    if file_compare.dst_hash is not None:
         return
 
-    src_hash = hash_file(src_path, progress=progress, total_size=src_size)
-    dst_hash = hash_file(dst_path, progress=progress, total_size=dst_size)
+    if file_compare.dst_inode:
+        file_compare.dst_hash = dst_inode_hashes.get(file_compare.dst_inode)
+        if file_compare.dst_hash is not None:
+            return
+        file_compare.dst_hash_future = dst_inode_futures.get(file_compare.dst_inode)
+    if file_compare.dst_hash_future is None:
+        file_compare.dst_hash_future = executor.submit(
+            hash_file, file_compare.dst_path, progress=NoopProgress(), total_size=file_compare.size
+        )
+        if file_compare.dst_inode:
+            dst_inode_futures[file_compare.dst_inode] = file_compare.dst_hash_future
+
+
+def check_file_hashes(
+    *,
+    file_compare: FileCompare,
+    size_db: FileSizeDatabase,
+    hash_db: FileHashDatabase,
+    compare_result: CompareResult,
+    dst_inode_hashes: dict[tuple[int, int], str],
+    dst_inode_futures: dict[tuple[int, int], Future],
+) -> None:
+    src_path = file_compare.src_path
+    src_size = file_compare.size
+    src_hash = file_compare.src_hash_future.result()
+    if file_compare.dst_hash_future is not None:
+        dst_hash = file_compare.dst_hash_future.result()
+        if file_compare.dst_inode:
+            # Keep only the hash, not the finished job:
+            dst_inode_hashes[file_compare.dst_inode] = dst_hash
+            dst_inode_futures.pop(file_compare.dst_inode, None)
+    else:
+        dst_hash = file_compare.dst_hash
 
     if src_hash != dst_hash:
         logger.warning(
             'Source file %s hash %r differs from compare file %s hash (%s)',
             src_path,
             src_hash,
-            dst_path,
+            file_compare.dst_path,
             dst_hash,
         )
         compare_result.file_hash_missmatch += 1
@@ -142,21 +258,116 @@ def compare_one_file(
     compare_result.successful_file_count += 1
 
 
-def compare_tree(
+def build_reverse_index(*, compare_dir: Path, hashes: set[str]) -> dict[str, list[Path]]:
+    """
+    Returns {hash: [backup file paths]} of the compare for the given hashes. No backup file content is read.
+    The hashes are read from the manifest file, only if it doesn't exist (e.g.: created by an old version)
+    all SHA256SUMS files of the compare are scanned.
+    """
+    reverse_index = collections.defaultdict(list)
+    try:
+        for entry in iter_manifest(compare_dir):
+            if entry.sha256 in hashes:
+                reverse_index[entry.sha256].append(compare_dir / entry.path)
+    except FileNotFoundError:
+        logger.info('No manifest found for %s -> scan all SHA256SUMS files', compare_dir)
+    else:
+        return reverse_index
+
+    for dir_path, dir_names, file_names in os.walk(compare_dir):
+        dir_names.sort()
+        if 'SHA256SUMS' not in file_names:
+            continue
+        for name, file_hash in read_sha256sums(Path(dir_path) / 'SHA256SUMS').items():
+            if file_hash in hashes:
+                reverse_index[file_hash].append(Path(dir_path) / name)
+    return reverse_index
+
+
+def is_in_source(*, backup_path: Path, src_root: Path, backup_root: Path) -> bool:
+    """
+    Check whether the source file of the given backup file still exists.
+    Backup files are stored as: `{backup_root}/{backup name}/{timestamp}/{relative path}`
+
+    >>> backup_path = Path('/backup/src/2026-01-01-120000/not/existing')
+    >>> is_in_source(backup_path=backup_path, src_root=Path('/'), backup_root=Path('/backup'))
+    False
+    """
+    rel_parts = backup_path.relative_to(backup_root).parts[2:]
+    return os.path.lexists(src_root.joinpath(*rel_parts))
+
+
+def detect_moved_files(
     *,
+    executor: ThreadPoolExecutor,
+    moved_candidates: list[tuple[Path, int]],
+    compare_dir: Path,
     src_root: Path,
     backup_root: Path,
-    one_file_system: bool,
-    excludes: tuple[str, ...],
-    log_manager: LoggingManager,
-) -> CompareResult:
-    src_root = src_root.resolve()
+    hash_db: FileHashDatabase,
+    compare_result: CompareResult,
+) -> None:
+    """DocWrite: README.md ## compare - moved files
+    Source files that are missing in the last backup are not always new: The file (or a parent directory)
+    may be moved or renamed. `phlb compare` reports such files as moved and logs their old location.
+
+    To avoid a hash pass over all new files, only files with a size that exists in the FileSizeDatabase are checked.
+    These files are hashed in batches and looked up in a reverse index of the last backup,
+    build from its manifest (or from its `SHA256SUMS` files, if it has no manifest).
+    If not found there, the FileHashDatabase is used, which points to a file with the same content in any backup.
+    A file is only reported as moved, if the source file of the old location doesn't exist anymore.
+    Otherwise it's a new copy of existing content.
+    Small files (below the FileSizeDatabase minimum size) are always reported as new.
+    Note: The compare never modifies the backup: Stale FileHashDatabase entries are ignored, not removed.
+    """
+    if not moved_candidates:
+        return
+
+    print(f'Check {len(moved_candidates)} source files, that are missing in the compare, by hash...')
+    candidate_hashes = {}  # source path -> hash
+    for batch in itertools.batched(moved_candidates, MOVED_BATCH_SIZE):
+        futures = [
+            (src_path, executor.submit(hash_file, src_path, progress=NoopProgress(), total_size=src_size))
+            for src_path, src_size in batch
+        ]
+        for src_path, future in futures:
+            try:
+                candidate_hashes[src_path] = future.result()
+            except OSError as err:
+                logger.exception(f'Hash {src_path} {err.__class__.__name__}')
+                compare_result.error_count += 1
+
+    reverse_index = build_reverse_index(compare_dir=compare_dir, hashes=set(candidate_hashes.values()))
+
+    def is_old_location(backup_path: Path | None) -> bool:
+        if backup_path is None:
+            return False
+        return not is_in_source(backup_path=backup_path, src_root=src_root, backup_root=backup_root)
+
+    for src_path, src_hash in candidate_hashes.items():
+        old_path = next((path for path in reverse_index.get(src_hash, ()) if is_old_location(path)), None)
+        if old_path is None:
+            db_path = hash_db.lookup(src_hash)  # Read-only: Never link or unlink anything in the backup
+            if is_old_location(db_path):
+                old_path = db_path
+        if old_path is None:
+            logger.warning('Source file %s not found in compare %s', src_path, compare_dir)
+            compare_result.src_file_new_count += 1
+        else:
+            logger.warning('Source file %s is moved, old location: %s', src_path, old_path)
+            compare_result.src_file_moved_count += 1
+
+
+def find_last_backup(*, src_root: Path, backup_root: Path) -> tuple[Path, str]:
+    """
+    Validates the source and backup directory.
+    Returns the main backup directory of the source and the timestamp of the last backup.
+    """
     if not src_root.is_dir():
         print('Error: Source directory does not exist!')
         print(f'Please check source directory: "{src_root}"\n')
         sys.exit(1)
 
-    backup_root = backup_root.resolve()
     phlb_conf_dir = backup_root / '.phlb'
     if not phlb_conf_dir.is_dir():
         print('Error: Compare directory seems to be wrong! (No .phlb configuration directory found)')
@@ -171,6 +382,24 @@ def compare_tree(
     for timestamp in timestamps:
         print(f' * {timestamp}')
     last_timestamp = timestamps[-1]
+    return compare_main_dir, last_timestamp
+
+
+def compare_tree(
+    *,
+    src_root: Path,
+    backup_root: Path,
+    one_file_system: bool,
+    excludes: tuple[str, ...],
+    log_manager: LoggingManager,
+    workers: int = DEFAULT_WORKERS,
+    rehash_backup: bool = False,
+    only_paths: Path | None = None,
+) -> CompareResult:
+    src_root = src_root.resolve()
+    backup_root = backup_root.resolve()
+    phlb_conf_dir = backup_root / '.phlb'
+    compare_main_dir, last_timestamp = find_last_backup(src_root=src_root, backup_root=backup_root)
     compare_dir = compare_main_dir / last_timestamp
     print(f'\nComparing source tree {src_root} with {last_timestamp} compare:')
     print(f'  {compare_dir}\n')
@@ -182,8 +411,22 @@ def compare_tree(
     src_device_id = verbose_path_stat(src_root).st_dev
 
     excludes: set = set(excludes)
-    with PrintTimingContextManager('Filesystem scan completed in'):
-        src_file_count, src_total_size = humanized_fs_scan(
+    if only_paths:
+        # Targeted compare, e.g.: of the changed files from a quick compare
+        rel_paths = only_paths.read_text(encoding='utf-8', errors='surrogateescape').splitlines()
+        print(f'Compare only {len(rel_paths)} files listed in {only_paths}\n')
+        src_entries = list(iter_listed_files(path=src_root, rel_paths=rel_paths))
+        src_file_count = len(src_entries)
+        src_total_size = sum(entry.stat(follow_symlinks=False).st_size for entry in src_entries)
+    else:
+        with PrintTimingContextManager('Filesystem scan completed in'):
+            src_file_count, src_total_size = humanized_fs_scan(
+                path=src_root,
+                one_file_system=one_file_system,
+                src_device_id=src_device_id,
+                excludes=excludes,
+            )
+        src_entries = iter_scandir_files(
             path=src_root,
             one_file_system=one_file_system,
             src_device_id=src_device_id,
@@ -197,31 +440,66 @@ def compare_tree(
     ) as progress:
         # init "databases":
         size_db = FileSizeDatabase(phlb_conf_dir)
-        hash_db = FileHashDatabase(backup_root, phlb_conf_dir)
+        hash_db = get_hash_db(backup_root, phlb_conf_dir)
 
         compare_result = CompareResult(last_timestamp=last_timestamp, compare_dir=compare_dir, log_file=log_file)
 
-        next_update = 0
-        for entry in iter_scandir_files(
-            path=src_root,
-            one_file_system=one_file_system,
-            src_device_id=src_device_id,
-            excludes=excludes,
-        ):
+        get_sha256sums = get_cached_sha256sums_reader()
+
+        # Backup inode -> hash (or pending hash job) of all hashed backup files with hardlinks:
+        dst_inode_hashes = {}
+        dst_inode_futures = {}
+
+        # Source files, that are missing in the compare, but maybe moved:
+        moved_candidates = []
+
+        def process_result(file_compare: FileCompare) -> None:
             try:
-                compare_one_file(
-                    src_root=src_root,
-                    entry=entry,
+                check_file_hashes(
+                    file_compare=file_compare,
                     size_db=size_db,
                     hash_db=hash_db,
-                    compare_dir=compare_dir,
                     compare_result=compare_result,
-                    progress=progress,
+                    dst_inode_hashes=dst_inode_hashes,
+                    dst_inode_futures=dst_inode_futures,
                 )
             except Exception as err:
-                logger.exception(f'Compare {entry.path} {err.__class__.__name__}')
+                logger.exception(f'Compare {file_compare.src_path} {err.__class__.__name__}')
                 compare_result.error_count += 1
-            else:
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='compare') as executor:
+            pending = BoundedJobQueue(max_pending=workers * 4)  # Submitted hash jobs, in source file order
+
+            next_update = 0
+            for entry in src_entries:
+                try:
+                    file_compare = compare_one_file(
+                        src_root=src_root,
+                        entry=entry,
+                        compare_dir=compare_dir,
+                        compare_result=compare_result,
+                        get_sha256sums=get_sha256sums,
+                        rehash_backup=rehash_backup,
+                        size_db=size_db,
+                        moved_candidates=moved_candidates,
+                    )
+                except Exception as err:
+                    logger.exception(f'Compare {entry.path} {err.__class__.__name__}')
+                    compare_result.error_count += 1
+                    continue
+
+                if file_compare is not None:
+                    submit_hash_jobs(
+                        executor=executor,
+                        file_compare=file_compare,
+                        dst_inode_hashes=dst_inode_hashes,
+                        dst_inode_futures=dst_inode_futures,
+                    )
+                    pending.append(file_compare, file_compare.src_hash_future)
+
+                for done_compare, _ in pending.iter_done():
+                    process_result(done_compare)
+
                 now = time.monotonic()
                 if now >= next_update:
                     progress.update(
@@ -230,6 +508,19 @@ def compare_tree(
                     )
                     next_update = now + 0.5
 
+            for done_compare, _ in pending.iter_all():
+                process_result(done_compare)
+
+            detect_moved_files(
+                executor=executor,
+                moved_candidates=moved_candidates,
+                compare_dir=compare_dir,
+                src_root=src_root,
+                backup_root=backup_root,
+                hash_db=hash_db,
+                compare_result=compare_result,
+            )
+
         # Finalize progress indicator values:
         progress.update(completed_file_count=compare_result.total_file_count, advance_size=compare_result.total_size)
 
@@ -239,6 +530,7 @@ def compare_tree(
         print(f'  Total files processed: {compare_result.total_file_count}')
         print(f'   * Successful compared files: {compare_result.successful_file_count}')
         print(f'   * New source files: {compare_result.src_file_new_count}')
+        print(f'   * Moved source files: {compare_result.src_file_moved_count}')
         print(f'   * File size missmatch: {compare_result.file_size_missmatch}')
         print(f'   * File hash missmatch: {compare_result.file_hash_missmatch}')
 
@@ -253,3 +545,151 @@ def compare_tree(
     logger.info('Compare completed. Summary created: %s', summary_file)
 
     return compare_result
+
+
+def quick_compare_one_file(
+    *,
+    rel_path: str,
+    src_entry: os.DirEntry | None,
+    dst_entry: os.DirEntry | None,
+    compare_result: QuickCompareResult,
+) -> bool:
+    """
+    Compare one file only by its metadata. Returns True if the source file is new or changed.
+    """
+    compare_result.total_file_count += 1
+
+    if dst_entry is None:
+        logger.info('New source file: %s', rel_path)
+        compare_result.new_file_count += 1
+        return True
+
+    if src_entry is None:
+        logger.info('Missing source file: %s', rel_path)
+        compare_result.missing_file_count += 1
+        return False
+
+    src_stat = src_entry.stat(follow_symlinks=False)
+    dst_stat = dst_entry.stat(follow_symlinks=False)
+    differences = []
+    if src_stat.st_mode != dst_stat.st_mode:
+        differences.append('mode')
+    elif stat.S_ISLNK(src_stat.st_mode):
+        # The modification time of symlinks is not stored in the backup
+        if os.readlink(src_entry.path) != os.readlink(dst_entry.path):
+            differences.append('symlink target')
+    else:
+        if src_stat.st_size != dst_stat.st_size:
+            differences.append('size')
+        if src_stat.st_mtime_ns != dst_stat.st_mtime_ns:
+            differences.append('mtime')
+
+    if differences:
+        logger.info('Changed source file: %s (%s)', rel_path, ', '.join(differences))
+        compare_result.changed_file_count += 1
+        return True
+
+    compare_result.unchanged_file_count += 1
+    return False
+
+
+def quick_compare_tree(
+    *,
+    src_root: Path,
+    backup_root: Path,
+    one_file_system: bool,
+    excludes: tuple[str, ...],
+    log_manager: LoggingManager,
+    changed_list: Path | None = None,
+) -> QuickCompareResult:
+    """DocWrite: README.md ## compare - quick mode
+    `phlb compare --quick` compares the source tree with the last backup only by metadata:
+    The file size, modification time and mode are compared via `stat()` calls, no file content is read.
+    New, missing and changed files are counted in the summary and listed in the log file.
+
+    With `--changed-list <file>` all new and changed files are written into the given file.
+    A following `phlb compare --only-paths <file>` compares just these files by content.
+
+    Note: Deduplicated files are hardlinks and share the metadata with the first backuped file.
+    So a source file with identical content, but different modification time, will be reported as changed.
+    """
+    src_root = src_root.resolve()
+    backup_root = backup_root.resolve()
+    compare_main_dir, last_timestamp = find_last_backup(src_root=src_root, backup_root=backup_root)
+    compare_dir = compare_main_dir / last_timestamp
+    print(f'\nQuick compare source tree {src_root} with {last_timestamp} backup metadata:')
+    print(f'  {compare_dir}\n')
+
+    now_timestamp = datetime.datetime.now().strftime('%Y-%m-%d-%H%M%S')
+    log_file = compare_main_dir / f'{now_timestamp}-compare.log'
+    log_manager.start_file_logging(log_file)
+
+    src_device_id = verbose_path_stat(src_root).st_dev
+
+    compare_result = QuickCompareResult(last_timestamp=last_timestamp, compare_dir=compare_dir, log_file=log_file)
+
+    progress = Progress(
+        TimeElapsedColumn(),
+        '{task.description}',
+        SpinnerColumn('simpleDots'),
+        TextColumn('[green]{task.completed} Files'),
+    )
+    with (
+        PrintTimingContextManager('Quick compare completed in'),
+        progress,
+        contextlib.ExitStack() as stack,
+    ):
+        changed_file = None
+        if changed_list:
+            changed_file = stack.enter_context(changed_list.open('w', encoding='utf-8', errors='surrogateescape'))
+
+        task_id = progress.add_task(description='Compare', total=None)
+        next_update = 0
+        for rel_path, src_entry, dst_entry in iter_scandir_pairs(
+            src_path=src_root,
+            dst_path=compare_dir,
+            one_file_system=one_file_system,
+            src_device_id=src_device_id,
+            excludes=set(excludes),
+        ):
+            if (src_entry or dst_entry).name == 'SHA256SUMS':
+                # Not backuped from source, created by us in the backup
+                continue
+            try:
+                changed = quick_compare_one_file(
+                    rel_path=rel_path,
+                    src_entry=src_entry,
+                    dst_entry=dst_entry,
+                    compare_result=compare_result,
+                )
+            except Exception as err:
+                logger.exception(f'Quick compare {rel_path} {err.__class__.__name__}')
+                compare_result.error_count += 1
+            else:
+                if changed and changed_file:
+                    changed_file.write(f'{rel_path}\n')
+
+            now = time.monotonic()
+            if now >= next_update:
+                progress.update(task_id, completed=compare_result.total_file_count, refresh=True)
+                next_update = now + 0.5
+
+        progress.update(task_id, description='Completed', completed=compare_result.total_file_count)
+
+    summary_file = compare_main_dir / f'{now_timestamp}-summary.txt'
+    with TeeStdoutContext(summary_file):
+        print(f'\nQuick compare complete: {compare_dir}\n')
+        print(f'  Total files processed: {compare_result.total_file_count}')
+        print(f'   * Unchanged files: {compare_result.unchanged_file_count}')
+        print(f'   * New source files: {compare_result.new_file_count}')
+        print(f'   * Missing source files: {compare_result.missing_file_count}')
+        print(f'   * Changed files: {compare_result.changed_file_count}')
+        if changed_list:
+            print(f'  New and changed files are listed in: {changed_list}')
+        if compare_result.error_count > 0:
+            print(f'  Errors during compare: {compare_result.error_count} (see log for details)')
+        print()
+
+    logger.info('Quick compare completed. Summary created: %s', summary_file)
+
+    return compare_result
@@ -0,0 +1,275 @@
+import dataclasses
+import datetime
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from rich import print
+
+from PyHardLinkBackup.logging_setup import LoggingManager
+from PyHardLinkBackup.utilities.bounded_jobs import BoundedJobQueue
+from PyHardLinkBackup.utilities.file_hash_database import FileHashDatabase
+from PyHardLinkBackup.utilities.file_hash_pool import get_hash_db
+from PyHardLinkBackup.utilities.file_size_database import FileSizeDatabase
+from PyHardLinkBackup.utilities.filesystem import (
+    hash_file,
+    humanized_fs_scan,
+    is_too_many_links_error,
+    iter_scandir_files,
+)
+from PyHardLinkBackup.utilities.humanize import PrintTimingContextManager, human_filesize
+from PyHardLinkBackup.utilities.rich_utils import DisplayFileTreeProgress, NoopProgress
+from PyHardLinkBackup.utilities.tee import TeeStdoutContext
+from PyHardLinkBackup.utilities.tyro_cli_shared_args import DEFAULT_WORKERS
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclasses.dataclass
+class DedupeInode:
+    """
+    One unique inode of the tree, with all its paths (hardlinks) found in the tree.
+    """
+
+    size: int
+    nlink: int
+    blocks: int
+    paths: list[Path] = dataclasses.field(default_factory=list)
+
+
+@dataclasses.dataclass
+class DedupeResult:
+    file_count: int = 0
+    inode_count: int = 0
+    hashed_size: int = 0
+    small_file_count: int = 0  # Smaller than FileSizeDatabase.MIN_SIZE -> skipped
+    added_hash_count: int = 0
+    already_deduped_count: int = 0
+    replaced_file_count: int = 0
+    freed_size: int = 0
+    hardlink_limit_count: int = 0
+    error_count: int = 0
+
+
+def collect_inodes(*, path: Path, device_id: int, dedupe_result: DedupeResult) -> dict[tuple[int, int], DedupeInode]:
+    """
+    Walk the tree and group all regular files by inode. Symlinks and small files are skipped.
+    """
+    inodes = {}
+    for entry in iter_scandir_files(path=path, one_file_system=True, src_device_id=device_id, excludes={'.phlb'}):
+        if not entry.is_file(follow_symlinks=False):
+            continue
+        dedupe_result.file_count += 1
+        entry_stat = entry.stat(follow_symlinks=False)
+        if entry_stat.st_size < FileSizeDatabase.MIN_SIZE:
+            dedupe_result.small_file_count += 1
+            continue
+        inode = (entry_stat.st_dev, entry_stat.st_ino)
+        dedupe_inode = inodes.get(inode)
+        if dedupe_inode is None:
+            dedupe_inode = inodes[inode] = DedupeInode(
+                size=entry_stat.st_size,
+                nlink=entry_stat.st_nlink,
+                blocks=entry_stat.st_blocks,
+            )
+        dedupe_inode.paths.append(Path(entry.path))
+    return inodes
+
+
+def replace_with_hardlink(existing_path: Path, path: Path) -> None:
+    """
+    Replace the file atomically with a hardlink to the existing file: Link to a temp name and rename it.
+    """
+    temp_path = path.with_name(f'.{path.name}.phlb-dedupe.tmp')
+    temp_path.unlink(missing_ok=True)
+    os.link(existing_path, temp_path)
+    try:
+        os.replace(temp_path, path)
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
+
+
+def dedupe_inode(
+    *,
+    dedupe_inode: DedupeInode,
+    file_hash: str,
+    size_db: FileSizeDatabase,
+    hash_db: FileHashDatabase,
+    dedupe_result: DedupeResult,
+) -> None:
+    """
+    Hardlink all paths of the inode to the known content, or register the new content.
+    Only called from the main thread, so all "databases" have a single writer.
+    """
+    first_path = dedupe_inode.paths[0]
+    if dedupe_inode.size not in size_db:
+        size_db.add(dedupe_inode.size)
+
+    existing_path = hash_db.get(file_hash)
+    if existing_path is None:
+        logger.info('Register new content %s: %s', file_hash, first_path)
+        hash_db[file_hash] = first_path
+        dedupe_result.added_hash_count += 1
+        return
+
+    if os.path.samefile(existing_path, first_path):
+        dedupe_result.already_deduped_count += len(dedupe_inode.paths)
+        return
+
+    replaced_count = 0
+    for path in dedupe_inode.paths:
+        logger.info('Replace %s with a hardlink to %s', path, existing_path)
+        try:
+            replace_with_hardlink(existing_path, path)
+        except OSError as err:
+            if not is_too_many_links_error(err):
+                raise
+            # Hardlink limit reached -> Use this inode as new "master" for all following hardlinks:
+            logger.warning('Hardlink limit reached for %s (%s) -> keep %s', existing_path, err, path)
+            hash_db[file_hash] = path
+            dedupe_result.hardlink_limit_count += 1
+            break
+        replaced_count += 1
+    dedupe_result.replaced_file_count += replaced_count
+
+    if replaced_count >= dedupe_inode.nlink:
+        # All hardlinks of the old inode are replaced -> its disk space is freed
+        dedupe_result.freed_size += dedupe_inode.blocks * 512
+
+
+def dedupe(
+    *,
+    backup_root: Path,
+    path: Path,
+    log_manager: LoggingManager,
+    workers: int = DEFAULT_WORKERS,
+) -> DedupeResult:
+    """DocWrite: README.md ## dedupe
+    `phlb dedupe <backup-directory> <path>` deduplicates an existing directory tree on the backup filesystem,
+    e.g.: old backups made with `rsync` or plain copies. So they take the same space as native phlb snapshots.
+
+    The tree must be inside the backup directory (the databases store relative paths) and on the same filesystem.
+    Every unique inode is hashed only once, in parallel by a worker pool.
+    If the content is already in the FileHashDatabase, all hardlinks of the inode are replaced atomically
+    (link to a temp name and rename it) with a hardlink to the existing file. Otherwise the content is registered,
+    so following backups and dedupe runs will hardlink to it.
+
+    Notes:
+      * Only files with at least the FileSizeDatabase minimum size are deduplicated.
+      * Replaced files share the metadata (e.g.: modification time) of the existing file.
+      * Only inodes whose hardlinks are all replaced free disk space, this space is reported.
+    """
+    backup_root = backup_root.resolve()
+    phlb_conf_dir = backup_root / '.phlb'
+    if not phlb_conf_dir.is_dir():
+        print(
+            f'Error: Backup directory "{backup_root}" seems to be wrong:'
+            f' Our hidden ".phlb" configuration directory is missing!'
+        )
+        sys.exit(1)
+
+    path = path.resolve()
+    if not path.is_dir():
+        print('Error: Directory to dedupe does not exist!')
+        print(f'Please check directory: "{path}"\n')
+        sys.exit(1)
+    if not path.is_relative_to(backup_root) or path == backup_root:
+        print(f'Error: Directory "{path}" is not inside the backup directory "{backup_root}"!\n')
+        sys.exit(1)
+    device_id = backup_root.stat().st_dev
+    if path.stat().st_dev != device_id:
+        print(f'Error: Directory "{path}" is not on the same filesystem as "{backup_root}"!\n')
+        sys.exit(1)
+
+    timestamp = datetime.datetime.now().strftime('%Y-%m-%d-%H%M%S')
+    log_manager.start_file_logging(log_file=backup_root / f'{timestamp}-dedupe.log')
+
+    with PrintTimingContextManager('Filesystem scan completed in'):
+        _, total_size = humanized_fs_scan(
+            path=path,
+            one_file_system=True,
+            src_device_id=device_id,
+            excludes={'.phlb'},
+        )
+
+    dedupe_result = DedupeResult()
+    with PrintTimingContextManager('Inode scan completed in'):
+        inodes = collect_inodes(path=path, device_id=device_id, dedupe_result=dedupe_result)
+    dedupe_result.inode_count = len(inodes)
+
+    with (
+        PrintTimingContextManager('Dedupe completed in'),
+        DisplayFileTreeProgress(
+            description=f'Dedupe {path}...',
+            total_file_count=len(inodes),
+            total_size=sum(dedupe_inode.size for dedupe_inode in inodes.values()),
+        ) as progress,
+        ThreadPoolExecutor(max_workers=workers, thread_name_prefix='dedupe') as executor,
+    ):
+        size_db = FileSizeDatabase(phlb_conf_dir)
+        hash_db = get_hash_db(backup_root, phlb_conf_dir)
+
+        processed_count = 0
+        next_update = 0
+
+        def process_result(done_inode: DedupeInode, done_future) -> None:
+            nonlocal processed_count, next_update
+            try:
+                dedupe_inode(
+                    dedupe_inode=done_inode,
+                    file_hash=done_future.result(),
+                    size_db=size_db,
+                    hash_db=hash_db,
+                    dedupe_result=dedupe_result,
+                )
+            except Exception as err:
+                logger.exception(f'Dedupe {done_inode.paths[0]} {err.__class__.__name__}')
+                dedupe_result.error_count += 1
+            processed_count += 1
+            dedupe_result.hashed_size += done_inode.size
+
+            now = time.monotonic()
+            if now >= next_update:
+                progress.update(completed_file_count=processed_count, completed_size=dedupe_result.hashed_size)
+                next_update = now + 0.5
+
+        # Submitted hash jobs, in inode order. Don't wait for every single hash job, but limit the memory usage:
+        pending = BoundedJobQueue(max_pending=workers * 16)
+
+        # Sorted by inode number, because it's a good approximation of the physical location on disk:
+        for inode in sorted(inodes):
+            current = inodes[inode]
+            future = executor.submit(hash_file, current.paths[0], progress=NoopProgress(), total_size=current.size)
+            pending.append(current, future)
+            for done_inode, done_future in pending.iter_done():
+                process_result(done_inode, done_future)
+
+        for done_inode, done_future in pending.iter_all():
+            process_result(done_inode, done_future)
+
+        progress.update(completed_file_count=processed_count, completed_size=dedupe_result.hashed_size)
+
+    summary_file = backup_root / f'{timestamp}-dedupe-summary.txt'
+    with TeeStdoutContext(summary_file):
+        print(f'\nDedupe "{path}" completed:')
+        print(f'  Total files processed: {dedupe_result.file_count} (total size {human_filesize(total_size)})')
+        print(f'   * Skipped small files: {dedupe_result.small_file_count}')
+        print(f'   * Unique inodes hashed: {dedupe_result.inode_count}')
+        print(f'   * Files replaced with hardlinks: {dedupe_result.replaced_file_count}')
+        print(f'   * Files already deduplicated: {dedupe_result.already_deduped_count}')
+        print(f'   * New content registered: {dedupe_result.added_hash_count}')
+        print(f'  Freed disk space: {human_filesize(dedupe_result.freed_size)}')
+        if dedupe_result.hardlink_limit_count:
+            print(f'  Hardlink limit reached: {dedupe_result.hardlink_limit_count}')
+        if dedupe_result.error_count > 0:
+            print(f'  Errors during dedupe: {dedupe_result.error_count} (see log for details)')
+        print()
+
+    logger.info('Dedupe completed. Summary created: %s', summary_file)
+
+    return dedupe_result
@@ -0,0 +1,232 @@
+import collections
+import dataclasses
+import logging
+import os
+import stat
+import sys
+import time
+from pathlib import Path
+
+from rich import print
+from rich.markup import escape
+from rich.progress import Progress, SpinnerColumn, TextColumn, TimeElapsedColumn
+
+from PyHardLinkBackup.utilities.filesystem import hash_file, iter_scandir_pairs
+from PyHardLinkBackup.utilities.humanize import PrintTimingContextManager
+from PyHardLinkBackup.utilities.rich_utils import NoopProgress
+from PyHardLinkBackup.utilities.sha256sums import get_cached_sha256sums_reader, get_sha256sums_path
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclasses.dataclass
+class SnapshotFile:
+    """
+    A file that exists only in one of the two snapshots.
+    """
+
+    rel_path: str
+    inode: tuple[int, int]
+    file_hash: str | None  # Taken from SHA256SUMS, None for symlinks
+
+
+@dataclasses.dataclass
+class DiffResult:
+    snapshot_a: Path
+    snapshot_b: Path
+    total_file_count: int = 0
+    same_inode_count: int = 0
+    same_hash_count: int = 0
+    hashed_file_count: int = 0
+    added: list[str] = dataclasses.field(default_factory=list)
+    removed: list[str] = dataclasses.field(default_factory=list)
+    modified: list[str] = dataclasses.field(default_factory=list)
+    moved: list[tuple[str, str]] = dataclasses.field(default_factory=list)
+    error_count: int = 0
+
+
+def get_file_hash(entry: os.DirEntry, *, get_sha256sums, diff_result: DiffResult) -> str | None:
+    """
+    Returns the hash of a regular file from the SHA256SUMS file of its directory.
+    Only if there is no entry, the file will be read and hashed.
+    """
+    file_path = Path(entry.path)
+    file_hash = get_sha256sums(get_sha256sums_path(file_path)).get(entry.name)
+    if file_hash is None:
+        logger.warning('No SHA256SUMS entry found for: %s (hash the file)', file_path)
+        file_hash = hash_file(file_path, progress=NoopProgress(), total_size=entry.stat().st_size)
+        diff_result.hashed_file_count += 1
+    return file_hash
+
+
+def is_modified(*, entry_a: os.DirEntry, entry_b: os.DirEntry, get_sha256sums, diff_result: DiffResult) -> bool:
+    """
+    Compare one file that exists in both snapshots. Returns True if the file was modified.
+    """
+    stat_a = entry_a.stat(follow_symlinks=False)
+    stat_b = entry_b.stat(follow_symlinks=False)
+    if (stat_a.st_dev, stat_a.st_ino) == (stat_b.st_dev, stat_b.st_ino):
+        # Hardlinked -> same content, nothing to read
+        diff_result.same_inode_count += 1
+        return False
+
+    if stat.S_IFMT(stat_a.st_mode) != stat.S_IFMT(stat_b.st_mode):
+        return True
+
+    if stat.S_ISLNK(stat_a.st_mode):
+        return os.readlink(entry_a.path) != os.readlink(entry_b.path)
+
+    if stat_a.st_size != stat_b.st_size:
+        return True
+
+    hash_a = get_file_hash(entry_a, get_sha256sums=get_sha256sums, diff_result=diff_result)
+    hash_b = get_file_hash(entry_b, get_sha256sums=get_sha256sums, diff_result=diff_result)
+    if hash_a != hash_b:
+        return True
+
+    # Same content, but not hardlinked (e.g.: small files)
+    diff_result.same_hash_count += 1
+    return False
+
+
+def snapshot_file(rel_path: str, entry: os.DirEntry, *, get_sha256sums, diff_result: DiffResult) -> SnapshotFile:
+    entry_stat = entry.stat(follow_symlinks=False)
+    file_hash = None
+    if stat.S_ISREG(entry_stat.st_mode):
+        file_hash = get_file_hash(entry, get_sha256sums=get_sha256sums, diff_result=diff_result)
+    return SnapshotFile(rel_path=rel_path, inode=(entry_stat.st_dev, entry_stat.st_ino), file_hash=file_hash)
+
+
+def detect_moved_files(
+    *, removed_files: list[SnapshotFile], added_files: list[SnapshotFile], diff_result: DiffResult
+) -> None:
+    """
+    Match added against removed files: A moved file is normally hardlinked to the old one (same inode),
+    otherwise the SHA256SUMS hash is used. Every removed file can only be matched once.
+    Several removed files can share a inode or hash (duplicates are hardlinked), so all of them are candidates.
+    """
+    removed_by_inode = collections.defaultdict(collections.deque)
+    removed_by_hash = collections.defaultdict(collections.deque)
+    for file in removed_files:
+        removed_by_inode[file.inode].append(file)
+        if file.file_hash:
+            removed_by_hash[file.file_hash].append(file)
+    matched = set()
+
+    def pop_unmatched(candidates: collections.deque | None) -> SnapshotFile | None:
+        while candidates:
+            candidate = candidates.popleft()
+            if candidate.rel_path not in matched:
+                return candidate
+        return None
+
+    for added_file in added_files:
+        removed_file = pop_unmatched(removed_by_inode.get(added_file.inode))
+        if removed_file is None and added_file.file_hash:
+            removed_file = pop_unmatched(removed_by_hash.get(added_file.file_hash))
+
+        if removed_file is None:
+            diff_result.added.append(added_file.rel_path)
+        else:
+            matched.add(removed_file.rel_path)
+            diff_result.moved.append((removed_file.rel_path, added_file.rel_path))
+
+    diff_result.removed = [file.rel_path for file in removed_files if file.rel_path not in matched]
+
+
+def diff_snapshots(*, snapshot_a: Path, snapshot_b: Path) -> DiffResult:
+    """DocWrite: README.md ## diff
+    `phlb diff <snapshot-a> <snapshot-b>` lists all added, removed, modified and moved files between two backups.
+
+    Both snapshot trees are walked in lockstep. Files with the same inode are hardlinks and therefore identical,
+    without reading anything. Only files with different inodes are compared by their `SHA256SUMS` entries.
+    Moved files are detected by matching removed and added files by inode or hash.
+    So normally no file content is read at all, only files without a `SHA256SUMS` entry are hashed.
+    """
+    snapshot_a = snapshot_a.resolve()
+    snapshot_b = snapshot_b.resolve()
+    for snapshot in (snapshot_a, snapshot_b):
+        if not snapshot.is_dir():
+            print('Error: Snapshot directory does not exist!')
+            print(f'Please check snapshot directory: "{snapshot}"\n')
+            sys.exit(1)
+
+    print(f'\nDiff backup snapshots:\n  a: {snapshot_a}\n  b: {snapshot_b}\n')
+
+    diff_result = DiffResult(snapshot_a=snapshot_a, snapshot_b=snapshot_b)
+
+    get_sha256sums = get_cached_sha256sums_reader()
+
+    removed_files = []
+    added_files = []
+
+    progress = Progress(
+        TimeElapsedColumn(),
+        '{task.description}',
+        SpinnerColumn('simpleDots'),
+        TextColumn('[green]{task.completed} Files'),
+    )
+    with PrintTimingContextManager('Diff completed in'), progress:
+        task_id = progress.add_task(description='Diff', total=None)
+        next_update = 0
+        for rel_path, entry_a, entry_b in iter_scandir_pairs(
+            src_path=snapshot_a,
+            dst_path=snapshot_b,
+            one_file_system=False,
+            src_device_id=None,
+            excludes=set(),
+        ):
+            if (entry_a or entry_b).name == 'SHA256SUMS':
+                # Created by us in the backup
+                continue
+            diff_result.total_file_count += 1
+            try:
+                if entry_a is None:
+                    added_files.append(
+                        snapshot_file(rel_path, entry_b, get_sha256sums=get_sha256sums, diff_result=diff_result)
+                    )
+                elif entry_b is None:
+                    removed_files.append(
+                        snapshot_file(rel_path, entry_a, get_sha256sums=get_sha256sums, diff_result=diff_result)
+                    )
+                elif is_modified(
+                    entry_a=entry_a, entry_b=entry_b, get_sha256sums=get_sha256sums, diff_result=diff_result
+                ):
+                    diff_result.modified.append(rel_path)
+            except Exception as err:
+                logger.exception(f'Diff {rel_path} {err.__class__.__name__}')
+                diff_result.error_count += 1
+
+            now = time.monotonic()
+            if now >= next_update:
+                progress.update(task_id, completed=diff_result.total_file_count, refresh=True)
+                next_update = now + 0.5
+
+        detect_moved_files(removed_files=removed_files, added_files=added_files, diff_result=diff_result)
+        progress.update(task_id, description='Completed', completed=diff_result.total_file_count)
+
+    for rel_path in diff_result.added:
+        print(f'A {escape(rel_path)}')
+    for rel_path in diff_result.removed:
+        print(f'D {escape(rel_path)}')
+    for rel_path in diff_result.modified:
+        print(f'M {escape(rel_path)}')
+    for old_rel_path, new_rel_path in diff_result.moved:
+        print(f'R {escape(old_rel_path)} -> {escape(new_rel_path)}')
+
+    print('\nDiff complete:\n')
+    print(f'  Total files processed: {diff_result.total_file_count}')
+    print(f'   * Unchanged files (same inode): {diff_result.same_inode_count}')
+    print(f'   * Unchanged files (same hash): {diff_result.same_hash_count}')
+    print(f'   * Added files: {len(diff_result.added)}')
+    print(f'   * Removed files: {len(diff_result.removed)}')
+    print(f'   * Modified files: {len(diff_result.modified)}')
+    print(f'   * Moved files: {len(diff_result.moved)}')
+    if diff_result.hashed_file_count:
+        print(f'  Files hashed (no SHA256SUMS entry): {diff_result.hashed_file_count}')
+    if diff_result.error_count > 0:
+        print(f'  Errors during diff: {diff_result.error_count} (see output above)')
+    print()
+
+    return diff_result
@@ -0,0 +1,276 @@
+import dataclasses
+import heapq
+import itertools
+import json
+import logging
+import operator
+import os
+import stat
+import struct
+import sys
+import time
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from rich import print
+from rich.markup import escape
+from rich.table import Table
+
+from PyHardLinkBackup.utilities.humanize import PrintTimingContextManager, human_filesize
+from PyHardLinkBackup.utilities.snapshots import get_snapshot_fingerprint, iter_snapshot_dirs
+from PyHardLinkBackup.utilities.tyro_cli_shared_args import DEFAULT_WORKERS
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclasses.dataclass
+class SnapshotUsage:
+    """
+    Real disk usage of one snapshot. All sizes are allocated disk space (st_blocks) in Bytes.
+    """
+
+    file_count: int = 0
+    dir_count: int = 0
+    exclusive_size: int = 0  # Inodes with all hardlinks inside the snapshot: Freed if the snapshot is deleted
+    shared_size: int = 0  # Inodes that are hardlinked from outside the snapshot, too
+
+    @property
+    def total_size(self) -> int:
+        return self.exclusive_size + self.shared_size
+
+
+@dataclasses.dataclass
+class SnapshotScan:
+    """
+    Result of the scan of one snapshot. The inodes are stored separately, sorted by (st_dev, st_ino),
+    because the exclusive/shared sizes depend on all other snapshots, see calculate_usages().
+    """
+
+    fingerprint: dict  # of the snapshot, if it's changed, the snapshot must be scanned again
+    scan_time_ns: int
+    file_count: int = 0
+    dir_count: int = 0
+    dir_size: int = 0  # Directories are always exclusive
+
+
+def scan_snapshot(snapshot_dir: Path, inodes_path: Path) -> SnapshotScan:
+    """
+    Stat every entry of the snapshot and write all inodes sorted to the given file.
+    Only one stat() call per directory entry is needed, no file content is read.
+    """
+    scan = SnapshotScan(
+        fingerprint=dataclasses.asdict(get_snapshot_fingerprint(snapshot_dir)),
+        scan_time_ns=time.time_ns(),
+    )
+    inode_links = {}  # (dev, ino) -> [hardlinks seen in the snapshot, st_nlink, size]
+    for dir_path, dir_names, file_names in os.walk(snapshot_dir):
+        scan.dir_count += 1
+        scan.dir_size += os.stat(dir_path, follow_symlinks=False).st_blocks * 512
+        for name in dir_names:
+            entry_stat = os.stat(os.path.join(dir_path, name), follow_symlinks=False)
+            if stat.S_ISLNK(entry_stat.st_mode):
+                # Directory symlinks are not followed by os.walk(), count them as files:
+                file_names.append(name)
+        for name in file_names:
+            entry_stat = os.stat(os.path.join(dir_path, name), follow_symlinks=False)
+            scan.file_count += 1
+            inode_info = inode_links.setdefault(
+                (entry_stat.st_dev, entry_stat.st_ino),
+                [0, entry_stat.st_nlink, entry_stat.st_blocks * 512],
+            )
+            inode_info[0] += 1
+
+    temp_path = inodes_path.with_name(f'{inodes_path.name}.tmp')
+    temp_path.parent.mkdir(parents=True, exist_ok=True)
+    with temp_path.open('wb') as f:
+        for (st_dev, st_ino), (links_seen, nlink, size) in sorted(inode_links.items()):
+            f.write(SnapshotCatalog.INODE_RECORD.pack(st_dev, st_ino, links_seen, nlink, size))
+    os.replace(temp_path, inodes_path)
+    return scan
+
+
+class SnapshotCatalog:
+    """DocWrite: README.md ## du
+    `phlb du <backup-directory>` shows the real disk usage of every snapshot:
+     * "exclusive": Files whose inode has all hardlinks (`st_nlink`) inside this snapshot.
+       That's the disk space that will be freed if the snapshot is deleted.
+     * "shared": Files that are hardlinked from other snapshots, too.
+
+    Every snapshot is scanned with one `stat()` call per file, no file content is read.
+    The result is stored in a catalog per snapshot, with all inodes of the snapshot:
+     * `{base_dst}/.phlb/snapshot-catalog/{backup name}/{timestamp}.json`
+     * `{base_dst}/.phlb/snapshot-catalog/{backup name}/{timestamp}.inodes`
+
+    A catalog is valid as long as its snapshot is unchanged (checked via the snapshot directory and its manifest),
+    so `phlb du` only scans new or changed snapshots, e.g.: after a backup only the new snapshot is scanned.
+    The exclusive/shared sizes are calculated by merging the sorted inodes of all catalogs,
+    so the files of older snapshots that are hardlinked by a new backup are shown as shared.
+
+    If snapshots were deleted, the hardlink counts in the catalogs are outdated, so all snapshots are scanned again.
+    Hardlinks created outside of a backup (e.g. by `phlb dedupe`) are not detected: Use `--refresh` to force a new scan.
+
+    Note: With the FileHashPool, every file is shared with its pool entry.
+    """
+
+    INODE_RECORD = struct.Struct('<QQIIQ')  # st_dev, st_ino, hardlinks in the snapshot, st_nlink, allocated size
+    READ_RECORD_COUNT = 4096  # Number of inode records read at once from a catalog
+
+    def __init__(self, backup_root: Path, phlb_conf_dir: Path):
+        self.backup_root = backup_root
+        self.base_path = phlb_conf_dir / 'snapshot-catalog'
+
+    def _get_catalog_path(self, snapshot_dir: Path) -> Path:
+        return self.base_path / f'{snapshot_dir.relative_to(self.backup_root)}.json'
+
+    def get_inodes_path(self, snapshot_dir: Path) -> Path:
+        return self.base_path / f'{snapshot_dir.relative_to(self.backup_root)}.inodes'
+
+    def get(self, snapshot_dir: Path) -> SnapshotScan | None:
+        catalog_path = self._get_catalog_path(snapshot_dir)
+        try:
+            data = json.loads(catalog_path.read_text())
+            scan = SnapshotScan(**data)
+        except FileNotFoundError:
+            return None
+        except (ValueError, TypeError) as err:
+            logger.warning('Ignore invalid snapshot catalog %s: %s', catalog_path, err)
+            return None
+        if scan.fingerprint != dataclasses.asdict(get_snapshot_fingerprint(snapshot_dir)):
+            logger.debug('Snapshot catalog %s is outdated', catalog_path)
+            return None
+        if not self.get_inodes_path(snapshot_dir).is_file():
+            logger.warning('Ignore snapshot catalog %s without inodes', catalog_path)
+            return None
+        return scan
+
+    def __setitem__(self, snapshot_dir: Path, scan: SnapshotScan):
+        catalog_path = self._get_catalog_path(snapshot_dir)
+        catalog_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = catalog_path.with_name(f'{catalog_path.name}.tmp')
+        temp_path.write_text(json.dumps(dataclasses.asdict(scan), indent=2, sort_keys=True))
+        os.replace(temp_path, catalog_path)
+
+    def iter_inodes(self, snapshot_dir: Path) -> Iterator[tuple[int, int, int, int, int]]:
+        """
+        Yield all inode records of the snapshot, sorted by (st_dev, st_ino). Read in chunks to limit memory usage.
+        """
+        chunk_size = self.INODE_RECORD.size * self.READ_RECORD_COUNT
+        with self.get_inodes_path(snapshot_dir).open('rb') as f:
+            while chunk := f.read(chunk_size):
+                yield from self.INODE_RECORD.iter_unpack(chunk)
+
+    def retain(self, snapshot_dirs: list[Path]) -> bool:
+        """
+        Remove the catalogs of all snapshots that doesn't exist anymore. Returns True if catalogs were removed.
+        """
+        if not self.base_path.is_dir():
+            return False
+        catalog_paths = {self._get_catalog_path(snapshot_dir) for snapshot_dir in snapshot_dirs}
+        removed = False
+        for catalog_path in self.base_path.glob('*/*.json'):
+            if catalog_path not in catalog_paths:
+                logger.info('Remove snapshot catalog %s', catalog_path)
+                catalog_path.unlink()
+                catalog_path.with_suffix('.inodes').unlink(missing_ok=True)
+                removed = True
+        return removed
+
+
+def calculate_usages(catalog: SnapshotCatalog, scans: dict[Path, SnapshotScan]) -> dict[Path, SnapshotUsage]:
+    """
+    Merge the sorted inodes of all snapshots: An inode is exclusive, if all its hardlinks are in one snapshot.
+    The hardlink count (st_nlink) of the newest scan is used, it includes new hardlinks of later backups
+    and hardlinks outside of the snapshots (e.g.: pool entries).
+    """
+    # Ordered by scan time, so the last record of an inode is from the newest scan:
+    snapshot_dirs = sorted(scans, key=lambda snapshot_dir: scans[snapshot_dir].scan_time_ns)
+    usages = {
+        snapshot_dir: SnapshotUsage(
+            file_count=scans[snapshot_dir].file_count,
+            dir_count=scans[snapshot_dir].dir_count,
+            exclusive_size=scans[snapshot_dir].dir_size,
+        )
+        for snapshot_dir in snapshot_dirs
+    }
+
+    def iter_records(index: int, snapshot_dir: Path) -> Iterator[tuple[int, int, int, int, int, int]]:
+        for st_dev, st_ino, links_seen, nlink, size in catalog.iter_inodes(snapshot_dir):
+            yield st_dev, st_ino, index, links_seen, nlink, size
+
+    records = heapq.merge(*(iter_records(index, snapshot_dir) for index, snapshot_dir in enumerate(snapshot_dirs)))
+    for _, inode_records in itertools.groupby(records, key=operator.itemgetter(0, 1)):
+        inode_records = list(inode_records)
+        links_seen = sum(record[3] for record in inode_records)
+        newest_nlink = inode_records[-1][4]
+        if len(inode_records) == 1 and links_seen >= newest_nlink:
+            usages[snapshot_dirs[inode_records[0][2]]].exclusive_size += inode_records[0][5]
+        else:
+            for record in inode_records:
+                usages[snapshot_dirs[record[2]]].shared_size += record[5]
+    return usages
+
+
+def disk_usage(
+    *,
+    backup_root: Path,
+    workers: int = DEFAULT_WORKERS,
+    refresh: bool = False,
+) -> dict[Path, SnapshotUsage]:
+    backup_root = backup_root.resolve()
+    phlb_conf_dir = backup_root / '.phlb'
+    if not phlb_conf_dir.is_dir():
+        print(
+            f'Error: Backup directory "{backup_root}" seems to be wrong:'
+            f' Our hidden ".phlb" configuration directory is missing!'
+        )
+        sys.exit(1)
+
+    snapshot_dirs = list(iter_snapshot_dirs(backup_root))
+    catalog = SnapshotCatalog(backup_root, phlb_conf_dir)
+    if catalog.retain(snapshot_dirs):
+        logger.info('Snapshots were deleted: The hardlink counts of all catalogs are outdated')
+        refresh = True
+
+    scans = {}
+    if not refresh:
+        for snapshot_dir in snapshot_dirs:
+            scan = catalog.get(snapshot_dir)
+            if scan is not None:
+                scans[snapshot_dir] = scan
+
+    scan_dirs = [snapshot_dir for snapshot_dir in snapshot_dirs if snapshot_dir not in scans]
+    if scan_dirs:
+        with (
+            PrintTimingContextManager(f'{len(scan_dirs)} snapshots scanned in'),
+            ThreadPoolExecutor(max_workers=workers, thread_name_prefix='du') as executor,
+        ):
+            inodes_paths = [catalog.get_inodes_path(snapshot_dir) for snapshot_dir in scan_dirs]
+            for snapshot_dir, scan in zip(scan_dirs, executor.map(scan_snapshot, scan_dirs, inodes_paths)):
+                catalog[snapshot_dir] = scan
+                scans[snapshot_dir] = scan
+
+    usages = calculate_usages(catalog, scans)
+
+    table = Table(title=f'Disk usage of "{escape(str(backup_root))}"')
+    table.add_column('Snapshot')
+    table.add_column('Files', justify='right')
+    table.add_column('Total', justify='right')
+    table.add_column('Exclusive', justify='right')
+    table.add_column('Shared', justify='right')
+    exclusive_size = 0
+    for snapshot_dir in snapshot_dirs:
+        usage = usages[snapshot_dir]
+        exclusive_size += usage.exclusive_size
+        table.add_row(
+            escape(str(snapshot_dir.relative_to(backup_root))),
+            str(usage.file_count),
+            human_filesize(usage.total_size),
+            human_filesize(usage.exclusive_size),
+            human_filesize(usage.shared_size),
+        )
+    print(table)
+    print(f'\n{len(snapshot_dirs)} snapshots, {human_filesize(exclusive_size)} in exclusive files.\n')
+
+    return usages
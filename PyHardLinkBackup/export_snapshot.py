@@ -0,0 +1,156 @@
+import dataclasses
+import filecmp
+import logging
+import os
+import sys
+import tarfile
+from pathlib import Path
+
+from rich import print
+
+from PyHardLinkBackup.diff_snapshots import DiffResult, is_modified
+from PyHardLinkBackup.utilities.filesystem import O_BINARY, iter_scandir_pairs
+from PyHardLinkBackup.utilities.humanize import human_filesize
+from PyHardLinkBackup.utilities.sha256sums import get_cached_sha256sums_reader
+from PyHardLinkBackup.utilities.tar_stream import TarStreamWriter, make_tarinfo
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclasses.dataclass
+class ExportResult:
+    member_count: int = 0
+    file_count: int = 0
+    hardlink_count: int = 0
+    symlink_count: int = 0
+    content_size: int = 0
+    unchanged_count: int = 0  # Only in incremental mode: Skipped, because they are in the base snapshot
+    removed_count: int = 0  # Only in incremental mode: Files of the base snapshot that are not in the snapshot
+    archive_size: int = 0
+    error_count: int = 0
+
+
+def is_unchanged(*, entry: os.DirEntry, base_entry: os.DirEntry, get_sha256sums, diff_result: DiffResult) -> bool:
+    if entry.name == 'SHA256SUMS':
+        # Has no SHA256SUMS entry itself, but it's small -> compare the content
+        return filecmp.cmp(base_entry.path, entry.path, shallow=False)
+    return not is_modified(entry_a=base_entry, entry_b=entry, get_sha256sums=get_sha256sums, diff_result=diff_result)
+
+
+def export_members(
+    *,
+    writer: TarStreamWriter,
+    snapshot_dir: Path,
+    base_dir: Path | None,
+    export_result: ExportResult,
+) -> None:
+    diff_result = DiffResult(snapshot_a=base_dir, snapshot_b=snapshot_dir) if base_dir is not None else None
+
+    get_sha256sums = get_cached_sha256sums_reader()
+
+    inode_map = {}  # inode -> member name of the first exported file, only for files with hardlinks
+
+    for rel_path, entry, base_entry in iter_scandir_pairs(
+        src_path=snapshot_dir,
+        dst_path=base_dir,
+        one_file_system=False,
+        src_device_id=None,
+        excludes=set(),
+    ):
+        if entry is None:
+            export_result.removed_count += 1
+            continue
+
+        offset = writer.offset
+        try:
+            if base_entry is not None and is_unchanged(
+                entry=entry, base_entry=base_entry, get_sha256sums=get_sha256sums, diff_result=diff_result
+            ):
+                export_result.unchanged_count += 1
+                continue
+
+            file_stat = entry.stat(follow_symlinks=False)
+            tarinfo = make_tarinfo(rel_path, file_stat)
+            if tarinfo.issym():
+                tarinfo.linkname = os.readlink(entry.path)
+                writer.add(tarinfo)
+                export_result.symlink_count += 1
+            elif file_stat.st_nlink > 1 and (linkname := inode_map.get((file_stat.st_dev, file_stat.st_ino))):
+                tarinfo.type = tarfile.LNKTYPE
+                tarinfo.linkname = linkname
+                tarinfo.size = 0
+                writer.add(tarinfo)
+                export_result.hardlink_count += 1
+            else:
+                # Open the file before the header is written: A unreadable file is skipped completely.
+                with open(entry.path, 'rb') as fileobj:
+                    writer.add(tarinfo, fileobj)
+                if file_stat.st_nlink > 1:
+                    inode_map[(file_stat.st_dev, file_stat.st_ino)] = rel_path
+                export_result.file_count += 1
+                export_result.content_size += file_stat.st_size
+        except OSError as err:
+            if writer.offset != offset:
+                raise  # Member is incomplete -> the archive is corrupt
+            logger.exception(f'Export {rel_path} {err.__class__.__name__}')
+            export_result.error_count += 1
+            continue
+        export_result.member_count += 1
+
+
+def export(*, snapshot_dir: Path, output: str, base_dir: Path | None = None) -> ExportResult:
+    """DocWrite: README.md ## export
+    `phlb export <snapshot> <output>` writes a backup snapshot as one POSIX (pax) tar archive,
+    e.g.: for tape or cold storage. Use `-` as output to write the archive to stdout, e.g.:
+    ```bash
+    phlb export .../backups/foobar/2026-01-01-120000 - | zstd > foobar-2026-01-01-120000.tar.zst
+    ```
+    The snapshot is walked directory by directory and the archive is written as a stream:
+    No member list is kept in memory, only a inode map of the already exported files with hardlinks.
+    Files with the same inode are stored as hardlink members, so their content is stored only once.
+    The file content is sent via `sendfile()`, without copying it through user space, if possible.
+
+    With `--base <snapshot>` only files that are new or changed against the base snapshot are exported
+    (incremental export). Unchanged files are detected by the inode or the `SHA256SUMS` hash, without reading them.
+    Note: A incremental archive has no information about deleted files, they are only counted.
+    """
+    snapshot_dir = snapshot_dir.resolve()
+    for directory in (snapshot_dir, base_dir):
+        if directory is not None and not directory.is_dir():
+            print('Error: Snapshot directory does not exist!')
+            print(f'Please check snapshot directory: "{directory}"\n')
+            sys.exit(1)
+    if base_dir is not None:
+        base_dir = base_dir.resolve()
+
+    export_result = ExportResult()
+    if output == '-':
+        sys.stdout.flush()
+        fd = sys.stdout.fileno()
+    else:
+        fd = os.open(output, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | O_BINARY, 0o644)
+    try:
+        writer = TarStreamWriter(fd)
+        export_members(writer=writer, snapshot_dir=snapshot_dir, base_dir=base_dir, export_result=export_result)
+        writer.close()
+    finally:
+        if output != '-':
+            os.close(fd)
+    export_result.archive_size = writer.offset
+
+    print(f'\nExport of {snapshot_dir} completed:')
+    if base_dir is not None:
+        print(f'  Incremental against: {base_dir}')
+    print(f'  Archive members: {export_result.member_count} (archive size {human_filesize(writer.offset)})')
+    print(f'   * Files: {export_result.file_count} (total size {human_filesize(export_result.content_size)})')
+    print(f'   * Hardlinks: {export_result.hardlink_count}')
+    print(f'   * Symlinks: {export_result.symlink_count}')
+    if base_dir is not None:
+        print(f'  Unchanged files (skipped): {export_result.unchanged_count}')
+        print(f'  Removed files (not in archive): {export_result.removed_count}')
+    if export_result.error_count > 0:
+        print(f'  Errors during export: {export_result.error_count} (see log for details)')
+    print()
+
+    return export_result
@@ -0,0 +1,114 @@
+import dataclasses
+import datetime
+import logging
+import re
+import sys
+from pathlib import Path
+
+from rich import print
+from rich.markup import escape
+
+from PyHardLinkBackup.utilities.humanize import PrintTimingContextManager, human_filesize
+from PyHardLinkBackup.utilities.snapshot_index import IndexedFile, SnapshotIndex
+
+
+logger = logging.getLogger(__name__)
+
+HASH_RE = re.compile(r'^[0-9a-f]{64}$')
+
+
+@dataclasses.dataclass
+class FileVersion:
+    """
+    One version of a file: The same content in consecutive snapshots.
+    """
+
+    backup_name: str
+    path: str
+    size: int
+    mtime_ns: int
+    sha256: str | None
+    timestamps: list[str] = dataclasses.field(default_factory=list)
+
+    def __str__(self):
+        mtime = datetime.datetime.fromtimestamp(self.mtime_ns / 1_000_000_000).strftime('%Y-%m-%d %H:%M:%S')
+        if len(self.timestamps) == 1:
+            snapshots = self.timestamps[0]
+        else:
+            snapshots = f'{self.timestamps[0]} … {self.timestamps[-1]} ({len(self.timestamps)} snapshots)'
+        return (
+            f'{escape(self.backup_name)}/{escape(self.path)}'
+            f' {human_filesize(self.size)} {mtime} sha256:{self.sha256 or "-"} in: {snapshots}'
+        )
+
+
+def collapse_versions(indexed_files: list[IndexedFile]) -> list[FileVersion]:
+    """
+    Collapse the entries of consecutive snapshots with the same content into one version.
+    The entries must be sorted by path, backup name and timestamp.
+    """
+    versions = []
+    previous = None
+    for indexed_file in indexed_files:
+        if (
+            previous is None
+            or (previous.path, previous.backup_name) != (indexed_file.path, indexed_file.backup_name)
+            or previous.version_key != indexed_file.version_key
+        ):
+            versions.append(
+                FileVersion(
+                    backup_name=indexed_file.backup_name,
+                    path=indexed_file.path,
+                    size=indexed_file.size,
+                    mtime_ns=indexed_file.mtime_ns,
+                    sha256=indexed_file.sha256,
+                )
+            )
+        versions[-1].timestamps.append(indexed_file.timestamp)
+        previous = indexed_file
+    return versions
+
+
+def get_snapshot_index(backup_root: Path) -> SnapshotIndex:
+    phlb_conf_dir = backup_root / '.phlb'
+    if not phlb_conf_dir.is_dir():
+        print(
+            f'Error: Backup directory "{backup_root}" seems to be wrong:'
+            f' Our hidden ".phlb" configuration directory is missing!'
+        )
+        sys.exit(1)
+
+    snapshot_index = SnapshotIndex(backup_root, phlb_conf_dir)
+    with PrintTimingContextManager('Snapshot index updated in'):
+        added_count, removed_count = snapshot_index.update()
+    logger.info('Snapshot index: %i snapshots added, %i removed', added_count, removed_count)
+    return snapshot_index
+
+
+def print_versions(versions: list[FileVersion]) -> None:
+    for version in versions:
+        print(str(version))
+    print(f'\n{len(versions)} versions found.\n')
+
+
+def file_history(*, backup_root: Path, rel_path: str) -> list[FileVersion]:
+    backup_root = backup_root.resolve()
+    rel_path = rel_path.strip('/')
+    with get_snapshot_index(backup_root) as snapshot_index:
+        versions = collapse_versions(snapshot_index.history(rel_path))
+    print(f'History of "{escape(rel_path)}":\n')
+    print_versions(versions)
+    return versions
+
+
+def find_files(*, backup_root: Path, pattern: str) -> list[FileVersion]:
+    backup_root = backup_root.resolve()
+    with get_snapshot_index(backup_root) as snapshot_index:
+        if HASH_RE.match(pattern):
+            indexed_files = snapshot_index.find_hash(pattern)
+        else:
+            indexed_files = snapshot_index.find_glob(pattern.strip('/'))
+        versions = collapse_versions(indexed_files)
+    print(f'Files matching "{escape(pattern)}":\n')
+    print_versions(versions)
+    return versions
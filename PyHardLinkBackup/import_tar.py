@@ -0,0 +1,351 @@
+import dataclasses
+import datetime
+import hashlib
+import logging
+import os
+import shutil
+import sys
+import tarfile
+from pathlib import Path
+from typing import BinaryIO
+
+from rich import print
+
+from PyHardLinkBackup.constants import CHUNK_SIZE, HASH_ALGO
+from PyHardLinkBackup.dedupe_tree import replace_with_hardlink
+from PyHardLinkBackup.logging_setup import LoggingManager
+from PyHardLinkBackup.utilities.file_hash_database import FileHashDatabase
+from PyHardLinkBackup.utilities.file_hash_pool import get_hash_db
+from PyHardLinkBackup.utilities.file_size_database import FileSizeDatabase
+from PyHardLinkBackup.utilities.filesystem import (
+    RemoveFileOnError,
+    hardlink_or_copy,
+    is_too_many_links_error,
+    supports_hardlinks,
+)
+from PyHardLinkBackup.utilities.humanize import PrintTimingContextManager, human_filesize
+from PyHardLinkBackup.utilities.manifest import ManifestWriter
+from PyHardLinkBackup.utilities.sha256sums import get_sha256sums_path, read_sha256sums, store_hash
+from PyHardLinkBackup.utilities.small_file_index import SmallFileIndex
+from PyHardLinkBackup.utilities.tee import TeeStdoutContext
+
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_SUFFIXES = ('.tar', '.tgz', '.tbz2', '.txz', '.gz', '.bz2', '.xz', '.zst')
+
+
+@dataclasses.dataclass
+class ImportResult:
+    member_count: int = 0
+    total_size: int = 0
+    written_files: int = 0
+    written_size: int = 0
+    hardlinked_files: int = 0
+    hardlinked_size: int = 0
+    symlink_files: int = 0
+    skipped_members: int = 0  # e.g.: Device files, FIFOs or SHA256SUMS files of the archive
+    hardlink_rotations: int = 0
+    error_count: int = 0
+
+
+def get_archive_name(archive_path: Path) -> str:
+    """
+    >>> get_archive_name(Path('/backups/home-2019.01.tar.gz'))
+    'home-2019.01'
+    >>> get_archive_name(Path('foo.tgz'))
+    'foo'
+    """
+    name = archive_path.name
+    while name.endswith(ARCHIVE_SUFFIXES):
+        name = name.rsplit('.', 1)[0]
+    return name
+
+
+def write_and_hash(fileobj: BinaryIO, dst_path: Path) -> str:
+    hasher = hashlib.new(HASH_ALGO)
+    with dst_path.open('wb') as dst_file:
+        while chunk := fileobj.read(CHUNK_SIZE):
+            dst_file.write(chunk)
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def set_metadata(member: tarfile.TarInfo, dst_path: Path) -> None:
+    os.chmod(dst_path, member.mode)
+    os.utime(dst_path, (member.mtime, member.mtime))
+
+
+def import_file(
+    *,
+    member: tarfile.TarInfo,
+    fileobj: BinaryIO,
+    dst_path: Path,
+    size_db: FileSizeDatabase,
+    hash_db: FileHashDatabase,
+    small_file_index: SmallFileIndex | None,
+    import_result: ImportResult,
+) -> str:
+    """
+    Import one regular file of the archive. Returns the hash of the content.
+    """
+    size = member.size
+    if size < size_db.MIN_SIZE:
+        lookup_db = small_file_index  # None -> small files are always written
+    else:
+        lookup_db = hash_db
+
+    if lookup_db is not None and (size < size_db.MIN_SIZE or size in size_db) and size <= CHUNK_SIZE:
+        # Possible duplicate, that fits into memory -> hash it first, so duplicates are not written at all:
+        content = fileobj.read()
+        file_hash = hashlib.new(HASH_ALGO, content).hexdigest()
+        if existing_path := lookup_db.get(file_hash):
+            logger.info('Hardlink duplicate file: %s to %s', dst_path, existing_path)
+            if hardlink_or_copy(existing_path, dst_path):
+                import_result.hardlinked_files += 1
+                import_result.hardlinked_size += size
+                return file_hash
+            # Hardlink limit reached -> Use the fresh copy as new "master" for all following hardlinks:
+            import_result.hardlink_rotations += 1
+        else:
+            dst_path.write_bytes(content)
+    else:
+        # Large or unique file -> hash it while it's written:
+        file_hash = write_and_hash(fileobj, dst_path)
+        if lookup_db is not None and (existing_path := lookup_db.get(file_hash)):
+            logger.info('Replace large duplicate file %s with a hardlink to %s', dst_path, existing_path)
+            try:
+                replace_with_hardlink(existing_path, dst_path)
+            except OSError as err:
+                if not is_too_many_links_error(err):
+                    raise
+                # Hardlink limit reached -> Keep the written copy as new "master" for all following hardlinks:
+                logger.warning('Hardlink limit reached for %s (%s) -> keep %s', existing_path, err, dst_path)
+                import_result.hardlink_rotations += 1
+            else:
+                import_result.hardlinked_files += 1
+                import_result.hardlinked_size += size
+                return file_hash
+
+    set_metadata(member, dst_path)
+    if lookup_db is not None:
+        lookup_db[file_hash] = dst_path
+    if size >= size_db.MIN_SIZE and size not in size_db:
+        size_db.add(size)
+    import_result.written_files += 1
+    import_result.written_size += size
+    return file_hash
+
+
+def import_member(
+    *,
+    tar: tarfile.TarFile,
+    member: tarfile.TarInfo,
+    snapshot_dir: Path,
+    size_db: FileSizeDatabase,
+    hash_db: FileHashDatabase,
+    small_file_index: SmallFileIndex | None,
+    manifest: ManifestWriter,
+    import_result: ImportResult,
+) -> None:
+    # Strip leading slashes and refuse members outside the snapshot directory:
+    member = tarfile.tar_filter(member, str(snapshot_dir))
+    dst_path = snapshot_dir / member.name
+
+    if member.isdir():
+        dst_path.mkdir(parents=True, exist_ok=True)
+        return
+    if not (member.isreg() or member.issym() or member.islnk()) or dst_path.name == 'SHA256SUMS':
+        logger.warning('Skip archive member %r (type %r)', member.name, member.type)
+        import_result.skipped_members += 1
+        return
+
+    dst_path.parent.mkdir(parents=True, exist_ok=True)
+    if member.issym():
+        os.symlink(member.linkname, dst_path)
+        import_result.symlink_files += 1
+        manifest.add(dst_path, None)
+        return
+
+    if member.islnk():
+        # Hardlink to a member imported before:
+        target_path = snapshot_dir / member.linkname.lstrip('/')
+        if not target_path.resolve().is_relative_to(snapshot_dir):
+            raise tarfile.LinkOutsideDestinationError(member, str(target_path))
+        os.link(target_path, dst_path)
+        file_hash = read_sha256sums(get_sha256sums_path(target_path)).get(target_path.name)
+        import_result.hardlinked_files += 1
+        import_result.hardlinked_size += target_path.stat().st_size
+    else:
+        with RemoveFileOnError(dst_path):
+            file_hash = import_file(
+                member=member,
+                fileobj=tar.extractfile(member),
+                dst_path=dst_path,
+                size_db=size_db,
+                hash_db=hash_db,
+                small_file_index=small_file_index,
+                import_result=import_result,
+            )
+    if file_hash:
+        store_hash(dst_path, file_hash)
+    manifest.add(dst_path, file_hash)
+
+
+def import_members(
+    *,
+    tar: tarfile.TarFile,
+    snapshot_dir: Path,
+    size_db: FileSizeDatabase,
+    hash_db: FileHashDatabase,
+    small_file_index: SmallFileIndex | None,
+    manifest: ManifestWriter,
+    import_result: ImportResult,
+) -> None:
+    """
+    Import all members of the archive stream. Errors of one member are logged and counted,
+    errors of the archive itself (e.g.: truncated) are raised.
+    """
+    while (member := tar.next()) is not None:
+        import_result.member_count += 1
+        if member.isreg():
+            import_result.total_size += member.size
+        try:
+            import_member(
+                tar=tar,
+                member=member,
+                snapshot_dir=snapshot_dir,
+                size_db=size_db,
+                hash_db=hash_db,
+                small_file_index=small_file_index,
+                manifest=manifest,
+                import_result=import_result,
+            )
+        except (OSError, tarfile.FilterError) as err:
+            logger.exception(f'Import {member.name!r} {err.__class__.__name__}')
+            import_result.error_count += 1
+
+        # TarFile collects all members, but they are not needed in the stream mode:
+        tar.members.clear()
+
+
+def import_tar(
+    *,
+    archive_path: Path,
+    backup_root: Path,
+    backup_name: str | None,
+    log_manager: LoggingManager,
+) -> ImportResult:
+    """DocWrite: README.md ## import-tar
+    `phlb import-tar <archive> <backup-directory> --name <name>` imports a tar archive (e.g.: old `.tar.gz` backups)
+    directly as a new backup snapshot. The archive is not extracted to a scratch directory first.
+
+    The members are read sequentially as a stream. Every file is hashed and deduplicated against the
+    FileHashDatabase, like a normal backup: Files that may be duplicates (their size is known
+    by the FileSizeDatabase) are read into memory and hashed first, so already stored content is not written at all.
+    Only larger files are hashed while they are written and replaced by a hardlink afterwards.
+    Hardlink and symlink members are restored, device files and FIFOs are skipped.
+
+    The snapshot timestamp is taken from the modification time of the archive file,
+    so imported legacy backups are sorted chronologically. `SHA256SUMS` and a manifest are created as by `phlb backup`.
+    The manifest is only written, if the archive was read completely: A truncated or corrupt archive aborts
+    the import and the incomplete snapshot is removed, so the import can be started again.
+    Only the `-import.log` file is kept.
+    """
+    archive_path = archive_path.resolve()
+    if not archive_path.is_file():
+        print('Error: Archive file does not exist!')
+        print(f'Please check archive file: "{archive_path}"\n')
+        sys.exit(1)
+
+    backup_root = backup_root.resolve()
+    if not backup_root.is_dir():
+        print('Error: Backup directory does not exist!')
+        print(f'Please create "{backup_root}" directory first and start again!\n')
+        sys.exit(1)
+    if not supports_hardlinks(backup_root):
+        print('Error: Filesystem for backup directory does not support hardlinks!')
+        print(f'Please check backup directory: "{backup_root}"\n')
+        sys.exit(1)
+
+    phlb_conf_dir = backup_root / '.phlb'
+    phlb_conf_dir.mkdir(parents=False, exist_ok=True)
+
+    timestamp = datetime.datetime.fromtimestamp(archive_path.stat().st_mtime).strftime('%Y-%m-%d-%H%M%S')
+    if not backup_name:
+        backup_name = get_archive_name(archive_path)
+    backup_main_dir = backup_root / backup_name
+    snapshot_dir = backup_main_dir / timestamp
+    if snapshot_dir.exists():
+        print(f'Error: Snapshot "{snapshot_dir}" already exists! (Archive imported before?)\n')
+        sys.exit(1)
+    snapshot_dir.mkdir(parents=True)
+
+    log_file = backup_main_dir / f'{timestamp}-import.log'
+    log_manager.start_file_logging(log_file)
+    logger.info('Import %s to %s', archive_path, snapshot_dir)
+    print(f'\nImport {archive_path} to {snapshot_dir}...\n')
+
+    import_result = ImportResult()
+    size_db = FileSizeDatabase(phlb_conf_dir)
+    hash_db = get_hash_db(backup_root, phlb_conf_dir)
+    small_file_index = None
+    if (phlb_conf_dir / 'small-file-index.bin').is_file():
+        # Small files are deduplicated by the backups -> by the import, too:
+        small_file_index = SmallFileIndex(backup_root, phlb_conf_dir)
+    manifest = ManifestWriter(snapshot_dir)
+
+    read_error = None
+    with PrintTimingContextManager('Import completed in'):
+        try:
+            with tarfile.open(archive_path, mode='r|*') as tar:
+                import_members(
+                    tar=tar,
+                    snapshot_dir=snapshot_dir,
+                    size_db=size_db,
+                    hash_db=hash_db,
+                    small_file_index=small_file_index,
+                    manifest=manifest,
+                    import_result=import_result,
+                )
+            # Only a completely read archive gets a manifest, e.g.: not a truncated one:
+            manifest.close()
+        except (tarfile.ReadError, tarfile.CompressionError, EOFError) as err:
+            logger.exception(f'Read archive {archive_path} {err.__class__.__name__}')
+            read_error = err
+        finally:
+            if small_file_index is not None:
+                small_file_index.close()
+            manifest.cleanup()
+
+    if read_error is not None:
+        # Remove the incomplete snapshot, so the import can be started again, e.g.: with a repaired archive.
+        # Database entries that point into it are stale and will be dropped on the next lookup.
+        shutil.rmtree(snapshot_dir)
+        print(f'Error: Archive is truncated or corrupt: {read_error}')
+        print(f'The incomplete snapshot "{snapshot_dir}" was removed, see log file: "{log_file}"\n')
+        sys.exit(1)
+
+    summary_file = backup_main_dir / f'{timestamp}-summary.txt'
+    with TeeStdoutContext(summary_file):
+        print(f'\nImport complete: {snapshot_dir} (total size {human_filesize(import_result.total_size)})\n')
+        print(f'  Total archive members: {import_result.member_count}')
+        print(f'   * Symlinked files: {import_result.symlink_files}')
+        print(
+            f'   * Hardlinked files: {import_result.hardlinked_files}'
+            f' (saved {human_filesize(import_result.hardlinked_size)})'
+        )
+        print(f'   * Written files: {import_result.written_files} (total {human_filesize(import_result.written_size)})')
+        if import_result.skipped_members:
+            print(f'   * Skipped members: {import_result.skipped_members} (see log for details)')
+        if import_result.hardlink_rotations > 0:
+            print(
+                f'   * Hardlink limit reached, new copies used as hardlink source: {import_result.hardlink_rotations}'
+            )
+        if import_result.error_count > 0:
+            print(f'  Errors during import: {import_result.error_count} (see log for details)')
+        print()
+
+    logger.info('Import completed. Summary created: %s', summary_file)
+
+    return import_result
@@ -1,5 +1,6 @@
 import logging
 import sys
+import threading
 from pathlib import Path
 from typing import Annotated, Literal
 
@@ -81,7 +82,7 @@ class LoggingManager:
         )
         sys.excepthook = self.log_unhandled_exception
 
-    def start_file_logging(self, log_file: Path):
+    def start_file_logging(self, log_file: Path, *, current_thread_only: bool = False) -> logging.Handler:
         console.print(
             f'(initialize log file [bold]{log_file}[/bold] with level: [cyan]{self.file_level_name}[/cyan])',
             justify='right',
@@ -100,7 +101,18 @@ class LoggingManager:
         )
         file_handler.setFormatter(formatter)
 
+        if current_thread_only:
+            # e.g.: One log file per source, if several sources are backed up concurrently
+            thread_id = threading.get_ident()
+            file_handler.addFilter(lambda record: record.thread == thread_id)
+
         root_logger.addHandler(file_handler)
+        return file_handler
+
+    def stop_file_logging(self, file_handler: logging.Handler | None):
+        if file_handler is not None:
+            logging.getLogger().removeHandler(file_handler)
+            file_handler.close()
 
     def log_unhandled_exception(self, exc_type, exc_value, exc_traceback):
         if issubclass(exc_type, KeyboardInterrupt):
@@ -120,5 +132,8 @@ class NoopLoggingManager(LoggingManager):
     def __init__(self, *args, **kwargs):
         pass
 
-    def start_file_logging(self, log_file: Path):
+    def start_file_logging(self, log_file: Path, *, current_thread_only: bool = False):
+        pass
+
+    def stop_file_logging(self, file_handler: logging.Handler | None):
         pass
@@ -0,0 +1,416 @@
+import collections
+import dataclasses
+import datetime
+import logging
+import os
+import stat
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from rich import print
+
+from PyHardLinkBackup.logging_setup import LoggingManager
+from PyHardLinkBackup.utilities.file_hash_database import FileHashDatabase
+from PyHardLinkBackup.utilities.file_hash_pool import FileHashPool, get_hash_db
+from PyHardLinkBackup.utilities.humanize import PrintTimingContextManager, human_filesize
+from PyHardLinkBackup.utilities.manifest import iter_snapshot_entries
+from PyHardLinkBackup.utilities.small_file_index import SmallFileIndex
+from PyHardLinkBackup.utilities.snapshots import IngestedSnapshots, iter_snapshot_dirs
+from PyHardLinkBackup.utilities.tee import TeeStdoutContext
+from PyHardLinkBackup.utilities.tyro_cli_shared_args import DEFAULT_WORKERS
+
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_TIMESTAMP_FORMAT = '%Y-%m-%d-%H%M%S'
+
+
+@dataclasses.dataclass
+class PruneResult:
+    snapshot_count: int = 0
+    pruned_snapshot_count: int = 0
+    deleted_file_count: int = 0
+    deleted_dir_count: int = 0
+    freed_size: int = 0
+    hash_entries_repointed: int = 0
+    hash_entries_dropped: int = 0
+    pool_entries_removed: int = 0
+    error_count: int = 0
+
+
+def select_snapshots_to_keep(
+    timestamps: list[str],
+    *,
+    keep_last: int = 0,
+    keep_daily: int = 0,
+    keep_weekly: int = 0,
+    keep_monthly: int = 0,
+) -> set[str]:
+    """
+    Returns the timestamps of all snapshots that should be kept.
+    For every period, the newest snapshot of the last N periods is kept.
+
+    >>> timestamps = ['2026-01-01-120000', '2026-01-01-180000', '2026-01-02-120000', '2026-01-20-120000']
+    >>> sorted(select_snapshots_to_keep(timestamps, keep_last=1))
+    ['2026-01-20-120000']
+    >>> sorted(select_snapshots_to_keep(timestamps, keep_daily=2))
+    ['2026-01-02-120000', '2026-01-20-120000']
+    >>> sorted(select_snapshots_to_keep(timestamps, keep_weekly=3))
+    ['2026-01-02-120000', '2026-01-20-120000']
+    >>> sorted(select_snapshots_to_keep(timestamps, keep_last=1, keep_monthly=1))
+    ['2026-01-20-120000']
+    """
+    timestamps = sorted(timestamps, reverse=True)
+    keep = set(timestamps[:keep_last])
+
+    period_policies = (
+        (keep_daily, lambda dt: dt.date()),
+        (keep_weekly, lambda dt: dt.isocalendar()[:2]),
+        (keep_monthly, lambda dt: (dt.year, dt.month)),
+    )
+    for keep_count, get_period in period_policies:
+        if keep_count <= 0:
+            continue
+        seen_periods = set()
+        for timestamp in timestamps:
+            period = get_period(datetime.datetime.strptime(timestamp, SNAPSHOT_TIMESTAMP_FORMAT))
+            if period not in seen_periods:
+                seen_periods.add(period)
+                keep.add(timestamp)
+                if len(seen_periods) >= keep_count:
+                    break
+    return keep
+
+
+class FreedSpaceCounter:
+    """
+    Count the really freed disk space of deleted files: Only if the last hardlink of an inode is deleted.
+    Thread-safe, because files with the same inode may be deleted in different threads.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.freed_size = 0
+        self.file_count = 0
+        self.dir_count = 0
+        self.inode_links = {}  # (dev, ino) -> [link count, deleted links, size]
+
+    def deleted(self, entry_stat: os.stat_result) -> None:
+        size = entry_stat.st_blocks * 512
+        with self.lock:
+            if stat.S_ISDIR(entry_stat.st_mode):
+                self.dir_count += 1
+                self.freed_size += size
+                return
+
+            self.file_count += 1
+            if entry_stat.st_nlink == 1:
+                self.freed_size += size
+                return
+
+            inode = (entry_stat.st_dev, entry_stat.st_ino)
+            inode_info = self.inode_links.setdefault(inode, [entry_stat.st_nlink, 0, size])
+            inode_info[1] += 1
+            if inode_info[1] >= inode_info[0]:
+                # All hardlinks are deleted
+                self.freed_size += size
+                del self.inode_links[inode]
+
+
+def remove_tree(path: Path, *, freed_space: FreedSpaceCounter) -> None:
+    """
+    Delete a directory tree with unlinkat()/rmdir() calls relative to the directory file descriptors.
+    """
+    for dir_path, dir_names, file_names, dir_fd in os.fwalk(path, topdown=False):
+        for name in file_names:
+            entry_stat = os.stat(name, dir_fd=dir_fd, follow_symlinks=False)
+            os.unlink(name, dir_fd=dir_fd)
+            freed_space.deleted(entry_stat)
+        for name in dir_names:
+            entry_stat = os.stat(name, dir_fd=dir_fd, follow_symlinks=False)
+            if stat.S_ISLNK(entry_stat.st_mode):
+                # Directory symlinks are not followed by fwalk()
+                os.unlink(name, dir_fd=dir_fd)
+            else:
+                os.rmdir(name, dir_fd=dir_fd)
+            freed_space.deleted(entry_stat)
+    entry_stat = os.stat(path, follow_symlinks=False)
+    os.rmdir(path)
+    freed_space.deleted(entry_stat)
+
+
+def remove_snapshot_files(snapshot_dir: Path, *, freed_space: FreedSpaceCounter) -> None:
+    """
+    Delete all files next to the snapshot directory: The manifest, the log and the summary file.
+    """
+    for file_path in snapshot_dir.parent.glob(f'{snapshot_dir.name}-*'):
+        file_stat = file_path.stat(follow_symlinks=False)
+        if stat.S_ISDIR(file_stat.st_mode):
+            continue
+        file_path.unlink()
+        freed_space.deleted(file_stat)
+
+
+def remove_snapshots(
+    snapshot_dirs: list[Path],
+    *,
+    workers: int,
+    prune_result: PruneResult,
+) -> None:
+    """
+    Delete the snapshot directories in parallel: Every top-level directory of a snapshot is one job.
+    """
+    freed_space = FreedSpaceCounter()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='prune') as executor:
+        futures = {}
+        for snapshot_dir in snapshot_dirs:
+            with os.scandir(snapshot_dir) as scandir_iterator:
+                for entry in scandir_iterator:
+                    if entry.is_dir(follow_symlinks=False):
+                        future = executor.submit(remove_tree, Path(entry.path), freed_space=freed_space)
+                        futures[future] = entry.path
+                    else:
+                        entry_stat = entry.stat(follow_symlinks=False)
+                        os.unlink(entry.path)
+                        freed_space.deleted(entry_stat)
+
+        for future, path in futures.items():
+            try:
+                future.result()
+            except OSError as err:
+                logger.exception(f'Remove {path} {err.__class__.__name__}')
+                prune_result.error_count += 1
+
+    for snapshot_dir in snapshot_dirs:
+        try:
+            remove_tree(snapshot_dir, freed_space=freed_space)
+            remove_snapshot_files(snapshot_dir, freed_space=freed_space)
+        except OSError as err:
+            logger.exception(f'Remove {snapshot_dir} {err.__class__.__name__}')
+            prune_result.error_count += 1
+        else:
+            logger.info('Snapshot %s removed', snapshot_dir)
+            prune_result.pruned_snapshot_count += 1
+
+    prune_result.deleted_file_count += freed_space.file_count
+    prune_result.deleted_dir_count += freed_space.dir_count
+    prune_result.freed_size += freed_space.freed_size
+
+
+def find_surviving_hardlinks(
+    *,
+    inodes: set[tuple[int, int]],
+    surviving_snapshot_dirs: list[Path],
+) -> dict[tuple[int, int], Path]:
+    """
+    Search a hardlink of every given (st_dev, st_ino) inode in all surviving snapshots of all backup names.
+    The inodes are looked up in the manifest files, so no snapshot tree must be walked.
+    (Only snapshots without a manifest, created by an old version, are walked.)
+    Stops if a hardlink is found for every inode.
+    """
+    found = {}
+    missing_inos = collections.Counter(st_ino for _, st_ino in inodes)  # The manifest stores only st_ino
+    for snapshot_dir in surviving_snapshot_dirs:
+        if not missing_inos:
+            break
+        try:
+            for entry in iter_snapshot_entries(snapshot_dir):
+                if entry.inode not in missing_inos:
+                    continue
+                candidate_path = snapshot_dir / entry.path
+                try:
+                    candidate_stat = candidate_path.stat(follow_symlinks=False)
+                except FileNotFoundError:
+                    continue
+                inode = (candidate_stat.st_dev, candidate_stat.st_ino)
+                if inode in inodes and inode not in found:
+                    found[inode] = candidate_path
+                    missing_inos[entry.inode] -= 1
+                    if not missing_inos[entry.inode]:
+                        del missing_inos[entry.inode]
+        except (OSError, ValueError) as err:
+            logger.exception(f'Read manifest of {snapshot_dir} {err.__class__.__name__}')
+    return found
+
+
+def collect_index_garbage(
+    *,
+    backup_root: Path,
+    hash_dbs: list[FileHashDatabase | SmallFileIndex],
+    prune_rel_paths: set[str],
+    surviving_snapshot_dirs: list[Path],
+    prune_result: PruneResult,
+) -> None:
+    """
+    One bulk pass over all index entries: Entries that point into a pruned snapshot are repointed
+    to a surviving hardlink of the same inode, if possible. All other entries to pruned or already missing
+    files are dropped.
+    """
+    prune_entries = []  # (hash_db, file_hash, rel_path, inode) of all entries that point into a pruned snapshot
+    for hash_db in hash_dbs:
+        for file_hash, rel_path in hash_db.iter_entries():
+            snapshot_rel_path = '/'.join(rel_path.split('/', maxsplit=2)[:2])
+            if snapshot_rel_path in prune_rel_paths:
+                try:
+                    old_stat = (backup_root / rel_path).stat(follow_symlinks=False)
+                except FileNotFoundError:
+                    pass
+                else:
+                    prune_entries.append((hash_db, file_hash, rel_path, (old_stat.st_dev, old_stat.st_ino)))
+                    continue
+            elif (backup_root / rel_path).is_file():
+                continue
+
+            logger.debug('Drop hash %s entry: %s', file_hash, rel_path)
+            del hash_db[file_hash]
+            prune_result.hash_entries_dropped += 1
+
+    surviving_hardlinks = find_surviving_hardlinks(
+        inodes={inode for *_, inode in prune_entries},
+        surviving_snapshot_dirs=surviving_snapshot_dirs,
+    )
+    for hash_db, file_hash, rel_path, inode in prune_entries:
+        if new_path := surviving_hardlinks.get(inode):
+            logger.debug('Repoint hash %s from %s to %s', file_hash, rel_path, new_path)
+            hash_db[file_hash] = new_path
+            prune_result.hash_entries_repointed += 1
+        else:
+            logger.debug('Drop hash %s entry: %s', file_hash, rel_path)
+            del hash_db[file_hash]
+            prune_result.hash_entries_dropped += 1
+
+
+def prune(
+    *,
+    backup_root: Path,
+    keep_last: int,
+    keep_daily: int,
+    keep_weekly: int,
+    keep_monthly: int,
+    log_manager: LoggingManager,
+    workers: int = DEFAULT_WORKERS,
+    dry_run: bool = False,
+) -> PruneResult:
+    """DocWrite: README.md ## prune
+    `phlb prune` deletes old snapshots by a retention policy, applied to every backup name separately:
+     * `--keep-last N`: Keep the N newest snapshots
+     * `--keep-daily N`, `--keep-weekly N`, `--keep-monthly N`:
+       Keep the newest snapshot of each of the last N days, weeks or months.
+
+    The snapshot trees are deleted in parallel via `unlinkat()`/`rmdir()` relative to directory file descriptors.
+    The files next to a deleted snapshot (manifest, backup log and summary) are deleted, too.
+    Only the really freed disk space is reported: A file only frees space if its last hardlink is deleted.
+
+    Before deleting, one bulk pass over the FileHashDatabase (and the SmallFileIndex) is made:
+    Entries that point into a pruned snapshot are repointed to a surviving hardlink of the same inode, if possible.
+    The hardlinks are searched in the manifests of all surviving snapshots (of all backup names), newest first.
+    All other entries of deleted or already missing files are dropped.
+    With the FileHashPool, unused pool entries (only one link left) are removed after deleting.
+
+    Use `--dry-run` to see which snapshots would be deleted.
+    """
+    backup_root = backup_root.resolve()
+    phlb_conf_dir = backup_root / '.phlb'
+    if not phlb_conf_dir.is_dir():
+        print(
+            f'Error: Backup directory "{backup_root}" seems to be wrong:'
+            f' Our hidden ".phlb" configuration directory is missing!'
+        )
+        sys.exit(1)
+
+    if not any((keep_last, keep_daily, keep_weekly, keep_monthly)):
+        print('Error: No retention policy given! (e.g.: --keep-last 10)')
+        sys.exit(1)
+
+    snapshots_by_name = collections.defaultdict(list)
+    for snapshot_dir in iter_snapshot_dirs(backup_root):
+        snapshots_by_name[snapshot_dir.parent.name].append(snapshot_dir)
+
+    prune_result = PruneResult()
+    prune_snapshot_dirs = []
+    surviving_snapshot_dirs = []
+    for name, snapshot_dirs in snapshots_by_name.items():
+        keep = select_snapshots_to_keep(
+            [snapshot_dir.name for snapshot_dir in snapshot_dirs],
+            keep_last=keep_last,
+            keep_daily=keep_daily,
+            keep_weekly=keep_weekly,
+            keep_monthly=keep_monthly,
+        )
+        print(f'\nBackup "{name}":')
+        for snapshot_dir in snapshot_dirs:
+            prune_result.snapshot_count += 1
+            if snapshot_dir.name in keep:
+                print(f'  keep   {snapshot_dir.name}')
+                surviving_snapshot_dirs.append(snapshot_dir)
+            else:
+                print(f'  delete {snapshot_dir.name}')
+                prune_snapshot_dirs.append(snapshot_dir)
+    # Newest first, because it probably has the most hardlinks to old files:
+    surviving_snapshot_dirs.sort(key=lambda snapshot_dir: snapshot_dir.name, reverse=True)
+
+    logger.info('Prune %i of %i snapshots in %s', len(prune_snapshot_dirs), prune_result.snapshot_count, backup_root)
+    if dry_run:
+        print(f'\nDry run: {len(prune_snapshot_dirs)} of {prune_result.snapshot_count} snapshots would be deleted.\n')
+        return prune_result
+
+    if not prune_snapshot_dirs:
+        print('\nNothing to prune.\n')
+        return prune_result
+
+    timestamp = datetime.datetime.now().strftime(SNAPSHOT_TIMESTAMP_FORMAT)
+    log_manager.start_file_logging(log_file=backup_root / f'{timestamp}-prune.log')
+
+    prune_rel_paths = {str(snapshot_dir.relative_to(backup_root)) for snapshot_dir in prune_snapshot_dirs}
+    with PrintTimingContextManager('Index garbage collection completed in'):
+        # Always the "hash-lookup" pointer files, the pool entries are not related to any snapshot:
+        hash_dbs = [FileHashDatabase(backup_root, phlb_conf_dir)]
+        small_file_index = SmallFileIndex(backup_root, phlb_conf_dir)
+        use_small_file_index = bool(small_file_index.entries)
+        if use_small_file_index:
+            hash_dbs.append(small_file_index)
+        collect_index_garbage(
+            backup_root=backup_root,
+            hash_dbs=hash_dbs,
+            prune_rel_paths=prune_rel_paths,
+            surviving_snapshot_dirs=surviving_snapshot_dirs,
+            prune_result=prune_result,
+        )
+        if use_small_file_index:
+            small_file_index.compact()
+
+    with PrintTimingContextManager('Snapshots deleted in'):
+        remove_snapshots(prune_snapshot_dirs, workers=workers, prune_result=prune_result)
+
+    ingested_snapshots = IngestedSnapshots(backup_root, phlb_conf_dir)
+    if ingested_snapshots.state_path.exists():
+        ingested_snapshots.retain(list(iter_snapshot_dirs(backup_root)))
+        ingested_snapshots.save()
+
+    hash_db = get_hash_db(backup_root, phlb_conf_dir)
+    if isinstance(hash_db, FileHashPool):
+        with PrintTimingContextManager('Pool garbage collection completed in'):
+            removed_count, freed_size = hash_db.remove_unused()
+            prune_result.pool_entries_removed += removed_count
+            prune_result.freed_size += freed_size
+
+    summary_file = backup_root / f'{timestamp}-prune-summary.txt'
+    with TeeStdoutContext(summary_file):
+        print(f'\nPrune "{backup_root}" completed:')
+        print(f'  Deleted snapshots: {prune_result.pruned_snapshot_count} of {prune_result.snapshot_count}')
+        print(f'  Deleted files: {prune_result.deleted_file_count}')
+        print(f'  Deleted directories: {prune_result.deleted_dir_count}')
+        print(f'  Freed disk space: {human_filesize(prune_result.freed_size)}')
+        print(f'  Hash entries repointed to surviving hardlinks: {prune_result.hash_entries_repointed}')
+        print(f'  Hash entries dropped: {prune_result.hash_entries_dropped}')
+        if isinstance(hash_db, FileHashPool):
+            print(f'  Unused pool entries removed: {prune_result.pool_entries_removed}')
+        if prune_result.error_count > 0:
+            print(f'  Errors during prune: {prune_result.error_count} (see log for details)')
+        print()
+
+    logger.info('Prune completed. Summary created: %s', summary_file)
+
+    return prune_result
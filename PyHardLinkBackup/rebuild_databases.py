@@ -1,19 +1,37 @@
 import dataclasses
 import datetime
+import itertools
 import logging
 import os
 import sys
 import time
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
 
 from PyHardLinkBackup.logging_setup import LoggingManager
+from PyHardLinkBackup.utilities.bounded_jobs import BoundedJobQueue
 from PyHardLinkBackup.utilities.file_hash_database import FileHashDatabase
+from PyHardLinkBackup.utilities.file_hash_pool import get_hash_db
 from PyHardLinkBackup.utilities.file_size_database import FileSizeDatabase
 from PyHardLinkBackup.utilities.filesystem import hash_file, humanized_fs_scan, iter_scandir_files
 from PyHardLinkBackup.utilities.humanize import PrintTimingContextManager, human_filesize
-from PyHardLinkBackup.utilities.rich_utils import DisplayFileTreeProgress
-from PyHardLinkBackup.utilities.sha256sums import check_sha256sums, store_hash
+from PyHardLinkBackup.utilities.inode_set import InodeHashes, InodeSet
+from PyHardLinkBackup.utilities.rich_utils import DisplayFileTreeProgress, NoopProgress
+from PyHardLinkBackup.utilities.sha256sums import (
+    check_sha256sums,
+    get_cached_sha256sums_reader,
+    get_sha256sums_path,
+    store_hash,
+)
+from PyHardLinkBackup.utilities.snapshots import (
+    IngestedSnapshots,
+    get_snapshot_fingerprint,
+    get_snapshot_size,
+    iter_snapshot_dirs,
+)
 from PyHardLinkBackup.utilities.tee import TeeStdoutContext
+from PyHardLinkBackup.utilities.tyro_cli_shared_args import DEFAULT_WORKERS
 
 
 logger = logging.getLogger(__name__)
@@ -31,6 +49,25 @@ class RebuildResult:
     hash_not_found_count: int = 0
     unique_inode_count: int = 0
     skip_by_inode_count: int = 0
+    trusted_hash_count: int = 0
+    reused_hash_count: int = 0
+    skipped_snapshot_count: int = 0
+
+
+@dataclasses.dataclass
+class RebuildJob:
+    """
+    A backup file, that must be hashed.
+    """
+
+    file_path: Path
+    size: int
+    inode: tuple[int, int]  # (st_dev, st_ino)
+    nlink: int
+    file_hash: str | None = None  # Known hash, the file content will not be read
+    trusted: bool = False  # The hash is taken from SHA256SUMS -> Nothing to verify
+    reused_hash: bool = False  # The hash is taken from a hardlink sibling with the same inode
+    hash_future: Future | None = None
 
 
 def rebuild_one_file(
@@ -38,55 +75,128 @@ def rebuild_one_file(
     backup_root: Path,
     entry: os.DirEntry,
     size_db: FileSizeDatabase,
-    hash_db: FileHashDatabase,
-    seen_inodes: set,
+    seen_inodes: InodeSet,
     skip_same_inode: bool,
     rebuild_result: RebuildResult,
-    progress: DisplayFileTreeProgress,
-):
-    inode = entry.inode()
-    if inode not in seen_inodes:
-        seen_inodes.add(inode)
-    else:
-        if skip_same_inode:
-            rebuild_result.skip_by_inode_count += 1
-            # Update counters used in progress display:
-            rebuild_result.process_size += entry.stat().st_size
-            rebuild_result.process_count += 1
-            return
-
+    get_sha256sums: Callable[[Path], dict[str, str]] | None = None,
+) -> RebuildJob | None:
+    """
+    Make all cheap checks of one backup file.
+    Returns a RebuildJob, if the file must be stored in the databases.
+    If "get_sha256sums" is given, the hash is taken from the SHA256SUMS file, if possible.
+    Skipped files with an already seen inode are returned, too: Their SHA256SUMS entry will be verified
+    with the hash of the inode, without reading the content again.
+    """
+    inode = (entry.stat(follow_symlinks=False).st_dev, entry.inode())
+    is_new_inode = seen_inodes.add(inode)
     file_path = Path(entry.path)
+    if not is_new_inode and skip_same_inode:
+        rebuild_result.skip_by_inode_count += 1
+        # Update counters used in progress display:
+        entry_stat = entry.stat()
+        rebuild_result.process_size += entry_stat.st_size
+        rebuild_result.process_count += 1
+        if file_path.parent == backup_root or entry.name == 'SHA256SUMS' or entry_stat.st_size < size_db.MIN_SIZE:
+            return None
+        return RebuildJob(file_path=file_path, size=entry_stat.st_size, inode=inode, nlink=entry_stat.st_nlink)
 
     # We should ignore all files in the root backup directory itself
     # e.g.: Our *-summary.txt and *.log files
     if file_path.parent == backup_root:
-        return
+        return None
 
     rebuild_result.process_count += 1
 
     if entry.name == 'SHA256SUMS':
         # Skip existing SHA256SUMS files
-        return
+        return None
 
-    size = entry.stat().st_size
+    entry_stat = entry.stat()
+    size = entry_stat.st_size
     rebuild_result.process_size += size
     if size < size_db.MIN_SIZE:
         # Small files will never deduplicate, skip them
-        return
+        return None
 
-    file_hash = hash_file(file_path, progress=progress, total_size=size)
+    file_hash = None
+    if get_sha256sums is not None:
+        file_hash = get_sha256sums(get_sha256sums_path(file_path)).get(entry.name)
 
-    if size not in size_db:
-        size_db.add(size)
+    return RebuildJob(
+        file_path=file_path,
+        size=size,
+        inode=inode,
+        nlink=entry_stat.st_nlink,
+        file_hash=file_hash,
+        trusted=file_hash is not None,
+    )
+
+
+def submit_hash_jobs(
+    *,
+    executor: ThreadPoolExecutor,
+    batch: list[RebuildJob],
+    inode_futures: dict[tuple[int, int], Future],
+    inode_hashes: InodeHashes,
+) -> None:
+    """
+    Hash the files of one batch in worker threads. The files are sorted by inode number,
+    because it's a good approximation of the physical location on disk.
+    Every inode with hardlinks will be hashed only once.
+    Note: No progress bars are used in worker threads.
+    """
+    batch.sort(key=lambda job: job.inode)
+    for job in batch:
+        if job.nlink > 1:
+            # Reuse the hash (or the pending hash job) of a hardlink sibling:
+            job.file_hash = inode_hashes.get(job.inode)
+            job.hash_future = inode_futures.get(job.inode)
+            if job.file_hash is not None or job.hash_future is not None:
+                job.reused_hash = True
+                continue
+
+        job.hash_future = executor.submit(hash_file, job.file_path, progress=NoopProgress(), total_size=job.size)
+        if job.nlink > 1:
+            inode_futures[job.inode] = job.hash_future
+
+
+def store_file_hash(
+    *,
+    job: RebuildJob,
+    size_db: FileSizeDatabase,
+    hash_db: FileHashDatabase,
+    rebuild_result: RebuildResult,
+) -> str:
+    """
+    Store the hash of one file in the databases and verify/update the SHA256SUMS file.
+    Only called from the main thread, so all "databases" have a single writer.
+    Returns the file hash.
+    """
+    if job.file_hash is not None:
+        file_hash = job.file_hash
+    else:
+        file_hash = job.hash_future.result()
+    if job.trusted:
+        # Trust the hash from the SHA256SUMS file, the file content was not read
+        rebuild_result.trusted_hash_count += 1
+    elif job.reused_hash:
+        rebuild_result.reused_hash_count += 1
+    file_path = job.file_path
+
+    if job.size not in size_db:
+        size_db.add(job.size)
         rebuild_result.added_size_count += 1
 
     if file_hash not in hash_db:
         hash_db[file_hash] = file_path
         rebuild_result.added_hash_count += 1
 
+    if job.trusted:
+        # Nothing to verify
+        return file_hash
+
     # We have calculated the current hash of the file,
     # Let's check if we can verify it, too:
-    file_path = Path(entry.path)
     compare_result = check_sha256sums(
         file_path=file_path,
         file_hash=file_hash,
@@ -101,13 +211,26 @@ def rebuild_one_file(
             file_path=file_path,
             file_hash=file_hash,
         )
+    return file_hash
 
 
 def rebuild(
     backup_root: Path,
     skip_same_inode: bool,
     log_manager: LoggingManager,
+    workers: int = DEFAULT_WORKERS,
+    trust_sha256sums: bool = False,
+    incremental: bool = False,
 ) -> RebuildResult:
+    """DocWrite: README.md ## rebuild
+    `phlb rebuild` recreates the FileSizeDatabase and FileHashDatabase by scanning all backup files.
+    All files are hashed and verified against the `SHA256SUMS` files. Missing `SHA256SUMS` entries are added.
+    Every inode is hashed only once: The `SHA256SUMS` entries of all hardlinks are verified with this hash.
+
+    With `--trust-sha256sums` the hashes are taken from the existing `SHA256SUMS` files instead,
+    only files without an entry are read and hashed. So e.g. a lost `.phlb` directory can be recovered fast,
+    but the backup files are not verified.
+    """
     backup_root = backup_root.resolve()
     if not backup_root.is_dir():
         print(f'Error: Backup directory "{backup_root}" does not exist!')
@@ -124,21 +247,54 @@ def rebuild(
     timestamp = datetime.datetime.now().strftime('%Y-%m-%d-%H%M%S')
     log_manager.start_file_logging(log_file=backup_root / f'{timestamp}-rebuild.log')
 
-    with PrintTimingContextManager('Filesystem scan completed in'):
-        file_count, total_size = humanized_fs_scan(
+    rebuild_result = RebuildResult()
+
+    ingested_snapshots = IngestedSnapshots(backup_root, phlb_conf_dir)
+    snapshot_dirs = list(iter_snapshot_dirs(backup_root))
+    if incremental:
+        process_snapshot_dirs = []
+        file_count = 0
+        total_size = 0
+        with PrintTimingContextManager('Snapshot fingerprints created in'):
+            for snapshot_dir in snapshot_dirs:
+                if ingested_snapshots.is_ingested(snapshot_dir, get_snapshot_fingerprint(snapshot_dir)):
+                    logger.info('Skip already ingested snapshot: %s', snapshot_dir)
+                    rebuild_result.skipped_snapshot_count += 1
+                else:
+                    logger.info('Process new or changed snapshot: %s', snapshot_dir)
+                    process_snapshot_dirs.append(snapshot_dir)
+                    # Only the new or changed snapshots are walked:
+                    snapshot_file_count, snapshot_size = get_snapshot_size(snapshot_dir)
+                    file_count += snapshot_file_count
+                    total_size += snapshot_size
+        print(f'Process {len(process_snapshot_dirs)} of {len(snapshot_dirs)} snapshots.')
+        entries = itertools.chain.from_iterable(
+            iter_scandir_files(path=snapshot_dir, one_file_system=False, src_device_id=None, excludes=set())
+            for snapshot_dir in process_snapshot_dirs
+        )
+    else:
+        process_snapshot_dirs = snapshot_dirs
+        with PrintTimingContextManager('Filesystem scan completed in'):
+            file_count, total_size = humanized_fs_scan(
+                path=backup_root,
+                one_file_system=False,
+                src_device_id=None,
+                excludes={'.phlb'},
+            )
+
+            # We should ignore all files in the root backup directory itself
+            # e.g.: Our *-summary.txt and *.log files
+            for file in backup_root.iterdir():
+                if file.is_file():
+                    file_count -= 1
+                    total_size -= file.stat().st_size
+        entries = iter_scandir_files(
             path=backup_root,
             one_file_system=False,
             src_device_id=None,
             excludes={'.phlb'},
         )
 
-        # We should ignore all files in the root backup directory itself
-        # e.g.: Our *-summary.txt and *.log files
-        for file in backup_root.iterdir():
-            if file.is_file():
-                file_count -= 1
-                total_size -= file.stat().st_size
-
     with DisplayFileTreeProgress(
         description=f'Rebuild {backup_root}...',
         total_file_count=file_count,
@@ -146,45 +302,112 @@ def rebuild(
     ) as progress:
         # "Databases" for deduplication
         size_db = FileSizeDatabase(phlb_conf_dir)
-        hash_db = FileHashDatabase(backup_root, phlb_conf_dir)
+        hash_db = get_hash_db(backup_root, phlb_conf_dir)
 
-        seen_inodes = set()
+        seen_inodes = InodeSet()
 
-        rebuild_result = RebuildResult()
+        # Inode -> pending hash job of files with hardlinks:
+        inode_futures = {}
+        # Inode -> hash of processed files with hardlinks, until all hardlinks are seen:
+        inode_hashes = InodeHashes()
 
-        next_update = 0
-        for entry in iter_scandir_files(
-            path=backup_root,
-            one_file_system=False,
-            src_device_id=None,
-            excludes={'.phlb'},
-        ):
+        get_sha256sums = None
+        if trust_sha256sums:
+            get_sha256sums = get_cached_sha256sums_reader()
+
+        def process_job(job: RebuildJob) -> None:
+            nonlocal pending_size
+            pending_size -= job.size
             try:
-                rebuild_one_file(
-                    backup_root=backup_root,
-                    entry=entry,
-                    size_db=size_db,
-                    hash_db=hash_db,
-                    seen_inodes=seen_inodes,
-                    skip_same_inode=skip_same_inode,
-                    rebuild_result=rebuild_result,
-                    progress=progress,
-                )
+                file_hash = store_file_hash(job=job, size_db=size_db, hash_db=hash_db, rebuild_result=rebuild_result)
             except Exception as err:
-                logger.exception(f'Backup {entry.path} {err.__class__.__name__}')
+                logger.exception(f'Backup {job.file_path} {err.__class__.__name__}')
                 rebuild_result.error_count += 1
             else:
+                if job.nlink > 1:
+                    inode_hashes.processed(job.inode, file_hash=file_hash, nlink=job.nlink)
+                    inode_futures.pop(job.inode, None)
+
+        def update_progress() -> None:
+            # Count only the processed files, not the files that are still waiting to be hashed:
+            pending_count = len(batch) + len(pending)
+            progress.update(
+                completed_file_count=rebuild_result.process_count - pending_count,
+                completed_size=rebuild_result.process_size - pending_size,
+            )
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='rebuild') as executor:
+            batch = []  # Files to hash, collected from the directory walk
+            batch_size = workers * 16
+            pending = BoundedJobQueue(max_pending=batch_size * 2)  # Submitted hash jobs, in inode order
+            pending_size = 0
+
+            next_update = 0
+            for entry in entries:
+                try:
+                    job = rebuild_one_file(
+                        backup_root=backup_root,
+                        entry=entry,
+                        size_db=size_db,
+                        seen_inodes=seen_inodes,
+                        skip_same_inode=skip_same_inode,
+                        rebuild_result=rebuild_result,
+                        get_sha256sums=get_sha256sums,
+                    )
+                except Exception as err:
+                    logger.exception(f'Backup {entry.path} {err.__class__.__name__}')
+                    rebuild_result.error_count += 1
+                    continue
+
+                if job is not None:
+                    pending_size += job.size
+                    if job.file_hash is None and job.nlink > 1 and (file_hash := inode_hashes.get(job.inode)):
+                        # Hardlink sibling of an already processed inode
+                        job.file_hash = file_hash
+                        job.reused_hash = True
+                    if job.file_hash is not None:
+                        # Nothing to hash -> store it directly
+                        process_job(job)
+                    else:
+                        batch.append(job)
+                    if len(batch) >= batch_size:
+                        submit_hash_jobs(
+                            executor=executor, batch=batch, inode_futures=inode_futures, inode_hashes=inode_hashes
+                        )
+                        for submitted_job in batch:
+                            pending.append(submitted_job, submitted_job.hash_future)
+                        batch = []
+
+                for done_job, _ in pending.iter_done():
+                    process_job(done_job)
+
                 now = time.monotonic()
                 if now >= next_update:
-                    progress.update(
-                        completed_file_count=rebuild_result.process_count, completed_size=rebuild_result.process_size
-                    )
+                    update_progress()
                     next_update = now + 0.5
 
+            submit_hash_jobs(executor=executor, batch=batch, inode_futures=inode_futures, inode_hashes=inode_hashes)
+            for submitted_job in batch:
+                pending.append(submitted_job, submitted_job.hash_future)
+            batch = []
+            for done_job, _ in pending.iter_all():
+                process_job(done_job)
+
         # Finalize progress indicator values:
         progress.update(completed_file_count=rebuild_result.process_count, completed_size=rebuild_result.process_size)
 
     rebuild_result.unique_inode_count = len(seen_inodes)
+    seen_inodes.close()
+
+    # Record the processed snapshots, for the next incremental rebuild:
+    ingested_snapshots.retain(snapshot_dirs)
+    if rebuild_result.error_count > 0:
+        logger.warning('Errors during rebuild: Processed snapshots are not recorded as ingested.')
+    else:
+        for snapshot_dir in process_snapshot_dirs:
+            # Note: The SHA256SUMS files may be changed by us, so create the (cheap) fingerprint again:
+            ingested_snapshots[snapshot_dir] = get_snapshot_fingerprint(snapshot_dir)
+    ingested_snapshots.save()
 
     summary_file = backup_root / f'{timestamp}-rebuild-summary.txt'
     with TeeStdoutContext(summary_file):
@@ -194,6 +417,8 @@ def rebuild(
 
         print(f'  Unique inodes count: {rebuild_result.unique_inode_count}')
         print(f'  Skipped files by inode: {rebuild_result.skip_by_inode_count}')
+        if incremental:
+            print(f'  Skipped already ingested snapshots: {rebuild_result.skipped_snapshot_count}')
 
         print(f'  Added file size information entries: {rebuild_result.added_size_count}')
         print(f'  Added file hash entries: {rebuild_result.added_hash_count}')
@@ -205,6 +430,9 @@ def rebuild(
         print(f'  Successfully verified files: {rebuild_result.hash_verified_count}')
         print(f'  File hash mismatches: {rebuild_result.hash_mismatch_count}')
         print(f'  File hashes not found, newly stored: {rebuild_result.hash_not_found_count}')
+        print(f'  Hardlinks verified with the hash of the same inode: {rebuild_result.reused_hash_count}')
+        if trust_sha256sums:
+            print(f'  Trusted hashes (file not read and not verified): {rebuild_result.trusted_hash_count}')
 
         print()
 
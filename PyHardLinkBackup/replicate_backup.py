@@ -0,0 +1,327 @@
+import dataclasses
+import datetime
+import logging
+import os
+import shutil
+import stat
+import sys
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+
+from rich import print
+
+from PyHardLinkBackup.logging_setup import LoggingManager
+from PyHardLinkBackup.utilities.bounded_jobs import BoundedJobQueue
+from PyHardLinkBackup.utilities.file_hash_database import FileHashDatabase
+from PyHardLinkBackup.utilities.file_hash_pool import get_hash_db
+from PyHardLinkBackup.utilities.file_size_database import FileSizeDatabase
+from PyHardLinkBackup.utilities.filesystem import RemoveFileOnError, copy_and_hash, hardlink_or_copy
+from PyHardLinkBackup.utilities.humanize import PrintTimingContextManager, human_filesize
+from PyHardLinkBackup.utilities.manifest import ManifestEntry, ManifestWriter, get_manifest_path, iter_snapshot_entries
+from PyHardLinkBackup.utilities.rich_utils import DisplayFileTreeProgress, NoopProgress
+from PyHardLinkBackup.utilities.sha256sums import store_hash
+from PyHardLinkBackup.utilities.small_file_index import SmallFileIndex
+from PyHardLinkBackup.utilities.snapshots import iter_snapshot_dirs
+from PyHardLinkBackup.utilities.tee import TeeStdoutContext
+from PyHardLinkBackup.utilities.tyro_cli_shared_args import DEFAULT_WORKERS
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclasses.dataclass
+class ReplicateResult:
+    snapshot_count: int = 0
+    replicated_snapshot_count: int = 0
+    skipped_snapshot_count: int = 0  # Already replicated by a previous run
+    file_count: int = 0
+    total_size: int = 0
+    copied_files: int = 0
+    copied_size: int = 0
+    hardlinked_files: int = 0
+    hardlinked_size: int = 0
+    symlink_files: int = 0
+    hardlink_rotations: int = 0
+    error_count: int = 0
+
+
+def copy_one_file(*, src_path: Path, dst_path: Path, expected_hash: str | None, size: int) -> str:
+    """
+    Copy one file and hash it on the fly, so the known hash is verified without an extra read.
+    """
+    with RemoveFileOnError(dst_path):
+        file_hash = copy_and_hash(src_path, dst_path, progress=NoopProgress(), total_size=size)
+        if expected_hash and file_hash != expected_hash:
+            raise ValueError(f'Hash mismatch of {src_path}: {file_hash} is not the expected {expected_hash}')
+    return file_hash
+
+
+def replicate_snapshot(
+    *,
+    src_snapshot: Path,
+    dst_snapshot: Path,
+    size_db: FileSizeDatabase,
+    hash_db: FileHashDatabase,
+    small_file_index: SmallFileIndex | None,
+    executor: ThreadPoolExecutor,
+    workers: int,
+    replicate_result: ReplicateResult,
+) -> bool:
+    """
+    Replicate one snapshot. Returns False if errors occurred, so the snapshot is incomplete.
+    """
+    file_count = 0
+    total_size = 0
+    for entry in iter_snapshot_entries(src_snapshot):
+        file_count += 1
+        total_size += entry.size
+
+    error_count = replicate_result.error_count
+    dst_snapshot.mkdir(parents=True)
+    created_dirs = {dst_snapshot}
+    manifest = ManifestWriter(dst_snapshot)
+    in_flight = {}  # hash of a pending copy -> entries with the same content, hardlinked after the copy
+    pending = BoundedJobQueue(max_pending=workers * 16)  # Submitted copy jobs, in snapshot order
+
+    def get_lookup_db(entry: ManifestEntry) -> FileHashDatabase | SmallFileIndex | None:
+        if entry.size >= FileSizeDatabase.MIN_SIZE:
+            return hash_db
+        return small_file_index  # None -> small files are always copied
+
+    def finish_file(entry: ManifestEntry, dst_path: Path, file_hash: str) -> None:
+        store_hash(dst_path, file_hash)
+        manifest.add(dst_path, file_hash, src_inode=entry.src_inode)
+
+    def link_file(entry: ManifestEntry, existing_path: Path) -> None:
+        src_path = src_snapshot / entry.path
+        dst_path = dst_snapshot / entry.path
+        logger.info('Hardlink %s to %s', dst_path, existing_path)
+        with RemoveFileOnError(dst_path):
+            if hardlink_or_copy(existing_path, dst_path):
+                replicate_result.hardlinked_files += 1
+                replicate_result.hardlinked_size += entry.size
+            else:
+                # Hardlink limit reached -> Use the fresh copy as new "master" for all following hardlinks:
+                shutil.copystat(src_path, dst_path)
+                get_lookup_db(entry)[entry.sha256] = dst_path
+                replicate_result.hardlink_rotations += 1
+                replicate_result.copied_files += 1
+                replicate_result.copied_size += entry.size
+        finish_file(entry, dst_path, entry.sha256)
+
+    def replicate_entry(entry: ManifestEntry) -> None:
+        src_path = src_snapshot / entry.path
+        dst_path = dst_snapshot / entry.path
+        if dst_path.parent not in created_dirs:
+            dst_path.parent.mkdir(parents=True, exist_ok=True)
+            created_dirs.add(dst_path.parent)
+
+        if stat.S_ISLNK(entry.mode):
+            os.symlink(os.readlink(src_path), dst_path)
+            replicate_result.symlink_files += 1
+            manifest.add(dst_path, None)
+            return
+
+        lookup_db = get_lookup_db(entry)
+        if entry.sha256 and lookup_db is not None:
+            if waiting := in_flight.get(entry.sha256):
+                # Same content is copied right now -> hardlink it after the copy is done
+                waiting.append(entry)
+                return
+            if existing_path := lookup_db.get(entry.sha256):
+                link_file(entry, existing_path)
+                return
+            in_flight[entry.sha256] = [entry]
+
+        future = executor.submit(
+            copy_one_file,
+            src_path=src_path,
+            dst_path=dst_path,
+            expected_hash=entry.sha256,
+            size=entry.size,
+        )
+        pending.append(entry, future)
+
+    def process_result(entry: ManifestEntry, future: Future) -> None:
+        waiting = in_flight.pop(entry.sha256, [entry])[1:] if entry.sha256 else []
+        dst_path = dst_snapshot / entry.path
+        try:
+            file_hash = future.result()
+            replicate_result.copied_files += 1
+            replicate_result.copied_size += entry.size
+            lookup_db = get_lookup_db(entry)
+            if lookup_db is not None:
+                lookup_db[file_hash] = dst_path
+            if entry.size >= FileSizeDatabase.MIN_SIZE and entry.size not in size_db:
+                size_db.add(entry.size)
+            finish_file(entry, dst_path, file_hash)
+        except Exception as err:
+            logger.exception(f'Replicate {src_snapshot / entry.path} {err.__class__.__name__}')
+            replicate_result.error_count += 1
+            # Copy the content again for all waiting files:
+            handle_entries(waiting, replicate_entry)
+        else:
+            handle_entries(waiting, lambda waiting_entry: link_file(waiting_entry, dst_path))
+
+    def handle_entries(entries: list[ManifestEntry], func) -> None:
+        for entry in entries:
+            try:
+                func(entry)
+            except Exception as err:
+                logger.exception(f'Replicate {src_snapshot / entry.path} {err.__class__.__name__}')
+                replicate_result.error_count += 1
+
+    with DisplayFileTreeProgress(
+        description=f'Replicate {src_snapshot.parent.name}/{src_snapshot.name}...',
+        total_file_count=file_count,
+        total_size=total_size,
+    ) as progress:
+        start_file_count = replicate_result.file_count
+        start_size = replicate_result.total_size
+        next_update = 0
+        for entry in iter_snapshot_entries(src_snapshot):
+            replicate_result.file_count += 1
+            replicate_result.total_size += entry.size
+            handle_entries([entry], replicate_entry)
+
+            for done_entry, done_future in pending.iter_done():
+                process_result(done_entry, done_future)
+
+            now = time.monotonic()
+            if now >= next_update:
+                progress.update(
+                    completed_file_count=replicate_result.file_count - start_file_count - len(pending),
+                    completed_size=replicate_result.total_size - start_size,
+                )
+                next_update = now + 0.5
+
+        for done_entry, done_future in pending.iter_all():
+            process_result(done_entry, done_future)
+
+        progress.update(completed_file_count=file_count, completed_size=total_size)
+
+    if replicate_result.error_count > error_count:
+        logger.error('Snapshot %s is incomplete, it will be replicated again by the next run', dst_snapshot)
+        manifest.cleanup()
+        return False
+
+    # Copy the log and summary files of the snapshot:
+    for src_path in src_snapshot.parent.glob(f'{src_snapshot.name}-*'):
+        if src_path.is_file() and src_path != get_manifest_path(src_snapshot):
+            shutil.copy2(src_path, dst_snapshot.parent / src_path.name)
+
+    # The manifest is written at last: It marks the snapshot as completely replicated.
+    manifest.close()
+    return True
+
+
+def replicate(
+    *,
+    src_root: Path,
+    dst_root: Path,
+    log_manager: LoggingManager,
+    workers: int = DEFAULT_WORKERS,
+) -> ReplicateResult:
+    """DocWrite: README.md ## replicate
+    `phlb replicate <src-root> <dst-root>` replicates all backup snapshots to a second backup root,
+    e.g.: a offsite backup disk. Unlike `rsync -aH`, no hardlink map of the whole tree is needed.
+
+    The snapshots are replicated one by one, in chronological order. The hash of every file is taken
+    from the snapshot manifest (or the `SHA256SUMS` files) and looked up in the destination FileHashDatabase:
+    Known content is hardlinked, only new content is copied (and its hash is verified while copying).
+    So the data transfer is proportional to the new unique content and the memory usage stays bounded.
+
+    The destination is a complete backup root with its own databases, so `phlb backup` can use it directly.
+    The manifest of a snapshot is written last: Already replicated snapshots are skipped by the next run
+    and incomplete ones (e.g.: after an abort) are replicated again.
+    """
+    src_root = src_root.resolve()
+    src_phlb_conf_dir = src_root / '.phlb'
+    if not src_phlb_conf_dir.is_dir():
+        print(
+            f'Error: Backup directory "{src_root}" seems to be wrong:'
+            f' Our hidden ".phlb" configuration directory is missing!'
+        )
+        sys.exit(1)
+
+    dst_root = dst_root.resolve()
+    if dst_root == src_root:
+        print('Error: Source and destination backup directory are the same!\n')
+        sys.exit(1)
+    dst_phlb_conf_dir = dst_root / '.phlb'
+    dst_phlb_conf_dir.mkdir(parents=True, exist_ok=True)
+
+    timestamp = datetime.datetime.now().strftime('%Y-%m-%d-%H%M%S')
+    log_manager.start_file_logging(log_file=dst_root / f'{timestamp}-replicate.log')
+
+    print(f'\nReplicate {src_root} to {dst_root}...\n')
+
+    replicate_result = ReplicateResult()
+    size_db = FileSizeDatabase(dst_phlb_conf_dir)
+    hash_db = get_hash_db(dst_root, dst_phlb_conf_dir, pool=(src_phlb_conf_dir / 'pool').is_dir())
+    small_file_index = None
+    if (src_phlb_conf_dir / 'small-file-index.bin').is_file() or (dst_phlb_conf_dir / 'small-file-index.bin').is_file():
+        # The source backups deduplicate small files -> the replication, too:
+        small_file_index = SmallFileIndex(dst_root, dst_phlb_conf_dir)
+
+    with (
+        PrintTimingContextManager('Replication completed in'),
+        ThreadPoolExecutor(max_workers=workers, thread_name_prefix='replicate') as executor,
+    ):
+        try:
+            for src_snapshot in iter_snapshot_dirs(src_root):
+                replicate_result.snapshot_count += 1
+                dst_snapshot = dst_root / src_snapshot.relative_to(src_root)
+                if get_manifest_path(dst_snapshot).is_file():
+                    logger.debug('Skip already replicated snapshot %s', dst_snapshot)
+                    replicate_result.skipped_snapshot_count += 1
+                    continue
+                if dst_snapshot.exists():
+                    logger.warning('Remove incomplete replicated snapshot %s', dst_snapshot)
+                    shutil.rmtree(dst_snapshot)
+
+                logger.info('Replicate snapshot %s to %s', src_snapshot, dst_snapshot)
+                if replicate_snapshot(
+                    src_snapshot=src_snapshot,
+                    dst_snapshot=dst_snapshot,
+                    size_db=size_db,
+                    hash_db=hash_db,
+                    small_file_index=small_file_index,
+                    executor=executor,
+                    workers=workers,
+                    replicate_result=replicate_result,
+                ):
+                    replicate_result.replicated_snapshot_count += 1
+        finally:
+            if small_file_index is not None:
+                small_file_index.close()
+
+    summary_file = dst_root / f'{timestamp}-replicate-summary.txt'
+    with TeeStdoutContext(summary_file):
+        print(f'\nReplication to {dst_root} completed:')
+        print(f'  Snapshots: {replicate_result.snapshot_count}')
+        print(f'   * Replicated: {replicate_result.replicated_snapshot_count}')
+        print(f'   * Skipped (already replicated): {replicate_result.skipped_snapshot_count}')
+        print(
+            f'  Total files processed: {replicate_result.file_count}'
+            f' (total size {human_filesize(replicate_result.total_size)})'
+        )
+        print(
+            f'   * Copied files: {replicate_result.copied_files}'
+            f' (total size {human_filesize(replicate_result.copied_size)})'
+        )
+        print(
+            f'   * Hardlinked files: {replicate_result.hardlinked_files}'
+            f' (total size {human_filesize(replicate_result.hardlinked_size)})'
+        )
+        print(f'   * Symlinked files: {replicate_result.symlink_files}')
+        if replicate_result.hardlink_rotations:
+            print(f'  Hardlink limit reached: {replicate_result.hardlink_rotations}')
+        if replicate_result.error_count > 0:
+            print(f'  Errors during replication: {replicate_result.error_count} (see log for details)')
+        print()
+
+    logger.info('Replication completed. Summary created: %s', summary_file)
+
+    return replicate_result
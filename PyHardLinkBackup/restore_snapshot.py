@@ -0,0 +1,225 @@
+import dataclasses
+import logging
+import os
+import shutil
+import stat
+import sys
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+
+from rich import print
+
+from PyHardLinkBackup.utilities.bounded_jobs import BoundedJobQueue
+from PyHardLinkBackup.utilities.filesystem import copy_and_hash, fast_copy_file
+from PyHardLinkBackup.utilities.humanize import PrintTimingContextManager, human_filesize
+from PyHardLinkBackup.utilities.manifest import ManifestEntry, iter_snapshot_entries
+from PyHardLinkBackup.utilities.rich_utils import DisplayFileTreeProgress, NoopProgress
+from PyHardLinkBackup.utilities.tyro_cli_shared_args import DEFAULT_WORKERS
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclasses.dataclass
+class RestoreResult:
+    file_count: int = 0
+    restored_size: int = 0
+    copied_files: int = 0
+    hardlinked_files: int = 0
+    symlink_files: int = 0
+    reflinked_files: int = 0
+    verified_files: int = 0
+    unverified_files: int = 0  # No hash to verify against
+    error_count: int = 0
+
+
+def is_selected(rel_path: str, paths: tuple[str, ...]) -> bool:
+    """
+    >>> is_selected('foo/bar.txt', ())
+    True
+    >>> is_selected('foo/bar.txt', ('foo',))
+    True
+    >>> is_selected('foobar.txt', ('foo',))
+    False
+    >>> is_selected('foo/bar.txt', ('foo/bar.txt', 'other'))
+    True
+    """
+    if not paths:
+        return True
+    return any(rel_path == path or rel_path.startswith(f'{path}/') for path in paths)
+
+
+def restore_one_file(
+    *,
+    snapshot_dir: Path,
+    target_dir: Path,
+    entry: ManifestEntry,
+    verify: bool,
+) -> str:
+    """
+    Restore one regular file. Returns the used copy method.
+    """
+    src_path = snapshot_dir / entry.path
+    dst_path = target_dir / entry.path
+    dst_path.parent.mkdir(parents=True, exist_ok=True)
+    if not verify:
+        method = fast_copy_file(src_path, dst_path)
+        shutil.copystat(src_path, dst_path)
+        return method
+
+    # Verify on the fly: The content is hashed while it's copied, so it's read only once.
+    file_hash = copy_and_hash(src_path, dst_path, progress=NoopProgress(), total_size=entry.size)
+    if file_hash != entry.sha256:
+        raise ValueError(f'Hash mismatch of {src_path}: {file_hash} is not the expected {entry.sha256}')
+    return 'verified'
+
+
+def restore(
+    *,
+    snapshot_dir: Path,
+    target_dir: Path,
+    paths: tuple[str, ...] = (),
+    workers: int = DEFAULT_WORKERS,
+    verify: bool = False,
+    hardlinks: bool = True,
+) -> RestoreResult:
+    """DocWrite: README.md ## restore
+    `phlb restore <snapshot> <target> [paths...]` restores a backup snapshot (or only the given relative paths).
+
+    Files are copied in parallel by a worker pool. If possible, the content is not passed through user space:
+    A reflink (copy-on-write clone) is tried first, then `copy_file_range()` and finally a normal read/write copy.
+    With `--verify`, every file is hashed while it's copied and compared with its `SHA256SUMS` entry.
+
+    Only hardlinks that existed in the source are restored: `phlb backup` hardlinks all files with the same
+    content, so the snapshot inodes can't be used. Instead, the source inode recorded in the manifest is used:
+    The first file of a source inode is copied, all others are hardlinked to it.
+    Independent files with the same content are restored as independent copies.
+    Snapshots without this information (e.g.: created by an old version) are restored without hardlinks.
+    Use `--no-hardlinks` to restore every file as an independent copy.
+    """
+    snapshot_dir = snapshot_dir.resolve()
+    if not snapshot_dir.is_dir():
+        print('Error: Snapshot directory does not exist!')
+        print(f'Please check snapshot directory: "{snapshot_dir}"\n')
+        sys.exit(1)
+
+    target_dir = target_dir.resolve()
+    if target_dir.exists() and any(target_dir.iterdir()):
+        print('Error: Target directory is not empty!')
+        print(f'Please check target directory: "{target_dir}"\n')
+        sys.exit(1)
+    target_dir.mkdir(parents=True, exist_ok=True)
+
+    paths = tuple(path.strip('/') for path in paths)
+    entries = [entry for entry in iter_snapshot_entries(snapshot_dir) if is_selected(entry.path, paths)]
+    if not entries:
+        print(f'Error: Nothing to restore from "{snapshot_dir}" with the given paths!\n')
+        sys.exit(1)
+
+    print(f'\nRestore {snapshot_dir} to {target_dir}...\n')
+
+    restore_result = RestoreResult()
+    first_paths = {}  # source inode -> relative path of the first restored file
+    hardlink_entries = []  # (entry, relative path of the first file)
+    pending = BoundedJobQueue(max_pending=workers * 16)  # Submitted restore jobs, in manifest order
+
+    def process_result(entry: ManifestEntry, future: Future) -> None:
+        try:
+            method = future.result()
+        except Exception as err:
+            logger.exception(f'Restore {entry.path} {err.__class__.__name__}')
+            restore_result.error_count += 1
+            return
+        restore_result.copied_files += 1
+        restore_result.restored_size += entry.size
+        if method == 'reflink':
+            restore_result.reflinked_files += 1
+        elif method == 'verified':
+            restore_result.verified_files += 1
+        if verify and not entry.sha256:
+            restore_result.unverified_files += 1
+
+    total_size = sum(entry.size for entry in entries)
+    with (
+        PrintTimingContextManager('Restore completed in'),
+        DisplayFileTreeProgress(
+            description=f'Restore {snapshot_dir}...',
+            total_file_count=len(entries),
+            total_size=total_size,
+        ) as progress,
+        ThreadPoolExecutor(max_workers=workers, thread_name_prefix='restore') as executor,
+    ):
+        next_update = 0
+        for entry in entries:
+            restore_result.file_count += 1
+            dst_path = target_dir / entry.path
+            try:
+                if stat.S_ISLNK(entry.mode):
+                    dst_path.parent.mkdir(parents=True, exist_ok=True)
+                    os.symlink(os.readlink(snapshot_dir / entry.path), dst_path)
+                    restore_result.symlink_files += 1
+                    continue
+
+                if hardlinks and entry.src_inode:
+                    if first_path := first_paths.get(entry.src_inode):
+                        hardlink_entries.append((entry, first_path))
+                        continue
+                    first_paths[entry.src_inode] = entry.path
+
+                verify_file = verify and bool(entry.sha256)
+                future = executor.submit(
+                    restore_one_file,
+                    snapshot_dir=snapshot_dir,
+                    target_dir=target_dir,
+                    entry=entry,
+                    verify=verify_file,
+                )
+                pending.append(entry, future)
+            except Exception as err:
+                logger.exception(f'Restore {entry.path} {err.__class__.__name__}')
+                restore_result.error_count += 1
+
+            for done_entry, done_future in pending.iter_done():
+                process_result(done_entry, done_future)
+
+            now = time.monotonic()
+            if now >= next_update:
+                progress.update(
+                    completed_file_count=restore_result.file_count - len(pending),
+                    completed_size=restore_result.restored_size,
+                )
+                next_update = now + 0.5
+
+        for done_entry, done_future in pending.iter_all():
+            process_result(done_entry, done_future)
+
+        # Link all other files of an inode, after the first file is restored:
+        for entry, first_path in hardlink_entries:
+            dst_path = target_dir / entry.path
+            try:
+                dst_path.parent.mkdir(parents=True, exist_ok=True)
+                os.link(target_dir / first_path, dst_path)
+            except Exception as err:
+                logger.exception(f'Restore {entry.path} {err.__class__.__name__}')
+                restore_result.error_count += 1
+            else:
+                restore_result.hardlinked_files += 1
+                restore_result.restored_size += entry.size
+
+        progress.update(completed_file_count=restore_result.file_count, completed_size=restore_result.restored_size)
+
+    print(f'\nRestore complete: {target_dir} (total size {human_filesize(restore_result.restored_size)})\n')
+    print(f'  Total files processed: {restore_result.file_count}')
+    print(f'   * Copied files: {restore_result.copied_files} (reflinked: {restore_result.reflinked_files})')
+    print(f'   * Hardlinked files: {restore_result.hardlinked_files}')
+    print(f'   * Symlinked files: {restore_result.symlink_files}')
+    if verify:
+        print(f'  Verified files: {restore_result.verified_files}')
+        if restore_result.unverified_files:
+            print(f'  Files without SHA256SUMS entry (not verified): {restore_result.unverified_files}')
+    if restore_result.error_count > 0:
+        print(f'  Errors during restore: {restore_result.error_count} (see output above)')
+    print()
+
+    return restore_result
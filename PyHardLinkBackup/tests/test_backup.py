@@ -1,4 +1,5 @@
 import datetime
+import errno
 import logging
 import os
 import shutil
@@ -18,12 +19,19 @@ from cli_base.cli_tools.test_utils.assertion import assert_in
 from freezegun import freeze_time
 from tabulate import tabulate
 
-from PyHardLinkBackup.backup import BackupResult, backup_tree
+from PyHardLinkBackup.backup import (
+    BackupResult,
+    BackupSource,
+    backup_one_file,
+    backup_sources,
+    backup_tree,
+    check_src_root,
+)
 from PyHardLinkBackup.logging_setup import DEFAULT_LOG_FILE_LEVEL, LoggingManager, LogLevelLiteral
 from PyHardLinkBackup.tests.test_compare_backup import assert_compare_backup
 from PyHardLinkBackup.utilities.file_size_database import FileSizeDatabase
-from PyHardLinkBackup.utilities.filesystem import copy_and_hash, iter_scandir_files
-from PyHardLinkBackup.utilities.rich_utils import DisplayFileTreeProgress, NoopProgress
+from PyHardLinkBackup.utilities.filesystem import copy_small_file, iter_scandir_files
+from PyHardLinkBackup.utilities.source_hash_cache import SourceHashCache
 from PyHardLinkBackup.utilities.tests.test_file_hash_database import assert_hash_db_info
 from PyHardLinkBackup.utilities.tests.unittest_utilities import (
     CollectOpenFiles,
@@ -92,7 +100,7 @@ def _fs_tree_overview(root: Path) -> str:
             birthtime = getattr(file_stat, 'st_birthtime', file_stat.st_mtime)
             birthtime = datetime.datetime.fromtimestamp(birthtime).strftime('%H:%M:%S')
             if entry.is_file():
-                is_log_file = entry.name.endswith('-backup.log') or entry.name.endswith('-summary.txt')
+                is_log_file = entry.name.endswith(('-backup.log', '-summary.txt', '-manifest.jsonl.gz'))
                 if is_log_file:
                     # flaky content!
                     crc32 = '<mock>'
@@ -155,6 +163,7 @@ class BackupTreeTestCase(
         time_to_freeze: str,
         backup_name=None,
         log_file_level: LogLevelLiteral = DEFAULT_LOG_FILE_LEVEL,
+        **backup_kwargs,
     ):
         # FIXME: freezegun doesn't handle this, see: https://github.com/spulec/freezegun/issues/392
         # Set modification times to a fixed time for easier testing:
@@ -175,6 +184,7 @@ class BackupTreeTestCase(
                     console_level='info',
                     file_level=log_file_level,
                 ),
+                **backup_kwargs,
             )
 
         return redirected_out, result
@@ -233,12 +243,12 @@ class BackupTreeTestCase(
                 backup_count=7,
                 backup_size=3065,
                 symlink_files=1,
-                hardlinked_files=1,
-                hardlinked_size=1000,
-                copied_files=5,
-                copied_size=2051,
-                copied_small_files=3,
-                copied_small_size=50,
+                hardlinked_files=2,
+                hardlinked_size=1014,
+                copied_files=4,
+                copied_size=2037,
+                copied_small_files=2,
+                copied_small_size=36,
                 error_count=0,
             ),
             redirected_out.stdout,
@@ -248,9 +258,6 @@ class BackupTreeTestCase(
             collector.opened_for_read,
             [
                 'r backups/.phlb_test_link',
-                'rb source/subdir/file.txt',
-                'rb source/file2.txt',
-                'rb source/hardlink2file1',
                 'rb source/large_file1.bin',
                 'rb source/min_sized_file1.bin',
                 'rb source/min_sized_file2.bin',
@@ -262,11 +269,8 @@ class BackupTreeTestCase(
             [
                 'w backups/.phlb_test',
                 'a backups/source/2026-01-01-123456-backup.log',
-                'wb backups/source/2026-01-01-123456/subdir/file.txt',
                 'a backups/source/2026-01-01-123456/subdir/SHA256SUMS',
-                'wb backups/source/2026-01-01-123456/file2.txt',
                 'a backups/source/2026-01-01-123456/SHA256SUMS',
-                'wb backups/source/2026-01-01-123456/hardlink2file1',
                 'a backups/source/2026-01-01-123456/SHA256SUMS',
                 'wb backups/source/2026-01-01-123456/large_file1.bin',
                 'w backups/.phlb/hash-lookup/e3/71/e3711d0eacddeb105af4ad9b0d63069d759acf32e49712663419e68dc294a94a',
@@ -276,6 +280,7 @@ class BackupTreeTestCase(
                 'a backups/source/2026-01-01-123456/SHA256SUMS',
                 'w backups/.phlb/hash-lookup/bb/c4/bbc4de2ca238d1ec41fb622b75b5cf7d31a6d2ac92405043dd8f8220364fefc8',
                 'a backups/source/2026-01-01-123456/SHA256SUMS',
+                'wb backups/source/2026-01-01-123456-manifest.jsonl.gz.tmp',
                 'w backups/source/2026-01-01-123456-summary.txt',
             ],
         )
@@ -305,8 +310,8 @@ class BackupTreeTestCase(
                 expected_overview="""
                     path                 birthtime    type        nlink    size  CRC32
                     SHA256SUMS           <mock>       file            1     411  a43ac4cb
-                    file2.txt            12:00:00     file            1      14  8a11514a
-                    hardlink2file1       12:00:00     file            1      14  8a11514a
+                    file2.txt            12:00:00     hardlink        2      14  8a11514a
+                    hardlink2file1       12:00:00     hardlink        2      14  8a11514a
                     large_file1.bin      12:00:00     file            1    1001  fb3014ff
                     min_sized_file1.bin  12:00:00     hardlink        2    1000  f0d93de4
                     min_sized_file2.bin  12:00:00     hardlink        2    1000  f0d93de4
@@ -383,8 +388,8 @@ class BackupTreeTestCase(
                 expected_overview="""
                     path                     birthtime    type        nlink    size  CRC32
                     SHA256SUMS               <mock>       file            1     845  b8aa6635
-                    file2.txt                12:00:00     file            1      14  8a11514a
-                    hardlink2file1           12:00:00     file            1      14  8a11514a
+                    file2.txt                12:00:00     hardlink        2      14  8a11514a
+                    hardlink2file1           12:00:00     hardlink        2      14  8a11514a
                     large_file1.bin          12:00:00     hardlink        3    1001  fb3014ff
                     large_file2.bin          12:00:00     hardlink        3    1001  fb3014ff
                     min_sized_file1.bin      12:00:00     hardlink        4    1000  f0d93de4
@@ -406,12 +411,12 @@ class BackupTreeTestCase(
                 backup_count=12,
                 backup_size=6091,
                 symlink_files=1,
-                hardlinked_files=4,
-                hardlinked_size=4002,
-                copied_files=7,
-                copied_size=2075,
-                copied_small_files=5,
-                copied_small_size=74,
+                hardlinked_files=5,
+                hardlinked_size=4016,
+                copied_files=6,
+                copied_size=2061,
+                copied_small_files=4,
+                copied_small_size=60,
                 error_count=0,
             ),
             redirected_out.stdout,
@@ -433,9 +438,6 @@ class BackupTreeTestCase(
             collector.opened_for_read,
             [
                 'r backups/.phlb_test_link',
-                'rb source/subdir/file.txt',
-                'rb source/file2.txt',
-                'rb source/hardlink2file1',
                 'rb source/large_file1.bin',
                 'r backups/.phlb/hash-lookup/e3/71/e3711d0eacddeb105af4ad9b0d63069d759acf32e49712663419e68dc294a94a',
                 'rb source/large_file2.bin',
@@ -449,8 +451,6 @@ class BackupTreeTestCase(
                 'rb source/min_sized_file_newA.bin',
                 'rb source/min_sized_file_newB.bin',
                 'r backups/.phlb/hash-lookup/9a/56/9a5670771141349931d69d6eb982faa01def544dc17a161ef83b3277fb7c0c3c',
-                'rb source/small_file_newA.txt',
-                'rb source/small_file_newB.txt',
             ],
         )
         self.assertEqual(
@@ -458,11 +458,8 @@ class BackupTreeTestCase(
             [
                 'w backups/.phlb_test',
                 'a backups/source/2026-01-02-123456-backup.log',
-                'wb backups/source/2026-01-02-123456/subdir/file.txt',
                 'a backups/source/2026-01-02-123456/subdir/SHA256SUMS',
-                'wb backups/source/2026-01-02-123456/file2.txt',
                 'a backups/source/2026-01-02-123456/SHA256SUMS',
-                'wb backups/source/2026-01-02-123456/hardlink2file1',
                 'a backups/source/2026-01-02-123456/SHA256SUMS',
                 'w backups/.phlb/hash-lookup/e3/71/e3711d0eacddeb105af4ad9b0d63069d759acf32e49712663419e68dc294a94a',
                 'a backups/source/2026-01-02-123456/SHA256SUMS',
@@ -478,10 +475,9 @@ class BackupTreeTestCase(
                 'wb backups/source/2026-01-02-123456/min_sized_file_newB.bin',
                 'w backups/.phlb/hash-lookup/9a/56/9a5670771141349931d69d6eb982faa01def544dc17a161ef83b3277fb7c0c3c',
                 'a backups/source/2026-01-02-123456/SHA256SUMS',
-                'wb backups/source/2026-01-02-123456/small_file_newA.txt',
                 'a backups/source/2026-01-02-123456/SHA256SUMS',
-                'wb backups/source/2026-01-02-123456/small_file_newB.txt',
                 'a backups/source/2026-01-02-123456/SHA256SUMS',
+                'wb backups/source/2026-01-02-123456-manifest.jsonl.gz.tmp',
                 'w backups/source/2026-01-02-123456-summary.txt',
             ],
         )
@@ -528,8 +524,8 @@ class BackupTreeTestCase(
                 expected_overview="""
                     path                     birthtime    type        nlink    size  CRC32
                     SHA256SUMS               <mock>       file            1     845  b8aa6635
-                    file2.txt                12:00:00     file            1      14  8a11514a
-                    hardlink2file1           12:00:00     file            1      14  8a11514a
+                    file2.txt                12:00:00     hardlink        2      14  8a11514a
+                    hardlink2file1           12:00:00     hardlink        2      14  8a11514a
                     large_file1.bin          12:00:00     hardlink        5    1001  fb3014ff
                     large_file2.bin          12:00:00     hardlink        5    1001  fb3014ff
                     min_sized_file1.bin      12:00:00     hardlink        5    1000  f0d93de4
@@ -552,12 +548,12 @@ class BackupTreeTestCase(
                 backup_count=12,
                 backup_size=6091,
                 symlink_files=1,
-                hardlinked_files=6,
-                hardlinked_size=6003,
-                copied_files=5,
-                copied_size=74,
-                copied_small_files=5,
-                copied_small_size=74,
+                hardlinked_files=7,
+                hardlinked_size=6017,
+                copied_files=4,
+                copied_size=60,
+                copied_small_files=4,
+                copied_small_size=60,
                 error_count=0,
             ),
         )
@@ -631,19 +627,20 @@ class BackupTreeTestCase(
             assert_fs_tree_overview(
                 root=self.temp_path,  # The complete overview os source + backup and outside file
                 expected_overview="""
-                    path                                              birthtime    type     nlink    size    CRC32
-                    backups/source/2026-01-01-123456-backup.log       <mock>       file     1        <mock>  <mock>
-                    backups/source/2026-01-01-123456-summary.txt      <mock>       file     1        <mock>  <mock>
-                    backups/source/2026-01-01-123456/SHA256SUMS       <mock>       file     1        82      c03fd60e
-                    backups/source/2026-01-01-123456/broken_symlink   -            symlink  -        -       -
-                    backups/source/2026-01-01-123456/source_file.txt  12:00:00     file     1        31      9309a10c
-                    backups/source/2026-01-01-123456/symlink2outside  12:00:00     symlink  1        36      24b5bf4c
-                    backups/source/2026-01-01-123456/symlink2source   12:00:00     symlink  1        31      9309a10c
-                    outside_file.txt                                  12:00:00     file     1        36      24b5bf4c
-                    source/broken_symlink                             -            symlink  -        -       -
-                    source/source_file.txt                            12:00:00     file     1        31      9309a10c
-                    source/symlink2outside                            12:00:00     symlink  1        36      24b5bf4c
-                    source/symlink2source                             12:00:00     symlink  1        31      9309a10c
+                    path                                                birthtime    type     nlink    size    CRC32
+                    backups/source/2026-01-01-123456-backup.log         <mock>       file     1        <mock>  <mock>
+                    backups/source/2026-01-01-123456-manifest.jsonl.gz  <mock>       file     1        <mock>  <mock>
+                    backups/source/2026-01-01-123456-summary.txt        <mock>       file     1        <mock>  <mock>
+                    backups/source/2026-01-01-123456/SHA256SUMS         <mock>       file     1        82      c03fd60e
+                    backups/source/2026-01-01-123456/broken_symlink     -            symlink  -        -       -
+                    backups/source/2026-01-01-123456/source_file.txt    12:00:00     file     1        31      9309a10c
+                    backups/source/2026-01-01-123456/symlink2outside    12:00:00     symlink  1        36      24b5bf4c
+                    backups/source/2026-01-01-123456/symlink2source     12:00:00     symlink  1        31      9309a10c
+                    outside_file.txt                                    12:00:00     file     1        36      24b5bf4c
+                    source/broken_symlink                               -            symlink  -        -       -
+                    source/source_file.txt                              12:00:00     file     1        31      9309a10c
+                    source/symlink2outside                              12:00:00     symlink  1        36      24b5bf4c
+                    source/symlink2source                               12:00:00     symlink  1        31      9309a10c
                 """,
             )
 
@@ -706,14 +703,14 @@ class BackupTreeTestCase(
         (self.src_root / 'file2.txt').write_text('File 2')
         (self.src_root / 'file3.txt').write_text('File 3')
 
-        def mocked_copy_and_hash(src: Path, dst: Path, progress: DisplayFileTreeProgress, total_size: int):
-            file_hash = copy_and_hash(src, dst, NoopProgress(), total_size)
+        def mocked_copy_small_file(src: Path, dst: Path, src_stat: os.stat_result):
+            file_hash = copy_small_file(src, dst, src_stat)
             if src.name == 'file2.txt':
                 raise PermissionError('Bam!')
             return file_hash
 
         with (
-            patch('PyHardLinkBackup.backup.copy_and_hash', mocked_copy_and_hash),
+            patch('PyHardLinkBackup.backup.copy_small_file', mocked_copy_small_file),
             CollectOpenFiles(self.temp_path) as collector,
         ):
             redirected_out, result = self.create_backup(time_to_freeze='2026-01-01T12:34:56Z')
@@ -721,9 +718,6 @@ class BackupTreeTestCase(
             collector.opened_for_read,
             [
                 'r backups/.phlb_test_link',
-                'rb source/file1.txt',
-                'rb source/file2.txt',
-                'rb source/file3.txt',
             ],
         )
         self.assertEqual(
@@ -731,11 +725,9 @@ class BackupTreeTestCase(
             [
                 'w backups/.phlb_test',
                 'a backups/source/2026-01-01-123456-backup.log',
-                'wb backups/source/2026-01-01-123456/file1.txt',
                 'a backups/source/2026-01-01-123456/SHA256SUMS',
-                'wb backups/source/2026-01-01-123456/file2.txt',
-                'wb backups/source/2026-01-01-123456/file3.txt',
                 'a backups/source/2026-01-01-123456/SHA256SUMS',
+                'wb backups/source/2026-01-01-123456-manifest.jsonl.gz.tmp',
                 'w backups/source/2026-01-01-123456-summary.txt',
             ],
         )
@@ -822,7 +814,6 @@ class BackupTreeTestCase(
             collector.opened_for_read,
             [
                 'r backups/.phlb_test_link',
-                'rb source/file.txt',
             ],
         )
         self.assertEqual(
@@ -830,8 +821,8 @@ class BackupTreeTestCase(
             [
                 'w backups/.phlb_test',
                 'a backups/source/2026-01-01-123456-backup.log',
-                'wb backups/source/2026-01-01-123456/file.txt',
                 'a backups/source/2026-01-01-123456/SHA256SUMS',
+                'wb backups/source/2026-01-01-123456-manifest.jsonl.gz.tmp',
                 'w backups/source/2026-01-01-123456-summary.txt',
             ],
         )
@@ -879,6 +870,7 @@ class BackupTreeTestCase(
                 'wb backups/source/2026-01-11-123456/large_fileA.txt',
                 'w backups/.phlb/hash-lookup/23/d2/23d2ce40d26211a9ffe8096fd1f927f2abd094691839d24f88440f7c5168d500',
                 'a backups/source/2026-01-11-123456/SHA256SUMS',
+                'wb backups/source/2026-01-11-123456-manifest.jsonl.gz.tmp',
                 'w backups/source/2026-01-11-123456-summary.txt',
             ],
         )
@@ -926,6 +918,7 @@ class BackupTreeTestCase(
                 'wb backups/source/2026-02-22-123456/large_fileB.txt',
                 'w backups/.phlb/hash-lookup/2a/92/2a925556d3ec9e4258624a324cd9300a9a3d9c86dac6bbbb63071bdb7787afd2',
                 'a backups/source/2026-02-22-123456/SHA256SUMS',
+                'wb backups/source/2026-02-22-123456-manifest.jsonl.gz.tmp',
                 'w backups/source/2026-02-22-123456-summary.txt',
             ],
         )
@@ -955,16 +948,18 @@ class BackupTreeTestCase(
             assert_fs_tree_overview(
                 root=self.backup_root / 'source',
                 expected_overview="""
-                    path                               birthtime    type        nlink  size    CRC32
-                    2026-01-11-123456-backup.log       <mock>       file            1  <mock>  <mock>
-                    2026-01-11-123456-summary.txt      <mock>       file            1  <mock>  <mock>
-                    2026-01-11-123456/SHA256SUMS       <mock>       file            1  82      c3dd960b
-                    2026-01-11-123456/large_fileA.txt  12:00:00     hardlink        2  1001    a48f0e33
-                    2026-02-22-123456-backup.log       <mock>       file            1  <mock>  <mock>
-                    2026-02-22-123456-summary.txt      <mock>       file            1  <mock>  <mock>
-                    2026-02-22-123456/SHA256SUMS       <mock>       file            1  164     3130cbcb
-                    2026-02-22-123456/large_fileA.txt  12:00:00     hardlink        2  1001    a48f0e33
-                    2026-02-22-123456/large_fileB.txt  12:00:00     file            1  1001    42c06e4a
+                    path                                 birthtime    type        nlink  size    CRC32
+                    2026-01-11-123456-backup.log         <mock>       file            1  <mock>  <mock>
+                    2026-01-11-123456-manifest.jsonl.gz  <mock>       file            1  <mock>  <mock>
+                    2026-01-11-123456-summary.txt        <mock>       file            1  <mock>  <mock>
+                    2026-01-11-123456/SHA256SUMS         <mock>       file            1  82      c3dd960b
+                    2026-01-11-123456/large_fileA.txt    12:00:00     hardlink        2  1001    a48f0e33
+                    2026-02-22-123456-backup.log         <mock>       file            1  <mock>  <mock>
+                    2026-02-22-123456-manifest.jsonl.gz  <mock>       file            1  <mock>  <mock>
+                    2026-02-22-123456-summary.txt        <mock>       file            1  <mock>  <mock>
+                    2026-02-22-123456/SHA256SUMS         <mock>       file            1  164     3130cbcb
+                    2026-02-22-123456/large_fileA.txt    12:00:00     hardlink        2  1001    a48f0e33
+                    2026-02-22-123456/large_fileB.txt    12:00:00     file            1  1001    42c06e4a
                 """,
             )
 
@@ -1020,8 +1015,6 @@ class BackupTreeTestCase(
             collector.opened_for_read,
             [
                 'r backups/.phlb_test_link',
-                'rb source/subdir/file_in_subdir.txt',
-                'rb source/root_file.txt',
             ],
         )
         self.assertEqual(
@@ -1029,10 +1022,9 @@ class BackupTreeTestCase(
             [
                 'w backups/.phlb_test',
                 'a backups/source/2026-01-01-123456-backup.log',
-                'wb backups/source/2026-01-01-123456/subdir/file_in_subdir.txt',
                 'a backups/source/2026-01-01-123456/subdir/SHA256SUMS',
-                'wb backups/source/2026-01-01-123456/root_file.txt',
                 'a backups/source/2026-01-01-123456/SHA256SUMS',
+                'wb backups/source/2026-01-01-123456-manifest.jsonl.gz.tmp',
                 'w backups/source/2026-01-01-123456-summary.txt',
             ],
         )
@@ -1109,15 +1101,15 @@ class BackupTreeTestCase(
 
         self.assertEqual(
             collector.opened_for_read,
-            ['r backups/.phlb_test_link', 'rb source/root_file.txt'],
+            ['r backups/.phlb_test_link'],
         )
         self.assertEqual(
             collector.opened_for_write,
             [
                 'w backups/.phlb_test',
                 'a backups/source/2026-01-23-123456-backup.log',
-                'wb backups/source/2026-01-23-123456/root_file.txt',
                 'a backups/source/2026-01-23-123456/SHA256SUMS',
+                'wb backups/source/2026-01-23-123456-manifest.jsonl.gz.tmp',
                 'w backups/source/2026-01-23-123456-summary.txt',
             ],
         )
@@ -1170,18 +1162,376 @@ class BackupTreeTestCase(
             assert_fs_tree_overview(
                 root=self.backup_root,
                 expected_overview="""
-                    path                                     birthtime    type      nlink  size    CRC32
-                    My-Backup/2026-01-01-123456-backup.log   <mock>       file          1  <mock>  <mock>
-                    My-Backup/2026-01-01-123456-summary.txt  <mock>       file          1  <mock>  <mock>
-                    My-Backup/2026-01-01-123456/SHA256SUMS   <mock>       file          1  75      43d11c57
-                    My-Backup/2026-01-01-123456/file.txt     12:00:00     file          1  0       00000000
-                    My-Backup/2026-12-24-001234-backup.log   <mock>       file          1  <mock>  <mock>
-                    My-Backup/2026-12-24-001234-summary.txt  <mock>       file          1  <mock>  <mock>
-                    My-Backup/2026-12-24-001234/SHA256SUMS   <mock>       file          1  75      43d11c57
-                    My-Backup/2026-12-24-001234/file.txt     12:00:00     file          1  0       00000000
-                    source/2026-01-01-123456-backup.log      <mock>       file          1  <mock>  <mock>
-                    source/2026-01-01-123456-summary.txt     <mock>       file          1  <mock>  <mock>
-                    source/2026-01-01-123456/SHA256SUMS      <mock>       file          1  75      43d11c57
-                    source/2026-01-01-123456/file.txt        12:00:00     file          1  0       00000000
+                    path                                           birthtime    type      nlink  size    CRC32
+                    My-Backup/2026-01-01-123456-backup.log         <mock>       file          1  <mock>  <mock>
+                    My-Backup/2026-01-01-123456-manifest.jsonl.gz  <mock>       file          1  <mock>  <mock>
+                    My-Backup/2026-01-01-123456-summary.txt        <mock>       file          1  <mock>  <mock>
+                    My-Backup/2026-01-01-123456/SHA256SUMS         <mock>       file          1  75      43d11c57
+                    My-Backup/2026-01-01-123456/file.txt           12:00:00     file          1  0       00000000
+                    My-Backup/2026-12-24-001234-backup.log         <mock>       file          1  <mock>  <mock>
+                    My-Backup/2026-12-24-001234-manifest.jsonl.gz  <mock>       file          1  <mock>  <mock>
+                    My-Backup/2026-12-24-001234-summary.txt        <mock>       file          1  <mock>  <mock>
+                    My-Backup/2026-12-24-001234/SHA256SUMS         <mock>       file          1  75      43d11c57
+                    My-Backup/2026-12-24-001234/file.txt           12:00:00     file          1  0       00000000
+                    source/2026-01-01-123456-backup.log            <mock>       file          1  <mock>  <mock>
+                    source/2026-01-01-123456-manifest.jsonl.gz     <mock>       file          1  <mock>  <mock>
+                    source/2026-01-01-123456-summary.txt           <mock>       file          1  <mock>  <mock>
+                    source/2026-01-01-123456/SHA256SUMS            <mock>       file          1  75      43d11c57
+                    source/2026-01-01-123456/file.txt              12:00:00     file          1  0       00000000
+                """,
+            )
+
+    def test_pool_mode(self):
+        content = b'X' * FileSizeDatabase.MIN_SIZE
+        (self.src_root / 'file1.bin').write_bytes(content)
+        (self.src_root / 'file2.bin').write_bytes(content)
+        (self.src_root / 'small_file.txt').write_text('Small files are not stored in the pool')
+
+        redirected_out, result = self.create_backup(time_to_freeze='2026-01-01T12:34:56Z', pool=True)
+        self.assertEqual(redirected_out.stderr, '')
+        self.assertEqual(
+            (result.copied_files, result.hardlinked_files, result.error_count),
+            (2, 1, 0),
+            redirected_out.stdout,
+        )
+        first_backup_dir = result.backup_dir
+
+        pool_root = self.backup_root / '.phlb' / 'pool'
+        pool_file = pool_root / 'bb/c4/bbc4de2ca238d1ec41fb622b75b5cf7d31a6d2ac92405043dd8f8220364fefc8'
+        assert_is_file(pool_file)
+        self.assertEqual(pool_file.read_bytes(), content)
+        self.assertEqual(pool_file.stat().st_nlink, 3)  # pool entry + file1.bin + file2.bin
+        self.assertEqual(
+            sorted(str(path.relative_to(pool_root)) for path in pool_root.rglob('*') if path.is_file()),
+            ['bb/c4/bbc4de2ca238d1ec41fb622b75b5cf7d31a6d2ac92405043dd8f8220364fefc8'],
+        )
+
+        # Remove the first snapshot -> The content is still in the pool:
+        shutil.rmtree(first_backup_dir)
+        self.assertEqual(pool_file.stat().st_nlink, 1)
+
+        # Backup again, without "--pool": The pool will be used automatically:
+        redirected_out, result = self.create_backup(time_to_freeze='2026-01-02T12:34:56Z')
+        self.assertEqual(redirected_out.stderr, '')
+        self.assertEqual(
+            (result.copied_files, result.hardlinked_files, result.error_count),
+            (1, 2, 0),  # No re-copy of the content, only the small file was copied
+            redirected_out.stdout,
+        )
+        self.assertEqual(pool_file.stat().st_nlink, 3)
+        with self.assertLogs('PyHardLinkBackup', level=logging.DEBUG):
+            assert_fs_tree_overview(
+                root=result.backup_dir,
+                expected_overview="""
+                    path            birthtime    type        nlink    size  CRC32
+                    SHA256SUMS      <mock>       file            1     233  3eae39f3
+                    file1.bin       12:00:00     hardlink        3    1000  f0d93de4
+                    file2.bin       12:00:00     hardlink        3    1000  f0d93de4
+                    small_file.txt  12:00:00     file            1      38  4316a03a
+                """,
+            )
+
+    def test_hardlink_limit_rotation(self):
+        content = b'X' * FileSizeDatabase.MIN_SIZE
+        for no in range(4):
+            (self.src_root / f'file{no}.bin').write_bytes(content)
+
+        origin_link = os.link
+        first_master = None
+
+        def link_with_limit(src, dst, *args, **kwargs):
+            # Simulate a reached hardlink limit on the first "master" file:
+            if first_master is not None and Path(src) == first_master:
+                raise OSError(errno.EMLINK, 'Too many links')
+            return origin_link(src, dst, *args, **kwargs)
+
+        redirected_out, result = self.create_backup(time_to_freeze='2026-01-01T12:34:56Z')
+        self.assertEqual((result.copied_files, result.hardlinked_files), (1, 3), redirected_out.stdout)
+        first_master = result.backup_dir / 'file3.bin'
+        self.assertEqual(first_master.stat().st_nlink, 4)
+
+        with patch('PyHardLinkBackup.utilities.filesystem.os.link', link_with_limit):
+            redirected_out, result = self.create_backup(time_to_freeze='2026-01-02T12:34:56Z')
+        self.assertEqual(redirected_out.stderr, '')
+        self.assertIn('Hardlink limit reached, new copies used as hardlink source: 1', redirected_out.stdout)
+        self.assertEqual(
+            (result.copied_files, result.hardlinked_files, result.hardlink_rotations, result.error_count),
+            (1, 3, 1, 0),
+            redirected_out.stdout,
+        )
+        with self.assertLogs('PyHardLinkBackup', level=logging.DEBUG):
+            assert_fs_tree_overview(
+                root=result.backup_dir,
+                expected_overview="""
+                    path        birthtime    type        nlink    size  CRC32
+                    SHA256SUMS  <mock>       file            1     304  c7edceda
+                    file0.bin   12:00:00     hardlink        4    1000  f0d93de4
+                    file1.bin   12:00:00     hardlink        4    1000  f0d93de4
+                    file2.bin   12:00:00     hardlink        4    1000  f0d93de4
+                    file3.bin   12:00:00     hardlink        4    1000  f0d93de4
                 """,
             )
+        self.assertEqual(first_master.stat().st_nlink, 4)  # unchanged
+
+        with self.assertLogs('PyHardLinkBackup', level=logging.DEBUG):
+            assert_hash_db_info(
+                backup_root=self.backup_root,
+                expected="""
+                    bb/c4/bbc4de2ca238d1… -> source/2026-01-02-123456/file3.bin
+                """,
+            )
+
+    def test_small_file_hardlink_limit_rotation(self):
+        for no in range(2):
+            (self.src_root / f'small{no}.txt').write_text('small content')
+
+        redirected_out, result = self.create_backup(time_to_freeze='2026-01-01T12:34:56Z', dedupe_small_files=True)
+        self.assertEqual((result.copied_files, result.hardlinked_files), (1, 1), redirected_out.stdout)
+
+        origin_link = os.link
+
+        def link_with_limit(src, dst, *args, **kwargs):
+            # Simulate a reached hardlink limit on all small files:
+            if Path(dst).name.startswith('small'):
+                raise OSError(errno.EMLINK, 'Too many links')
+            return origin_link(src, dst, *args, **kwargs)
+
+        with patch('PyHardLinkBackup.utilities.filesystem.os.link', link_with_limit):
+            redirected_out, result = self.create_backup(time_to_freeze='2026-01-02T12:34:56Z', dedupe_small_files=True)
+        self.assertEqual(
+            (result.copied_files, result.hardlinked_files, result.hardlink_rotations, result.error_count),
+            (2, 0, 2, 0),
+            redirected_out.stdout,
+        )
+        # The rotated copies have the metadata of the source files:
+        for no in range(2):
+            self.assertEqual(
+                (result.backup_dir / f'small{no}.txt').stat().st_mtime_ns,
+                (self.src_root / f'small{no}.txt').stat().st_mtime_ns,
+            )
+
+    def test_source_hardlinks(self):
+        """DocWrite: README.md ## backup implementation - Hardlinks in source
+        Hardlinks in the source tree (e.g.: package caches or `cp -al` copies) are processed only once:
+        The first path of a source inode is backed up as usual, all other paths of the same inode
+        will be hardlinked to it, without reading the content again.
+        So the hardlink structure of the source is kept in the backup.
+        """
+        file_path = self.src_root / 'file.bin'
+        file_path.write_bytes(b'X' * FileSizeDatabase.MIN_SIZE)
+        os.link(file_path, self.src_root / 'link1.bin')
+        os.link(file_path, self.src_root / 'link2.bin')
+
+        with CollectOpenFiles(self.temp_path) as collector:
+            redirected_out, result = self.create_backup(time_to_freeze='2026-01-01T12:34:56Z')
+        self.assertEqual(redirected_out.stderr, '')
+        self.assertEqual(
+            collector.opened_for_read,
+            [
+                'r backups/.phlb_test_link',
+                'rb source/file.bin',  # Only the first path is read
+            ],
+        )
+        self.assertEqual(
+            (result.copied_files, result.hardlinked_files, result.error_count),
+            (1, 2, 0),
+            redirected_out.stdout,
+        )
+        with self.assertLogs('PyHardLinkBackup', level=logging.DEBUG):
+            assert_fs_tree_overview(
+                root=result.backup_dir,
+                expected_overview="""
+                    path        birthtime    type        nlink    size  CRC32
+                    SHA256SUMS  <mock>       file            1     227  5715c690
+                    file.bin    12:00:00     hardlink        3    1000  f0d93de4
+                    link1.bin   12:00:00     hardlink        3    1000  f0d93de4
+                    link2.bin   12:00:00     hardlink        3    1000  f0d93de4
+                """,
+            )
+
+    def test_source_hash_cache(self):
+        (self.src_root / 'old_dir').mkdir()
+        (self.src_root / 'old_dir' / 'file1.bin').write_bytes(b'X' * FileSizeDatabase.MIN_SIZE)
+
+        # Note: Freeze the time in the future, otherwise the source files are too "fresh" to be cached.
+        redirected_out, result = self.create_backup(time_to_freeze='2100-01-01T12:34:56Z', hash_cache=True)
+        self.assertEqual(redirected_out.stderr, '')
+        self.assertIn('Source hash cache hits: 0 of 0 lookups (hit rate 0.0%)', redirected_out.stdout)
+        assert_is_file(self.backup_root / '.phlb' / 'source-hash-cache' / 'source.bin')
+
+        # Move the directory -> The file content must not be read again:
+        (self.src_root / 'new_parent').mkdir()
+        (self.src_root / 'old_dir').rename(self.src_root / 'new_parent' / 'new_dir')
+
+        with (
+            # Don't touch the source files: Changing the file times will change the ctime, too.
+            patch('PyHardLinkBackup.tests.test_backup.set_file_times'),
+            CollectOpenFiles(self.temp_path) as collector,
+        ):
+            redirected_out, result = self.create_backup(time_to_freeze='2100-01-02T12:34:56Z', hash_cache=True)
+        self.assertEqual(redirected_out.stderr, '')
+        self.assertIn('Source hash cache hits: 1 of 1 lookups (hit rate 100.0%)', redirected_out.stdout)
+        self.assertEqual(
+            (result.hardlinked_files, result.hash_cache_hits, result.hash_cache_misses, result.error_count),
+            (1, 1, 0, 0),
+            redirected_out.stdout,
+        )
+        self.assertNotIn('rb source/new_parent/new_dir/file1.bin', collector.opened_for_read)
+        self.assertTrue(
+            os.path.samefile(
+                result.backup_dir / 'new_parent' / 'new_dir' / 'file1.bin',
+                self.backup_root / 'source' / '2100-01-01-123456' / 'old_dir' / 'file1.bin',
+            )
+        )
+
+        # Modify the file -> cache miss:
+        (self.src_root / 'new_parent' / 'new_dir' / 'file1.bin').write_bytes(b'Y' * FileSizeDatabase.MIN_SIZE)
+        redirected_out, result = self.create_backup(time_to_freeze='2100-01-03T12:34:56Z', hash_cache=True)
+        self.assertEqual(redirected_out.stderr, '')
+        self.assertEqual(
+            (result.copied_files, result.hash_cache_hits, result.hash_cache_misses, result.error_count),
+            (1, 0, 1, 0),
+            redirected_out.stdout,
+        )
+
+    def test_source_hash_cache_interrupted_backup(self):
+        (self.src_root / 'file1.bin').write_bytes(b'X' * FileSizeDatabase.MIN_SIZE)
+        (self.src_root / 'file2.bin').write_bytes(b'Y' * FileSizeDatabase.MIN_SIZE)
+
+        origin_backup_one_file = backup_one_file
+
+        def interrupted_backup_one_file(*, entry, **kwargs):
+            if entry.name == 'file2.bin':
+                raise KeyboardInterrupt
+            return origin_backup_one_file(entry=entry, **kwargs)
+
+        with (
+            patch('PyHardLinkBackup.backup.backup_one_file', interrupted_backup_one_file),
+            self.assertRaises(KeyboardInterrupt),
+        ):
+            self.create_backup(time_to_freeze='2100-01-01T12:34:56Z', hash_cache=True)
+
+        # The hash of the already processed file is stored in the cache file:
+        cache_path = self.backup_root / '.phlb' / 'source-hash-cache' / 'source.bin'
+        self.assertEqual(cache_path.stat().st_size, len(SourceHashCache.MAGIC) + SourceHashCache.RECORD.size)
+
+        # An interrupted backup gets no manifest, so it's not treated as a complete snapshot:
+        self.assertEqual(
+            sorted(path.name for path in (self.backup_root / 'source').iterdir()),
+            ['2100-01-01-123456', '2100-01-01-123456-backup.log'],
+        )
+
+    def test_dedupe_small_files(self):
+        (self.src_root / 'file1.txt').write_text('Small file content')
+        (self.src_root / 'file2.txt').write_text('Small file content')
+        (self.src_root / 'unique.txt').write_text('Unique small file')
+
+        redirected_out, result = self.create_backup(time_to_freeze='2026-01-01T12:34:56Z', dedupe_small_files=True)
+        self.assertEqual(redirected_out.stderr, '')
+        self.assertEqual(
+            (result.copied_small_files, result.hardlinked_files, result.hardlinked_small_files, result.error_count),
+            (2, 1, 1, 0),
+            redirected_out.stdout,
+        )
+        self.assertIn('of which small (<1000 Bytes) files: 1', redirected_out.stdout)
+        first_backup_dir = result.backup_dir
+        assert_is_file(self.backup_root / '.phlb' / 'small-file-index.bin')
+
+        # Small files are not stored in the hash database:
+        with self.assertLogs('PyHardLinkBackup', level=logging.DEBUG):
+            assert_hash_db_info(backup_root=self.backup_root, expected='')
+
+        # The next backup will hardlink all small files:
+        redirected_out, result = self.create_backup(time_to_freeze='2026-01-02T12:34:56Z', dedupe_small_files=True)
+        self.assertEqual(redirected_out.stderr, '')
+        self.assertEqual(
+            (result.copied_files, result.hardlinked_files, result.hardlinked_small_files, result.error_count),
+            (0, 3, 3, 0),
+            redirected_out.stdout,
+        )
+        with self.assertLogs('PyHardLinkBackup', level=logging.DEBUG):
+            assert_fs_tree_overview(
+                root=result.backup_dir,
+                expected_overview="""
+                    path        birthtime    type        nlink    size  CRC32
+                    SHA256SUMS  <mock>       file            1     229  adbe3d5d
+                    file1.txt   12:00:00     hardlink        4      18  565aa36a
+                    file2.txt   12:00:00     hardlink        4      18  565aa36a
+                    unique.txt  12:00:00     hardlink        2      17  4f261686
+                """,
+            )
+        self.assertTrue(os.path.samefile(result.backup_dir / 'file2.txt', first_backup_dir / 'file1.txt'))
+
+    def test_multiple_sources(self):
+        content = b'X' * FileSizeDatabase.MIN_SIZE
+        (self.src_root / 'file.bin').write_bytes(content)
+        (self.src_root / 'small.txt').write_text('Small file')
+
+        other_root = self.temp_path / 'other'
+        other_root.mkdir()
+        (other_root / 'same.bin').write_bytes(content)
+
+        third_root = self.temp_path / 'third'
+        third_root.mkdir()
+        (third_root / 'unique.bin').write_bytes(b'Y' * FileSizeDatabase.MIN_SIZE)
+
+        def fake_check_src_root(src_root: Path) -> tuple[Path, int]:
+            # "source" and "other" are on the same device, "third" on a other one:
+            src_root, src_device_id = check_src_root(src_root)
+            return src_root, src_device_id + 1 if src_root.name == 'third' else src_device_id
+
+        with (
+            patch('PyHardLinkBackup.backup.check_src_root', fake_check_src_root),
+            freeze_time('2026-01-01T12:34:56Z', auto_tick_seconds=0),
+            RedirectOut() as redirected_out,
+        ):
+            results = backup_sources(
+                sources=[
+                    BackupSource(src_root=self.src_root),
+                    BackupSource(src_root=other_root, backup_name='second'),
+                    BackupSource(src_root=third_root),
+                ],
+                backup_root=self.backup_root,
+                one_file_system=False,  # The fake device id would exclude all files
+                excludes=(),
+                log_manager=LoggingManager(console_level='info', file_level=DEFAULT_LOG_FILE_LEVEL),
+                workers=2,
+            )
+        self.assertEqual(redirected_out.stderr, '')
+        assert_in(
+            content=redirected_out.stdout,
+            parts=(
+                'Backup 3 sources (2 devices) to',
+                'All 3 sources backed up (total size 2.94 KiB, errors: 0)',
+            ),
+        )
+        self.assertEqual(
+            [str(result.backup_dir.relative_to(self.backup_root)) for result in results],
+            ['source/2026-01-01-123456', 'second/2026-01-01-123456', 'third/2026-01-01-123456'],
+        )
+        self.assertEqual(
+            [(result.copied_files, result.hardlinked_files, result.error_count) for result in results],
+            [(2, 0, 0), (0, 1, 0), (1, 0, 0)],
+        )
+
+        # Sources on the same device are processed one after the other,
+        # so the content of the first source is deduplicated via the shared databases:
+        self.assertTrue(os.path.samefile(results[0].backup_dir / 'file.bin', results[1].backup_dir / 'same.bin'))
+
+        # Every source has its own log file and summary:
+        for result in results:
+            self.assertIn('Backup complete', (result.backup_dir.parent / '2026-01-01-123456-summary.txt').read_text())
+        self.assertIn('same.bin', results[1].log_file.read_text())
+        self.assertNotIn('unique.bin', results[1].log_file.read_text())
+        self.assertIn('unique.bin', results[2].log_file.read_text())
+
+        # A backup name can be used only once:
+        with self.assertRaises(SystemExit), RedirectOut() as redirected_out:
+            backup_sources(
+                sources=[BackupSource(src_root=self.src_root), BackupSource(src_root=other_root, backup_name='source')],
+                backup_root=self.backup_root,
+                one_file_system=True,
+                excludes=(),
+                log_manager=LoggingManager(console_level='info', file_level=DEFAULT_LOG_FILE_LEVEL),
+            )
+        self.assertIn('Backup names must be unique, duplicates: source', redirected_out.stdout)
@@ -1,18 +1,30 @@
+import logging
+import os
 import shutil
 from pathlib import Path
 from unittest import TestCase
+from unittest.mock import patch
 
 from bx_py_utils.test_utils.redirect import RedirectOut
 from cli_base.cli_tools.test_utils.assertion import assert_in
 from cli_base.cli_tools.test_utils.rich_test_utils import NoColorEnvRich
 from freezegun import freeze_time
 
-from PyHardLinkBackup.compare_backup import CompareResult, LoggingManager, compare_tree
+from PyHardLinkBackup.compare_backup import (
+    CompareResult,
+    LoggingManager,
+    QuickCompareResult,
+    build_reverse_index,
+    compare_tree,
+    quick_compare_tree,
+)
 from PyHardLinkBackup.logging_setup import DEFAULT_LOG_FILE_LEVEL
 from PyHardLinkBackup.utilities.file_hash_database import FileHashDatabase
 from PyHardLinkBackup.utilities.file_size_database import FileSizeDatabase
 from PyHardLinkBackup.utilities.filesystem import hash_file
+from PyHardLinkBackup.utilities.manifest import ManifestWriter
 from PyHardLinkBackup.utilities.rich_utils import NoopProgress
+from PyHardLinkBackup.utilities.sha256sums import store_hash
 from PyHardLinkBackup.utilities.tests.unittest_utilities import (
     CollectOpenFiles,
     PyHardLinkBackupTestCaseMixin,
@@ -165,3 +177,257 @@ class CompareBackupTestCase(PyHardLinkBackupTestCaseMixin, TestCase):
             excpected_successful_file_count=total_file_count,
             excpected_error_count=0,
         )
+
+    def test_hash_from_sha256sums(self):
+        phlb_conf_dir = self.backup_root / '.phlb'
+        phlb_conf_dir.mkdir()
+        last_backup_dir = self.backup_root / self.src_root.name / '2026-01-17-120000'
+        last_backup_dir.mkdir(parents=True)
+
+        (self.src_root / 'file1.txt').write_text('content 1')
+        (self.src_root / 'file2.txt').write_text('content 2')
+        (self.src_root / 'file3.txt').write_text('content 2')
+        shutil.copy2(self.src_root / 'file1.txt', last_backup_dir / 'file1.txt')
+        shutil.copy2(self.src_root / 'file2.txt', last_backup_dir / 'file2.txt')
+        os.link(last_backup_dir / 'file2.txt', last_backup_dir / 'file3.txt')
+        for name in ('file1.txt', 'file2.txt', 'file3.txt'):
+            store_hash(
+                last_backup_dir / name,
+                hash_file(self.src_root / name, progress=NoopProgress(), total_size=9),
+            )
+
+        def compare(**kwargs) -> tuple[CompareResult, list[str]]:
+            with (
+                CollectOpenFiles(self.temp_path) as collector,
+                freeze_time('2026-01-18T22:12:34+0000', auto_tick_seconds=0),
+                RedirectOut() as redirected_out,
+            ):
+                result = compare_tree(
+                    src_root=self.src_root,
+                    backup_root=self.backup_root,
+                    one_file_system=True,
+                    excludes=(),
+                    log_manager=LoggingManager(console_level='info', file_level=DEFAULT_LOG_FILE_LEVEL),
+                    workers=2,
+                    **kwargs,
+                )
+            self.assertEqual(redirected_out.stderr, '')
+            self.assertIn('Compare completed.', redirected_out.stdout)
+            return result, sorted(collector.opened_for_read)
+
+        # The backup files are not read, the hashes from SHA256SUMS are used:
+        result, opened_for_read = compare()
+        self.assertEqual(
+            opened_for_read,
+            [
+                'r backups/source/2026-01-17-120000/SHA256SUMS',
+                'rb source/file1.txt',
+                'rb source/file2.txt',
+                'rb source/file3.txt',
+            ],
+        )
+        self.assertEqual((result.successful_file_count, result.file_hash_missmatch), (3, 0))
+
+        # Damage a backup file -> Only detected with --rehash-backup:
+        (last_backup_dir / 'file2.txt').write_text('damaged!!')
+        result, opened_for_read = compare()
+        self.assertEqual((result.successful_file_count, result.file_hash_missmatch), (3, 0))
+
+        result, opened_for_read = compare(rehash_backup=True)
+        self.assertEqual(
+            opened_for_read,
+            [
+                'rb backups/source/2026-01-17-120000/file1.txt',
+                'rb backups/source/2026-01-17-120000/file2.txt',  # file3.txt is the same inode
+                'rb source/file1.txt',
+                'rb source/file2.txt',
+                'rb source/file3.txt',
+            ],
+        )
+        self.assertEqual((result.successful_file_count, result.file_hash_missmatch), (1, 2))
+
+    def test_moved_files(self):
+        phlb_conf_dir = self.backup_root / '.phlb'
+        phlb_conf_dir.mkdir()
+        older_backup_dir = self.backup_root / self.src_root.name / '2026-01-10-120000'
+        older_backup_dir.mkdir(parents=True)
+        last_backup_dir = self.backup_root / self.src_root.name / '2026-01-17-120000'
+        (last_backup_dir / 'old_dir').mkdir(parents=True)
+
+        size = FileSizeDatabase.MIN_SIZE + 1
+        size_db = FileSizeDatabase(phlb_conf_dir)
+        size_db.add(size)
+
+        # A moved directory with a large file:
+        (self.src_root / 'new_dir').mkdir()
+        moved_file = self.src_root / 'new_dir' / 'moved.txt'
+        moved_file.write_bytes(b'M' * size)
+        shutil.copy2(moved_file, last_backup_dir / 'old_dir' / 'moved.txt')
+        store_hash(
+            last_backup_dir / 'old_dir' / 'moved.txt',
+            hash_file(moved_file, progress=NoopProgress(), total_size=size),
+        )
+
+        # Content only exists in a older backup, under a other name:
+        older_file = self.src_root / 'older.txt'
+        older_file.write_bytes(b'O' * size)
+        shutil.copy2(older_file, older_backup_dir / 'old-name.txt')
+        hash_db = FileHashDatabase(self.backup_root, phlb_conf_dir)
+        hash_db[hash_file(older_file, progress=NoopProgress(), total_size=size)] = older_backup_dir / 'old-name.txt'
+
+        # A copy of a file, that still exists in the source, is new and not moved:
+        orig_file = self.src_root / 'orig.txt'
+        orig_file.write_bytes(b'C' * size)
+        shutil.copy2(orig_file, last_backup_dir / 'orig.txt')
+        orig_hash = hash_file(orig_file, progress=NoopProgress(), total_size=size)
+        store_hash(last_backup_dir / 'orig.txt', orig_hash)
+        hash_db[orig_hash] = last_backup_dir / 'orig.txt'
+        shutil.copy2(orig_file, self.src_root / 'orig-copy.txt')
+
+        # A stale hash database entry is ignored, but not removed by the compare:
+        stale_file = self.src_root / 'stale.txt'
+        stale_file.write_bytes(b'S' * size)
+        stale_hash = hash_file(stale_file, progress=NoopProgress(), total_size=size)
+        hash_db[stale_hash] = older_backup_dir / 'deleted.txt'
+
+        # New files:
+        (self.src_root / 'new_dir' / 'new_same_size.txt').write_bytes(b'N' * size)  # Size in DB -> hashed
+        (self.src_root / 'new_other_size.txt').write_bytes(b'N' * (size + 1))  # Size not in DB -> not read
+        (self.src_root / 'new_small.txt').write_text('small')  # Small file -> not read
+
+        with (
+            CollectOpenFiles(self.temp_path) as collector,
+            freeze_time('2026-01-18T22:12:34+0000', auto_tick_seconds=0),
+            RedirectOut() as redirected_out,
+        ):
+            result = compare_tree(
+                src_root=self.src_root,
+                backup_root=self.backup_root,
+                one_file_system=True,
+                excludes=(),
+                log_manager=LoggingManager(console_level='info', file_level=DEFAULT_LOG_FILE_LEVEL),
+            )
+        self.assertEqual(redirected_out.stderr, '')
+        self.assertIn('Moved source files: 2', redirected_out.stdout)
+        self.assertEqual(
+            (result.total_file_count, result.src_file_new_count, result.src_file_moved_count, result.error_count),
+            (8, 5, 2, 0),
+        )
+        self.assertEqual(result.successful_file_count, 1)  # orig.txt
+        self.assertEqual(hash_db.lookup(stale_hash), None)
+        self.assertIn(stale_hash, hash_db)
+        source_files_read = [path for path in collector.opened_for_read if path.startswith('rb source/')]
+        self.assertEqual(
+            sorted(source_files_read),
+            [
+                'rb source/new_dir/moved.txt',
+                'rb source/new_dir/new_same_size.txt',
+                'rb source/older.txt',
+                'rb source/orig-copy.txt',
+                'rb source/orig.txt',
+                'rb source/stale.txt',
+            ],
+        )
+        log_content = result.log_file.read_text()
+        self.assertIn(f'{moved_file} is moved, old location: {last_backup_dir}/old_dir/moved.txt', log_content)
+        self.assertIn(f'{older_file} is moved, old location: {older_backup_dir}/old-name.txt', log_content)
+        self.assertIn(f'{self.src_root}/orig-copy.txt not found in compare', log_content)
+
+    def test_build_reverse_index(self):
+        compare_dir = self.backup_root / self.src_root.name / '2026-01-17-120000'
+        (compare_dir / 'sub').mkdir(parents=True)
+        (compare_dir / 'a.txt').write_text('A')
+        (compare_dir / 'sub' / 'b.txt').write_text('B')
+        (compare_dir / 'sub' / 'other.txt').write_text('other')
+        store_hash(compare_dir / 'a.txt', 'aaaa')
+        store_hash(compare_dir / 'sub' / 'b.txt', 'bbbb')
+        store_hash(compare_dir / 'sub' / 'other.txt', 'cccc')
+
+        # Without a manifest (e.g.: created by an old version) -> Scan all SHA256SUMS files:
+        with self.assertLogs('PyHardLinkBackup', level=logging.INFO) as logs:
+            reverse_index = build_reverse_index(compare_dir=compare_dir, hashes={'aaaa', 'bbbb'})
+        self.assertEqual(reverse_index, {'aaaa': [compare_dir / 'a.txt'], 'bbbb': [compare_dir / 'sub' / 'b.txt']})
+        self.assertIn('No manifest found', ''.join(logs.output))
+
+        # With a manifest -> The snapshot tree is not walked:
+        with self.assertLogs('PyHardLinkBackup', level=logging.INFO):
+            manifest = ManifestWriter(compare_dir)
+            manifest.add(compare_dir / 'a.txt', 'aaaa')
+            manifest.add(compare_dir / 'sub' / 'b.txt', 'aaaa')
+            manifest.add(compare_dir / 'sub' / 'other.txt', 'cccc')
+            manifest.close()
+        with patch.object(os, 'walk', side_effect=AssertionError('Tree walked')):
+            reverse_index = build_reverse_index(compare_dir=compare_dir, hashes={'aaaa', 'bbbb'})
+        self.assertEqual(reverse_index, {'aaaa': [compare_dir / 'a.txt', compare_dir / 'sub' / 'b.txt']})
+
+    def test_quick_compare(self):
+        phlb_conf_dir = self.backup_root / '.phlb'
+        phlb_conf_dir.mkdir()
+        last_backup_dir = self.backup_root / self.src_root.name / '2026-01-17-120000'
+        last_backup_dir.mkdir(parents=True)
+
+        (self.src_root / 'unchanged.txt').write_text('unchanged')
+        (self.src_root / 'changed.txt').write_text('old content')
+        (self.src_root / 'sub').mkdir()
+        (self.src_root / 'sub' / 'removed.txt').write_text('removed')
+        shutil.copytree(self.src_root, last_backup_dir, dirs_exist_ok=True)
+        (last_backup_dir / 'SHA256SUMS').write_text('ignored')
+
+        (self.src_root / 'changed.txt').write_text('new content!')
+        (self.src_root / 'sub' / 'removed.txt').unlink()
+        (self.src_root / 'sub' / 'new.txt').write_text('new')
+        changed_list = self.temp_path / 'changed.txt'
+
+        with (
+            CollectOpenFiles(self.temp_path) as collector,
+            freeze_time('2026-01-18T22:12:34+0000', auto_tick_seconds=0),
+            RedirectOut() as redirected_out,
+        ):
+            result = quick_compare_tree(
+                src_root=self.src_root,
+                backup_root=self.backup_root,
+                one_file_system=True,
+                excludes=(),
+                log_manager=LoggingManager(console_level='info', file_level=DEFAULT_LOG_FILE_LEVEL),
+                changed_list=changed_list,
+            )
+        self.assertEqual(redirected_out.stderr, '')
+        self.assertIn('Quick compare complete', redirected_out.stdout)
+        self.assertEqual(collector.opened_for_read, [])  # No file content was read
+        self.assertEqual(
+            result,
+            QuickCompareResult(
+                last_timestamp='2026-01-17-120000',
+                compare_dir=last_backup_dir,
+                log_file=result.log_file,
+                total_file_count=4,
+                unchanged_file_count=1,
+                new_file_count=1,
+                missing_file_count=1,
+                changed_file_count=1,
+                error_count=0,
+            ),
+            redirected_out.stdout,
+        )
+        self.assertIn('Changed source file: changed.txt (size, mtime)', result.log_file.read_text())
+        self.assertEqual(changed_list.read_text(), 'changed.txt\nsub/new.txt\n')
+
+        # Compare only the changed files by content:
+        with (
+            CollectOpenFiles(self.temp_path) as collector,
+            RedirectOut() as redirected_out,
+        ):
+            result = compare_tree(
+                src_root=self.src_root,
+                backup_root=self.backup_root,
+                one_file_system=True,
+                excludes=(),
+                log_manager=LoggingManager(console_level='info', file_level=DEFAULT_LOG_FILE_LEVEL),
+                only_paths=changed_list,
+            )
+        self.assertEqual(redirected_out.stderr, '')
+        self.assertEqual(collector.opened_for_read, ['r changed.txt'])  # Only the list file was read
+        self.assertEqual(
+            (result.total_file_count, result.src_file_new_count, result.file_size_missmatch),
+            (2, 1, 1),
+        )
@@ -0,0 +1,125 @@
+import errno
+import hashlib
+import logging
+import os
+from unittest import TestCase
+from unittest.mock import patch
+
+from bx_py_utils.test_utils.redirect import RedirectOut
+from cli_base.cli_tools.test_utils.assertion import assert_in
+from cli_base.cli_tools.test_utils.rich_test_utils import NoColorEnvRich
+from freezegun import freeze_time
+
+from PyHardLinkBackup.dedupe_tree import DedupeResult, dedupe
+from PyHardLinkBackup.logging_setup import NoopLoggingManager
+from PyHardLinkBackup.utilities.file_hash_database import FileHashDatabase
+from PyHardLinkBackup.utilities.file_size_database import FileSizeDatabase
+from PyHardLinkBackup.utilities.tests.unittest_utilities import PyHardLinkBackupTestCaseMixin
+
+
+CONTENT_A = 'A' * 1000
+CONTENT_B = 'B' * 1000
+
+
+def content_hash(content: str) -> str:
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+class DedupeTreeTestCase(PyHardLinkBackupTestCaseMixin, TestCase):
+    maxDiff = None
+
+    def setUp(self):
+        super().setUp()
+        self.phlb_conf_dir = self.backup_root / '.phlb'
+        self.phlb_conf_dir.mkdir()
+
+        # A native phlb snapshot with known content:
+        self.known_file = self.backup_root / 'source' / '2026-01-01-120000' / 'known.txt'
+        self.known_file.parent.mkdir(parents=True)
+        self.known_file.write_text(CONTENT_A)
+        FileHashDatabase(self.backup_root, self.phlb_conf_dir)[content_hash(CONTENT_A)] = self.known_file
+        FileSizeDatabase(self.phlb_conf_dir).add(1000)
+
+        # An imported rsync tree:
+        self.rsync_dir = self.backup_root / 'rsync'
+        (self.rsync_dir / 'day1').mkdir(parents=True)
+        (self.rsync_dir / 'day2').mkdir(parents=True)
+        (self.rsync_dir / 'day1' / 'a.txt').write_text(CONTENT_A)
+        os.link(self.rsync_dir / 'day1' / 'a.txt', self.rsync_dir / 'day2' / 'a.txt')
+        (self.rsync_dir / 'day1' / 'b.txt').write_text(CONTENT_B)
+        (self.rsync_dir / 'day2' / 'b.txt').write_text(CONTENT_B)
+        (self.rsync_dir / 'day2' / 'small.txt').write_text('small')
+        (self.rsync_dir / 'day2' / 'symlink').symlink_to('b.txt')
+
+    def call_dedupe(self, **kwargs) -> tuple[DedupeResult, str]:
+        with (
+            self.assertLogs('PyHardLinkBackup', level=logging.DEBUG),
+            NoColorEnvRich(width=200),
+            RedirectOut() as redirected_out,
+            freeze_time('2026-01-16T12:34:56Z', auto_tick_seconds=0),
+        ):
+            dedupe_result = dedupe(backup_root=self.backup_root, log_manager=NoopLoggingManager(), **kwargs)
+        self.assertEqual(redirected_out.stderr, '')
+        return dedupe_result, redirected_out.stdout
+
+    def test_dedupe(self):
+        freed_size = (self.rsync_dir / 'day1' / 'a.txt').stat().st_blocks * 512
+        freed_size += (self.rsync_dir / 'day2' / 'b.txt').stat().st_blocks * 512
+
+        dedupe_result, stdout = self.call_dedupe(path=self.rsync_dir)
+        self.assertEqual(
+            dedupe_result,
+            DedupeResult(
+                file_count=5,
+                inode_count=3,
+                hashed_size=3000,
+                small_file_count=1,
+                added_hash_count=1,
+                replaced_file_count=3,
+                freed_size=freed_size,
+            ),
+            stdout,
+        )
+        assert_in(
+            content=stdout,
+            parts=(
+                'Dedupe "',
+                'Files replaced with hardlinks: 3',
+                'New content registered: 1',
+            ),
+        )
+        self.assertTrue(os.path.samefile(self.known_file, self.rsync_dir / 'day1' / 'a.txt'))
+        self.assertTrue(os.path.samefile(self.known_file, self.rsync_dir / 'day2' / 'a.txt'))
+        self.assertTrue(os.path.samefile(self.rsync_dir / 'day1' / 'b.txt', self.rsync_dir / 'day2' / 'b.txt'))
+        self.assertEqual(self.known_file.stat().st_nlink, 3)
+        self.assertEqual((self.rsync_dir / 'day2' / 'b.txt').read_text(), CONTENT_B)
+        self.assertEqual(os.readlink(self.rsync_dir / 'day2' / 'symlink'), 'b.txt')
+        self.assertEqual(
+            FileHashDatabase(self.backup_root, self.phlb_conf_dir).get(content_hash(CONTENT_B)),
+            self.rsync_dir / 'day1' / 'b.txt',
+        )
+        self.assertEqual(sorted(path.name for path in self.rsync_dir.rglob('*.tmp')), [])
+        self.assertTrue((self.backup_root / '2026-01-16-123456-dedupe-summary.txt').is_file())
+
+        # A second run has nothing to do:
+        dedupe_result, stdout = self.call_dedupe(path=self.rsync_dir)
+        self.assertEqual(dedupe_result.replaced_file_count, 0)
+        self.assertEqual(dedupe_result.already_deduped_count, 4)
+
+    def test_hardlink_limit(self):
+        too_many_links = OSError(errno.EMLINK, 'Too many links')
+        with patch('PyHardLinkBackup.dedupe_tree.os.link', side_effect=too_many_links):
+            dedupe_result, _ = self.call_dedupe(path=self.rsync_dir / 'day1')
+        self.assertEqual(dedupe_result.hardlink_limit_count, 1)
+        self.assertEqual(dedupe_result.replaced_file_count, 0)
+        self.assertEqual(dedupe_result.error_count, 0)
+        # The limited file is the new target for this content:
+        self.assertEqual(
+            FileHashDatabase(self.backup_root, self.phlb_conf_dir).get(content_hash(CONTENT_A)),
+            self.rsync_dir / 'day1' / 'a.txt',
+        )
+
+    def test_path_outside_backup_root(self):
+        with self.assertRaises(SystemExit), RedirectOut() as redirected_out:
+            dedupe(backup_root=self.backup_root, path=self.src_root, log_manager=NoopLoggingManager())
+        self.assertIn('is not inside the backup directory', redirected_out.stdout)
@@ -0,0 +1,122 @@
+import hashlib
+import os
+from pathlib import Path
+from unittest import TestCase
+
+from bx_py_utils.test_utils.redirect import RedirectOut
+from cli_base.cli_tools.test_utils.assertion import assert_in
+from cli_base.cli_tools.test_utils.rich_test_utils import NoColorEnvRich
+
+from PyHardLinkBackup.diff_snapshots import DiffResult, SnapshotFile, detect_moved_files, diff_snapshots
+from PyHardLinkBackup.utilities.sha256sums import store_hash
+from PyHardLinkBackup.utilities.tests.unittest_utilities import (
+    CollectOpenFiles,
+    PyHardLinkBackupTestCaseMixin,
+)
+
+
+def write_backup_file(path: Path, content: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content)
+    store_hash(path, hashlib.sha256(content.encode()).hexdigest())
+
+
+def hardlink_backup_file(existing_path: Path, path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    os.link(existing_path, path)
+    store_hash(path, hashlib.sha256(existing_path.read_bytes()).hexdigest())
+
+
+class DiffSnapshotsTestCase(PyHardLinkBackupTestCaseMixin, TestCase):
+    def test_diff_snapshots(self):
+        snapshot_a = self.backup_root / 'source' / '2026-01-01-120000'
+        snapshot_b = self.backup_root / 'source' / '2026-01-02-120000'
+
+        write_backup_file(snapshot_a / 'unchanged.txt', 'unchanged content')
+        hardlink_backup_file(snapshot_a / 'unchanged.txt', snapshot_b / 'unchanged.txt')
+
+        write_backup_file(snapshot_a / 'small.txt', 'small')
+        write_backup_file(snapshot_b / 'small.txt', 'small')  # Copied, not hardlinked
+
+        write_backup_file(snapshot_a / 'modified.txt', 'old content')
+        write_backup_file(snapshot_b / 'modified.txt', 'new content')  # Same size, other hash
+
+        write_backup_file(snapshot_a / 'removed.txt', 'removed content')
+
+        write_backup_file(snapshot_a / 'old' / 'moved.txt', 'moved content')
+        hardlink_backup_file(snapshot_a / 'old' / 'moved.txt', snapshot_b / 'new' / 'moved.txt')
+
+        write_backup_file(snapshot_a / 'renamed.txt', 'renamed content')
+        write_backup_file(snapshot_b / 'renamed2.txt', 'renamed content')  # Not hardlinked
+
+        write_backup_file(snapshot_b / 'added.txt', 'added content')
+
+        with (
+            CollectOpenFiles(self.temp_path) as collector,
+            NoColorEnvRich(width=200),
+            RedirectOut() as redirected_out,
+        ):
+            result = diff_snapshots(snapshot_a=snapshot_a, snapshot_b=snapshot_b)
+        stdout = redirected_out.stdout
+        self.assertEqual(redirected_out.stderr, '')
+        self.assertEqual(
+            result,
+            DiffResult(
+                snapshot_a=snapshot_a,
+                snapshot_b=snapshot_b,
+                total_file_count=9,
+                same_inode_count=1,
+                same_hash_count=1,
+                hashed_file_count=0,
+                added=['added.txt'],
+                removed=['removed.txt'],
+                modified=['modified.txt'],
+                moved=[('old/moved.txt', 'new/moved.txt'), ('renamed.txt', 'renamed2.txt')],
+                error_count=0,
+            ),
+            stdout,
+        )
+        # Only the SHA256SUMS files are read, no file content:
+        self.assertEqual(
+            sorted(collector.opened_for_read),
+            [
+                'r backups/source/2026-01-01-120000/SHA256SUMS',
+                'r backups/source/2026-01-01-120000/old/SHA256SUMS',
+                'r backups/source/2026-01-02-120000/SHA256SUMS',
+                'r backups/source/2026-01-02-120000/new/SHA256SUMS',
+            ],
+        )
+        assert_in(
+            content=stdout,
+            parts=(
+                'A added.txt',
+                'D removed.txt',
+                'M modified.txt',
+                'R old/moved.txt -> new/moved.txt',
+                'R renamed.txt -> renamed2.txt',
+                'Total files processed: 9',
+                'Moved files: 2',
+            ),
+        )
+
+    def test_moved_duplicates(self):
+        # Duplicates share the inode and the hash: All of them can be matched as moved files.
+        removed_files = [
+            SnapshotFile(rel_path='old/a.txt', inode=(1, 100), file_hash='abc'),
+            SnapshotFile(rel_path='old/b.txt', inode=(1, 100), file_hash='abc'),
+            SnapshotFile(rel_path='old/c.txt', inode=(1, 200), file_hash='abc'),
+        ]
+        added_files = [
+            SnapshotFile(rel_path='new/a.txt', inode=(1, 100), file_hash='abc'),
+            SnapshotFile(rel_path='new/b.txt', inode=(1, 100), file_hash='abc'),
+            SnapshotFile(rel_path='new/c.txt', inode=(1, 300), file_hash='abc'),
+            SnapshotFile(rel_path='new/d.txt', inode=(1, 100), file_hash='abc'),
+        ]
+        diff_result = DiffResult(snapshot_a=Path('a'), snapshot_b=Path('b'))
+        detect_moved_files(removed_files=removed_files, added_files=added_files, diff_result=diff_result)
+        self.assertEqual(
+            diff_result.moved,
+            [('old/a.txt', 'new/a.txt'), ('old/b.txt', 'new/b.txt'), ('old/c.txt', 'new/c.txt')],
+        )
+        self.assertEqual(diff_result.added, ['new/d.txt'])
+        self.assertEqual(diff_result.removed, [])
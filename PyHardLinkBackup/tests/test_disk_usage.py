@@ -0,0 +1,132 @@
+import logging
+import os
+from pathlib import Path
+from unittest import TestCase
+from unittest.mock import patch
+
+from bx_py_utils.test_utils.redirect import RedirectOut
+from cli_base.cli_tools.test_utils.assertion import assert_in
+from cli_base.cli_tools.test_utils.rich_test_utils import NoColorEnvRich
+
+from PyHardLinkBackup import disk_usage as disk_usage_module
+from PyHardLinkBackup.disk_usage import SnapshotUsage, disk_usage
+from PyHardLinkBackup.utilities.tests.unittest_utilities import PyHardLinkBackupTestCaseMixin
+
+
+def allocated_size(*paths: Path) -> int:
+    return sum(path.stat(follow_symlinks=False).st_blocks * 512 for path in paths)
+
+
+class DiskUsageTestCase(PyHardLinkBackupTestCaseMixin, TestCase):
+    maxDiff = None
+
+    def call_disk_usage(self, **kwargs) -> tuple[dict[Path, SnapshotUsage], str]:
+        with NoColorEnvRich(width=200), RedirectOut() as redirected_out:
+            usages = disk_usage(backup_root=self.backup_root, **kwargs)
+        self.assertEqual(redirected_out.stderr, '')
+        return usages, redirected_out.stdout
+
+    def test_disk_usage(self):
+        (self.backup_root / '.phlb').mkdir()
+        snapshot1 = self.backup_root / 'source' / '2026-01-01-120000'
+        snapshot2 = self.backup_root / 'source' / '2026-01-02-120000'
+        snapshot1.mkdir(parents=True)
+        snapshot2.mkdir(parents=True)
+
+        shared_path = snapshot1 / 'shared.txt'
+        shared_path.write_text('shared' * 1000)
+        os.link(shared_path, snapshot2 / 'shared.txt')
+
+        (snapshot1 / 'sub').mkdir()
+        internal_path = snapshot1 / 'sub' / 'internal.txt'
+        internal_path.write_text('hardlinked inside one snapshot' * 100)
+        os.link(internal_path, snapshot1 / 'internal.txt')
+
+        (snapshot2 / 'new.txt').write_text('new' * 1000)
+        (snapshot2 / 'link').symlink_to('new.txt')
+
+        usages, stdout = self.call_disk_usage()
+        self.assertEqual(
+            usages,
+            {
+                snapshot1: SnapshotUsage(
+                    file_count=3,
+                    dir_count=2,
+                    exclusive_size=allocated_size(snapshot1, snapshot1 / 'sub', internal_path),
+                    shared_size=allocated_size(shared_path),
+                ),
+                snapshot2: SnapshotUsage(
+                    file_count=3,
+                    dir_count=1,
+                    exclusive_size=allocated_size(snapshot2, snapshot2 / 'new.txt', snapshot2 / 'link'),
+                    shared_size=allocated_size(shared_path),
+                ),
+            },
+        )
+        assert_in(content=stdout, parts=('source/2026-01-01-120000', 'source/2026-01-02-120000', '2 snapshots'))
+        self.assertTrue(
+            (self.backup_root / '.phlb' / 'snapshot-catalog' / 'source' / '2026-01-01-120000.json').is_file()
+        )
+
+        self.assertTrue(
+            (self.backup_root / '.phlb' / 'snapshot-catalog' / 'source' / '2026-01-01-120000.inodes').is_file()
+        )
+
+        # The catalogs are used, no snapshot is scanned again:
+        with patch.object(disk_usage_module, 'scan_snapshot') as scan_snapshot_mock:
+            cached_usages, _ = self.call_disk_usage()
+        scan_snapshot_mock.assert_not_called()
+        self.assertEqual(cached_usages, usages)
+
+        # A new snapshot -> Only the new one is scanned, but it turns exclusive files of the others into shared:
+        snapshot3 = self.backup_root / 'source' / '2026-01-03-120000'
+        snapshot3.mkdir()
+        os.link(snapshot2 / 'new.txt', snapshot3 / 'new.txt')
+        with patch.object(
+            disk_usage_module, 'scan_snapshot', side_effect=disk_usage_module.scan_snapshot
+        ) as scan_snapshot_mock:
+            usages, stdout = self.call_disk_usage()
+        self.assertEqual([call.args[0] for call in scan_snapshot_mock.call_args_list], [snapshot3])
+        self.assertEqual(
+            usages[snapshot2],
+            SnapshotUsage(
+                file_count=3,
+                dir_count=1,
+                exclusive_size=allocated_size(snapshot2, snapshot2 / 'link'),
+                shared_size=allocated_size(shared_path, snapshot2 / 'new.txt'),
+            ),
+        )
+        self.assertEqual(
+            usages[snapshot3],
+            SnapshotUsage(
+                file_count=1,
+                dir_count=1,
+                exclusive_size=allocated_size(snapshot3),
+                shared_size=allocated_size(snapshot3 / 'new.txt'),
+            ),
+        )
+        assert_in(content=stdout, parts=('1 snapshots scanned in', '3 snapshots'))
+
+        # A deleted snapshot changes the shared files of the others -> scan again:
+        for snapshot_dir in (snapshot2, snapshot3):
+            for path in snapshot_dir.iterdir():
+                path.unlink()
+            snapshot_dir.rmdir()
+        with self.assertLogs('PyHardLinkBackup', level=logging.INFO) as logs:
+            usages, _ = self.call_disk_usage()
+        self.assertIn('The hardlink counts of all catalogs are outdated', '\n'.join(logs.output))
+        self.assertEqual(
+            usages,
+            {
+                snapshot1: SnapshotUsage(
+                    file_count=3,
+                    dir_count=2,
+                    exclusive_size=allocated_size(snapshot1, snapshot1 / 'sub', internal_path, shared_path),
+                    shared_size=0,
+                ),
+            },
+        )
+        self.assertEqual(
+            sorted(path.name for path in (self.backup_root / '.phlb' / 'snapshot-catalog' / 'source').iterdir()),
+            ['2026-01-01-120000.inodes', '2026-01-01-120000.json'],
+        )
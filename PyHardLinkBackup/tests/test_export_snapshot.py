@@ -0,0 +1,134 @@
+import hashlib
+import io
+import os
+import subprocess
+import sys
+import tarfile
+from pathlib import Path
+from unittest import TestCase
+
+from bx_py_utils.test_utils.redirect import RedirectOut
+from cli_base.cli_tools.test_utils.assertion import assert_in
+from cli_base.cli_tools.test_utils.rich_test_utils import NoColorEnvRich
+
+from PyHardLinkBackup.export_snapshot import ExportResult, export
+from PyHardLinkBackup.utilities.sha256sums import store_hash
+from PyHardLinkBackup.utilities.tests.unittest_utilities import PyHardLinkBackupTestCaseMixin
+
+
+def create_file(file_path: Path, content: str) -> None:
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    file_path.write_text(content)
+    os.utime(file_path, ns=(0, 1_767_268_800_000_000_000))
+    store_hash(file_path, hashlib.sha256(content.encode()).hexdigest())
+
+
+def get_members(archive_path: Path) -> list[tuple[str, str, str]]:
+    with tarfile.open(archive_path) as tar:
+        members = []
+        for member in tar.getmembers():
+            if member.isreg():
+                members.append((member.name, 'file', tar.extractfile(member).read().decode()))
+            elif member.islnk():
+                members.append((member.name, 'hardlink', member.linkname))
+            elif member.issym():
+                members.append((member.name, 'symlink', member.linkname))
+        return members
+
+
+class ExportSnapshotTestCase(PyHardLinkBackupTestCaseMixin, TestCase):
+    maxDiff = None
+
+    def setUp(self):
+        super().setUp()
+        self.base_dir = self.backup_root / 'source' / '2026-01-01-120000'
+        create_file(self.base_dir / 'file.txt', 'file content')
+        create_file(self.base_dir / 'sub' / 'other.txt', 'other content')
+        create_file(self.base_dir / 'removed.txt', 'removed')
+
+        # The second snapshot: Unchanged files are hardlinked, as by "phlb backup"
+        self.snapshot_dir = self.backup_root / 'source' / '2026-01-02-120000'
+        (self.snapshot_dir / 'sub').mkdir(parents=True)
+        os.link(self.base_dir / 'file.txt', self.snapshot_dir / 'file.txt')
+        store_hash(self.snapshot_dir / 'file.txt', hashlib.sha256(b'file content').hexdigest())
+        os.link(self.base_dir / 'file.txt', self.snapshot_dir / 'sub' / 'hardlink.txt')
+        store_hash(self.snapshot_dir / 'sub' / 'hardlink.txt', hashlib.sha256(b'file content').hexdigest())
+        create_file(self.snapshot_dir / 'sub' / 'other.txt', 'modified content')
+        (self.snapshot_dir / 'symlink').symlink_to('file.txt')
+
+        self.archive_path = self.temp_path / 'export.tar'
+
+    def call_export(self, **kwargs) -> tuple[ExportResult, str]:
+        with NoColorEnvRich(width=200), RedirectOut() as redirected_out:
+            export_result = export(snapshot_dir=self.snapshot_dir, output=str(self.archive_path), **kwargs)
+        self.assertEqual(redirected_out.stderr, '')
+        return export_result, redirected_out.stdout
+
+    def test_export(self):
+        export_result, stdout = self.call_export()
+        sha256sums_size = sum(path.stat().st_size for path in self.snapshot_dir.rglob('SHA256SUMS'))
+        self.assertEqual(
+            export_result,
+            ExportResult(
+                member_count=6,
+                file_count=4,
+                hardlink_count=1,
+                symlink_count=1,
+                content_size=len('file content') + len('modified content') + sha256sums_size,
+                archive_size=self.archive_path.stat().st_size,
+            ),
+            stdout,
+        )
+        self.assertEqual(export_result.archive_size % tarfile.RECORDSIZE, 0)
+        assert_in(content=stdout, parts=('Export of', 'Archive members: 6', 'Hardlinks: 1'))
+
+        members = get_members(self.archive_path)
+        self.assertEqual(
+            [member for member in members if not member[0].endswith('SHA256SUMS')],
+            [
+                ('file.txt', 'file', 'file content'),
+                ('sub/hardlink.txt', 'hardlink', 'file.txt'),
+                ('sub/other.txt', 'file', 'modified content'),
+                ('symlink', 'symlink', 'file.txt'),
+            ],
+        )
+
+        # The extracted archive keeps the hardlinks and the metadata:
+        extract_dir = self.temp_path / 'extracted'
+        with tarfile.open(self.archive_path) as tar:
+            tar.extractall(extract_dir, filter='tar')
+        self.assertTrue(os.path.samefile(extract_dir / 'file.txt', extract_dir / 'sub' / 'hardlink.txt'))
+        self.assertEqual((extract_dir / 'sub' / 'other.txt').stat().st_mtime, 1_767_268_800)
+        self.assertEqual(
+            (extract_dir / 'sub' / 'SHA256SUMS').read_text(),
+            (self.snapshot_dir / 'sub' / 'SHA256SUMS').read_text(),
+        )
+
+    def test_incremental_export(self):
+        export_result, stdout = self.call_export(base_dir=self.base_dir)
+        self.assertEqual(export_result.unchanged_count, 1)  # file.txt
+        self.assertEqual(export_result.removed_count, 1)  # removed.txt
+        assert_in(content=stdout, parts=('Incremental against:', 'Unchanged files (skipped): 1'))
+        self.assertEqual(
+            get_members(self.archive_path),
+            [
+                ('SHA256SUMS', 'file', (self.snapshot_dir / 'SHA256SUMS').read_text()),
+                ('sub/SHA256SUMS', 'file', (self.snapshot_dir / 'sub' / 'SHA256SUMS').read_text()),
+                # The first link of the inode is unchanged, so the content is stored:
+                ('sub/hardlink.txt', 'file', 'file content'),
+                ('sub/other.txt', 'file', 'modified content'),
+                ('symlink', 'symlink', 'file.txt'),
+            ],
+        )
+
+    def test_export_to_stdout(self):
+        # The version banner and all messages go to stderr, so the archive on stdout is not corrupted:
+        process = subprocess.run(
+            [sys.executable, '-m', 'PyHardLinkBackup', 'export', '--verbosity', 'info', self.snapshot_dir, '-'],
+            capture_output=True,
+            check=True,
+        )
+        stderr = process.stderr.decode()
+        assert_in(content=stderr, parts=('phlb v', 'Export of', 'Archive members: 6'))
+        with tarfile.open(fileobj=io.BytesIO(process.stdout)) as tar:
+            self.assertIn('sub/hardlink.txt', tar.getnames())
@@ -0,0 +1,152 @@
+import hashlib
+import os
+import shutil
+from pathlib import Path
+from unittest import TestCase
+
+from bx_py_utils.test_utils.redirect import RedirectOut
+from cli_base.cli_tools.test_utils.assertion import assert_in
+from cli_base.cli_tools.test_utils.rich_test_utils import NoColorEnvRich
+
+from PyHardLinkBackup.history import FileVersion, file_history, find_files
+from PyHardLinkBackup.utilities.manifest import ManifestWriter
+from PyHardLinkBackup.utilities.sha256sums import store_hash
+from PyHardLinkBackup.utilities.snapshot_index import SnapshotIndex
+from PyHardLinkBackup.utilities.tests.unittest_utilities import PyHardLinkBackupTestCaseMixin
+
+
+def content_hash(content: str) -> str:
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+class HistoryTestCase(PyHardLinkBackupTestCaseMixin, TestCase):
+    maxDiff = None
+
+    def setUp(self):
+        super().setUp()
+        (self.backup_root / '.phlb').mkdir()
+
+    def create_snapshot(self, timestamp: str, files: dict[str, str], *, manifest: bool = True) -> Path:
+        snapshot_dir = self.backup_root / 'source' / timestamp
+        snapshot_dir.mkdir(parents=True)
+        manifest_writer = ManifestWriter(snapshot_dir)
+        for rel_path, content in files.items():
+            file_path = snapshot_dir / rel_path
+            file_path.parent.mkdir(parents=True, exist_ok=True)
+            file_path.write_text(content)
+            os.utime(file_path, ns=(0, 0))
+            store_hash(file_path, content_hash(content))
+            manifest_writer.add(file_path, content_hash(content))
+        if manifest:
+            manifest_writer.close()
+        return snapshot_dir
+
+    def call(self, func, **kwargs) -> tuple[list[FileVersion], str]:
+        with self.assertLogs('PyHardLinkBackup'), NoColorEnvRich(width=200), RedirectOut() as redirected_out:
+            versions = func(backup_root=self.backup_root, **kwargs)
+        self.assertEqual(redirected_out.stderr, '')
+        return versions, redirected_out.stdout
+
+    def test_history_and_find(self):
+        self.create_snapshot('2026-01-01-120000', {'home/x/report.xlsx': 'version 1', 'a.txt': 'A'}, manifest=False)
+        self.create_snapshot('2026-01-02-120000', {'home/x/report.xlsx': 'version 1', 'a.txt': 'A'})
+        snapshot3 = self.create_snapshot('2026-01-03-120000', {'home/x/report.xlsx': 'version 2'})
+        self.create_snapshot('2026-01-04-120000', {'home/x/report.xlsx': 'version 1', 'b.txt': 'version 2'})
+
+        versions, stdout = self.call(file_history, rel_path='/home/x/report.xlsx')
+        self.assertEqual(
+            [(version.sha256, version.timestamps) for version in versions],
+            [
+                (content_hash('version 1'), ['2026-01-01-120000', '2026-01-02-120000']),
+                (content_hash('version 2'), ['2026-01-03-120000']),
+                (content_hash('version 1'), ['2026-01-04-120000']),
+            ],
+        )
+        assert_in(
+            content=stdout,
+            parts=(
+                'History of "home/x/report.xlsx"',
+                'source/home/x/report.xlsx 9.00 Bytes',
+                'in: 2026-01-01-120000 … 2026-01-02-120000 (2 snapshots)',
+                '3 versions found.',
+            ),
+        )
+        self.assertTrue((self.backup_root / '.phlb' / 'snapshot-index.sqlite').is_file())
+
+        # Glob pattern without "/" matches the file name:
+        versions, stdout = self.call(find_files, pattern='*.xlsx')
+        self.assertEqual(len(versions), 3)
+        versions, stdout = self.call(find_files, pattern='home/*/report.*')
+        self.assertEqual(len(versions), 3)
+        versions, stdout = self.call(find_files, pattern='?.txt')
+        self.assertEqual(
+            [(version.path, version.timestamps) for version in versions],
+            [
+                ('a.txt', ['2026-01-01-120000', '2026-01-02-120000']),
+                ('b.txt', ['2026-01-04-120000']),
+            ],
+        )
+
+        # Find by hash:
+        versions, stdout = self.call(find_files, pattern=content_hash('version 2'))
+        self.assertEqual(
+            [(version.path, version.timestamps) for version in versions],
+            [
+                ('b.txt', ['2026-01-04-120000']),
+                ('home/x/report.xlsx', ['2026-01-03-120000']),
+            ],
+        )
+
+        # Deleted snapshots are removed from the index:
+        shutil.rmtree(snapshot3)
+        versions, stdout = self.call(file_history, rel_path='home/x/report.xlsx')
+        self.assertEqual(
+            [version.timestamps for version in versions],
+            [['2026-01-01-120000', '2026-01-02-120000', '2026-01-04-120000']],
+        )
+
+    def test_reindex_changed_manifest(self):
+        # A running backup: The snapshot tree is incomplete and has no manifest yet:
+        snapshot_dir = self.create_snapshot('2026-01-01-120000', {'a.txt': 'A'}, manifest=False)
+        versions, _ = self.call(find_files, pattern='*.txt')
+        self.assertEqual([version.path for version in versions], ['a.txt'])
+
+        # The backup is finished -> The snapshot is indexed again from the manifest:
+        (snapshot_dir / 'b.txt').write_text('B')
+        store_hash(snapshot_dir / 'b.txt', content_hash('B'))
+        manifest_writer = ManifestWriter(snapshot_dir)
+        manifest_writer.add(snapshot_dir / 'a.txt', content_hash('A'))
+        manifest_writer.add(snapshot_dir / 'b.txt', content_hash('B'))
+        manifest_writer.close()
+        with self.assertLogs('PyHardLinkBackup') as logs, NoColorEnvRich(width=200), RedirectOut():
+            versions = find_files(backup_root=self.backup_root, pattern='*.txt')
+        self.assertIn('Manifest of snapshot', '\n'.join(logs.output))
+        self.assertEqual(
+            [(version.path, version.timestamps) for version in versions],
+            [
+                ('a.txt', ['2026-01-01-120000']),
+                ('b.txt', ['2026-01-01-120000']),
+            ],
+        )
+
+    def test_index_schema(self):
+        self.create_snapshot('2026-01-01-120000', {'home/x/report.xlsx': 'version 1'})
+        phlb_conf_dir = self.backup_root / '.phlb'
+        with self.assertLogs('PyHardLinkBackup'), SnapshotIndex(self.backup_root, phlb_conf_dir) as snapshot_index:
+            self.assertEqual(snapshot_index.update(), (1, 0))
+
+            # The file name column is indexed:
+            query_plan = snapshot_index.connection.execute(
+                'EXPLAIN QUERY PLAN SELECT id FROM paths WHERE name = ?', ('report.xlsx',)
+            ).fetchall()
+            self.assertIn('paths_name', str(query_plan))
+            self.assertEqual(len(snapshot_index.find_glob('report.xlsx')), 1)
+
+            # A index with a other schema version is created again:
+            snapshot_index.connection.execute('PRAGMA user_version = 1')
+        with (
+            self.assertLogs('PyHardLinkBackup') as logs,
+            SnapshotIndex(self.backup_root, phlb_conf_dir) as snapshot_index,
+        ):
+            self.assertEqual(snapshot_index.update(), (1, 0))
+        self.assertIn('Create snapshot index', '\n'.join(logs.output))
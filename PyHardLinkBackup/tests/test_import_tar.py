@@ -0,0 +1,225 @@
+import datetime
+import errno
+import gzip
+import hashlib
+import io
+import logging
+import os
+import tarfile
+from pathlib import Path
+from unittest import TestCase
+from unittest.mock import patch
+
+from bx_py_utils.test_utils.redirect import RedirectOut
+from cli_base.cli_tools.test_utils.assertion import assert_in
+from cli_base.cli_tools.test_utils.rich_test_utils import NoColorEnvRich
+
+from PyHardLinkBackup.import_tar import ImportResult, import_tar
+from PyHardLinkBackup.logging_setup import NoopLoggingManager
+from PyHardLinkBackup.utilities.file_hash_database import FileHashDatabase
+from PyHardLinkBackup.utilities.file_size_database import FileSizeDatabase
+from PyHardLinkBackup.utilities.manifest import get_manifest_path, iter_manifest
+from PyHardLinkBackup.utilities.sha256sums import read_sha256sums
+from PyHardLinkBackup.utilities.tests.unittest_utilities import PyHardLinkBackupTestCaseMixin
+
+
+CONTENT_A = b'A' * 1000
+CONTENT_B = b'B' * 1000
+ARCHIVE_MTIME = 1_546_344_000  # 2019-01-01 12:00:00 UTC
+
+
+def add_member(tar: tarfile.TarFile, name: str, content: bytes = b'', **attributes) -> None:
+    tarinfo = tarfile.TarInfo(name)
+    tarinfo.size = len(content)
+    tarinfo.mtime = ARCHIVE_MTIME
+    for key, value in attributes.items():
+        setattr(tarinfo, key, value)
+    tar.addfile(tarinfo, io.BytesIO(content) if content else None)
+
+
+class ImportTarTestCase(PyHardLinkBackupTestCaseMixin, TestCase):
+    maxDiff = None
+
+    def setUp(self):
+        super().setUp()
+        phlb_conf_dir = self.backup_root / '.phlb'
+        phlb_conf_dir.mkdir()
+
+        # Content that is already stored by a backup:
+        self.known_file = self.backup_root / 'source' / '2026-01-01-120000' / 'known.txt'
+        self.known_file.parent.mkdir(parents=True)
+        self.known_file.write_bytes(CONTENT_A)
+        FileHashDatabase(self.backup_root, phlb_conf_dir)[hashlib.sha256(CONTENT_A).hexdigest()] = self.known_file
+        FileSizeDatabase(phlb_conf_dir).add(1000)
+
+        self.archive_path = self.temp_path / 'home-2019.tar.gz'
+        with tarfile.open(self.archive_path, 'w:gz') as tar:
+            add_member(tar, 'data', type=tarfile.DIRTYPE, mode=0o755)
+            add_member(tar, 'data/known.txt', CONTENT_A, mode=0o644)
+            add_member(tar, 'data/new.txt', CONTENT_B, mode=0o600)
+            add_member(tar, 'data/sub/new-copy.txt', CONTENT_B, mode=0o644)
+            add_member(tar, 'data/hardlink.txt', type=tarfile.LNKTYPE, linkname='data/new.txt')
+            add_member(tar, 'data/symlink', type=tarfile.SYMTYPE, linkname='new.txt')
+            add_member(tar, 'data/small.txt', b'small', mode=0o644)
+            add_member(tar, 'data/SHA256SUMS', b'foo  bar\n', mode=0o644)
+            add_member(tar, 'data/fifo', type=tarfile.FIFOTYPE)
+            add_member(tar, '../outside.txt', b'evil', mode=0o644)
+        os.utime(self.archive_path, (ARCHIVE_MTIME, ARCHIVE_MTIME))
+
+        timestamp = datetime.datetime.fromtimestamp(ARCHIVE_MTIME).strftime('%Y-%m-%d-%H%M%S')
+        self.snapshot_dir = self.backup_root / 'home-2019' / timestamp
+
+    def call_import(self) -> tuple[ImportResult, str]:
+        with (
+            self.assertLogs('PyHardLinkBackup', level=logging.DEBUG),
+            NoColorEnvRich(width=200),
+            RedirectOut() as redirected_out,
+        ):
+            import_result = import_tar(
+                archive_path=self.archive_path,
+                backup_root=self.backup_root,
+                backup_name=None,
+                log_manager=NoopLoggingManager(),
+            )
+        self.assertEqual(redirected_out.stderr, '')
+        return import_result, redirected_out.stdout
+
+    def assert_snapshot(self):
+        data_dir = self.snapshot_dir / 'data'
+        self.assertTrue(os.path.samefile(data_dir / 'known.txt', self.known_file))
+        self.assertTrue(os.path.samefile(data_dir / 'new.txt', data_dir / 'sub' / 'new-copy.txt'))
+        self.assertTrue(os.path.samefile(data_dir / 'new.txt', data_dir / 'hardlink.txt'))
+        self.assertEqual((data_dir / 'new.txt').read_bytes(), CONTENT_B)
+        self.assertEqual((data_dir / 'new.txt').stat().st_mode & 0o777, 0o600)
+        self.assertEqual((data_dir / 'new.txt').stat().st_mtime, ARCHIVE_MTIME)
+        self.assertEqual(os.readlink(data_dir / 'symlink'), 'new.txt')
+        self.assertFalse((data_dir / 'fifo').exists())
+        self.assertFalse((self.backup_root / 'home-2019' / 'outside.txt').exists())
+        self.assertEqual(
+            read_sha256sums(data_dir / 'SHA256SUMS'),
+            {
+                'known.txt': hashlib.sha256(CONTENT_A).hexdigest(),
+                'new.txt': hashlib.sha256(CONTENT_B).hexdigest(),
+                'hardlink.txt': hashlib.sha256(CONTENT_B).hexdigest(),
+                'small.txt': hashlib.sha256(b'small').hexdigest(),
+            },
+        )
+        self.assertEqual(
+            [entry.path for entry in iter_manifest(self.snapshot_dir)],
+            [
+                'data/hardlink.txt',
+                'data/known.txt',
+                'data/new.txt',
+                'data/small.txt',
+                'data/sub/new-copy.txt',
+                'data/symlink',
+            ],
+        )
+
+    def test_import_tar(self):
+        import_result, stdout = self.call_import()
+        self.assertEqual(
+            import_result,
+            ImportResult(
+                member_count=10,
+                total_size=3018,  # All regular file members, including the skipped/refused ones
+                written_files=2,  # new.txt and small.txt
+                written_size=1005,
+                hardlinked_files=3,  # known.txt, new-copy.txt and hardlink.txt
+                hardlinked_size=3000,
+                symlink_files=1,
+                skipped_members=2,  # SHA256SUMS and fifo
+                error_count=1,  # ../outside.txt
+            ),
+            stdout,
+        )
+        assert_in(content=stdout, parts=('Import complete:', 'Written files: 2', 'Errors during import: 1'))
+        self.assert_snapshot()
+
+        # The same archive can't be imported twice:
+        with NoColorEnvRich(width=200), RedirectOut() as redirected_out, self.assertRaises(SystemExit):
+            import_tar(
+                archive_path=self.archive_path,
+                backup_root=self.backup_root,
+                backup_name=None,
+                log_manager=NoopLoggingManager(),
+            )
+        self.assertIn('already exists!', redirected_out.stdout)
+
+    def test_import_large_files(self):
+        # Files that don't fit into memory are written and replaced by a hardlink afterwards:
+        with patch('PyHardLinkBackup.import_tar.CHUNK_SIZE', 100):
+            import_result, _ = self.call_import()
+        self.assertEqual(import_result.written_files, 2)
+        self.assertEqual(import_result.hardlinked_files, 3)
+        self.assert_snapshot()
+        self.assertEqual(sorted(path.name for path in Path(self.snapshot_dir).rglob('*.tmp')), [])
+
+    def test_hardlink_limit(self):
+        # The written copy of a large duplicate is kept, if the hardlink limit of the existing file is reached:
+        def replace_with_hardlink(existing_path, path):
+            raise OSError(errno.EMLINK, 'Too many links')
+
+        with (
+            patch('PyHardLinkBackup.import_tar.CHUNK_SIZE', 100),
+            patch('PyHardLinkBackup.import_tar.replace_with_hardlink', replace_with_hardlink),
+        ):
+            import_result, stdout = self.call_import()
+        self.assertEqual(import_result.hardlink_rotations, 2)  # known.txt and new-copy.txt
+        self.assertEqual(import_result.written_files, 4)
+        self.assertEqual(import_result.hardlinked_files, 1)  # hardlink.txt
+        self.assertEqual(import_result.error_count, 1)  # ../outside.txt
+        self.assertIn('Hardlink limit reached, new copies used as hardlink source: 2', stdout)
+
+        data_dir = self.snapshot_dir / 'data'
+        self.assertEqual((data_dir / 'known.txt').read_bytes(), CONTENT_A)
+        self.assertFalse(os.path.samefile(data_dir / 'known.txt', self.known_file))
+        self.assertEqual((data_dir / 'sub' / 'new-copy.txt').read_bytes(), CONTENT_B)
+
+        # The copies are the new "master" files for the following hardlinks:
+        hash_db = FileHashDatabase(self.backup_root, self.backup_root / '.phlb')
+        self.assertEqual(hash_db.get(hashlib.sha256(CONTENT_A).hexdigest()), data_dir / 'known.txt')
+        self.assertEqual(hash_db.get(hashlib.sha256(CONTENT_B).hexdigest()), data_dir / 'sub' / 'new-copy.txt')
+
+    def call_truncated_import(self, archive_content: bytes) -> tuple[str, str]:
+        self.archive_path.write_bytes(archive_content)
+        os.utime(self.archive_path, (ARCHIVE_MTIME, ARCHIVE_MTIME))
+        with (
+            self.assertLogs('PyHardLinkBackup', level=logging.DEBUG) as logs,
+            NoColorEnvRich(width=200),
+            RedirectOut() as redirected_out,
+            self.assertRaises(SystemExit),  # innermost: Catch the error, before it's passed through the others
+        ):
+            import_tar(
+                archive_path=self.archive_path,
+                backup_root=self.backup_root,
+                backup_name=None,
+                log_manager=NoopLoggingManager(),
+            )
+        self.assertEqual(redirected_out.stderr, '')
+        self.assertIn('Error: Archive is truncated or corrupt', redirected_out.stdout)
+
+        # The incomplete snapshot is removed:
+        self.assertFalse(self.snapshot_dir.exists())
+        self.assertFalse(get_manifest_path(self.snapshot_dir).exists())
+        return '\n'.join(logs.output), redirected_out.stdout
+
+    def test_truncated_archive(self):
+        archive_content = self.archive_path.read_bytes()
+
+        # Truncated in the archive header, before the first member:
+        self.call_truncated_import(archive_content[:20])
+
+        # Truncated in the middle of a member, while the stream is imported:
+        tar_content = gzip.decompress(archive_content)
+        truncate_pos = tar_content.index(CONTENT_B) + 500
+        logs, _ = self.call_truncated_import(tar_content[:truncate_pos])
+        self.assertIn('Hardlink duplicate file', logs)  # data/known.txt was imported before
+        self.assertIn('Read archive', logs)
+
+        # The import can be started again with the complete archive:
+        self.archive_path.write_bytes(archive_content)
+        os.utime(self.archive_path, (ARCHIVE_MTIME, ARCHIVE_MTIME))
+        import_result, _ = self.call_import()
+        self.assertEqual(import_result.written_files, 2)
+        self.assert_snapshot()
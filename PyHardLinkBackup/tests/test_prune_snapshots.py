@@ -0,0 +1,208 @@
+import hashlib
+import logging
+import os
+from pathlib import Path
+from unittest import TestCase
+
+from bx_py_utils.test_utils.redirect import RedirectOut
+from cli_base.cli_tools.test_utils.assertion import assert_in
+from cli_base.cli_tools.test_utils.rich_test_utils import NoColorEnvRich
+from freezegun import freeze_time
+
+from PyHardLinkBackup.logging_setup import NoopLoggingManager
+from PyHardLinkBackup.prune_snapshots import PruneResult, prune
+from PyHardLinkBackup.utilities.file_hash_database import FileHashDatabase
+from PyHardLinkBackup.utilities.file_hash_pool import FileHashPool
+from PyHardLinkBackup.utilities.manifest import ManifestWriter, get_manifest_path
+from PyHardLinkBackup.utilities.small_file_index import SmallFileIndex
+from PyHardLinkBackup.utilities.tests.unittest_utilities import PyHardLinkBackupTestCaseMixin
+
+
+def freed_size(*paths: Path) -> int:
+    return sum(path.stat(follow_symlinks=False).st_blocks * 512 for path in paths)
+
+
+def content_hash(content: str) -> str:
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+class PruneSnapshotsTestCase(PyHardLinkBackupTestCaseMixin, TestCase):
+    maxDiff = None
+
+    def setUp(self):
+        super().setUp()
+        self.phlb_conf_dir = self.backup_root / '.phlb'
+        self.phlb_conf_dir.mkdir()
+        self.snapshot1 = self.backup_root / 'source' / '2026-01-01-120000'
+        self.snapshot2 = self.backup_root / 'source' / '2026-01-02-120000'
+        self.snapshot3 = self.backup_root / 'source' / '2026-01-03-120000'
+        for snapshot_dir in (self.snapshot1, self.snapshot2, self.snapshot3):
+            snapshot_dir.mkdir(parents=True)
+
+    def call_prune(self, **kwargs) -> tuple[PruneResult, str]:
+        with (
+            self.assertLogs('PyHardLinkBackup', level=logging.DEBUG),
+            NoColorEnvRich(width=200),
+            RedirectOut() as redirected_out,
+            freeze_time('2026-01-16T12:34:56Z', auto_tick_seconds=0),
+        ):
+            prune_result = prune(backup_root=self.backup_root, log_manager=NoopLoggingManager(), **kwargs)
+        self.assertEqual(redirected_out.stderr, '')
+        return prune_result, redirected_out.stdout
+
+    def test_no_policy(self):
+        with self.assertRaises(SystemExit), RedirectOut() as redirected_out:
+            prune(
+                backup_root=self.backup_root,
+                keep_last=0,
+                keep_daily=0,
+                keep_weekly=0,
+                keep_monthly=0,
+                log_manager=NoopLoggingManager(),
+            )
+        self.assertIn('Error: No retention policy given!', redirected_out.stdout)
+
+    def test_prune(self):
+        shared_content = 'shared content' * 100
+        (self.snapshot1 / 'subdir').mkdir()
+        shared_path = self.snapshot1 / 'subdir' / 'shared.txt'
+        shared_path.write_text(shared_content)
+        (self.snapshot2 / 'subdir').mkdir()
+        os.link(shared_path, self.snapshot2 / 'subdir' / 'shared.txt')
+        (self.snapshot3 / 'subdir').mkdir()
+        os.link(shared_path, self.snapshot3 / 'subdir' / 'shared.txt')
+
+        old_only_path = self.snapshot1 / 'old-only.txt'
+        old_only_path.write_text('old only content' * 100)
+        (self.snapshot1 / 'small.txt').write_text('small')
+        (self.snapshot3 / 'new.txt').write_text('new content' * 100)
+
+        # A hardlink with another path in a snapshot of another backup name:
+        other_snapshot = self.backup_root / 'other' / '2026-01-05-120000'
+        (other_snapshot / 'moved').mkdir(parents=True)
+        os.link(old_only_path, other_snapshot / 'moved' / 'renamed.txt')
+
+        hash_db = FileHashDatabase(self.backup_root, self.phlb_conf_dir)
+        hash_db[content_hash(shared_content)] = shared_path
+        hash_db[content_hash('old only content' * 100)] = old_only_path
+        hash_db[content_hash('new content' * 100)] = self.snapshot3 / 'new.txt'
+        hash_db[content_hash('missing')] = self.snapshot2 / 'missing.txt'
+
+        with SmallFileIndex(self.backup_root, self.phlb_conf_dir) as small_file_index:
+            small_file_index[content_hash('small')] = self.snapshot1 / 'small.txt'
+
+        # The manifest, log and summary files next to the snapshots (The third snapshot has no manifest):
+        with self.assertLogs('PyHardLinkBackup', level=logging.INFO):
+            for snapshot_dir in (self.snapshot1, self.snapshot2, other_snapshot):
+                manifest = ManifestWriter(snapshot_dir)
+                for file_path in sorted(snapshot_dir.rglob('*')):
+                    if file_path.is_file():
+                        manifest.add(file_path, file_hash=None)
+                manifest.close()
+                (snapshot_dir.parent / f'{snapshot_dir.name}-backup.log').write_text('log')
+                (snapshot_dir.parent / f'{snapshot_dir.name}-summary.txt').write_text('summary')
+        snapshot1_files = (
+            get_manifest_path(self.snapshot1),
+            self.backup_root / 'source' / '2026-01-01-120000-backup.log',
+            self.backup_root / 'source' / '2026-01-01-120000-summary.txt',
+        )
+
+        # Only the snapshot directory, the files next to it and the not hardlinked files free disk space:
+        expected_freed_size = freed_size(
+            self.snapshot1,
+            self.snapshot1 / 'subdir',
+            self.snapshot1 / 'small.txt',
+            *snapshot1_files,
+        )
+
+        # A dry run deletes nothing:
+        prune_result, stdout = self.call_prune(keep_last=2, keep_daily=0, keep_weekly=0, keep_monthly=0, dry_run=True)
+        self.assertEqual(prune_result, PruneResult(snapshot_count=4))
+        assert_in(
+            content=stdout,
+            parts=(
+                'delete 2026-01-01-120000',
+                'keep   2026-01-02-120000',
+                'keep   2026-01-03-120000',
+                'keep   2026-01-05-120000',
+                'Dry run: 1 of 4 snapshots would be deleted.',
+            ),
+        )
+        self.assertTrue(self.snapshot1.is_dir())
+
+        prune_result, stdout = self.call_prune(keep_last=2, keep_daily=0, keep_weekly=0, keep_monthly=0)
+        self.assertEqual(
+            prune_result,
+            PruneResult(
+                snapshot_count=4,
+                pruned_snapshot_count=1,
+                deleted_file_count=6,
+                deleted_dir_count=2,
+                freed_size=expected_freed_size,
+                hash_entries_repointed=2,
+                hash_entries_dropped=2,
+                pool_entries_removed=0,
+                error_count=0,
+            ),
+            stdout,
+        )
+        assert_in(
+            content=stdout,
+            parts=(
+                'Deleted snapshots: 1 of 4',
+                'Hash entries repointed to surviving hardlinks: 2',
+                'Hash entries dropped: 2',
+            ),
+        )
+        self.assertFalse(self.snapshot1.exists())
+        self.assertEqual(
+            sorted(path.name for path in (self.backup_root / 'source').iterdir()),
+            [
+                '2026-01-02-120000',
+                '2026-01-02-120000-backup.log',
+                '2026-01-02-120000-manifest.jsonl.gz',
+                '2026-01-02-120000-summary.txt',
+                '2026-01-03-120000',
+            ],
+        )
+        self.assertTrue((self.backup_root / '2026-01-16-123456-prune-summary.txt').is_file())
+
+        # The hash entry is repointed to the newest surviving hardlink:
+        self.assertEqual(
+            sorted(FileHashDatabase(self.backup_root, self.phlb_conf_dir).iter_entries()),
+            sorted(
+                [
+                    (content_hash(shared_content), 'source/2026-01-03-120000/subdir/shared.txt'),
+                    (content_hash('old only content' * 100), 'other/2026-01-05-120000/moved/renamed.txt'),
+                    (content_hash('new content' * 100), 'source/2026-01-03-120000/new.txt'),
+                ]
+            ),
+        )
+        self.assertEqual(list(SmallFileIndex(self.backup_root, self.phlb_conf_dir).iter_entries()), [])
+
+    def test_prune_pool(self):
+        content = 'pool content' * 100
+        pool = FileHashPool(self.backup_root, self.phlb_conf_dir)
+        (self.snapshot1 / 'old.txt').write_text(content)
+        pool[content_hash(content)] = self.snapshot1 / 'old.txt'
+        (self.snapshot3 / 'new.txt').write_text('new content' * 100)
+        pool[content_hash('new content' * 100)] = self.snapshot3 / 'new.txt'
+
+        expected_freed_size = freed_size(self.snapshot1, self.snapshot2, self.snapshot1 / 'old.txt')
+
+        prune_result, stdout = self.call_prune(keep_last=1, keep_daily=0, keep_weekly=0, keep_monthly=0)
+        self.assertEqual(
+            prune_result,
+            PruneResult(
+                snapshot_count=3,
+                pruned_snapshot_count=2,
+                deleted_file_count=1,
+                deleted_dir_count=2,
+                freed_size=expected_freed_size,
+                pool_entries_removed=1,
+            ),
+            stdout,
+        )
+        self.assertIn('Unused pool entries removed: 1', stdout)
+        self.assertEqual(pool.link_count(content_hash(content)), 0)
+        self.assertEqual(pool.link_count(content_hash('new content' * 100)), 2)
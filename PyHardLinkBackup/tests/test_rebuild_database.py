@@ -75,6 +75,7 @@ class RebuildDatabaseTestCase(BaseTestCase):
                 [
                     '.phlb',
                     '.phlb/hash-lookup',
+                    '.phlb/ingested-snapshots.json',
                     '.phlb/size-lookup',
                     '2026-01-16-123456-rebuild-summary.txt',
                 ],
@@ -105,6 +106,7 @@ class RebuildDatabaseTestCase(BaseTestCase):
                     '.phlb/hash-lookup/bb',
                     '.phlb/hash-lookup/bb/c4',
                     '.phlb/hash-lookup/bb/c4/bbc4de2ca238d1ec41fb622b75b5cf7d31a6d2ac92405043dd8f8220364fefc8',
+                    '.phlb/ingested-snapshots.json',
                     '.phlb/size-lookup',
                     '.phlb/size-lookup/10',
                     '.phlb/size-lookup/10/00',
@@ -114,12 +116,14 @@ class RebuildDatabaseTestCase(BaseTestCase):
                     'source-name/2026-01-15-181709',
                     'source-name/2026-01-15-181709/SHA256SUMS',
                     'source-name/2026-01-15-181709/file1.txt',
-                ], redirected_out.stdout
+                ],
+                redirected_out.stdout,
             )
             self.assertEqual(
                 sorted_rglob_files(backup_root),
                 [
                     '.phlb/hash-lookup/bb/c4/bbc4de2ca238d1ec41fb622b75b5cf7d31a6d2ac92405043dd8f8220364fefc8',
+                    '.phlb/ingested-snapshots.json',
                     '.phlb/size-lookup/10/00/1000',
                     '2026-01-16-123456-rebuild-summary.txt',
                     'source-name/2026-01-15-181709/SHA256SUMS',
@@ -164,6 +168,7 @@ class RebuildDatabaseTestCase(BaseTestCase):
                 sorted_rglob_files(backup_root),
                 [
                     '.phlb/hash-lookup/bb/c4/bbc4de2ca238d1ec41fb622b75b5cf7d31a6d2ac92405043dd8f8220364fefc8',
+                    '.phlb/ingested-snapshots.json',
                     '.phlb/size-lookup/10/00/1000',
                     '2026-01-16-123456-rebuild-summary.txt',
                     'source-name/2026-01-15-181709/SHA256SUMS',
@@ -216,7 +221,7 @@ class RebuildDatabaseTestCase(BaseTestCase):
                 parts=(
                     f'Backup {snapshot_path}/file1.txt OSError\n',
                     '\nTraceback (most recent call last):\n',
-                    'OSError: Bam!'
+                    'OSError: Bam!',
                 ),
             )
 
@@ -270,3 +275,209 @@ class RebuildDatabaseTestCase(BaseTestCase):
                 ),
                 redirected_out.stdout,
             )
+
+    def test_hash_same_inode_only_once(self):
+        with TemporaryDirectoryPath() as temp_path:
+            backup_root = temp_path / 'backup'
+            snapshot_path = backup_root / 'source-name' / '2026-01-15-181709'
+            snapshot_path.mkdir(parents=True)
+            (backup_root / '.phlb').mkdir()
+
+            file1_path = snapshot_path / 'file1.txt'
+            file1_path.write_text('X' * FileSizeDatabase.MIN_SIZE)
+            os.link(file1_path, snapshot_path / 'file2.txt')
+            (snapshot_path / 'other.txt').write_text('Y' * FileSizeDatabase.MIN_SIZE)
+
+            with (
+                self.assertLogs('PyHardLinkBackup', level=logging.DEBUG),
+                RedirectOut() as redirected_out,
+                patch.object(rebuild_databases, 'hash_file', wraps=rebuild_databases.hash_file) as hash_file_mock,
+            ):
+                rebuild_result = rebuild(
+                    backup_root, skip_same_inode=False, log_manager=NoopLoggingManager(), workers=2
+                )
+            self.assertEqual(redirected_out.stderr, '')
+            hashed_names = sorted(call.args[0].name for call in hash_file_mock.call_args_list)
+            self.assertEqual(len(hashed_names), 2, hashed_names)  # file1.txt and file2.txt are the same inode
+            self.assertEqual(hashed_names[-1], 'other.txt')
+            self.assertEqual(
+                rebuild_result,
+                RebuildResult(
+                    process_count=3,
+                    process_size=3000,
+                    added_size_count=1,
+                    added_hash_count=2,
+                    error_count=0,
+                    hash_verified_count=0,
+                    hash_mismatch_count=0,
+                    hash_not_found_count=3,
+                    unique_inode_count=2,
+                    skip_by_inode_count=0,
+                    reused_hash_count=1,  # file2.txt was verified with the hash of file1.txt or vice versa
+                ),
+                redirected_out.stdout,
+            )
+            self.assertEqual(
+                sorted((snapshot_path / 'SHA256SUMS').read_text().splitlines()),
+                [
+                    '354bd777d4e58926f13503ffafd6b8a5d5901260def09153be2cb42dca46033e  other.txt',
+                    'bbc4de2ca238d1ec41fb622b75b5cf7d31a6d2ac92405043dd8f8220364fefc8  file1.txt',
+                    'bbc4de2ca238d1ec41fb622b75b5cf7d31a6d2ac92405043dd8f8220364fefc8  file2.txt',
+                ],
+            )
+
+    def test_trust_sha256sums(self):
+        with TemporaryDirectoryPath() as temp_path:
+            backup_root = temp_path / 'backup'
+            snapshot_path = backup_root / 'source-name' / '2026-01-15-181709'
+            snapshot_path.mkdir(parents=True)
+            phlb_conf_dir = backup_root / '.phlb'
+            phlb_conf_dir.mkdir()
+
+            (snapshot_path / 'file1.txt').write_text('X' * FileSizeDatabase.MIN_SIZE)
+            (snapshot_path / 'file2.txt').write_text('Y' * (FileSizeDatabase.MIN_SIZE + 1))
+            (snapshot_path / 'SHA256SUMS').write_text(
+                'bbc4de2ca238d1ec41fb622b75b5cf7d31a6d2ac92405043dd8f8220364fefc8  file1.txt\n'
+            )
+
+            with (
+                self.assertLogs('PyHardLinkBackup', level=logging.DEBUG),
+                RedirectOut() as redirected_out,
+                patch.object(rebuild_databases, 'hash_file', wraps=rebuild_databases.hash_file) as hash_file_mock,
+            ):
+                rebuild_result = rebuild(
+                    backup_root, skip_same_inode=True, log_manager=NoopLoggingManager(), trust_sha256sums=True
+                )
+            self.assertEqual(redirected_out.stderr, '')
+            self.assertIn('Trusted hashes (file not read and not verified): 1', redirected_out.stdout)
+
+            # Only the file without SHA256SUMS entry was hashed:
+            self.assertEqual([call.args[0].name for call in hash_file_mock.call_args_list], ['file2.txt'])
+            self.assertEqual(
+                rebuild_result,
+                RebuildResult(
+                    process_count=3,
+                    process_size=2001,
+                    added_size_count=2,
+                    added_hash_count=2,
+                    error_count=0,
+                    hash_verified_count=0,
+                    hash_mismatch_count=0,
+                    hash_not_found_count=1,
+                    unique_inode_count=3,
+                    skip_by_inode_count=0,
+                    trusted_hash_count=1,
+                ),
+                redirected_out.stdout,
+            )
+            self.assertEqual(
+                sorted_rglob_files(phlb_conf_dir),
+                [
+                    'hash-lookup/bb/c4/bbc4de2ca238d1ec41fb622b75b5cf7d31a6d2ac92405043dd8f8220364fefc8',
+                    'hash-lookup/e3/71/e3711d0eacddeb105af4ad9b0d63069d759acf32e49712663419e68dc294a94a',
+                    'ingested-snapshots.json',
+                    'size-lookup/10/00/1000',
+                    'size-lookup/10/01/1001',
+                ],
+            )
+
+    def test_incremental(self):
+        with TemporaryDirectoryPath() as temp_path:
+            backup_root = temp_path / 'backup'
+            (backup_root / '.phlb').mkdir(parents=True)
+
+            def create_snapshot(timestamp: str, content: str) -> Path:
+                snapshot_path = backup_root / 'source-name' / timestamp
+                snapshot_path.mkdir(parents=True)
+                (snapshot_path / 'file.txt').write_text(content * FileSizeDatabase.MIN_SIZE)
+                return snapshot_path
+
+            def rebuild_incremental() -> tuple[RebuildResult, list[str]]:
+                with (
+                    self.assertLogs('PyHardLinkBackup', level=logging.DEBUG),
+                    RedirectOut() as redirected_out,
+                    patch.object(rebuild_databases, 'hash_file', wraps=rebuild_databases.hash_file) as hash_file_mock,
+                ):
+                    rebuild_result = rebuild(
+                        backup_root, skip_same_inode=True, log_manager=NoopLoggingManager(), incremental=True
+                    )
+                self.assertEqual(redirected_out.stderr, '')
+                hashed_files = sorted(
+                    str(call.args[0].relative_to(backup_root)) for call in hash_file_mock.call_args_list
+                )
+                return rebuild_result, hashed_files
+
+            create_snapshot('2026-01-15-120000', 'A')
+            snapshot_path = create_snapshot('2026-01-16-120000', 'B')
+
+            # Nothing ingested yet -> process all snapshots:
+            rebuild_result, hashed_files = rebuild_incremental()
+            self.assertEqual(
+                hashed_files,
+                ['source-name/2026-01-15-120000/file.txt', 'source-name/2026-01-16-120000/file.txt'],
+            )
+            self.assertEqual((rebuild_result.skipped_snapshot_count, rebuild_result.added_hash_count), (0, 2))
+
+            # Add a new snapshot -> only this one is processed:
+            create_snapshot('2026-01-17-120000', 'C')
+            rebuild_result, hashed_files = rebuild_incremental()
+            self.assertEqual(hashed_files, ['source-name/2026-01-17-120000/file.txt'])
+            self.assertEqual((rebuild_result.skipped_snapshot_count, rebuild_result.added_hash_count), (2, 1))
+
+            # Nothing changed -> nothing to do:
+            rebuild_result, hashed_files = rebuild_incremental()
+            self.assertEqual(hashed_files, [])
+            self.assertEqual((rebuild_result.skipped_snapshot_count, rebuild_result.process_count), (3, 0))
+
+            # A changed snapshot is processed again, e.g.: copied again with rsync, so the directory mtime changed:
+            (snapshot_path / 'file.txt').write_text('X' * FileSizeDatabase.MIN_SIZE * 2)
+            snapshot_stat = snapshot_path.stat()
+            os.utime(snapshot_path, ns=(snapshot_stat.st_atime_ns, snapshot_stat.st_mtime_ns + 1_000_000_000))
+            rebuild_result, hashed_files = rebuild_incremental()
+            self.assertEqual(hashed_files, ['source-name/2026-01-16-120000/file.txt'])
+            self.assertEqual((rebuild_result.skipped_snapshot_count, rebuild_result.hash_mismatch_count), (2, 1))
+
+    def test_verify_hardlink_siblings(self):
+        with TemporaryDirectoryPath() as temp_path:
+            backup_root = temp_path / 'backup'
+            (backup_root / '.phlb').mkdir(parents=True)
+            snapshot1_path = backup_root / 'source-name' / '2026-01-15-120000'
+            snapshot2_path = backup_root / 'source-name' / '2026-01-16-120000'
+            snapshot3_path = backup_root / 'source-name' / '2026-01-17-120000'
+            for snapshot_path in (snapshot1_path, snapshot2_path, snapshot3_path):
+                snapshot_path.mkdir(parents=True)
+
+            file_hash = 'bbc4de2ca238d1ec41fb622b75b5cf7d31a6d2ac92405043dd8f8220364fefc8'
+            (snapshot1_path / 'file.txt').write_text('X' * FileSizeDatabase.MIN_SIZE)
+            (snapshot1_path / 'SHA256SUMS').write_text(f'{file_hash}  file.txt\n')
+            os.link(snapshot1_path / 'file.txt', snapshot2_path / 'file.txt')  # SHA256SUMS is missing
+            os.link(snapshot1_path / 'file.txt', snapshot3_path / 'file.txt')
+            (snapshot3_path / 'SHA256SUMS').write_text(f'{"0" * 64}  file.txt\n')  # Wrong hash
+
+            with (
+                self.assertLogs('PyHardLinkBackup', level=logging.DEBUG),
+                RedirectOut() as redirected_out,
+                patch.object(rebuild_databases, 'hash_file', wraps=rebuild_databases.hash_file) as hash_file_mock,
+            ):
+                rebuild_result = rebuild(backup_root, skip_same_inode=True, log_manager=NoopLoggingManager())
+            self.assertEqual(redirected_out.stderr, '')
+            self.assertEqual(hash_file_mock.call_count, 1)  # Only one hash per inode
+            self.assertEqual(
+                rebuild_result,
+                RebuildResult(
+                    process_count=5,
+                    process_size=3000,
+                    added_size_count=1,
+                    added_hash_count=1,
+                    error_count=0,
+                    hash_verified_count=1,
+                    hash_mismatch_count=1,
+                    hash_not_found_count=1,
+                    unique_inode_count=3,
+                    skip_by_inode_count=2,
+                    reused_hash_count=2,
+                ),
+                redirected_out.stdout,
+            )
+            self.assertIn('Hardlinks verified with the hash of the same inode: 2', redirected_out.stdout)
+            self.assertEqual((snapshot2_path / 'SHA256SUMS').read_text(), f'{file_hash}  file.txt\n')
@@ -0,0 +1,133 @@
+import logging
+import os
+from pathlib import Path
+from unittest import TestCase
+
+from bx_py_utils.test_utils.redirect import RedirectOut
+from cli_base.cli_tools.test_utils.assertion import assert_in
+from cli_base.cli_tools.test_utils.rich_test_utils import NoColorEnvRich
+from freezegun import freeze_time
+
+from PyHardLinkBackup.backup import backup_tree
+from PyHardLinkBackup.logging_setup import NoopLoggingManager
+from PyHardLinkBackup.replicate_backup import ReplicateResult, replicate
+from PyHardLinkBackup.utilities.file_hash_database import FileHashDatabase
+from PyHardLinkBackup.utilities.manifest import get_manifest_path
+from PyHardLinkBackup.utilities.sha256sums import read_sha256sums
+from PyHardLinkBackup.utilities.tests.unittest_utilities import PyHardLinkBackupTestCaseMixin
+
+
+class ReplicateBackupTestCase(PyHardLinkBackupTestCaseMixin, TestCase):
+    maxDiff = None
+
+    def setUp(self):
+        super().setUp()
+        self.dst_root = self.temp_path / 'offsite'
+
+        (self.src_root / 'sub').mkdir()
+        (self.src_root / 'large.txt').write_text('A' * 1000)
+        (self.src_root / 'sub' / 'duplicate.txt').write_text('A' * 1000)
+        (self.src_root / 'small.txt').write_text('small')
+        (self.src_root / 'symlink').symlink_to('small.txt')
+        self.snapshot1 = self.create_backup('2026-01-01T12:00:00Z')
+
+        (self.src_root / 'new.txt').write_text('B' * 1000)
+        self.snapshot2 = self.create_backup('2026-01-02T12:00:00Z')
+
+    def create_backup(self, time_to_freeze: str) -> Path:
+        with (
+            self.assertLogs('PyHardLinkBackup', level=logging.DEBUG),
+            NoColorEnvRich(width=200),
+            RedirectOut(),
+            freeze_time(time_to_freeze, auto_tick_seconds=0),
+        ):
+            backup_tree(
+                src_root=self.src_root,
+                backup_root=self.backup_root,
+                backup_name=None,
+                one_file_system=True,
+                excludes=(),
+                log_manager=NoopLoggingManager(),
+            )
+        return max((self.backup_root / 'source').glob('2026-*-*-??????'))
+
+    def call_replicate(self) -> tuple[ReplicateResult, str]:
+        with (
+            self.assertLogs('PyHardLinkBackup', level=logging.DEBUG),
+            NoColorEnvRich(width=200),
+            RedirectOut() as redirected_out,
+            freeze_time('2026-01-16T12:34:56Z', auto_tick_seconds=0),
+        ):
+            replicate_result = replicate(
+                src_root=self.backup_root,
+                dst_root=self.dst_root,
+                log_manager=NoopLoggingManager(),
+            )
+        self.assertEqual(redirected_out.stderr, '')
+        return replicate_result, redirected_out.stdout
+
+    def test_replicate(self):
+        replicate_result, stdout = self.call_replicate()
+        self.assertEqual(
+            replicate_result,
+            ReplicateResult(
+                snapshot_count=2,
+                replicated_snapshot_count=2,
+                file_count=9,
+                total_size=5028,
+                copied_files=4,  # "A" and "B" content + small file in both snapshots
+                copied_size=2010,
+                hardlinked_files=3,
+                hardlinked_size=3000,
+                symlink_files=2,
+            ),
+            stdout,
+        )
+        assert_in(content=stdout, parts=('Replication to', 'Replicated: 2', 'Hardlinked files: 3'))
+
+        dst_snapshot1 = self.dst_root / 'source' / self.snapshot1.name
+        dst_snapshot2 = self.dst_root / 'source' / self.snapshot2.name
+        self.assertTrue(os.path.samefile(dst_snapshot1 / 'large.txt', dst_snapshot1 / 'sub' / 'duplicate.txt'))
+        self.assertTrue(os.path.samefile(dst_snapshot1 / 'large.txt', dst_snapshot2 / 'large.txt'))
+        self.assertEqual((dst_snapshot1 / 'large.txt').stat().st_nlink, 4)
+        self.assertEqual((dst_snapshot2 / 'new.txt').read_text(), 'B' * 1000)
+        self.assertEqual(os.readlink(dst_snapshot2 / 'symlink'), 'small.txt')
+        self.assertEqual(
+            read_sha256sums(dst_snapshot2 / 'SHA256SUMS'),
+            read_sha256sums(self.snapshot2 / 'SHA256SUMS'),
+        )
+        self.assertTrue(get_manifest_path(dst_snapshot2).is_file())
+        self.assertTrue((self.dst_root / 'source' / f'{self.snapshot2.name}-summary.txt').is_file())
+
+        # The destination is a complete backup root:
+        file_hash = read_sha256sums(dst_snapshot2 / 'SHA256SUMS')['new.txt']
+        self.assertEqual(
+            FileHashDatabase(self.dst_root, self.dst_root / '.phlb').get(file_hash),
+            dst_snapshot2 / 'new.txt',
+        )
+
+        # Only new snapshots are replicated:
+        replicate_result, stdout = self.call_replicate()
+        self.assertEqual(
+            replicate_result,
+            ReplicateResult(snapshot_count=2, skipped_snapshot_count=2),
+        )
+
+    def test_hash_mismatch(self):
+        (self.snapshot2 / 'new.txt').write_text('X' * 1000)  # Bit rot in the source backup
+
+        replicate_result, stdout = self.call_replicate()
+        self.assertEqual(replicate_result.replicated_snapshot_count, 1)
+        self.assertEqual(replicate_result.error_count, 1)
+        self.assertIn('Errors during replication: 1', stdout)
+        dst_snapshot2 = self.dst_root / 'source' / self.snapshot2.name
+        self.assertFalse((dst_snapshot2 / 'new.txt').exists())
+        self.assertFalse(get_manifest_path(dst_snapshot2).exists())
+
+        # The incomplete snapshot is replicated again by the next run:
+        (self.snapshot2 / 'new.txt').write_text('B' * 1000)
+        replicate_result, stdout = self.call_replicate()
+        self.assertEqual(replicate_result.replicated_snapshot_count, 1)
+        self.assertEqual(replicate_result.skipped_snapshot_count, 1)
+        self.assertEqual(replicate_result.error_count, 0)
+        self.assertEqual((dst_snapshot2 / 'new.txt').read_text(), 'B' * 1000)
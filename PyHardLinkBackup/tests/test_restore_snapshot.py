@@ -0,0 +1,139 @@
+import hashlib
+import os
+from pathlib import Path
+from unittest import TestCase
+from unittest.mock import patch
+
+from bx_py_utils.test_utils.redirect import RedirectOut
+from cli_base.cli_tools.test_utils.assertion import assert_in
+from cli_base.cli_tools.test_utils.rich_test_utils import NoColorEnvRich
+
+from PyHardLinkBackup.backup import backup_tree
+from PyHardLinkBackup.logging_setup import NoopLoggingManager
+from PyHardLinkBackup.restore_snapshot import RestoreResult, restore
+from PyHardLinkBackup.utilities.file_size_database import FileSizeDatabase
+from PyHardLinkBackup.utilities.manifest import ManifestWriter
+from PyHardLinkBackup.utilities.sha256sums import store_hash
+from PyHardLinkBackup.utilities.tests.unittest_utilities import PyHardLinkBackupTestCaseMixin
+
+
+def sorted_rglob_files(path: Path):
+    return sorted(str(p.relative_to(path)) for p in path.rglob('*') if not p.is_dir())
+
+
+class RestoreSnapshotTestCase(PyHardLinkBackupTestCaseMixin, TestCase):
+    maxDiff = None
+
+    def setUp(self):
+        super().setUp()
+        self.snapshot_dir = self.backup_root / 'source' / '2026-01-01-120000'
+        (self.snapshot_dir / 'sub').mkdir(parents=True)
+        manifest = ManifestWriter(self.snapshot_dir)
+
+        for rel_path, content, src_inode in (
+            ('file.txt', 'file content', '1:100'),
+            ('sub/other.txt', 'other content', None),
+        ):
+            file_path = self.snapshot_dir / rel_path
+            file_path.write_text(content)
+            os.utime(file_path, ns=(0, 1_767_268_800_000_000_000))
+            file_hash = hashlib.sha256(content.encode()).hexdigest()
+            store_hash(file_path, file_hash)
+            manifest.add(file_path, file_hash, src_inode=src_inode)
+
+        # Was hardlinked to "file.txt" in the source:
+        hardlink_path = self.snapshot_dir / 'sub' / 'hardlink.txt'
+        os.link(self.snapshot_dir / 'file.txt', hardlink_path)
+        store_hash(hardlink_path, hashlib.sha256(b'file content').hexdigest())
+        manifest.add(hardlink_path, hashlib.sha256(b'file content').hexdigest(), src_inode='1:100')
+
+        (self.snapshot_dir / 'symlink').symlink_to('file.txt')
+        manifest.add(self.snapshot_dir / 'symlink', None)
+        manifest.close()
+
+        self.target_dir = self.temp_path / 'restore'
+
+    def call_restore(self, **kwargs) -> tuple[RestoreResult, str]:
+        with NoColorEnvRich(width=200), RedirectOut() as redirected_out:
+            restore_result = restore(snapshot_dir=self.snapshot_dir, target_dir=self.target_dir, **kwargs)
+        self.assertEqual(redirected_out.stderr, '')
+        return restore_result, redirected_out.stdout
+
+    def test_restore(self):
+        restore_result, stdout = self.call_restore(verify=True)
+        self.assertEqual(
+            restore_result,
+            RestoreResult(
+                file_count=4,
+                restored_size=37,
+                copied_files=2,
+                hardlinked_files=1,
+                symlink_files=1,
+                verified_files=2,
+            ),
+            stdout,
+        )
+        assert_in(content=stdout, parts=('Restore complete', 'Verified files: 2'))
+        self.assertEqual(
+            sorted_rglob_files(self.target_dir),
+            ['file.txt', 'sub/hardlink.txt', 'sub/other.txt', 'symlink'],
+        )
+        self.assertEqual((self.target_dir / 'sub' / 'other.txt').read_text(), 'other content')
+        self.assertEqual((self.target_dir / 'sub' / 'other.txt').stat().st_mtime_ns, 1_767_268_800_000_000_000)
+        self.assertTrue(os.path.samefile(self.target_dir / 'file.txt', self.target_dir / 'sub' / 'hardlink.txt'))
+        self.assertEqual(os.readlink(self.target_dir / 'symlink'), 'file.txt')
+
+        # The target directory must be empty:
+        with self.assertRaises(SystemExit), RedirectOut() as redirected_out:
+            restore(snapshot_dir=self.snapshot_dir, target_dir=self.target_dir)
+        self.assertIn('Error: Target directory is not empty!', redirected_out.stdout)
+
+    def test_restore_paths_without_hardlinks(self):
+        with patch('PyHardLinkBackup.utilities.filesystem.fcntl', None):  # No reflinks
+            restore_result, stdout = self.call_restore(paths=('/sub',), hardlinks=False)
+        self.assertEqual(
+            restore_result,
+            RestoreResult(file_count=2, restored_size=25, copied_files=2),
+            stdout,
+        )
+        self.assertEqual(sorted_rglob_files(self.target_dir), ['sub/hardlink.txt', 'sub/other.txt'])
+        self.assertEqual((self.target_dir / 'sub' / 'hardlink.txt').read_text(), 'file content')
+        self.assertEqual((self.target_dir / 'sub' / 'hardlink.txt').stat().st_nlink, 1)
+
+    def test_verify_error(self):
+        (self.snapshot_dir / 'sub' / 'other.txt').write_text('Bit rot content')
+
+        with self.assertLogs('PyHardLinkBackup', level='ERROR') as logs:
+            restore_result, stdout = self.call_restore(verify=True)
+        self.assertEqual(restore_result.error_count, 1)
+        self.assertEqual(restore_result.verified_files, 1)
+        self.assertIn('Hash mismatch', '\n'.join(logs.output))
+        self.assertIn('Errors during restore: 1', stdout)
+
+    def test_restore_only_source_hardlinks(self):
+        content = b'X' * FileSizeDatabase.MIN_SIZE
+        (self.src_root / 'file1.bin').write_bytes(content)
+        (self.src_root / 'file2.bin').write_bytes(content)  # Same content, but a independent file
+        os.link(self.src_root / 'file1.bin', self.src_root / 'hardlink.bin')
+
+        with RedirectOut():
+            backup_result = backup_tree(
+                src_root=self.src_root,
+                backup_root=self.backup_root,
+                backup_name='other',
+                one_file_system=True,
+                excludes=(),
+                log_manager=NoopLoggingManager(),
+            )
+        # All files are deduplicated in the snapshot:
+        self.assertEqual((backup_result.backup_dir / 'file2.bin').stat().st_nlink, 3)
+
+        self.snapshot_dir = backup_result.backup_dir
+        restore_result, stdout = self.call_restore()
+        self.assertEqual((restore_result.copied_files, restore_result.hardlinked_files), (2, 1), stdout)
+        self.assertTrue(os.path.samefile(self.target_dir / 'file1.bin', self.target_dir / 'hardlink.bin'))
+        self.assertEqual((self.target_dir / 'file2.bin').stat().st_nlink, 1)
+
+        # Changing the independent file doesn't change the others:
+        (self.target_dir / 'file2.bin').write_bytes(b'modified')
+        self.assertEqual((self.target_dir / 'file1.bin').read_bytes(), content)
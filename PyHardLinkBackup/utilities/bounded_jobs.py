@@ -0,0 +1,41 @@
+import collections
+from collections.abc import Iterator
+from concurrent.futures import Future
+
+
+class BoundedJobQueue:
+    """
+    Jobs submitted to an executor, in submit order, so the results are processed in the same order.
+    The number of pending jobs is limited: Don't read the complete input into memory while the workers are busy.
+    """
+
+    def __init__(self, max_pending: int):
+        self.max_pending = max_pending
+        self.jobs = collections.deque()
+
+    def __len__(self) -> int:
+        return len(self.jobs)
+
+    def append(self, job, future: Future | None) -> None:
+        """
+        Add a submitted job. A job without a future (e.g.: nothing to hash) is processed in order, too.
+        """
+        self.jobs.append((job, future))
+
+    def iter_done(self) -> Iterator[tuple[object, Future | None]]:
+        """
+        Yield all finished jobs in submit order. If too many jobs are pending, the first job is yielded,
+        even if it's still running: The caller waits for its result, before more jobs are submitted.
+        """
+        while self.jobs:
+            future = self.jobs[0][1]
+            if len(self.jobs) <= self.max_pending and future is not None and not future.done():
+                return
+            yield self.jobs.popleft()
+
+    def iter_all(self) -> Iterator[tuple[object, Future | None]]:
+        """
+        Yield all remaining jobs in submit order, e.g.: after the last job is submitted.
+        """
+        while self.jobs:
+            yield self.jobs.popleft()
@@ -1,4 +1,7 @@
 import logging
+import os
+import threading
+from collections.abc import Iterator
 from pathlib import Path
 
 
@@ -25,6 +28,9 @@ class FileHashDatabase:
         self.base_path = phlb_conf_dir / 'hash-lookup'
         self.base_path.mkdir(parents=False, exist_ok=True)
 
+        # The database may be shared by the threads of a multi source backup:
+        self.lock = threading.RLock()
+
     def _get_hash_path(self, hash: str) -> Path:
         first_dir_name = hash[:2]
         second_dir_name = hash[2:4]
@@ -37,22 +43,50 @@ class FileHashDatabase:
 
     def get(self, hash: str) -> Path | None:
         hash_path = self._get_hash_path(hash)
+        with self.lock:
+            try:
+                rel_file_path = hash_path.read_text()
+            except FileNotFoundError:
+                return None
+            else:
+                abs_file_path = self.backup_root / rel_file_path
+                if not abs_file_path.is_file():
+                    logger.warning('Hash database entry found, but file does not exist: %s', abs_file_path)
+                    hash_path.unlink()
+                    return None
+                return abs_file_path
+
+    def lookup(self, hash: str) -> Path | None:
+        """
+        Side-effect-free variant of get(): Only the pointer file is read, stale entries are not removed.
+        """
         try:
-            rel_file_path = hash_path.read_text()
+            rel_file_path = self._get_hash_path(hash).read_text()
         except FileNotFoundError:
             return None
-        else:
-            abs_file_path = self.backup_root / rel_file_path
-            if not abs_file_path.is_file():
-                logger.warning('Hash database entry found, but file does not exist: %s', abs_file_path)
-                hash_path.unlink()
-                return None
-            return abs_file_path
+        abs_file_path = self.backup_root / rel_file_path
+        if not abs_file_path.is_file():
+            return None
+        return abs_file_path
 
     def __setitem__(self, hash: str, abs_file_path: Path):
         """
         Create or update the hash entry with the given absolute file path.
         """
         hash_path = self._get_hash_path(hash)
-        hash_path.parent.mkdir(parents=True, exist_ok=True)
-        hash_path.write_text(str(abs_file_path.relative_to(self.backup_root)))
+        with self.lock:
+            hash_path.parent.mkdir(parents=True, exist_ok=True)
+            hash_path.write_text(str(abs_file_path.relative_to(self.backup_root)))
+
+    def __delitem__(self, hash: str):
+        with self.lock:
+            self._get_hash_path(hash).unlink()
+
+    def iter_entries(self) -> Iterator[tuple[str, str]]:
+        """
+        Yield all (hash, relative file path) entries, without checking if the file exists.
+        """
+        for first_dir in sorted(os.scandir(self.base_path), key=lambda entry: entry.name):
+            for second_dir in sorted(os.scandir(first_dir.path), key=lambda entry: entry.name):
+                for hash_entry in sorted(os.scandir(second_dir.path), key=lambda entry: entry.name):
+                    yield hash_entry.name, Path(hash_entry.path).read_text()
@@ -0,0 +1,121 @@
+import logging
+import os
+from pathlib import Path
+
+from PyHardLinkBackup.utilities.file_hash_database import FileHashDatabase
+
+
+logger = logging.getLogger(__name__)
+
+
+class FileHashPool(FileHashDatabase):
+    """DocWrite: README.md ## FileHashPool
+    Optional content-addressed "pool" as hardlink anchor (activate via `phlb backup --pool`).
+    The first copy of every content is hardlinked into the pool and every snapshot file
+    is hardlinked to the pool entry. Path structure:
+            {base_dst}/.phlb/pool/{XX}/{YY}/{hash}
+
+    Notes:
+      * A lookup is just a `stat()` of the pool entry, no pointer file must be read.
+      * Deleting old snapshots never causes re-copies, because the pool keeps a hardlink to the content.
+      * The link count of a pool entry shows whether the content is still referenced by any snapshot:
+        A pool entry with only one link is not used in any snapshot anymore.
+      * Content backed up before the pool was activated is found via the "hash-lookup" database
+        and will be moved into the pool on first usage.
+      * Once the pool directory exists, all commands will use it automatically.
+    """
+
+    def __init__(self, backup_root: Path, phlb_conf_dir: Path):
+        super().__init__(backup_root, phlb_conf_dir)
+        self.pool_path = phlb_conf_dir / 'pool'
+        self.pool_path.mkdir(parents=False, exist_ok=True)
+
+    def _get_pool_path(self, hash: str) -> Path:
+        first_dir_name = hash[:2]
+        second_dir_name = hash[2:4]
+        pool_path = self.pool_path / first_dir_name / second_dir_name / hash
+        return pool_path
+
+    def __contains__(self, hash: str) -> bool:
+        pool_path = self._get_pool_path(hash)
+        if pool_path.is_file():
+            return True
+        return super().__contains__(hash)
+
+    def get(self, hash: str) -> Path | None:
+        pool_path = self._get_pool_path(hash)
+        if pool_path.is_file():
+            return pool_path
+
+        with self.lock:
+            # Fallback to content that was backed up before the pool was activated:
+            existing_path = super().get(hash)
+            if existing_path is None:
+                return None
+
+            try:
+                self._link_into_pool(existing_path, pool_path)
+            except OSError as err:
+                # e.g.: hardlink limit of the existing file reached
+                logger.warning('Can not move %s into pool: %s', existing_path, err)
+                return existing_path
+            return pool_path
+
+    def __setitem__(self, hash: str, abs_file_path: Path):
+        """
+        Create or update the pool entry, so that it's a hardlink to the given absolute file path.
+        """
+        pool_path = self._get_pool_path(hash)
+        with self.lock:
+            if pool_path.is_file() and os.path.samefile(pool_path, abs_file_path):
+                # The file was hardlinked from the pool -> nothing to do
+                return
+            self._link_into_pool(abs_file_path, pool_path)
+
+    def _link_into_pool(self, abs_file_path: Path, pool_path: Path) -> None:
+        logger.debug('Link %s into pool: %s', abs_file_path, pool_path)
+        pool_path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Replace a maybe existing entry atomically:
+        temp_path = pool_path.with_name(f'{pool_path.name}.tmp')
+        temp_path.unlink(missing_ok=True)
+        os.link(abs_file_path, temp_path)
+        os.replace(temp_path, pool_path)
+
+    def remove_unused(self) -> tuple[int, int]:
+        """
+        Remove all pool entries that are not used in any snapshot (only one link left).
+        Returns the number of removed entries and the freed disk space in Bytes.
+        """
+        removed_count = 0
+        freed_size = 0
+        for dir_path, dir_names, file_names in os.walk(self.pool_path):
+            for file_name in file_names:
+                pool_path = Path(dir_path) / file_name
+                pool_stat = pool_path.stat()
+                if pool_stat.st_nlink == 1:
+                    logger.info('Remove unused pool entry: %s', pool_path)
+                    pool_path.unlink()
+                    removed_count += 1
+                    freed_size += pool_stat.st_blocks * 512
+        return removed_count, freed_size
+
+    def link_count(self, hash: str) -> int:
+        """
+        Returns the number of hardlinks to the pool entry (The pool entry itself included).
+        Returns 0 if the hash is not in the pool.
+        """
+        pool_path = self._get_pool_path(hash)
+        try:
+            return pool_path.stat().st_nlink
+        except FileNotFoundError:
+            return 0
+
+
+def get_hash_db(backup_root: Path, phlb_conf_dir: Path, *, pool: bool = False) -> FileHashDatabase:
+    """
+    Returns the FileHashPool if requested or if the pool was activated before, otherwise the FileHashDatabase.
+    """
+    if pool or (phlb_conf_dir / 'pool').is_dir():
+        return FileHashPool(backup_root, phlb_conf_dir)
+    return FileHashDatabase(backup_root, phlb_conf_dir)
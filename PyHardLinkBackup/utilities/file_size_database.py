@@ -43,4 +43,4 @@ class FileSizeDatabase:
 
             """DocWrite: README.md ## FileSizeDatabase
             All files are created empty, as we only care about their existence."""
-            size_path.touch(exist_ok=False)
+            size_path.touch(exist_ok=True)  # The same size may be added concurrently by a other thread
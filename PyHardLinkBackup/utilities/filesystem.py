@@ -1,9 +1,12 @@
+import collections
+import errno
 import hashlib
 import logging
 import os
 import shutil
+import stat
 import time
-from collections.abc import Iterator
+from collections.abc import Iterable, Iterator
 from pathlib import Path
 
 from bx_py_utils.path import assert_is_dir
@@ -22,6 +25,20 @@ logger = logging.getLogger(__name__)
 
 MIN_SIZE_FOR_PROGRESS_BAR = CHUNK_SIZE * 10
 
+# Windows error code if the hardlink limit of a file is reached:
+ERROR_TOO_MANY_LINKS = 1142
+
+# Needed on Windows to avoid newline translation of raw file descriptors:
+O_BINARY = getattr(os, 'O_BINARY', 0)
+
+try:
+    import fcntl
+except ImportError:  # e.g.: Windows
+    fcntl = None
+
+# Linux ioctl to create a reflink (copy-on-write clone of the file content, e.g.: btrfs, XFS):
+FICLONE = 0x40049409
+
 
 def verbose_path_stat(path: Path) -> os.stat_result:
     stat_result = path.stat()
@@ -114,6 +131,110 @@ def copy_and_hash(src: Path, dst: Path, progress: DisplayFileTreeProgress, total
     return file_hash
 
 
+def fast_copy_file(src: Path, dst: Path) -> str:
+    """
+    Copy the file content without passing it through user space, if possible:
+     1. reflink: Copy-on-write clone, if the filesystem supports it
+     2. copy_file_range: In-kernel copy (e.g.: server side copy on NFS)
+     3. read/write fallback
+    The metadata is not copied. Returns the used copy method.
+    """
+    with src.open('rb') as source_file, dst.open('wb') as dst_file:
+        src_fd = source_file.fileno()
+        dst_fd = dst_file.fileno()
+        if fcntl is not None:
+            try:
+                fcntl.ioctl(dst_fd, FICLONE, src_fd)
+            except OSError as err:
+                logger.debug('Reflink %s to %s not possible: %s', src, dst, err)
+            else:
+                return 'reflink'
+
+        if hasattr(os, 'copy_file_range'):
+            try:
+                while os.copy_file_range(src_fd, dst_fd, CHUNK_SIZE):
+                    pass
+            except OSError as err:
+                # e.g.: Not supported by the filesystem or cross-filesystem copy on older kernels
+                logger.debug('copy_file_range %s to %s not possible: %s', src, dst, err)
+                source_file.seek(0)
+                dst_file.seek(0)
+                dst_file.truncate()
+            else:
+                return 'copy_file_range'
+
+        shutil.copyfileobj(source_file, dst_file, CHUNK_SIZE)
+    return 'read/write'
+
+
+def read_small_file(src: Path, src_stat: os.stat_result) -> bytes:
+    """
+    Read a small file with as few syscalls as possible on a raw file descriptor:
+    The first read() requests the complete file, it's read until EOF to handle short reads and grown files.
+    """
+    chunks = []
+    read_size = src_stat.st_size + 1
+    src_fd = os.open(src, os.O_RDONLY | O_BINARY)
+    try:
+        while chunk := os.read(src_fd, read_size):
+            chunks.append(chunk)
+            read_size = CHUNK_SIZE
+    finally:
+        os.close(src_fd)
+    return b''.join(chunks)
+
+
+def write_small_file(dst: Path, content: bytes, src_stat: os.stat_result) -> None:
+    """
+    Write a small file on a raw file descriptor and set the metadata (permission bits, time stamps)
+    from the given source stat result, so no extra stat() of the source file is needed.
+    """
+    dst_fd = os.open(dst, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | O_BINARY, 0o600)
+    try:
+        data = memoryview(content)
+        while data:
+            data = data[os.write(dst_fd, data) :]
+    finally:
+        os.close(dst_fd)
+
+    os.chmod(dst, stat.S_IMODE(src_stat.st_mode))
+    os.utime(dst, ns=(src_stat.st_atime_ns, src_stat.st_mtime_ns))
+
+
+def copy_small_file(src: Path, dst: Path, src_stat: os.stat_result) -> str:
+    """
+    Copy and hash a small file with as few syscalls as possible, see read_small_file() and write_small_file().
+    No progress bar is used and the metadata (permission bits, time stamps) is set from the given source stat result.
+    """
+    content = read_small_file(src, src_stat)
+    write_small_file(dst, content, src_stat)
+
+    file_hash = hashlib.new(HASH_ALGO, content).hexdigest()
+    logger.debug('%s copied to %s with %s hash: %s', src, dst, HASH_ALGO, file_hash)
+    return file_hash
+
+
+def is_too_many_links_error(err: OSError) -> bool:
+    return err.errno == errno.EMLINK or getattr(err, 'winerror', None) == ERROR_TOO_MANY_LINKS
+
+
+def hardlink_or_copy(existing_path: Path, dst_path: Path) -> bool:
+    """
+    Hardlink the existing file to the destination.
+    If the hardlink limit of the existing file is reached (e.g.: 65000 on ext4), copy it instead.
+    Returns False if the file was copied, so the caller can use the copy as new hardlink "master".
+    """
+    try:
+        os.link(existing_path, dst_path)
+    except OSError as err:
+        if not is_too_many_links_error(err):
+            raise
+        logger.warning('Hardlink limit reached for %s (%s) -> copy it to %s', existing_path, err, dst_path)
+        shutil.copyfile(existing_path, dst_path)
+        return False
+    return True
+
+
 def read_and_hash_file(path: Path) -> tuple[bytes, str]:
     logger.debug('Read and hash file %s using %s into RAM', path, HASH_ALGO)
     content = path.read_bytes()
@@ -171,6 +292,108 @@ def iter_scandir_files(
                 yield entry
 
 
+def _is_included_dir(entry: os.DirEntry, *, one_file_system: bool, src_device_id, excludes: set[str]) -> bool:
+    if entry.name in excludes:
+        logger.debug('Excluding directory %s', entry.path)
+        return False
+    if one_file_system:
+        try:
+            entry_device_id = entry.stat(follow_symlinks=False).st_dev
+        except OSError as err:
+            logger.debug('Skipping directory %s: %s', entry.path, err)
+            return False
+        if entry_device_id != src_device_id:
+            logger.debug('Skipping directory %s: different device ID %s', entry.path, entry_device_id)
+            return False
+    return True
+
+
+def iter_scandir_pairs(
+    *,
+    src_path: Path | None,
+    dst_path: Path | None,
+    one_file_system: bool,
+    src_device_id,
+    excludes: set[str],
+    rel_path: str = '',
+) -> Iterator[tuple[str, os.DirEntry | None, os.DirEntry | None]]:
+    """
+    Walk two directory trees in lockstep and yield (relative path, source entry, destination entry)
+    for all files+symlinks. The entry is None, if the file doesn't exist in one of the trees.
+    Entries are sorted by name in every directory, only one directory of each tree is held in memory.
+    Note: Directory symlinks are treated as files (not recursed into).
+    The "one_file_system" and "excludes" arguments are only applied to the source tree.
+    """
+
+    def scandir_dict(path: Path | None) -> dict[str, os.DirEntry]:
+        if path is None:
+            return {}
+        with os.scandir(path) as scandir_iterator:
+            return {entry.name: entry for entry in scandir_iterator}
+
+    src_entries = scandir_dict(src_path)
+    dst_entries = scandir_dict(dst_path)
+    for name in sorted(src_entries.keys() | dst_entries.keys()):
+        src_entry = src_entries.get(name)
+        dst_entry = dst_entries.get(name)
+
+        src_dir_path = None
+        if src_entry is not None and src_entry.is_dir(follow_symlinks=False):
+            if not _is_included_dir(
+                src_entry, one_file_system=one_file_system, src_device_id=src_device_id, excludes=excludes
+            ):
+                src_entry = None
+            else:
+                src_dir_path = Path(src_entry.path)
+
+        dst_dir_path = None
+        if dst_entry is not None and dst_entry.is_dir(follow_symlinks=False):
+            dst_dir_path = Path(dst_entry.path)
+
+        entry_rel_path = f'{rel_path}{name}'
+        if src_dir_path or dst_dir_path:
+            # A file on one side and a directory on the other side? -> Yield the file alone:
+            if src_entry is not None and src_dir_path is None:
+                yield entry_rel_path, src_entry, None
+            if dst_entry is not None and dst_dir_path is None:
+                yield entry_rel_path, None, dst_entry
+
+            yield from iter_scandir_pairs(
+                src_path=src_dir_path,
+                dst_path=dst_dir_path,
+                one_file_system=one_file_system,
+                src_device_id=src_device_id,
+                excludes=excludes,
+                rel_path=f'{entry_rel_path}/',
+            )
+        elif src_entry is not None or dst_entry is not None:
+            yield entry_rel_path, src_entry, dst_entry
+
+
+def iter_listed_files(*, path: Path, rel_paths: Iterable[str]) -> Iterator[os.DirEntry]:
+    """
+    Yield the entries of all given relative file paths, sorted by directory and name.
+    Every directory is scanned only once. Not existing files are logged and skipped.
+    """
+    names_per_dir = collections.defaultdict(set)
+    for rel_path in rel_paths:
+        dir_name, _, name = rel_path.rpartition('/')
+        names_per_dir[dir_name].add(name)
+
+    for dir_name in sorted(names_per_dir):
+        names = names_per_dir[dir_name]
+        dir_path = path / dir_name
+        entries = []
+        try:
+            with os.scandir(dir_path) as scandir_iterator:
+                entries = [entry for entry in scandir_iterator if entry.name in names]
+        except FileNotFoundError:
+            pass
+        for name in sorted(names - {entry.name for entry in entries}):
+            logger.warning('Listed file not found: %s', dir_path / name)
+        yield from sorted(entries, key=lambda entry: entry.name)
+
+
 def humanized_fs_scan(
     *,
     path: Path,
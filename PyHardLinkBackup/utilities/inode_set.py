@@ -0,0 +1,213 @@
+import bisect
+import collections
+import heapq
+import itertools
+import logging
+import mmap
+import tempfile
+from array import array
+from collections.abc import Iterable
+from pathlib import Path
+
+
+logger = logging.getLogger(__name__)
+
+
+class MappedRun:
+    """
+    A sorted run of inode numbers, spilled to disk and accessed via mmap.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        with path.open('rb') as f:
+            self.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.values = memoryview(self.mmap).cast('Q')
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def close(self) -> None:
+        self.values.release()
+        self.mmap.close()
+        self.path.unlink()
+
+
+class InodeSet:
+    """DocWrite: README.md ## InodeSet
+    `phlb rebuild` must remember every seen inode, to process hardlinked files only once.
+    A Python `set` needs about 60-70 Bytes per inode, so the `InodeSet` is used instead:
+    It stores `(st_dev, st_ino)` pairs in sorted `array('Q')` runs per device, so only 8 Bytes per inode are needed.
+
+    Notes:
+      * New inodes are collected in a small set and merged into a sorted run, if it's full.
+      * Runs of similar size are merged, so only a few runs must be searched via bisect.
+      * If the runs need more memory than the cap, the largest runs are spilled to temporary files (mmap'ed).
+    """
+
+    DELTA_MAX_SIZE = 100_000  # Max. inodes in the delta set, before they are merged into a sorted run
+    DEFAULT_MAX_MEMORY = 256 * 1024 * 1024  # Spill sorted runs to disk, if they need more memory
+    WRITE_CHUNK_SIZE = 64 * 1024  # Number of inodes written at once to a spill file
+
+    def __init__(self, *, max_memory: int = DEFAULT_MAX_MEMORY):
+        self.max_memory = max_memory
+        self.deltas: dict[int, set[int]] = collections.defaultdict(set)  # device -> inodes, not merged yet
+        self.runs: dict[int, list[array | MappedRun]] = collections.defaultdict(list)  # device -> sorted runs
+        self.count = 0
+        self.memory_usage = 0  # Bytes used by all in-memory runs
+        self.temp_dir: tempfile.TemporaryDirectory | None = None
+        self.spill_count = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __contains__(self, key: tuple[int, int]) -> bool:
+        dev, ino = key
+        if ino in self.deltas.get(dev, ()):
+            return True
+        for run in self.runs.get(dev, ()):
+            values = run.values if isinstance(run, MappedRun) else run
+            index = bisect.bisect_left(values, ino)
+            if index < len(values) and values[index] == ino:
+                return True
+        return False
+
+    def add(self, key: tuple[int, int]) -> bool:
+        """
+        Add the (device, inode) pair. Returns False, if it was already in the set.
+        """
+        if key in self:
+            return False
+        dev, ino = key
+        delta = self.deltas[dev]
+        delta.add(ino)
+        self.count += 1
+        if len(delta) >= self.DELTA_MAX_SIZE:
+            self._flush(dev)
+        return True
+
+    def _flush(self, dev: int) -> None:
+        runs = self.runs[dev]
+        run = array('Q', sorted(self.deltas.pop(dev)))
+        self.memory_usage += run.itemsize * len(run)
+        runs.append(run)
+
+        # Merge runs of similar size, so the number of runs stays logarithmic:
+        while len(runs) >= 2 and len(runs[-2]) <= len(runs[-1]) * 2:
+            newer_run = runs.pop()
+            older_run = runs.pop()
+            runs.append(self._merge(older_run, newer_run))
+
+        while self.memory_usage > self.max_memory:
+            self._spill_largest_run()
+
+    def _iter_values(self, run: array | MappedRun) -> Iterable[int]:
+        return run.values if isinstance(run, MappedRun) else run
+
+    def _release(self, run: array | MappedRun) -> None:
+        if isinstance(run, MappedRun):
+            run.close()
+        else:
+            self.memory_usage -= run.itemsize * len(run)
+
+    def _merge(self, run1: array | MappedRun, run2: array | MappedRun) -> array | MappedRun:
+        # The runs are disjoint, because add() checks the membership first.
+        merged_values = heapq.merge(self._iter_values(run1), self._iter_values(run2))
+        if (len(run1) + len(run2)) * 8 > self.max_memory // 2:
+            merged_run = self._write_run(merged_values)
+        else:
+            merged_run = array('Q', merged_values)
+            self.memory_usage += merged_run.itemsize * len(merged_run)
+        self._release(run1)
+        self._release(run2)
+        return merged_run
+
+    def _write_run(self, values: Iterable[int]) -> MappedRun:
+        if self.temp_dir is None:
+            self.temp_dir = tempfile.TemporaryDirectory(prefix='phlb-inodes-')
+        self.spill_count += 1
+        path = Path(self.temp_dir.name) / f'run-{self.spill_count}.bin'
+        logger.debug('Spill sorted inode run to %s', path)
+        with path.open('wb') as f:
+            for chunk in itertools.batched(values, self.WRITE_CHUNK_SIZE):
+                array('Q', chunk).tofile(f)
+        return MappedRun(path)
+
+    def _spill_largest_run(self) -> None:
+        dev, index, run = max(
+            (
+                (dev, index, run)
+                for dev, runs in self.runs.items()
+                for index, run in enumerate(runs)
+                if isinstance(run, array)
+            ),
+            key=lambda item: len(item[2]),
+        )
+        self.runs[dev][index] = self._write_run(run)
+        self._release(run)
+
+    def close(self) -> None:
+        for runs in self.runs.values():
+            for run in runs:
+                if isinstance(run, MappedRun):
+                    run.close()
+        self.runs.clear()
+        self.deltas.clear()
+        self.memory_usage = 0
+        if self.temp_dir is not None:
+            self.temp_dir.cleanup()
+            self.temp_dir = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class InodeHashes:
+    """
+    Hashes of already processed inodes with hardlinks, used to verify all hardlink siblings without reading them.
+    An entry is removed, if all hardlinks (by "st_nlink") of the inode are processed, to keep the memory usage low.
+
+    Not all hardlinks are always processed (e.g.: the pool entry in ".phlb" or snapshots outside of the walk),
+    so the number of entries is capped: The least recently used entries are dropped (LRU).
+    A dropped inode is just hashed again, if a other hardlink of it is found later.
+    """
+
+    DEFAULT_MAX_ENTRIES = 500_000  # About 250 Bytes per entry -> ~125 MiB
+
+    def __init__(self, *, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        # (dev, ino) -> (hash digest, number of not processed hardlinks), in least recently used order:
+        self.entries: collections.OrderedDict[tuple[int, int], tuple[bytes, int]] = collections.OrderedDict()
+        self.evicted_count = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, inode: tuple[int, int]) -> str | None:
+        entry = self.entries.get(inode)
+        if entry is None:
+            return None
+        self.entries.move_to_end(inode)
+        return entry[0].hex()
+
+    def processed(self, inode: tuple[int, int], *, file_hash: str, nlink: int) -> None:
+        """
+        Count one processed hardlink of the inode.
+        """
+        entry = self.entries.get(inode)
+        if entry is None:
+            digest, remaining_links = bytes.fromhex(file_hash), nlink
+        else:
+            digest, remaining_links = entry
+        remaining_links -= 1
+        if remaining_links > 0:
+            self.entries[inode] = (digest, remaining_links)
+            self.entries.move_to_end(inode)
+            if len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evicted_count += 1
+        elif entry is not None:
+            del self.entries[inode]
@@ -0,0 +1,179 @@
+import dataclasses
+import gzip
+import heapq
+import json
+import logging
+import os
+import tempfile
+from collections.abc import Iterator
+from pathlib import Path
+
+from PyHardLinkBackup.utilities.sha256sums import read_sha256sums
+
+
+logger = logging.getLogger(__name__)
+
+
+def get_manifest_path(snapshot_dir: Path) -> Path:
+    """
+    >>> get_manifest_path(Path('backups/foobar/2026-01-01-120000'))
+    PosixPath('backups/foobar/2026-01-01-120000-manifest.jsonl.gz')
+    """
+    return snapshot_dir.parent / f'{snapshot_dir.name}-manifest.jsonl.gz'
+
+
+@dataclasses.dataclass
+class ManifestEntry:
+    path: str  # Relative to the snapshot directory
+    size: int
+    mtime_ns: int
+    mode: int
+    inode: int
+    sha256: str | None  # None for symlinks
+    src_inode: str | None = None  # "{st_dev}:{st_ino}" of the source file, only if the source file has hardlinks
+
+
+MANIFEST_FIELDS = tuple(field.name for field in dataclasses.fields(ManifestEntry))
+
+
+class ManifestWriter:
+    """DocWrite: README.md ## Manifest
+    Every backup writes one compressed manifest file next to the snapshot:
+     * `{base_dst}/{backup name}/{timestamp}-manifest.jsonl.gz`
+
+    It contains one JSON line per backup file, sorted by the relative path, e.g.:
+    ```
+    {"path": "foo/bar.txt", "size": 1234, "mtime_ns": 1767268800000000000, "mode": 33188, "inode": 123, "sha256": "…"}
+    ```
+    So information about a snapshot can be read sequentially from one file, instead of walking the whole tree.
+    Files that had several hardlinks in the source, get a additional `"src_inode": "{st_dev}:{st_ino}"` field
+    of the source file. Because `phlb backup` hardlinks all files with the same content, only this field shows
+    which files were hardlinked in the source.
+
+    Notes:
+      * The entries are collected while the backup runs, no extra walk or `SHA256SUMS` read is needed.
+      * To sort the entries with bounded memory, sorted runs are spilled to temporary files and merged at the end.
+      * The manifest is only written, if the backup completed: It marks the snapshot as complete.
+        An interrupted backup has no manifest, and its spilled runs are removed.
+      * `size`, `mtime_ns`, `mode` and `inode` are taken from the backup file, not from the source file.
+    """
+
+    RUN_MAX_SIZE = 100_000  # Max. entries in memory, before they are spilled as a sorted run
+
+    def __init__(self, snapshot_dir: Path):
+        self.snapshot_dir = snapshot_dir
+        self.manifest_path = get_manifest_path(snapshot_dir)
+        self.entries: list[tuple] = []
+        self.run_paths: list[Path] = []
+        self.temp_dir: tempfile.TemporaryDirectory | None = None
+        self.count = 0
+
+    def add(self, dst_path: Path, file_hash: str | None, src_inode: str | None = None) -> None:
+        dst_stat = dst_path.stat(follow_symlinks=False)
+        self.entries.append(
+            (
+                str(dst_path.relative_to(self.snapshot_dir)),
+                dst_stat.st_size,
+                dst_stat.st_mtime_ns,
+                dst_stat.st_mode,
+                dst_stat.st_ino,
+                file_hash,
+                src_inode,
+            )
+        )
+        self.count += 1
+        if len(self.entries) >= self.RUN_MAX_SIZE:
+            self._spill()
+
+    def _spill(self) -> None:
+        if self.temp_dir is None:
+            self.temp_dir = tempfile.TemporaryDirectory(prefix='phlb-manifest-')
+        run_path = Path(self.temp_dir.name) / f'run-{len(self.run_paths)}.jsonl'
+        logger.debug('Spill sorted manifest run to %s', run_path)
+        self.entries.sort()
+        with run_path.open('w', encoding='utf-8') as f:
+            for entry in self.entries:
+                f.write(json.dumps(entry))
+                f.write('\n')
+        self.entries.clear()
+        self.run_paths.append(run_path)
+
+    def _iter_run(self, run_path: Path) -> Iterator[tuple]:
+        with run_path.open('r', encoding='utf-8') as f:
+            for line in f:
+                yield tuple(json.loads(line))
+
+    def close(self) -> None:
+        """
+        Merge all sorted runs and write the manifest file.
+        """
+        self.entries.sort()
+        runs = [self._iter_run(run_path) for run_path in self.run_paths]
+        temp_path = self.manifest_path.with_name(f'{self.manifest_path.name}.tmp')
+        try:
+            with gzip.open(temp_path, 'wt', encoding='utf-8', compresslevel=6) as f:
+                for entry in heapq.merge(self.entries, *runs):
+                    entry = dict(zip(MANIFEST_FIELDS, entry))
+                    if entry['src_inode'] is None:
+                        del entry['src_inode']  # Only stored for source files with hardlinks
+                    f.write(json.dumps(entry))
+                    f.write('\n')
+            os.replace(temp_path, self.manifest_path)
+        finally:
+            self.cleanup()
+        logger.info('Manifest with %i entries created: %s', self.count, self.manifest_path)
+
+    def cleanup(self) -> None:
+        """
+        Remove all collected entries and the spilled runs, without writing the manifest file.
+        """
+        self.entries.clear()
+        self.run_paths.clear()
+        if self.temp_dir is not None:
+            self.temp_dir.cleanup()
+            self.temp_dir = None
+
+
+def iter_manifest(snapshot_dir: Path) -> Iterator[ManifestEntry]:
+    """
+    Yield all entries of the manifest file of the given snapshot, sorted by the relative path.
+    Raises FileNotFoundError if the snapshot has no manifest (e.g.: created by an old version).
+    """
+    with gzip.open(get_manifest_path(snapshot_dir), 'rt', encoding='utf-8') as f:
+        for line in f:
+            yield ManifestEntry(**json.loads(line))
+
+
+def iter_snapshot_entries(snapshot_dir: Path) -> Iterator[ManifestEntry]:
+    """
+    Yield all entries of the snapshot: Read from the manifest file, if it exists.
+    Otherwise (e.g.: created by an old version) the snapshot tree is walked and the hashes
+    are taken from the SHA256SUMS files. Note: Only the manifest entries are sorted by path!
+    """
+    try:
+        yield from iter_manifest(snapshot_dir)
+    except FileNotFoundError:
+        logger.info('No manifest found for %s -> walk the snapshot tree', snapshot_dir)
+    else:
+        return
+
+    for dir_path, dir_names, file_names in os.walk(snapshot_dir):
+        dir_path = Path(dir_path)
+        hashes = read_sha256sums(dir_path / 'SHA256SUMS')
+        for name in dir_names:
+            if (dir_path / name).is_symlink():
+                # Directory symlinks are not followed by os.walk(), handle them as files:
+                file_names.append(name)
+        for name in file_names:
+            if name == 'SHA256SUMS':
+                continue
+            file_path = dir_path / name
+            file_stat = file_path.stat(follow_symlinks=False)
+            yield ManifestEntry(
+                path=str(file_path.relative_to(snapshot_dir)),
+                size=file_stat.st_size,
+                mtime_ns=file_stat.st_mtime_ns,
+                mode=file_stat.st_mode,
+                inode=file_stat.st_ino,
+                sha256=hashes.get(name),
+            )
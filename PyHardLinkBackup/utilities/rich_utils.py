@@ -170,12 +170,12 @@ class LargeFileProgress:
 
     def __enter__(self):
         is_large_file = self.total_size > LAGE_FILE_PROGRESS_MIN_SIZE
-        if is_large_file:
+        if is_large_file and not isinstance(self.parent_progress, NoopProgress):
             self.start_time = time.monotonic()
             self.next_update = self.start_time + 1
             self.advance = 0
         else:
-            # No progress indicator for small files
+            # No progress indicator for small files (or without a parent progress, e.g.: in worker threads)
             self.next_update = None
         return self
 
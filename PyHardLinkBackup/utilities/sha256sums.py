@@ -1,4 +1,6 @@
+import functools
 import logging
+from collections.abc import Callable
 from pathlib import Path
 
 
@@ -30,6 +32,34 @@ def store_hash(file_path: Path, file_hash: str):
         f.write(f'{file_hash}  {file_path.name}\n')
 
 
+def read_sha256sums(hash_file_path: Path) -> dict[str, str]:
+    """
+    Returns all entries of a SHA256SUMS file as a {filename: hash} dict.
+    Returns an empty dict if the SHA256SUMS file does not exist.
+    """
+    hashes = {}
+    if not hash_file_path.is_file():
+        return hashes
+
+    with hash_file_path.open('r') as f:
+        for line in f:
+            file_hash, separator, filename = line.rstrip('\n').partition(' ')
+            if not separator or not filename:
+                logger.error(f'Invalid line in "{hash_file_path}": {line!r}')
+                continue
+            # Skip the mode character: " " for text mode or "*" for binary mode
+            hashes[filename[1:]] = file_hash
+    return hashes
+
+
+def get_cached_sha256sums_reader() -> Callable[[Path], dict[str, str]]:
+    """
+    Returns a cached read_sha256sums() for one run:
+    Only the last SHA256SUMS files are needed, because the files are processed directory by directory.
+    """
+    return functools.lru_cache(maxsize=100)(read_sha256sums)
+
+
 def check_sha256sums(
     *,
     file_path: Path,
@@ -0,0 +1,156 @@
+import logging
+import os
+import struct
+import threading
+from collections.abc import Iterator
+from pathlib import Path
+
+
+logger = logging.getLogger(__name__)
+
+
+class SmallFileIndex:
+    """DocWrite: README.md ## SmallFileIndex
+    Optional deduplication of small files (activate via `phlb backup --dedupe-small-files`).
+    Files below the FileSizeDatabase minimum size are normally copied into every backup.
+    With this option, they are hardlinked to an existing backup file with the same content, too.
+
+    The small files are not stored in the "hash-lookup" database, to avoid millions of tiny lookup files.
+    Instead, a single packed index file is used:
+     * `{base_dst}/.phlb/small-file-index.bin`
+
+    Notes:
+      * The index will be loaded completely into memory (hash digest -> relative path).
+      * New entries are appended to the index file, it's compacted if too many records are outdated.
+      * Small files are hashed in one read. Combined with `--hash-cache`, unmodified files are not read at all.
+    """
+
+    MAGIC = b'PHLB-SFI1\n'
+    RECORD_HEADER = struct.Struct('<32sH')  # hash digest, length of the relative path
+
+    COMPACT_MIN_STALE = 1000  # Don't rewrite the index file for only a few outdated records
+    COMPACT_STALE_RATIO = 0.25  # Compact if more than 25% of all records are outdated
+
+    def __init__(self, backup_root: Path, phlb_conf_dir: Path):
+        self.backup_root = backup_root
+        self.index_path = phlb_conf_dir / 'small-file-index.bin'
+
+        self.record_count = 0  # Number of all records in the index file
+        self.entries: dict[bytes, str] = {}  # hash digest -> relative path
+        self.pending = bytearray()  # New records, not written to the index file yet
+        self.lock = threading.Lock()  # The index may be shared by the threads of a multi source backup
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            data = self.index_path.read_bytes()
+        except FileNotFoundError:
+            return
+
+        if not data.startswith(self.MAGIC):
+            logger.warning('Ignore invalid small file index: %s', self.index_path)
+            self.index_path.unlink()
+            return
+
+        pos = len(self.MAGIC)
+        header_size = self.RECORD_HEADER.size
+        while pos + header_size <= len(data):
+            digest, path_length = self.RECORD_HEADER.unpack_from(data, pos)
+            pos += header_size
+            if pos + path_length > len(data):
+                # Ignore a incomplete last record (e.g.: an aborted backup)
+                break
+            self.entries[digest] = data[pos : pos + path_length].decode('utf-8', errors='surrogateescape')
+            pos += path_length
+            self.record_count += 1
+        logger.info(
+            'Small file index %s loaded: %i entries (%i records)',
+            self.index_path,
+            len(self.entries),
+            self.record_count,
+        )
+
+    def __contains__(self, hash: str) -> bool:
+        return bytes.fromhex(hash) in self.entries
+
+    def get(self, hash: str) -> Path | None:
+        digest = bytes.fromhex(hash)
+        with self.lock:
+            rel_file_path = self.entries.get(digest)
+            if rel_file_path is None:
+                return None
+
+            abs_file_path = self.backup_root / rel_file_path
+            if not abs_file_path.is_file():
+                logger.warning('Small file index entry found, but file does not exist: %s', abs_file_path)
+                del self.entries[digest]
+                return None
+            return abs_file_path
+
+    def __setitem__(self, hash: str, abs_file_path: Path):
+        """
+        Create or update the index entry with the given absolute file path.
+        """
+        digest = bytes.fromhex(hash)
+        rel_file_path = str(abs_file_path.relative_to(self.backup_root))
+        with self.lock:
+            self.entries[digest] = rel_file_path
+            self.pending += self._pack(digest, rel_file_path)
+            self.record_count += 1
+
+    def __delitem__(self, hash: str):
+        """
+        Remove the entry. Note: Only stored on disk by compact()
+        """
+        with self.lock:
+            del self.entries[bytes.fromhex(hash)]
+
+    def iter_entries(self) -> Iterator[tuple[str, str]]:
+        """
+        Yield all (hash, relative file path) entries, without checking if the file exists.
+        """
+        for digest, rel_file_path in list(self.entries.items()):
+            yield digest.hex(), rel_file_path
+
+    def _pack(self, digest: bytes, rel_file_path: str) -> bytes:
+        encoded_path = rel_file_path.encode('utf-8', errors='surrogateescape')
+        return self.RECORD_HEADER.pack(digest, len(encoded_path)) + encoded_path
+
+    @property
+    def stale_count(self) -> int:
+        return self.record_count - len(self.entries)
+
+    def close(self) -> None:
+        stale_count = self.stale_count
+        if stale_count >= self.COMPACT_MIN_STALE and stale_count > self.record_count * self.COMPACT_STALE_RATIO:
+            self.compact()
+        elif self.pending:
+            with self.index_path.open('ab') as f:
+                if f.tell() == 0:
+                    f.write(self.MAGIC)
+                f.write(self.pending)
+        self.pending.clear()
+
+    def compact(self) -> None:
+        """
+        Rewrite the index file with the current entries, so all outdated records are removed.
+        """
+        logger.info(
+            'Compact small file index %s: remove %i outdated records, keep %i entries',
+            self.index_path,
+            self.stale_count,
+            len(self.entries),
+        )
+        temp_path = self.index_path.with_name(f'{self.index_path.name}.tmp')
+        with temp_path.open('wb') as f:
+            f.write(self.MAGIC)
+            for digest, rel_file_path in self.entries.items():
+                f.write(self._pack(digest, rel_file_path))
+        os.replace(temp_path, self.index_path)
+        self.record_count = len(self.entries)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,223 @@
+import dataclasses
+import logging
+import sqlite3
+from collections.abc import Iterator
+from pathlib import Path
+
+from PyHardLinkBackup.utilities.manifest import get_manifest_path, iter_snapshot_entries
+from PyHardLinkBackup.utilities.snapshots import iter_snapshot_dirs
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclasses.dataclass
+class IndexedFile:
+    backup_name: str
+    timestamp: str
+    path: str  # Relative to the snapshot directory
+    size: int
+    mtime_ns: int
+    inode: int
+    sha256: str | None  # None for symlinks or files without a SHA256SUMS entry
+
+    @property
+    def version_key(self) -> tuple:
+        """
+        Identical content: Same hash or (without a hash) the same inode, because hardlinks share the content.
+        """
+        if self.sha256:
+            return ('sha256', self.sha256)
+        return ('inode', self.inode)
+
+
+def get_manifest_mtime_ns(snapshot_dir: Path) -> int | None:
+    try:
+        return get_manifest_path(snapshot_dir).stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+class SnapshotIndex:
+    """DocWrite: README.md ## history
+    `phlb history <backup-directory> <path>` lists all versions of one file over all snapshots
+    and `phlb find <backup-directory> <glob|hash>` searches files by a glob pattern or a SHA256 hash.
+
+    Both commands use an index of all snapshots, stored in a SQLite database:
+     * `{base_dst}/.phlb/snapshot-index.sqlite`
+
+    The index is updated automatically before every query: New snapshots are added and deleted snapshots removed.
+    The entries are read from the snapshot manifest files, so no snapshot tree must be walked.
+    (Only snapshots without a manifest, created by an old version, are walked once.)
+    The modification time of the manifest is stored, too: A snapshot is indexed again, if its manifest
+    is created or changed later. e.g.: A snapshot of a running backup is indexed from its partial tree
+    and indexed again from the manifest, after the backup is finished.
+    Every relative path is stored only once, the files table references it by id.
+    The file name is stored in a separate indexed column: A glob pattern without "/" is matched against it.
+    Note: A pattern with a leading wildcard (e.g.: `*.txt`) can't use a index and scans all (distinct) paths.
+
+    Identical versions are collapsed: Files with the same hash (or the same inode, if no hash is known)
+    in consecutive snapshots are shown as one version.
+    """
+
+    SCHEMA_VERSION = 2  # The index is created again, if the stored version differs
+
+    def __init__(self, backup_root: Path, phlb_conf_dir: Path):
+        self.backup_root = backup_root
+        self.db_path = phlb_conf_dir / 'snapshot-index.sqlite'
+        self.connection = sqlite3.connect(self.db_path)
+        (schema_version,) = self.connection.execute('PRAGMA user_version').fetchone()
+        if schema_version != self.SCHEMA_VERSION:
+            logger.info('Create snapshot index %s (schema version %i)', self.db_path, self.SCHEMA_VERSION)
+            self.connection.executescript(
+                """
+                DROP TABLE IF EXISTS files;
+                DROP TABLE IF EXISTS paths;
+                DROP TABLE IF EXISTS snapshots;
+                """
+            )
+        self.connection.executescript(
+            f"""
+            PRAGMA journal_mode = WAL;
+            PRAGMA user_version = {self.SCHEMA_VERSION};
+            CREATE TABLE IF NOT EXISTS snapshots (
+                id INTEGER PRIMARY KEY,
+                backup_name TEXT NOT NULL,
+                timestamp TEXT NOT NULL,
+                manifest_mtime_ns INTEGER,  -- NULL if the snapshot has no manifest
+                UNIQUE (backup_name, timestamp)
+            );
+            CREATE TABLE IF NOT EXISTS paths (
+                id INTEGER PRIMARY KEY,
+                path TEXT NOT NULL UNIQUE,
+                name TEXT NOT NULL  -- The last path component
+            );
+            CREATE INDEX IF NOT EXISTS paths_name ON paths (name);
+            CREATE TABLE IF NOT EXISTS files (
+                snapshot_id INTEGER NOT NULL,
+                path_id INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                inode INTEGER NOT NULL,
+                sha256 BLOB
+            );
+            CREATE INDEX IF NOT EXISTS files_path_id ON files (path_id);
+            CREATE INDEX IF NOT EXISTS files_sha256 ON files (sha256);
+            CREATE INDEX IF NOT EXISTS files_snapshot_id ON files (snapshot_id);
+            """
+        )
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def update(self) -> tuple[int, int]:
+        """
+        Add all new (or changed) snapshots and remove deleted ones.
+        Returns the number of added and removed snapshots.
+        """
+        indexed = {
+            (backup_name, timestamp): (snapshot_id, manifest_mtime_ns)
+            for snapshot_id, backup_name, timestamp, manifest_mtime_ns in self.connection.execute(
+                'SELECT id, backup_name, timestamp, manifest_mtime_ns FROM snapshots'
+            )
+        }
+        added_count = 0
+        for snapshot_dir in iter_snapshot_dirs(self.backup_root):
+            key = (snapshot_dir.parent.name, snapshot_dir.name)
+            manifest_mtime_ns = get_manifest_mtime_ns(snapshot_dir)
+            indexed_snapshot = indexed.pop(key, None)
+            if indexed_snapshot is not None:
+                snapshot_id, indexed_mtime_ns = indexed_snapshot
+                if indexed_mtime_ns == manifest_mtime_ns:
+                    continue
+                # e.g.: The manifest was created after the snapshot was indexed from its (partial) tree
+                logger.info('Manifest of snapshot %s changed -> index it again', snapshot_dir)
+                self._remove_snapshot(snapshot_id)
+            self._add_snapshot(snapshot_dir, manifest_mtime_ns)
+            added_count += 1
+
+        # All remaining snapshots doesn't exist anymore (e.g.: pruned):
+        for (backup_name, timestamp), (snapshot_id, _) in indexed.items():
+            logger.info('Remove snapshot %s/%s from index', backup_name, timestamp)
+            self._remove_snapshot(snapshot_id)
+        return added_count, len(indexed)
+
+    def _remove_snapshot(self, snapshot_id: int) -> None:
+        with self.connection:
+            self.connection.execute('DELETE FROM files WHERE snapshot_id = ?', (snapshot_id,))
+            self.connection.execute('DELETE FROM snapshots WHERE id = ?', (snapshot_id,))
+
+    def _add_snapshot(self, snapshot_dir: Path, manifest_mtime_ns: int | None) -> None:
+        logger.info('Add snapshot %s to index', snapshot_dir)
+        # One transaction per snapshot: A aborted run never leaves a incomplete snapshot in the index.
+        with self.connection:
+            cursor = self.connection.execute(
+                'INSERT INTO snapshots (backup_name, timestamp, manifest_mtime_ns) VALUES (?, ?, ?)',
+                (snapshot_dir.parent.name, snapshot_dir.name, manifest_mtime_ns),
+            )
+            snapshot_id = cursor.lastrowid
+            self.connection.executemany(
+                """
+                INSERT INTO files (snapshot_id, path_id, size, mtime_ns, inode, sha256)
+                VALUES (?, (SELECT id FROM paths WHERE path = ?), ?, ?, ?, ?)
+                """,
+                self._iter_file_rows(snapshot_id, snapshot_dir),
+            )
+
+    def _iter_file_rows(self, snapshot_id: int, snapshot_dir: Path) -> Iterator[tuple]:
+        for entry in iter_snapshot_entries(snapshot_dir):
+            self.connection.execute(
+                'INSERT OR IGNORE INTO paths (path, name) VALUES (?, ?)',
+                (entry.path, entry.path.rpartition('/')[2]),
+            )
+            sha256 = bytes.fromhex(entry.sha256) if entry.sha256 else None
+            yield snapshot_id, entry.path, entry.size, entry.mtime_ns, entry.inode, sha256
+
+    def _query(self, where: str, parameters: tuple) -> list[IndexedFile]:
+        rows = self.connection.execute(
+            f"""
+            SELECT snapshots.backup_name, snapshots.timestamp, paths.path,
+                files.size, files.mtime_ns, files.inode, files.sha256
+            FROM files
+            JOIN snapshots ON snapshots.id = files.snapshot_id
+            JOIN paths ON paths.id = files.path_id
+            WHERE {where}
+            ORDER BY paths.path, snapshots.backup_name, snapshots.timestamp
+            """,
+            parameters,
+        )
+        return [
+            IndexedFile(
+                backup_name=backup_name,
+                timestamp=timestamp,
+                path=path,
+                size=size,
+                mtime_ns=mtime_ns,
+                inode=inode,
+                sha256=sha256.hex() if sha256 else None,
+            )
+            for backup_name, timestamp, path, size, mtime_ns, inode, sha256 in rows
+        ]
+
+    def history(self, rel_path: str) -> list[IndexedFile]:
+        """
+        All snapshot entries of the given relative path, sorted by backup name and timestamp.
+        """
+        return self._query('paths.path = ?', (rel_path,))
+
+    def find_glob(self, pattern: str) -> list[IndexedFile]:
+        """
+        All snapshot entries matching the glob pattern. A pattern without "/" matches the (indexed) file name.
+        """
+        if '/' in pattern:
+            return self._query('files.path_id IN (SELECT id FROM paths WHERE path GLOB ?)', (pattern,))
+        return self._query('files.path_id IN (SELECT id FROM paths WHERE name GLOB ?)', (pattern,))
+
+    def find_hash(self, file_hash: str) -> list[IndexedFile]:
+        return self._query('files.sha256 = ?', (bytes.fromhex(file_hash),))
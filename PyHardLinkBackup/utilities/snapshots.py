@@ -0,0 +1,125 @@
+import dataclasses
+import json
+import logging
+import os
+import re
+from collections.abc import Iterator
+from pathlib import Path
+
+from PyHardLinkBackup.utilities.filesystem import iter_scandir_files
+from PyHardLinkBackup.utilities.manifest import get_manifest_path
+
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_NAME_RE = re.compile(r'^\d{4}-\d{2}-\d{2}-\d{6}$')  # e.g.: "2026-01-17-120000"
+
+
+def iter_snapshot_dirs(backup_root: Path) -> Iterator[Path]:
+    """
+    Yield all snapshot directories: `{backup_root}/{backup name}/{timestamp}/`
+    Sorted by backup name and timestamp.
+    """
+    for name_dir in sorted(backup_root.iterdir()):
+        if name_dir.name == '.phlb' or name_dir.is_symlink() or not name_dir.is_dir():
+            continue
+        for snapshot_dir in sorted(name_dir.iterdir()):
+            if SNAPSHOT_NAME_RE.match(snapshot_dir.name) and not snapshot_dir.is_symlink() and snapshot_dir.is_dir():
+                yield snapshot_dir
+
+
+@dataclasses.dataclass
+class SnapshotFingerprint:
+    """
+    Cheap fingerprint of a snapshot: Only the snapshot directory and its manifest file are stat'ed,
+    the snapshot tree is not walked.
+    """
+
+    mtime_ns: int  # Of the snapshot directory itself
+    manifest_mtime_ns: int | None  # None, if the snapshot has no manifest (e.g.: created by an old version)
+    manifest_size: int | None
+
+
+def get_snapshot_fingerprint(snapshot_dir: Path) -> SnapshotFingerprint:
+    try:
+        manifest_stat = get_manifest_path(snapshot_dir).stat()
+    except FileNotFoundError:
+        manifest_mtime_ns = manifest_size = None
+    else:
+        manifest_mtime_ns = manifest_stat.st_mtime_ns
+        manifest_size = manifest_stat.st_size
+    return SnapshotFingerprint(
+        mtime_ns=snapshot_dir.stat().st_mtime_ns,
+        manifest_mtime_ns=manifest_mtime_ns,
+        manifest_size=manifest_size,
+    )
+
+
+def get_snapshot_size(snapshot_dir: Path) -> tuple[int, int]:
+    """
+    Walk the snapshot tree and returns the file count and the total size.
+    """
+    file_count = 0
+    total_size = 0
+    for entry in iter_scandir_files(path=snapshot_dir, one_file_system=False, src_device_id=None, excludes=set()):
+        file_count += 1
+        total_size += entry.stat(follow_symlinks=False).st_size
+    return file_count, total_size
+
+
+class IngestedSnapshots:
+    """DocWrite: README.md ## rebuild - incremental
+    A rebuild records all snapshot directories that are completely stored in the databases:
+     * `{base_dst}/.phlb/ingested-snapshots.json`
+
+    For every snapshot a cheap fingerprint is stored: The mtime of the snapshot directory
+    and the mtime and size of its manifest file. So no snapshot tree must be walked to create it.
+    `phlb rebuild --incremental` processes (and walks) only snapshots that are new or whose fingerprint has changed.
+    e.g.: After snapshots are copied from another backup destination.
+    Note: Changes deep inside a snapshot tree, that don't change the snapshot directory or its manifest,
+    are not detected. Use a normal `phlb rebuild` to verify all snapshots.
+    Note: Snapshots created by `phlb backup` are not recorded, they will be processed by the next incremental rebuild.
+    """
+
+    def __init__(self, backup_root: Path, phlb_conf_dir: Path):
+        self.backup_root = backup_root
+        self.state_path = phlb_conf_dir / 'ingested-snapshots.json'
+
+        self.fingerprints: dict[str, SnapshotFingerprint] = {}  # relative snapshot path -> fingerprint
+        try:
+            data = json.loads(self.state_path.read_text())
+        except FileNotFoundError:
+            pass
+        except ValueError as err:
+            logger.warning('Ignore invalid ingested snapshots file %s: %s', self.state_path, err)
+        else:
+            for rel_path, fingerprint in data.items():
+                try:
+                    self.fingerprints[rel_path] = SnapshotFingerprint(**fingerprint)
+                except TypeError:
+                    # Fingerprint of an old version -> process the snapshot again
+                    logger.info('Ignore outdated fingerprint of snapshot %s', rel_path)
+
+    def _rel_path(self, snapshot_dir: Path) -> str:
+        return str(snapshot_dir.relative_to(self.backup_root))
+
+    def is_ingested(self, snapshot_dir: Path, fingerprint: SnapshotFingerprint) -> bool:
+        return self.fingerprints.get(self._rel_path(snapshot_dir)) == fingerprint
+
+    def __setitem__(self, snapshot_dir: Path, fingerprint: SnapshotFingerprint):
+        self.fingerprints[self._rel_path(snapshot_dir)] = fingerprint
+
+    def retain(self, snapshot_dirs: list[Path]) -> None:
+        """
+        Forget all snapshots that doesn't exist anymore.
+        """
+        rel_paths = {self._rel_path(snapshot_dir) for snapshot_dir in snapshot_dirs}
+        self.fingerprints = {
+            rel_path: fingerprint for rel_path, fingerprint in self.fingerprints.items() if rel_path in rel_paths
+        }
+
+    def save(self) -> None:
+        data = {rel_path: dataclasses.asdict(fingerprint) for rel_path, fingerprint in self.fingerprints.items()}
+        temp_path = self.state_path.with_name(f'{self.state_path.name}.tmp')
+        temp_path.write_text(json.dumps(data, indent=2, sort_keys=True))
+        os.replace(temp_path, self.state_path)
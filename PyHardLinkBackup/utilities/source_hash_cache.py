@@ -0,0 +1,158 @@
+import logging
+import os
+import struct
+import time
+from pathlib import Path
+
+
+logger = logging.getLogger(__name__)
+
+
+class SourceHashCache:
+    """DocWrite: README.md ## SourceHashCache
+    Optional persistent cache of source file hashes (activate via `phlb backup --hash-cache`).
+    Unmodified source files are never read twice for hashing, even if they are renamed or moved.
+
+    The cache key is `(st_dev, st_ino, st_size, st_mtime_ns, st_ctime_ns)` of the source file.
+    Every backup name has its own cache file:
+     * `{base_dst}/.phlb/source-hash-cache/{backup_name}.bin`
+
+    Notes:
+      * The cache is loaded into memory and new entries are appended to the cache file.
+      * Moving or renaming directories keeps the cache entries of all files in it.
+        Note: Renaming a single file changes its `st_ctime` on most filesystems, so it will be hashed again.
+      * Entries that were not used in a backup run are "stale" and will be removed by compacting the cache file.
+      * Files modified in the last seconds before the backup starts are not cached,
+        because a following modification may not change the timestamps (coarse timestamp resolution).
+      * The hit rate is shown in the backup summary.
+    """
+
+    MAGIC = b'PHLB-SHC1\n'
+    RECORD = struct.Struct('<QQQqq32s')  # st_dev, st_ino, st_size, st_mtime_ns, st_ctime_ns, hash digest
+
+    COMPACT_MIN_STALE = 1000  # Don't rewrite the cache file for only a few stale entries
+    COMPACT_STALE_RATIO = 0.25  # Compact if more than 25% of all records are stale
+    RACY_TIME_NS = 2 * 1_000_000_000  # Don't cache files modified in the last 2 seconds before backup start
+
+    def __init__(self, phlb_conf_dir: Path, backup_name: str):
+        self.base_path = phlb_conf_dir / 'source-hash-cache'
+        self.base_path.mkdir(parents=False, exist_ok=True)
+        self.cache_path = self.base_path / f'{backup_name}.bin'
+
+        self.start_time_ns = time.time_ns()
+        self.hits = 0
+        self.misses = 0
+
+        self.record_count = 0  # Number of all records in the cache file
+        self.previous: dict[tuple[int, int, int, int, int], bytes] = {}  # Entries from cache file, not used yet
+        self.current: dict[tuple[int, int, int, int, int], bytes] = {}  # Entries used in this run
+        self.pending = bytearray()  # New records, not written to the cache file yet
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            data = self.cache_path.read_bytes()
+        except FileNotFoundError:
+            return
+
+        if not data.startswith(self.MAGIC):
+            logger.warning('Ignore invalid source hash cache file: %s', self.cache_path)
+            self.cache_path.unlink()
+            return
+
+        data = memoryview(data)[len(self.MAGIC) :]
+        # Ignore a maybe incomplete last record (e.g.: an aborted backup):
+        record_data = data[: len(data) - len(data) % self.RECORD.size]
+        for st_dev, st_ino, st_size, st_mtime_ns, st_ctime_ns, digest in self.RECORD.iter_unpack(record_data):
+            self.previous[(st_dev, st_ino, st_size, st_mtime_ns, st_ctime_ns)] = digest
+            self.record_count += 1
+        logger.info(
+            'Source hash cache %s loaded: %i entries (%i records)',
+            self.cache_path,
+            len(self.previous),
+            self.record_count,
+        )
+
+    @staticmethod
+    def _get_key(stat_result: os.stat_result) -> tuple[int, int, int, int, int]:
+        return (
+            stat_result.st_dev,
+            stat_result.st_ino,
+            stat_result.st_size,
+            stat_result.st_mtime_ns,
+            stat_result.st_ctime_ns,
+        )
+
+    def get(self, stat_result: os.stat_result) -> str | None:
+        key = self._get_key(stat_result)
+        digest = self.current.get(key)
+        if digest is None:
+            digest = self.previous.pop(key, None)
+            if digest is None:
+                self.misses += 1
+                return None
+            self.current[key] = digest
+        self.hits += 1
+        return digest.hex()
+
+    def __setitem__(self, stat_result: os.stat_result, file_hash: str):
+        key = self._get_key(stat_result)
+        if max(stat_result.st_mtime_ns, stat_result.st_ctime_ns) > self.start_time_ns - self.RACY_TIME_NS:
+            logger.debug('Do not cache hash of recently modified file: %s', key)
+            return
+
+        digest = bytes.fromhex(file_hash)
+        if self.current.get(key) == digest:
+            return
+        self.previous.pop(key, None)
+        self.current[key] = digest
+        self.pending += self.RECORD.pack(*key, digest)
+        self.record_count += 1
+
+    @property
+    def stale_count(self) -> int:
+        return self.record_count - len(self.current)
+
+    def close(self, *, compact: bool = True) -> None:
+        """
+        Write all new records to the cache file. Use compact=False if the backup run was not completed:
+        All entries of not processed files would be "stale" and removed by compacting.
+        """
+        stale_count = self.stale_count
+        if (
+            compact
+            and stale_count >= self.COMPACT_MIN_STALE
+            and stale_count > self.record_count * self.COMPACT_STALE_RATIO
+        ):
+            self.compact()
+        elif self.pending:
+            with self.cache_path.open('ab') as f:
+                if f.tell() == 0:
+                    f.write(self.MAGIC)
+                f.write(self.pending)
+        self.pending.clear()
+
+    def compact(self) -> None:
+        """
+        Rewrite the cache file with all entries used in this run, so all stale entries are removed.
+        """
+        logger.info(
+            'Compact source hash cache %s: remove %i stale records, keep %i entries',
+            self.cache_path,
+            self.stale_count,
+            len(self.current),
+        )
+        temp_path = self.cache_path.with_name(f'{self.cache_path.name}.tmp')
+        with temp_path.open('wb') as f:
+            f.write(self.MAGIC)
+            for key, digest in self.current.items():
+                f.write(self.RECORD.pack(*key, digest))
+        os.replace(temp_path, self.cache_path)
+        self.previous.clear()
+        self.record_count = len(self.current)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close(compact=exc_type is None)
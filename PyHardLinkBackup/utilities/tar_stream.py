@@ -0,0 +1,118 @@
+import functools
+import logging
+import os
+import stat
+import tarfile
+from typing import BinaryIO
+
+from PyHardLinkBackup.constants import CHUNK_SIZE
+
+
+logger = logging.getLogger(__name__)
+
+try:
+    import grp
+    import pwd
+except ImportError:  # e.g.: Windows
+    grp = pwd = None
+
+
+@functools.lru_cache(maxsize=100)
+def get_user_name(uid: int) -> str:
+    try:
+        return pwd.getpwuid(uid).pw_name
+    except (AttributeError, KeyError):
+        return ''
+
+
+@functools.lru_cache(maxsize=100)
+def get_group_name(gid: int) -> str:
+    try:
+        return grp.getgrgid(gid).gr_name
+    except (AttributeError, KeyError):
+        return ''
+
+
+def make_tarinfo(arcname: str, file_stat: os.stat_result) -> tarfile.TarInfo:
+    """
+    Create the tar header of a regular file or a symlink (without the link target) from the lstat() result.
+    The modification time is stored as integer: A float would add a extended pax header to every member.
+    """
+    tarinfo = tarfile.TarInfo(arcname)
+    tarinfo.mode = stat.S_IMODE(file_stat.st_mode)
+    tarinfo.uid = file_stat.st_uid
+    tarinfo.gid = file_stat.st_gid
+    tarinfo.uname = get_user_name(file_stat.st_uid)
+    tarinfo.gname = get_group_name(file_stat.st_gid)
+    tarinfo.mtime = int(file_stat.st_mtime)
+    if stat.S_ISLNK(file_stat.st_mode):
+        tarinfo.type = tarfile.SYMTYPE
+    else:
+        tarinfo.size = file_stat.st_size
+    return tarinfo
+
+
+class TarStreamWriter:
+    """
+    Write a POSIX (pax) tar archive sequentially into a file descriptor, e.g.: stdout or a tape.
+    Unlike tarfile.TarFile, no list of the written members is kept in memory.
+    The file content is sent via os.sendfile() without copying it through user space, if possible.
+    """
+
+    def __init__(self, fd: int):
+        self.fd = fd
+        self.offset = 0
+        self.use_sendfile = hasattr(os, 'sendfile')
+
+    def _write(self, data: bytes) -> None:
+        view = memoryview(data)
+        while view:
+            written = os.write(self.fd, view)
+            view = view[written:]
+        self.offset += len(data)
+
+    def add(self, tarinfo: tarfile.TarInfo, fileobj: BinaryIO | None = None) -> None:
+        """
+        Write the header and, for regular files, the content of the given (already opened) file.
+        """
+        self._write(tarinfo.tobuf(tarfile.PAX_FORMAT, tarfile.ENCODING, 'surrogateescape'))
+        if tarinfo.isreg() and tarinfo.size:
+            self._write_content(fileobj, tarinfo.size)
+            remainder = tarinfo.size % tarfile.BLOCKSIZE
+            if remainder:
+                self._write(tarfile.NUL * (tarfile.BLOCKSIZE - remainder))
+
+    def _write_content(self, fileobj: BinaryIO, size: int) -> None:
+        sent = 0
+        if self.use_sendfile:
+            try:
+                while sent < size:
+                    count = os.sendfile(self.fd, fileobj.fileno(), sent, size - sent)
+                    if not count:
+                        break
+                    sent += count
+            except OSError as err:
+                if sent:
+                    raise
+                # e.g.: Not supported for this kind of output
+                logger.debug('sendfile() not possible: %s -> use read/write', err)
+                self.use_sendfile = False
+            self.offset += sent
+
+        fileobj.seek(sent)
+        while sent < size and (chunk := fileobj.read(min(CHUNK_SIZE, size - sent))):
+            self._write(chunk)
+            sent += len(chunk)
+
+        if sent != size:
+            # The header is already written -> The archive would be corrupt:
+            raise OSError(f'File {fileobj.name} changed while reading: {sent} bytes instead of {size}')
+
+    def close(self) -> None:
+        """
+        Write the end-of-archive marker (two empty blocks) and fill up the last record.
+        """
+        self._write(tarfile.NUL * (tarfile.BLOCKSIZE * 2))
+        remainder = self.offset % tarfile.RECORDSIZE
+        if remainder:
+            self._write(tarfile.NUL * (tarfile.RECORDSIZE - remainder))
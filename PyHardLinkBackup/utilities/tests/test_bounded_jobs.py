@@ -0,0 +1,40 @@
+from concurrent.futures import Future
+from unittest import TestCase
+
+from PyHardLinkBackup.utilities.bounded_jobs import BoundedJobQueue
+
+
+def done_future(result) -> Future:
+    future = Future()
+    future.set_result(result)
+    return future
+
+
+class BoundedJobQueueTestCase(TestCase):
+    def test_basic(self):
+        queue = BoundedJobQueue(max_pending=2)
+
+        future_a = Future()
+        future_b = Future()
+        queue.append('A', future_a)
+        queue.append('B', future_b)
+        self.assertEqual(len(queue), 2)
+
+        # The first job is still running -> wait for it, to keep the submit order:
+        self.assertEqual(list(queue.iter_done()), [])
+
+        # Too many pending jobs -> The first job is returned, even if it's not done:
+        queue.append('C', None)
+        self.assertEqual([job for job, future in queue.iter_done()], ['A'])
+        self.assertEqual(len(queue), 2)
+
+        # All finished jobs are returned, a job without a future is always finished:
+        future_b.set_result('b')
+        self.assertEqual(list(queue.iter_done()), [('B', future_b), ('C', None)])
+        self.assertEqual(len(queue), 0)
+
+        queue.append('D', Future())
+        queue.append('E', done_future('e'))
+        self.assertEqual(list(queue.iter_done()), [])
+        self.assertEqual([job for job, future in queue.iter_all()], ['D', 'E'])
+        self.assertEqual(len(queue), 0)
@@ -0,0 +1,116 @@
+import logging
+import os
+import tempfile
+from pathlib import Path
+
+from bx_py_utils.path import assert_is_dir, assert_is_file
+from cli_base.cli_tools.test_utils.base_testcases import BaseTestCase
+
+from PyHardLinkBackup.utilities.file_hash_database import FileHashDatabase
+from PyHardLinkBackup.utilities.file_hash_pool import FileHashPool, get_hash_db
+
+
+LOGGER_NAME = 'PyHardLinkBackup.utilities.file_hash_pool'
+
+
+class TemporaryFileHashPool(tempfile.TemporaryDirectory):
+    def __enter__(self) -> FileHashPool:
+        temp_dir = super().__enter__()
+        backup_root = Path(temp_dir).resolve()
+
+        phlb_conf_dir = backup_root / '.phlb'
+        phlb_conf_dir.mkdir()
+
+        hash_pool = FileHashPool(backup_root=backup_root, phlb_conf_dir=phlb_conf_dir)
+        return hash_pool
+
+
+class FileHashPoolTestCase(BaseTestCase):
+    def test_happy_path(self):
+        with TemporaryFileHashPool() as hash_pool:
+            self.assertIsInstance(hash_pool, FileHashPool)
+            backup_root_path = hash_pool.backup_root
+            assert_is_dir(backup_root_path / '.phlb' / 'pool')
+
+            test_path = hash_pool._get_pool_path('12345678abcdef')
+            self.assertEqual(test_path, backup_root_path / '.phlb' / 'pool' / '12' / '34' / '12345678abcdef')
+
+            file_a_path = backup_root_path / 'snapshot1/file-A'
+            file_a_path.parent.mkdir(parents=True)
+            file_a_path.write_text('A')
+
+            self.assertIs(hash_pool.get('12345678abcdef'), None)
+            self.assertIs('12345678abcdef' in hash_pool, False)
+            self.assertEqual(hash_pool.link_count('12345678abcdef'), 0)
+
+            with self.assertLogs('PyHardLinkBackup', level=logging.DEBUG) as logs:
+                hash_pool['12345678abcdef'] = file_a_path
+            self.assertEqual(logs.output, [f'DEBUG:{LOGGER_NAME}:Link {file_a_path} into pool: {test_path}'])
+            self.assertIs('12345678abcdef' in hash_pool, True)
+            self.assertEqual(hash_pool.get('12345678abcdef'), test_path)
+            self.assertTrue(os.path.samefile(test_path, file_a_path))
+            self.assertEqual(hash_pool.link_count('12345678abcdef'), 2)
+
+            # Hardlink a new "snapshot" file to the pool entry:
+            file_b_path = backup_root_path / 'snapshot2/file-A'
+            file_b_path.parent.mkdir(parents=True)
+            os.link(hash_pool.get('12345678abcdef'), file_b_path)
+            with self.assertNoLogs('PyHardLinkBackup', level=logging.DEBUG):
+                hash_pool['12345678abcdef'] = file_b_path  # no-op, because it's the same inode
+            self.assertEqual(hash_pool.link_count('12345678abcdef'), 3)
+
+            # Remove all snapshots -> The pool still holds the content:
+            file_a_path.unlink()
+            file_b_path.unlink()
+            self.assertEqual(hash_pool.get('12345678abcdef'), test_path)
+            self.assertEqual(test_path.read_text(), 'A')
+            self.assertEqual(hash_pool.link_count('12345678abcdef'), 1)  # Not referenced anymore
+
+            # Replace the pool entry with a new file:
+            file_c_path = backup_root_path / 'snapshot3/file-A'
+            file_c_path.parent.mkdir(parents=True)
+            file_c_path.write_text('A')
+            with self.assertLogs('PyHardLinkBackup', level=logging.DEBUG) as logs:
+                hash_pool['12345678abcdef'] = file_c_path
+            self.assertEqual(logs.output, [f'DEBUG:{LOGGER_NAME}:Link {file_c_path} into pool: {test_path}'])
+            self.assertTrue(os.path.samefile(test_path, file_c_path))
+            self.assertEqual(hash_pool.link_count('12345678abcdef'), 2)
+
+    def test_fallback_to_hash_database(self):
+        with TemporaryFileHashPool() as hash_pool:
+            backup_root_path = hash_pool.backup_root
+            phlb_conf_dir = backup_root_path / '.phlb'
+
+            old_file_path = backup_root_path / 'old-snapshot/file-A'
+            old_file_path.parent.mkdir(parents=True)
+            old_file_path.write_text('A')
+
+            # Content that was backed up before the pool was activated:
+            hash_db = FileHashDatabase(backup_root=backup_root_path, phlb_conf_dir=phlb_conf_dir)
+            hash_db['12345678abcdef'] = old_file_path
+
+            self.assertIs('12345678abcdef' in hash_pool, True)
+            pool_path = hash_pool._get_pool_path('12345678abcdef')
+            self.assertFalse(pool_path.exists())
+
+            with self.assertLogs('PyHardLinkBackup', level=logging.DEBUG) as logs:
+                self.assertEqual(hash_pool.get('12345678abcdef'), pool_path)
+            self.assertIn('Link', ''.join(logs.output))
+            assert_is_file(pool_path)
+            self.assertTrue(os.path.samefile(pool_path, old_file_path))
+
+    def test_get_hash_db(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            backup_root = Path(temp_dir).resolve()
+            phlb_conf_dir = backup_root / '.phlb'
+            phlb_conf_dir.mkdir()
+
+            hash_db = get_hash_db(backup_root, phlb_conf_dir)
+            self.assertIs(type(hash_db), FileHashDatabase)
+
+            hash_db = get_hash_db(backup_root, phlb_conf_dir, pool=True)
+            self.assertIs(type(hash_db), FileHashPool)
+
+            # The pool was activated before -> use it automatically:
+            hash_db = get_hash_db(backup_root, phlb_conf_dir)
+            self.assertIs(type(hash_db), FileHashPool)
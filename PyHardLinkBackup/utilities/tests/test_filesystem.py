@@ -1,3 +1,4 @@
+import errno
 import hashlib
 import logging
 import os
@@ -10,9 +11,15 @@ from cli_base.cli_tools.test_utils.base_testcases import BaseTestCase
 
 from PyHardLinkBackup.constants import HASH_ALGO
 from PyHardLinkBackup.utilities.filesystem import (
+    FICLONE,
     copy_and_hash,
+    copy_small_file,
+    fast_copy_file,
+    hardlink_or_copy,
     hash_file,
+    iter_listed_files,
     iter_scandir_files,
+    iter_scandir_pairs,
     read_and_hash_file,
     supports_hardlinks,
 )
@@ -51,6 +58,151 @@ class TestHashFile(BaseTestCase):
         self.assertEqual(file_hash, '6ae8a75555209fd6c44157c0aed8016e763ff435a19cf186f76863140143ff72')
         self.assertIn(' backup to ', ''.join(logs.output))
 
+    def test_fast_copy_file(self):
+        with TemporaryDirectoryPath() as temp_path:
+            src_path = temp_path / 'source.txt'
+            src_path.write_bytes(b'test content')
+
+            # Reflink is supported -> The filesystem clones the file, nothing else is done:
+            with (
+                self.assertNoLogs('PyHardLinkBackup', level=logging.DEBUG),
+                patch('PyHardLinkBackup.utilities.filesystem.fcntl') as fcntl_mock,
+                patch.object(os, 'copy_file_range', create=True) as copy_file_range_mock,
+            ):
+                method = fast_copy_file(src_path, temp_path / 'dest1.txt')
+            self.assertEqual(method, 'reflink')
+            fcntl_mock.ioctl.assert_called_once()
+            self.assertEqual(fcntl_mock.ioctl.call_args.args[1], FICLONE)
+            copy_file_range_mock.assert_not_called()
+
+            def fake_copy_file_range(src_fd, dst_fd, count):
+                return os.write(dst_fd, os.read(src_fd, count))
+
+            # Reflink not supported -> copy_file_range:
+            reflink_error = OSError(errno.EOPNOTSUPP, 'Operation not supported')
+            with (
+                self.assertLogs('PyHardLinkBackup', level=logging.DEBUG) as logs,
+                patch('PyHardLinkBackup.utilities.filesystem.fcntl') as fcntl_mock,
+                patch.object(os, 'copy_file_range', create=True, side_effect=fake_copy_file_range),
+            ):
+                fcntl_mock.ioctl.side_effect = reflink_error
+                method = fast_copy_file(src_path, temp_path / 'dest2.txt')
+            self.assertEqual(method, 'copy_file_range')
+            self.assertEqual((temp_path / 'dest2.txt').read_bytes(), b'test content')
+            self.assertEqual(
+                logs.output,
+                [
+                    (
+                        f'DEBUG:PyHardLinkBackup.utilities.filesystem:Reflink {src_path} to {temp_path}/dest2.txt'
+                        f' not possible: {reflink_error}'
+                    ),
+                ],
+            )
+
+            # Reflink and copy_file_range are not supported -> read/write fallback:
+            copy_file_range_error = OSError(errno.EXDEV, 'Invalid cross-device link')
+            with (
+                self.assertLogs('PyHardLinkBackup', level=logging.DEBUG) as logs,
+                patch('PyHardLinkBackup.utilities.filesystem.fcntl') as fcntl_mock,
+                patch.object(os, 'copy_file_range', create=True, side_effect=copy_file_range_error),
+            ):
+                fcntl_mock.ioctl.side_effect = reflink_error
+                method = fast_copy_file(src_path, temp_path / 'dest3.txt')
+            self.assertEqual(method, 'read/write')
+            self.assertEqual((temp_path / 'dest3.txt').read_bytes(), b'test content')
+            self.assertEqual(
+                logs.output,
+                [
+                    (
+                        f'DEBUG:PyHardLinkBackup.utilities.filesystem:Reflink {src_path} to {temp_path}/dest3.txt'
+                        f' not possible: {reflink_error}'
+                    ),
+                    (
+                        f'DEBUG:PyHardLinkBackup.utilities.filesystem:copy_file_range {src_path}'
+                        f' to {temp_path}/dest3.txt not possible: {copy_file_range_error}'
+                    ),
+                ],
+            )
+
+            # No fcntl (e.g.: Windows) -> reflink is not tried:
+            with (
+                self.assertNoLogs('PyHardLinkBackup', level=logging.DEBUG),
+                patch('PyHardLinkBackup.utilities.filesystem.fcntl', None),
+                patch.object(os, 'copy_file_range', create=True, side_effect=fake_copy_file_range),
+            ):
+                method = fast_copy_file(src_path, temp_path / 'dest4.txt')
+            self.assertEqual(method, 'copy_file_range')
+            self.assertEqual((temp_path / 'dest4.txt').read_bytes(), b'test content')
+
+    def test_copy_small_file(self):
+        with TemporaryDirectoryPath() as temp_path:
+            src_path = temp_path / 'source.txt'
+            dst_path = temp_path / 'dest.txt'
+
+            src_path.write_bytes(b'test content')
+            src_path.chmod(0o640)
+            os.utime(src_path, ns=(1_000_000_000, 2_000_000_000))
+            src_stat = src_path.stat()
+
+            with self.assertLogs('PyHardLinkBackup', level=logging.DEBUG) as logs:
+                file_hash = copy_small_file(src=src_path, dst=dst_path, src_stat=src_stat)
+            self.assertEqual(file_hash, '6ae8a75555209fd6c44157c0aed8016e763ff435a19cf186f76863140143ff72')
+            self.assertEqual(
+                logs.output,
+                [
+                    (
+                        f'DEBUG:PyHardLinkBackup.utilities.filesystem:{src_path} copied to {dst_path}'
+                        f' with sha256 hash: {file_hash}'
+                    ),
+                ],
+            )
+            dst_stat = dst_path.stat()
+            self.assertEqual(oct(dst_stat.st_mode), '0o100640')
+            self.assertEqual((dst_stat.st_atime_ns, dst_stat.st_mtime_ns), (1_000_000_000, 2_000_000_000))
+            self.assertEqual(dst_path.read_bytes(), b'test content')
+
+            # The source file has grown since stat() -> The complete content is copied:
+            src_path.write_bytes(b'test content' * 2)
+            with self.assertLogs('PyHardLinkBackup', level=logging.DEBUG) as logs:
+                file_hash = copy_small_file(src=src_path, dst=dst_path, src_stat=src_stat)
+            self.assertEqual(dst_path.read_bytes(), b'test content' * 2)
+            self.assertIn(f' with sha256 hash: {file_hash}', ''.join(logs.output))
+
+            # Short reads are handled: The file is read until EOF
+            origin_read = os.read
+            with (
+                self.assertLogs('PyHardLinkBackup', level=logging.DEBUG) as logs,
+                patch('PyHardLinkBackup.utilities.filesystem.os.read', lambda fd, size: origin_read(fd, min(size, 5))),
+            ):
+                file_hash = copy_small_file(src=src_path, dst=dst_path, src_stat=src_path.stat())
+            self.assertEqual(dst_path.read_bytes(), b'test content' * 2)
+            self.assertEqual(file_hash, hashlib.sha256(b'test content' * 2).hexdigest())
+            self.assertIn(f' with sha256 hash: {file_hash}', ''.join(logs.output))
+
+    def test_hardlink_or_copy(self):
+        with TemporaryDirectoryPath() as temp_path:
+            master_path = temp_path / 'master.txt'
+            master_path.write_text('content')
+
+            self.assertIs(hardlink_or_copy(master_path, temp_path / 'link.txt'), True)
+            self.assertEqual(master_path.stat().st_nlink, 2)
+
+            with (
+                self.assertLogs(level=logging.WARNING) as logs,
+                patch('PyHardLinkBackup.utilities.filesystem.os.link', side_effect=OSError(errno.EMLINK, 'Too many')),
+            ):
+                self.assertIs(hardlink_or_copy(master_path, temp_path / 'copy.txt'), False)
+            self.assertIn('Hardlink limit reached', ''.join(logs.output))
+            self.assertEqual((temp_path / 'copy.txt').read_text(), 'content')
+            self.assertEqual((temp_path / 'copy.txt').stat().st_nlink, 1)
+
+            # Other errors will be raised:
+            with (
+                patch('PyHardLinkBackup.utilities.filesystem.os.link', side_effect=OSError(errno.EPERM, 'Bam!')),
+                self.assertRaises(PermissionError),
+            ):
+                hardlink_or_copy(master_path, temp_path / 'other.txt')
+
     def test_read_and_hash_file(self):
         with tempfile.NamedTemporaryFile() as temp:
             temp_file_path = Path(temp.name)
@@ -170,3 +322,65 @@ class TestHashFile(BaseTestCase):
 
         with self.assertLogs(level=logging.DEBUG), self.assertRaises(NotADirectoryError):
             supports_hardlinks(Path('/not/existing/directory'))
+
+    def test_iter_scandir_pairs(self):
+        with TemporaryDirectoryPath() as temp_path:
+            src_path = temp_path / 'src'
+            dst_path = temp_path / 'dst'
+            for path in (src_path / 'both', src_path / 'only_src', src_path / 'excluded', dst_path / 'both'):
+                path.mkdir(parents=True)
+            (src_path / 'both' / 'file.txt').touch()
+            (dst_path / 'both' / 'file.txt').touch()
+            (src_path / 'only_src' / 'file.txt').touch()
+            (src_path / 'excluded' / 'file.txt').touch()
+            (dst_path / 'only_dst.txt').touch()
+            (src_path / 'file_or_dir').touch()
+            (dst_path / 'file_or_dir').mkdir()
+            (dst_path / 'file_or_dir' / 'file.txt').touch()
+
+            with self.assertLogs('PyHardLinkBackup', level=logging.DEBUG) as logs:
+                pairs = [
+                    (rel_path, src_entry and src_entry.path, dst_entry and dst_entry.path)
+                    for rel_path, src_entry, dst_entry in iter_scandir_pairs(
+                        src_path=src_path,
+                        dst_path=dst_path,
+                        one_file_system=True,
+                        src_device_id=src_path.stat().st_dev,
+                        excludes={'excluded'},
+                    )
+                ]
+        self.assertEqual(
+            logs.output,
+            [f'DEBUG:PyHardLinkBackup.utilities.filesystem:Excluding directory {src_path}/excluded'],
+        )
+        self.assertEqual(
+            pairs,
+            [
+                ('both/file.txt', f'{src_path}/both/file.txt', f'{dst_path}/both/file.txt'),
+                ('file_or_dir', f'{src_path}/file_or_dir', None),
+                ('file_or_dir/file.txt', None, f'{dst_path}/file_or_dir/file.txt'),
+                ('only_dst.txt', None, f'{dst_path}/only_dst.txt'),
+                ('only_src/file.txt', f'{src_path}/only_src/file.txt', None),
+            ],
+        )
+
+    def test_iter_listed_files(self):
+        with TemporaryDirectoryPath() as temp_path:
+            (temp_path / 'sub').mkdir()
+            (temp_path / 'sub' / 'file1.txt').touch()
+            (temp_path / 'sub' / 'file2.txt').touch()
+            (temp_path / 'root.txt').touch()
+
+            with self.assertLogs(level=logging.WARNING) as logs:
+                names = [
+                    entry.path
+                    for entry in iter_listed_files(
+                        path=temp_path,
+                        rel_paths=['sub/file2.txt', 'root.txt', 'sub/file1.txt', 'sub/missing.txt', 'missing/file.txt'],
+                    )
+                ]
+        self.assertEqual(names, [f'{temp_path}/root.txt', f'{temp_path}/sub/file1.txt', f'{temp_path}/sub/file2.txt'])
+        assert_in(
+            content=''.join(logs.output),
+            parts=('Listed file not found: ', 'sub/missing.txt', 'missing/file.txt'),
+        )
@@ -0,0 +1,93 @@
+import random
+from array import array
+from pathlib import Path
+from unittest import TestCase
+
+from PyHardLinkBackup.utilities.inode_set import InodeHashes, InodeSet, MappedRun
+
+
+class InodeSetTestCase(TestCase):
+    def test_basic(self):
+        with InodeSet() as inode_set:
+            self.assertEqual(len(inode_set), 0)
+            self.assertNotIn((1, 123), inode_set)
+
+            self.assertIs(inode_set.add((1, 123)), True)
+            self.assertIs(inode_set.add((1, 123)), False)
+            self.assertEqual(len(inode_set), 1)
+            self.assertIn((1, 123), inode_set)
+            self.assertNotIn((2, 123), inode_set)  # Same inode number on other device
+
+            inode_set.add((2, 123))
+            inode_set.add((2, 2**64 - 1))
+            self.assertEqual(len(inode_set), 3)
+            self.assertIn((2, 123), inode_set)
+            self.assertIn((2, 2**64 - 1), inode_set)
+
+    def test_merge_and_spill(self):
+        inode_set = InodeSet(max_memory=8 * 100)
+        inode_set.DELTA_MAX_SIZE = 10
+
+        inodes = random.Random(1).sample(range(1, 10_000), 500)
+        for ino in inodes:
+            inode_set.add((1, ino))
+            inode_set.add((2, ino * 2))
+        self.assertEqual(len(inode_set), 1000)
+
+        runs = inode_set.runs[1]
+        self.assertLess(len(runs), 10)  # Merged into a few runs
+        self.assertTrue(any(isinstance(run, MappedRun) for run in runs))  # Some runs are spilled to disk
+        self.assertLessEqual(inode_set.memory_usage, 8 * 100)
+        for run in runs:
+            values = run.values if isinstance(run, MappedRun) else run
+            self.assertEqual(array('Q', values).tolist(), sorted(values))
+
+        for ino in inodes:
+            self.assertIn((1, ino), inode_set)
+            self.assertIn((2, ino * 2), inode_set)
+        self.assertNotIn((1, 10_000), inode_set)
+        self.assertNotIn((3, inodes[0]), inode_set)
+
+        temp_path = Path(inode_set.temp_dir.name)
+        self.assertTrue(temp_path.is_dir())
+        inode_set.close()
+        self.assertFalse(temp_path.exists())
+
+
+class InodeHashesTestCase(TestCase):
+    def test_basic(self):
+        inode_hashes = InodeHashes()
+        file_hash = 'bbc4de2ca238d1ec41fb622b75b5cf7d31a6d2ac92405043dd8f8220364fefc8'
+        self.assertIsNone(inode_hashes.get((1, 123)))
+
+        inode_hashes.processed((1, 123), file_hash=file_hash, nlink=3)
+        self.assertEqual(inode_hashes.get((1, 123)), file_hash)
+        self.assertIsNone(inode_hashes.get((2, 123)))
+
+        inode_hashes.processed((1, 123), file_hash=file_hash, nlink=3)
+        self.assertEqual(len(inode_hashes), 1)
+
+        # All hardlinks processed -> entry removed:
+        inode_hashes.processed((1, 123), file_hash=file_hash, nlink=3)
+        self.assertEqual(len(inode_hashes), 0)
+        self.assertIsNone(inode_hashes.get((1, 123)))
+
+        # Without other hardlinks, nothing is stored:
+        inode_hashes.processed((1, 456), file_hash=file_hash, nlink=1)
+        self.assertEqual(len(inode_hashes), 0)
+
+    def test_max_entries(self):
+        inode_hashes = InodeHashes(max_entries=2)
+        file_hash = 'bbc4de2ca238d1ec41fb622b75b5cf7d31a6d2ac92405043dd8f8220364fefc8'
+
+        # e.g.: The other hardlinks are pool entries, that are never processed:
+        inode_hashes.processed((1, 1), file_hash=file_hash, nlink=2)
+        inode_hashes.processed((1, 2), file_hash=file_hash, nlink=2)
+        self.assertEqual(inode_hashes.get((1, 1)), file_hash)  # (1, 1) is now the most recently used entry
+
+        inode_hashes.processed((1, 3), file_hash=file_hash, nlink=2)
+        self.assertEqual(len(inode_hashes), 2)
+        self.assertEqual(inode_hashes.evicted_count, 1)
+        self.assertIsNone(inode_hashes.get((1, 2)))  # The least recently used entry was dropped
+        self.assertEqual(inode_hashes.get((1, 1)), file_hash)
+        self.assertEqual(inode_hashes.get((1, 3)), file_hash)
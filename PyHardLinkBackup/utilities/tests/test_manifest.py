@@ -0,0 +1,56 @@
+import hashlib
+import os
+from unittest import TestCase
+from unittest.mock import patch
+
+from PyHardLinkBackup.utilities.manifest import ManifestEntry, ManifestWriter, get_manifest_path, iter_manifest
+from PyHardLinkBackup.utilities.tests.unittest_utilities import PyHardLinkBackupTestCaseMixin
+
+
+class ManifestTestCase(PyHardLinkBackupTestCaseMixin, TestCase):
+    def test_write_and_read(self):
+        snapshot_dir = self.backup_root / 'source' / '2026-01-01-120000'
+        (snapshot_dir / 'sub').mkdir(parents=True)
+
+        file_paths = {}
+        for rel_path in ('b.txt', 'sub/c.txt', 'a.txt', 'sub/a.txt', 'd.txt'):
+            file_path = snapshot_dir / rel_path
+            file_path.write_text(rel_path)
+            file_paths[rel_path] = file_path
+        (snapshot_dir / 'link').symlink_to('a.txt')
+
+        manifest = ManifestWriter(snapshot_dir)
+        with patch.object(ManifestWriter, 'RUN_MAX_SIZE', 2):
+            for rel_path, file_path in file_paths.items():
+                manifest.add(file_path, hashlib.sha256(rel_path.encode()).hexdigest())
+            manifest.add(snapshot_dir / 'link', None)
+            self.assertEqual(len(manifest.run_paths), 3)  # Sorted runs spilled to disk
+            manifest.close()
+
+        self.assertIsNone(manifest.temp_dir)
+        self.assertEqual(
+            sorted(path.name for path in snapshot_dir.parent.iterdir()),
+            ['2026-01-01-120000', '2026-01-01-120000-manifest.jsonl.gz'],
+        )
+        self.assertTrue(get_manifest_path(snapshot_dir).is_file())
+
+        entries = list(iter_manifest(snapshot_dir))
+        self.assertEqual(
+            [entry.path for entry in entries],
+            ['a.txt', 'b.txt', 'd.txt', 'link', 'sub/a.txt', 'sub/c.txt'],
+        )
+        a_stat = file_paths['a.txt'].stat()
+        self.assertEqual(
+            entries[0],
+            ManifestEntry(
+                path='a.txt',
+                size=5,
+                mtime_ns=a_stat.st_mtime_ns,
+                mode=a_stat.st_mode,
+                inode=a_stat.st_ino,
+                sha256=hashlib.sha256(b'a.txt').hexdigest(),
+            ),
+        )
+        link_entry = entries[3]
+        self.assertIsNone(link_entry.sha256)
+        self.assertEqual(link_entry.inode, os.lstat(snapshot_dir / 'link').st_ino)
@@ -0,0 +1,102 @@
+import logging
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+
+from cli_base.cli_tools.test_utils.base_testcases import BaseTestCase
+
+from PyHardLinkBackup.utilities.small_file_index import SmallFileIndex
+
+
+LOGGER_NAME = 'PyHardLinkBackup.utilities.small_file_index'
+
+HASH_A = 'a' * 64
+HASH_B = 'b' * 64
+
+
+class SmallFileIndexTestCase(BaseTestCase):
+    def test_happy_path(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            backup_root = Path(temp_dir)
+            phlb_conf_dir = backup_root / '.phlb'
+            phlb_conf_dir.mkdir()
+
+            file_a_path = backup_root / 'snapshot1' / 'file-ä.txt'
+            file_a_path.parent.mkdir()
+            file_a_path.write_text('A')
+
+            with SmallFileIndex(backup_root, phlb_conf_dir) as index:
+                self.assertIs(HASH_A in index, False)
+                self.assertIs(index.get(HASH_A), None)
+                index[HASH_A] = file_a_path
+                self.assertIs(HASH_A in index, True)
+                self.assertEqual(index.get(HASH_A), file_a_path)
+
+            index_path = phlb_conf_dir / 'small-file-index.bin'
+            self.assertEqual(
+                index_path.read_bytes(),
+                SmallFileIndex.MAGIC + bytes.fromhex(HASH_A) + b'\x15\x00snapshot1/file-\xc3\xa4.txt',
+            )
+
+            # A incomplete last record (e.g. aborted backup) is ignored:
+            with index_path.open('ab') as f:
+                f.write(bytes.fromhex(HASH_B) + b'\x12\x00snap')
+
+            with (
+                self.assertLogs('PyHardLinkBackup', level=logging.INFO) as logs,
+                SmallFileIndex(backup_root, phlb_conf_dir) as index,
+            ):
+                self.assertEqual(index.get(HASH_A), file_a_path)
+                self.assertIs(HASH_B in index, False)
+                self.assertEqual(
+                    logs.output,
+                    [f'INFO:{LOGGER_NAME}:Small file index {index_path} loaded: 1 entries (1 records)'],
+                )
+
+                # Remove the backup file -> The entry will be removed, too:
+                file_a_path.unlink()
+                with self.assertLogs('PyHardLinkBackup', level=logging.WARNING) as warning_logs:
+                    self.assertIs(index.get(HASH_A), None)
+                self.assertIn('Small file index entry found, but file does not exist', ''.join(warning_logs.output))
+                self.assertIs(HASH_A in index, False)
+
+    def test_compact(self):
+        with (
+            tempfile.TemporaryDirectory() as temp_dir,
+            patch.object(SmallFileIndex, 'COMPACT_MIN_STALE', 2),
+        ):
+            backup_root = Path(temp_dir)
+            phlb_conf_dir = backup_root / '.phlb'
+            phlb_conf_dir.mkdir()
+            file_path = backup_root / 'file.txt'
+            file_path.write_text('A')
+
+            index_path = phlb_conf_dir / 'small-file-index.bin'
+
+            with (
+                self.assertLogs('PyHardLinkBackup', level=logging.INFO) as logs,
+                SmallFileIndex(backup_root, phlb_conf_dir) as index,
+            ):
+                for _ in range(10):
+                    index[HASH_A] = file_path
+                self.assertEqual(index.stale_count, 9)
+            self.assertEqual(
+                logs.output,
+                [
+                    (
+                        f'INFO:{LOGGER_NAME}:Compact small file index {index_path}:'
+                        ' remove 9 outdated records, keep 1 entries'
+                    ),
+                ],
+            )
+
+            with (
+                self.assertLogs('PyHardLinkBackup', level=logging.INFO) as logs,
+                SmallFileIndex(backup_root, phlb_conf_dir) as index,
+            ):
+                self.assertEqual((index.record_count, index.stale_count), (1, 0))
+                self.assertEqual(index.get(HASH_A), file_path)
+            self.assertEqual(
+                logs.output,
+                [f'INFO:{LOGGER_NAME}:Small file index {index_path} loaded: 1 entries (1 records)'],
+            )
@@ -0,0 +1,77 @@
+from unittest import TestCase
+
+from PyHardLinkBackup.utilities.manifest import get_manifest_path
+from PyHardLinkBackup.utilities.snapshots import (
+    IngestedSnapshots,
+    SnapshotFingerprint,
+    get_snapshot_fingerprint,
+    get_snapshot_size,
+    iter_snapshot_dirs,
+)
+from PyHardLinkBackup.utilities.tests.unittest_utilities import TemporaryDirectoryPath
+
+
+class SnapshotsTestCase(TestCase):
+    def test_iter_snapshot_dirs(self):
+        with TemporaryDirectoryPath() as temp_path:
+            (temp_path / '.phlb' / '2026-01-01-120000').mkdir(parents=True)
+            (temp_path / 'foo' / '2026-01-02-120000').mkdir(parents=True)
+            (temp_path / 'foo' / '2026-01-01-120000').mkdir(parents=True)
+            (temp_path / 'foo' / '2026-01-01-120000-summary.txt').touch()
+            (temp_path / 'foo' / 'not-a-snapshot').mkdir()
+            (temp_path / 'bar' / '2026-01-03-120000').mkdir(parents=True)
+            (temp_path / '2026-01-01-120000-rebuild.log').touch()
+
+            self.assertEqual(
+                [str(path.relative_to(temp_path)) for path in iter_snapshot_dirs(temp_path)],
+                ['bar/2026-01-03-120000', 'foo/2026-01-01-120000', 'foo/2026-01-02-120000'],
+            )
+
+    def test_ingested_snapshots(self):
+        with TemporaryDirectoryPath() as temp_path:
+            phlb_conf_dir = temp_path / '.phlb'
+            phlb_conf_dir.mkdir()
+            snapshot_dir = temp_path / 'foo' / '2026-01-01-120000'
+            (snapshot_dir / 'sub').mkdir(parents=True)
+            (snapshot_dir / 'one.txt').write_text('one')
+            (snapshot_dir / 'sub' / 'two.txt').write_text('two!')
+
+            self.assertEqual(get_snapshot_size(snapshot_dir), (2, 7))
+            fingerprint = get_snapshot_fingerprint(snapshot_dir)
+            self.assertEqual(
+                fingerprint,
+                SnapshotFingerprint(
+                    mtime_ns=snapshot_dir.stat().st_mtime_ns,
+                    manifest_mtime_ns=None,
+                    manifest_size=None,
+                ),
+            )
+
+            ingested_snapshots = IngestedSnapshots(temp_path, phlb_conf_dir)
+            self.assertFalse(ingested_snapshots.is_ingested(snapshot_dir, fingerprint))
+            ingested_snapshots[snapshot_dir] = fingerprint
+            ingested_snapshots[temp_path / 'foo' / '2026-01-02-120000'] = fingerprint
+            ingested_snapshots.retain([snapshot_dir])  # The other snapshot doesn't exist anymore
+            ingested_snapshots.save()
+
+            ingested_snapshots = IngestedSnapshots(temp_path, phlb_conf_dir)
+            self.assertEqual(list(ingested_snapshots.fingerprints), ['foo/2026-01-01-120000'])
+            self.assertTrue(ingested_snapshots.is_ingested(snapshot_dir, fingerprint))
+
+            # e.g.: The snapshot was copied again with a (new) manifest:
+            get_manifest_path(snapshot_dir).write_bytes(b'manifest')
+            self.assertFalse(ingested_snapshots.is_ingested(snapshot_dir, get_snapshot_fingerprint(snapshot_dir)))
+
+            # Fingerprints of old versions are ignored:
+            ingested_snapshots.state_path.write_text(
+                '{"foo/2026-01-01-120000": {"file_count": 2, "total_size": 7, "mtime_ns": 1}}'
+            )
+            with self.assertLogs('PyHardLinkBackup', level='INFO'):
+                ingested_snapshots = IngestedSnapshots(temp_path, phlb_conf_dir)
+            self.assertEqual(ingested_snapshots.fingerprints, {})
+
+            # Invalid files are ignored:
+            ingested_snapshots.state_path.write_text('{invalid')
+            with self.assertLogs('PyHardLinkBackup', level='WARNING'):
+                ingested_snapshots = IngestedSnapshots(temp_path, phlb_conf_dir)
+            self.assertEqual(ingested_snapshots.fingerprints, {})
@@ -0,0 +1,160 @@
+import logging
+import os
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+
+from cli_base.cli_tools.test_utils.base_testcases import BaseTestCase
+
+from PyHardLinkBackup.utilities.source_hash_cache import SourceHashCache
+
+
+LOGGER_NAME = 'PyHardLinkBackup.utilities.source_hash_cache'
+
+HASH_A = 'a' * 64
+HASH_B = 'b' * 64
+
+
+def fake_stat(*, st_ino: int, st_size: int = 1000, st_mtime_ns: int = 1, st_ctime_ns: int = 1) -> os.stat_result:
+    return os.stat_result(
+        (0o100644, st_ino, 1, 1, 0, 0, st_size, 0, 0, 0),
+        {'st_mtime_ns': st_mtime_ns, 'st_ctime_ns': st_ctime_ns},
+    )
+
+
+class SourceHashCacheTestCase(BaseTestCase):
+    def test_happy_path(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            phlb_conf_dir = Path(temp_dir)
+            cache_path = phlb_conf_dir / 'source-hash-cache' / 'foo.bin'
+
+            with (
+                self.assertNoLogs('PyHardLinkBackup', level=logging.INFO),
+                SourceHashCache(phlb_conf_dir, 'foo') as cache,
+            ):
+                self.assertIs(cache.get(fake_stat(st_ino=1)), None)
+                cache[fake_stat(st_ino=1)] = HASH_A
+                self.assertEqual(cache.get(fake_stat(st_ino=1)), HASH_A)
+                self.assertEqual((cache.hits, cache.misses), (1, 1))
+            self.assertEqual(cache_path.stat().st_size, len(SourceHashCache.MAGIC) + SourceHashCache.RECORD.size)
+
+            with (
+                self.assertLogs('PyHardLinkBackup', level=logging.INFO) as logs,
+                SourceHashCache(phlb_conf_dir, 'foo') as cache,
+            ):
+                self.assertEqual(cache.get(fake_stat(st_ino=1)), HASH_A)
+
+                # Any change of the stat values -> cache miss:
+                self.assertIs(cache.get(fake_stat(st_ino=2)), None)
+                self.assertIs(cache.get(fake_stat(st_ino=1, st_size=1001)), None)
+                self.assertIs(cache.get(fake_stat(st_ino=1, st_mtime_ns=2)), None)
+                self.assertIs(cache.get(fake_stat(st_ino=1, st_ctime_ns=2)), None)
+                self.assertEqual((cache.hits, cache.misses), (1, 4))
+
+                cache[fake_stat(st_ino=2)] = HASH_B
+            self.assertEqual(
+                logs.output, [f'INFO:{LOGGER_NAME}:Source hash cache {cache_path} loaded: 1 entries (1 records)']
+            )
+            self.assertEqual(cache_path.stat().st_size, len(SourceHashCache.MAGIC) + SourceHashCache.RECORD.size * 2)
+
+            # A incomplete last record (e.g. aborted backup) is ignored:
+            with cache_path.open('ab') as f:
+                f.write(b'\x00' * 10)
+            with (
+                self.assertLogs('PyHardLinkBackup', level=logging.INFO) as logs,
+                SourceHashCache(phlb_conf_dir, 'foo') as cache,
+            ):
+                self.assertEqual(cache.get(fake_stat(st_ino=1)), HASH_A)
+                self.assertEqual(cache.get(fake_stat(st_ino=2)), HASH_B)
+                self.assertEqual(cache.record_count, 2)
+            self.assertEqual(
+                logs.output, [f'INFO:{LOGGER_NAME}:Source hash cache {cache_path} loaded: 2 entries (2 records)']
+            )
+
+    def test_recently_modified_files(self):
+        with tempfile.TemporaryDirectory() as temp_dir, SourceHashCache(Path(temp_dir), 'foo') as cache:
+            now = cache.start_time_ns
+            with self.assertLogs('PyHardLinkBackup', level=logging.DEBUG) as logs:
+                cache[fake_stat(st_ino=1, st_mtime_ns=now)] = HASH_A
+                cache[fake_stat(st_ino=2, st_ctime_ns=now)] = HASH_A
+                cache[fake_stat(st_ino=3, st_mtime_ns=now - SourceHashCache.RACY_TIME_NS)] = HASH_A
+            self.assertEqual(
+                logs.output,
+                [
+                    f'DEBUG:{LOGGER_NAME}:Do not cache hash of recently modified file: (1, 1, 1000, {now}, 1)',
+                    f'DEBUG:{LOGGER_NAME}:Do not cache hash of recently modified file: (1, 2, 1000, 1, {now})',
+                ],
+            )
+            self.assertIs(cache.get(fake_stat(st_ino=1, st_mtime_ns=now)), None)
+            self.assertIs(cache.get(fake_stat(st_ino=2, st_ctime_ns=now)), None)
+            self.assertEqual(cache.get(fake_stat(st_ino=3, st_mtime_ns=now - SourceHashCache.RACY_TIME_NS)), HASH_A)
+
+    def test_compact(self):
+        with tempfile.TemporaryDirectory() as temp_dir, patch.object(SourceHashCache, 'COMPACT_MIN_STALE', 2):
+            phlb_conf_dir = Path(temp_dir)
+            cache_path = phlb_conf_dir / 'source-hash-cache' / 'foo.bin'
+
+            with SourceHashCache(phlb_conf_dir, 'foo') as cache:
+                for st_ino in range(10):
+                    cache[fake_stat(st_ino=st_ino)] = HASH_A
+
+            # A interrupted run stores its new records, but doesn't compact:
+            with (
+                self.assertLogs('PyHardLinkBackup', level=logging.INFO) as logs,
+                self.assertRaises(KeyboardInterrupt),
+                SourceHashCache(phlb_conf_dir, 'foo') as cache,
+            ):
+                cache[fake_stat(st_ino=10)] = HASH_B
+                self.assertEqual(cache.stale_count, 10)
+                raise KeyboardInterrupt
+            self.assertEqual(
+                logs.output, [f'INFO:{LOGGER_NAME}:Source hash cache {cache_path} loaded: 10 entries (10 records)']
+            )
+            self.assertEqual(cache_path.stat().st_size, len(SourceHashCache.MAGIC) + SourceHashCache.RECORD.size * 11)
+
+            # Only one file unchanged, one file modified -> 10 stale records:
+            with (
+                self.assertLogs('PyHardLinkBackup', level=logging.INFO) as logs,
+                SourceHashCache(phlb_conf_dir, 'foo') as cache,
+            ):
+                self.assertEqual(cache.get(fake_stat(st_ino=1)), HASH_A)
+                cache[fake_stat(st_ino=2, st_mtime_ns=2)] = HASH_B
+                self.assertEqual(cache.stale_count, 10)
+            self.assertEqual(
+                logs.output,
+                [
+                    f'INFO:{LOGGER_NAME}:Source hash cache {cache_path} loaded: 11 entries (11 records)',
+                    (
+                        f'INFO:{LOGGER_NAME}:Compact source hash cache {cache_path}:'
+                        ' remove 10 stale records, keep 2 entries'
+                    ),
+                ],
+            )
+            self.assertEqual(cache_path.stat().st_size, len(SourceHashCache.MAGIC) + SourceHashCache.RECORD.size * 2)
+            self.assertEqual(sorted(path.name for path in cache_path.parent.iterdir()), ['foo.bin'])
+
+            with (
+                self.assertLogs('PyHardLinkBackup', level=logging.INFO) as logs,
+                SourceHashCache(phlb_conf_dir, 'foo') as cache,
+            ):
+                self.assertEqual(cache.get(fake_stat(st_ino=1)), HASH_A)
+                self.assertEqual(cache.get(fake_stat(st_ino=2, st_mtime_ns=2)), HASH_B)
+                self.assertIs(cache.get(fake_stat(st_ino=3)), None)
+            self.assertEqual(
+                logs.output, [f'INFO:{LOGGER_NAME}:Source hash cache {cache_path} loaded: 2 entries (2 records)']
+            )
+
+    def test_invalid_cache_file(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            phlb_conf_dir = Path(temp_dir)
+            cache_path = phlb_conf_dir / 'source-hash-cache' / 'foo.bin'
+            cache_path.parent.mkdir()
+            cache_path.write_bytes(b'Not a cache file')
+
+            with (
+                self.assertLogs('PyHardLinkBackup', level=logging.WARNING) as logs,
+                SourceHashCache(phlb_conf_dir, 'foo') as cache,
+            ):
+                cache[fake_stat(st_ino=1)] = HASH_A
+            self.assertIn('Ignore invalid source hash cache file', '\n'.join(logs.output))
+            self.assertTrue(cache_path.read_bytes().startswith(SourceHashCache.MAGIC))
@@ -0,0 +1,56 @@
+import errno
+import os
+import tarfile
+from pathlib import Path
+from unittest import TestCase
+from unittest.mock import patch
+
+from PyHardLinkBackup.utilities.tar_stream import TarStreamWriter, make_tarinfo
+from PyHardLinkBackup.utilities.tests.unittest_utilities import TemporaryDirectoryPath
+
+
+def write_archive(archive_path: Path, file_path: Path) -> int:
+    fd = os.open(archive_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC)
+    try:
+        writer = TarStreamWriter(fd)
+        with file_path.open('rb') as fileobj:
+            writer.add(make_tarinfo('file.bin', file_path.stat()), fileobj)
+        writer.close()
+    finally:
+        os.close(fd)
+    return writer.offset
+
+
+class TarStreamWriterTestCase(TestCase):
+    def test_sendfile_fallback(self):
+        with TemporaryDirectoryPath() as temp_path:
+            file_path = temp_path / 'file.bin'
+            file_path.write_bytes(os.urandom(1234))
+
+            archive_size = write_archive(temp_path / 'sendfile.tar', file_path)
+            self.assertEqual(archive_size, tarfile.RECORDSIZE)
+
+            with patch.object(os, 'sendfile', side_effect=OSError(errno.EINVAL, 'Invalid argument')):
+                write_archive(temp_path / 'fallback.tar', file_path)
+
+            self.assertEqual(
+                (temp_path / 'sendfile.tar').read_bytes(),
+                (temp_path / 'fallback.tar').read_bytes(),
+            )
+            with tarfile.open(temp_path / 'fallback.tar') as tar:
+                self.assertEqual(tar.extractfile('file.bin').read(), file_path.read_bytes())
+
+    def test_file_changed(self):
+        with TemporaryDirectoryPath() as temp_path:
+            file_path = temp_path / 'file.bin'
+            file_path.write_bytes(b'content')
+            tarinfo = make_tarinfo('file.bin', file_path.stat())
+            tarinfo.size = 100  # File was truncated after the stat() call
+
+            fd = os.open(temp_path / 'archive.tar', os.O_WRONLY | os.O_CREAT)
+            try:
+                with self.assertRaises(OSError) as cm, file_path.open('rb') as fileobj:
+                    TarStreamWriter(fd).add(tarinfo, fileobj)
+            finally:
+                os.close(fd)
+            self.assertIn('changed while reading: 7 bytes instead of 100', str(cm.exception))
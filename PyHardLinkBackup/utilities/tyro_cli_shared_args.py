@@ -27,3 +27,11 @@ TyroBackupNameArgType = Annotated[
         ),
     ),
 ]
+
+TyroWorkersArgType = Annotated[
+    int,
+    tyro.conf.arg(
+        help='Number of worker threads for hashing files.',
+    ),
+]
+DEFAULT_WORKERS = 4